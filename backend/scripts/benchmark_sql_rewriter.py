@@ -0,0 +1,1103 @@
+#!/usr/bin/env python3
+"""
+Replay the SQL rewrite corpus and benchmark rewrite latency.
+
+Each entry in sql_rewrite_corpus.jsonl is a previously generated query with
+the output of the legacy multi-pass chain (LegacyRewriter below, the regex
+fixes BigQuerySQLGenerator ran before src.core.sql_rewriter) as its expected
+SQL, and the rule set the single-pass rewriter is expected to fire. Entries
+where the rewriter deliberately differs from the legacy chain carry an
+intended_difference note and the rewritten_sql expected instead. Outputs are
+compared token by token, ignoring whitespace; any other mismatch is reported
+as a regression and fails the run. Latency is measured for both.
+
+Usage:
+    cd backend
+    python scripts/benchmark_sql_rewriter.py [--iterations 200] [--no-legacy]
+    python scripts/benchmark_sql_rewriter.py --update   # re-record the legacy output as expected
+"""
+
+import difflib
+import json
+import logging
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Add project root to path
+SCRIPT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import structlog
+
+# The legacy chain logs on nearly every step; keep logging out of the timings
+structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+
+from src.core.ap_examples import AP_SQL_EXAMPLES
+from src.core.bigquery_sql_generator import DEFAULT_TABLE
+from src.core.sql_rewriter import RewriteContext, flatten, fragment, rewrite_sql
+
+logger = structlog.get_logger()
+
+CORPUS_PATH = SCRIPT_DIR / "sql_rewrite_corpus.jsonl"
+
+PROJECT_ID = "arizona-poc"
+DATASET_ID = "copa_export_copa_data_000000000000"
+SCHEMA_TABLES = ["dataset_25m_table"]
+VALID_TABLES = SCHEMA_TABLES + sorted({
+    table for example in AP_SQL_EXAMPLES for table in re.findall(r"\{dataset\}\.(\w+)", example["sql"])
+})
+
+
+class LegacyRewriter:
+    """The multi-pass regex post-processing BigQuerySQLGenerator.generate_sql ran before the single-pass rewriter."""
+
+    def __init__(self, project_id: str, dataset_id: str):
+        self.project_id = project_id
+        self.dataset_id = dataset_id
+
+    def rewrite(self, sql: str, schemas: List[Dict[str, Any]], valid_table_names: List[str]) -> str:
+        """Apply the legacy fixes in the order generate_sql ran them."""
+        sql = self._fix_postgresql_syntax(sql)
+        sql = self._qualify_table_names(sql, schemas, valid_table_names)
+        if "LIMIT" not in sql.upper() and "SELECT" in sql.upper():
+            sql = sql.rstrip(';') + " LIMIT 1000;"
+        sql = self._fix_current_date_queries(sql)
+        sql = self._enforce_correct_dataset(sql)
+        sql = self._remove_lower_from_select(sql)
+        return self._add_null_filters_for_identifiers(sql)
+
+    def _qualify_table_names(self, sql: str, schemas: List[Dict[str, Any]], valid_table_names: List[str]) -> str:
+        """Ensure fully qualified table names"""
+        import re as regex_module
+
+        # First, fix any malformed table names where LLM split table_name incorrectly
+        # e.g., `arizona-poc.dataset.25m_table` should be `arizona-poc.copa_export_copa_data_000000000000.dataset_25m_table`
+        # e.g., `arizona-poc.dataset_25m.table` should be `arizona-poc.copa_export_copa_data_000000000000.dataset_25m_table`
+        for schema in schemas:
+            table_name = schema['table_name']
+            full_table = f"`{self.project_id}.{self.dataset_id}.{table_name}`"
+
+            # Fix malformed table references where table name was split at underscores
+            # e.g., dataset_25m_table became dataset.25m_table or dataset_25m.table
+            if '_' in table_name:
+                parts = table_name.split('_')
+                # Generate all possible malformed variations
+                for i in range(1, len(parts)):
+                    # Split at each underscore position
+                    prefix = '_'.join(parts[:i])
+                    suffix = '_'.join(parts[i:])
+
+                    # Pattern 1: `project.prefix.suffix` (underscore became dot)
+                    malformed1 = f"`{self.project_id}.{prefix}.{suffix}`"
+                    if malformed1 in sql:
+                        sql = sql.replace(malformed1, full_table)
+                        logger.info(f"Fixed malformed table name: {malformed1} -> {full_table}")
+
+                    # Pattern 2: `project.prefix_suffix.remaining` (partial split)
+                    for j in range(i + 1, len(parts)):
+                        partial_prefix = '_'.join(parts[:j])
+                        partial_suffix = '_'.join(parts[j:])
+                        malformed2 = f"`{self.project_id}.{partial_prefix}.{partial_suffix}`"
+                        if malformed2 in sql:
+                            sql = sql.replace(malformed2, full_table)
+                            logger.info(f"Fixed malformed table name: {malformed2} -> {full_table}")
+
+            # Also fix cases where LLM used wrong dataset but correct table name
+            # Pattern: `project.wrong_dataset.table_name`
+            wrong_dataset_pattern = regex_module.compile(
+                rf'`{regex_module.escape(self.project_id)}\.(?!{regex_module.escape(self.dataset_id)})[^`]+\.{regex_module.escape(table_name)}`'
+            )
+            sql = wrong_dataset_pattern.sub(full_table, sql)
+
+        # Catch-all: Find any table reference with project ID that doesn't have correct dataset
+        # Pattern: `project.anything.anything` where dataset is wrong
+        def fix_all_malformed_tables(sql_str, project, correct_dataset, valid_tables):
+            """Fix all malformed table references in the SQL"""
+            # Find all backtick-quoted table references for this project
+            pattern = rf'`{regex_module.escape(project)}\.([^`\.]+)\.([^`]+)`'
+            matches = regex_module.findall(pattern, sql_str)
+
+            logger.info(f"Checking malformed tables. Found patterns: {matches}, valid tables: {valid_tables[:5]}...")
+
+            for dataset_part, table_part in matches:
+                if dataset_part == correct_dataset:
+                    continue  # Already correct
+
+                # Try to find which valid table this might be
+                combined = f"{dataset_part}_{table_part}"
+                logger.info(f"Checking combined name: {combined}")
+
+                for valid_table in valid_tables:
+                    # Check various match conditions
+                    if (valid_table == combined or
+                        valid_table == table_part or
+                        valid_table.endswith(table_part) or
+                        combined.endswith(valid_table) or
+                        valid_table.replace('_', '') == f"{dataset_part}{table_part}".replace('_', '')):
+
+                        old_ref = f"`{project}.{dataset_part}.{table_part}`"
+                        new_ref = f"`{project}.{correct_dataset}.{valid_table}`"
+                        logger.info(f"Replacing: {old_ref} -> {new_ref}")
+                        sql_str = sql_str.replace(old_ref, new_ref)
+                        break
+
+            return sql_str
+
+        sql = fix_all_malformed_tables(sql, self.project_id, self.dataset_id, valid_table_names)
+
+        # Final catch-all: Replace any `project.wrong_dataset.valid_table` with correct dataset
+        for table_name in valid_table_names:
+            correct_ref = f"`{self.project_id}.{self.dataset_id}.{table_name}`"
+            # Pattern: `project.anything.table_name` where anything != correct_dataset
+            wrong_dataset_pattern = regex_module.compile(
+                rf'`{regex_module.escape(self.project_id)}\.([^`\.]+)\.{regex_module.escape(table_name)}`'
+            )
+            for match in wrong_dataset_pattern.finditer(sql):
+                wrong_dataset = match.group(1)
+                if wrong_dataset != self.dataset_id:
+                    old_ref = match.group(0)
+                    sql = sql.replace(old_ref, correct_ref)
+                    logger.info(f"Fixed wrong dataset: {old_ref} -> {correct_ref}")
+
+        # CRITICAL: Validate all table names in SQL and replace invalid ones with default
+        def replace_invalid_tables(sql_str, project, dataset, valid_tables, default_table=DEFAULT_TABLE):
+            """Replace any invalid table names with the default table"""
+            pattern = rf'`{regex_module.escape(project)}\.{regex_module.escape(dataset)}\.([^`]+)`'
+            matches = regex_module.findall(pattern, sql_str)
+
+            for table_name in matches:
+                if table_name not in valid_tables:
+                    old_ref = f"`{project}.{dataset}.{table_name}`"
+                    new_ref = f"`{project}.{dataset}.{default_table}`"
+                    logger.warning(f"Invalid table '{table_name}' not in valid tables, replacing with default: {old_ref} -> {new_ref}")
+                    sql_str = sql_str.replace(old_ref, new_ref)
+
+            return sql_str
+
+        sql = replace_invalid_tables(sql, self.project_id, self.dataset_id, valid_table_names)
+
+        for schema in schemas:
+            table_name = schema['table_name']
+            full_table = f"`{self.project_id}.{self.dataset_id}.{table_name}`"
+
+            # Skip if already fully qualified
+            if full_table in sql:
+                continue
+
+            # Replace backtick-quoted table name
+            sql = sql.replace(f"`{table_name}`", full_table)
+
+            # Replace FROM table_name (with word boundary to avoid partial matches)
+            sql = regex_module.sub(
+                rf'\bFROM\s+{regex_module.escape(table_name)}\b',
+                f'FROM {full_table}',
+                sql,
+                flags=regex_module.IGNORECASE
+            )
+
+            # Replace JOIN table_name
+            sql = regex_module.sub(
+                rf'\bJOIN\s+{regex_module.escape(table_name)}\b',
+                f'JOIN {full_table}',
+                sql,
+                flags=regex_module.IGNORECASE
+            )
+
+        return sql
+
+    def _fix_current_date_queries(self, sql: str) -> str:
+        """Remove CURRENT_DATE() based filtering since data has fixed date range.
+
+        Also fixes wrong date column usage (REFERENCESDDOCUMENT -> Posting_Date).
+        """
+        import re
+
+        original_sql = sql
+
+        # CRITICAL FIX: Replace EXTRACT(YEAR FROM CURRENT_DATE()) with 2025 (max year in data)
+        # This catches patterns like: WHERE EXTRACT(YEAR FROM col) = EXTRACT(YEAR FROM CURRENT_DATE())
+        sql = re.sub(
+            r"EXTRACT\s*\(\s*YEAR\s+FROM\s+CURRENT_DATE\s*\(\s*\)\s*\)",
+            '2025',
+            sql,
+            flags=re.IGNORECASE
+        )
+
+        # CRITICAL FIX: Replace date_column with Posting_Date (LLM sometimes hallucinates this column)
+        sql = re.sub(r'\bdate_column\b', 'Posting_Date', sql, flags=re.IGNORECASE)
+
+        # CRITICAL FIX: Replace Order_Date in WHERE clause date filtering with Posting_Date
+        # Order_Date may not exist or have different meaning - Posting_Date is the canonical date
+        sql = re.sub(
+            r"EXTRACT\s*\(\s*(YEAR|MONTH|DAY|QUARTER)\s+FROM\s+Order_Date\s*\)",
+            r'EXTRACT(\1 FROM Posting_Date)',
+            sql,
+            flags=re.IGNORECASE
+        )
+
+        # CRITICAL FIX: Replace Header_Creation_Date with Posting_Date (LLM hallucinates this column)
+        sql = re.sub(
+            r"PARSE_DATE\s*\(\s*'[^']+'\s*,\s*Header_Creation_Date\s*\)",
+            'Posting_Date',
+            sql,
+            flags=re.IGNORECASE
+        )
+        sql = re.sub(r'\bHeader_Creation_Date\b', 'Posting_Date', sql, flags=re.IGNORECASE)
+
+        # Fix 1: Replace wrong date column parsing with Posting_Date
+        # Pattern: PARSE_DATE('%Y%m%d', SUBSTRING(REFERENCESDDOCUMENT, ...)) -> Posting_Date
+        sql = re.sub(
+            r"PARSE_DATE\s*\(\s*'%Y%m%d'\s*,\s*SUBSTRING\s*\(\s*REFERENCESDDOCUMENT[^)]*\)\s*\)",
+            'Posting_Date',
+            sql,
+            flags=re.IGNORECASE
+        )
+        # Pattern: CAST(SUBSTRING(REFERENCESDDOCUMENT, ...) AS DATE) -> Posting_Date
+        sql = re.sub(
+            r"CAST\s*\(\s*SUBSTRING\s*\(\s*REFERENCESDDOCUMENT[^)]*\)\s*AS\s+DATE\s*\)",
+            'Posting_Date',
+            sql,
+            flags=re.IGNORECASE
+        )
+
+        # Fix 2: Remove CURRENT_DATE() based filtering entirely
+        # Remove conditions like: AND Posting_Date >= DATE_SUB(CURRENT_DATE(), INTERVAL 6 MONTH)
+        sql = re.sub(
+            r"\s+AND\s+\w+\s*>=\s*DATE_SUB\s*\(\s*CURRENT_DATE\s*\(\s*\)\s*,\s*INTERVAL\s+\d+\s+\w+\s*\)",
+            '',
+            sql,
+            flags=re.IGNORECASE
+        )
+
+        # Remove standalone WHERE conditions with CURRENT_DATE (not preceded by AND)
+        sql = re.sub(
+            r"\s+AND\s+Posting_Date\s*>=\s*DATE_SUB\s*\(\s*CURRENT_DATE\s*\(\s*\)\s*,\s*INTERVAL\s+\d+\s+\w+\s*\)",
+            '',
+            sql,
+            flags=re.IGNORECASE
+        )
+
+        # Remove WHERE conditions with CURRENT_DATE when followed by GROUP/ORDER
+        sql = re.sub(
+            r"WHERE\s+\w+\s*>=\s*DATE_SUB\s*\(\s*CURRENT_DATE\s*\(\s*\)\s*,\s*INTERVAL\s+\d+\s+\w+\s*\)\s*(GROUP|ORDER)",
+            r'WHERE Posting_Date IS NOT NULL \1',
+            sql,
+            flags=re.IGNORECASE
+        )
+
+        # More general pattern - remove entire lines containing CURRENT_DATE()
+        lines = sql.split('\n')
+        filtered_lines = []
+        removed_count = 0
+        for line in lines:
+            line_upper = line.upper()
+            has_current_date = 'CURRENT_DATE' in line_upper
+            has_condition = 'AND' in line_upper or '>=' in line_upper
+            if has_current_date and has_condition:
+                # Skip lines with CURRENT_DATE in conditions
+                logger.warning(f"REMOVING CURRENT_DATE line: [{line.strip()}]")
+                removed_count += 1
+                continue
+            filtered_lines.append(line)
+        sql = '\n'.join(filtered_lines)
+        if removed_count > 0:
+            logger.warning(f"Removed {removed_count} lines containing CURRENT_DATE()")
+
+        # Remove the complex REFERENCESDDOCUMENT conditions entirely
+        sql = re.sub(
+            r"\s+AND\s+LENGTH\s*\(\s*REFERENCESDDOCUMENT\s*\)\s*>=\s*\d+",
+            '',
+            sql,
+            flags=re.IGNORECASE
+        )
+        sql = re.sub(
+            r"\s+AND\s+REGEXP_CONTAINS\s*\(\s*SUBSTRING\s*\(\s*REFERENCESDDOCUMENT[^)]*\)[^)]*\)",
+            '',
+            sql,
+            flags=re.IGNORECASE
+        )
+        sql = re.sub(
+            r"WHERE\s+REFERENCESDDOCUMENT\s+IS\s+NOT\s+NULL\s+AND",
+            'WHERE',
+            sql,
+            flags=re.IGNORECASE
+        )
+
+        # Clean up double spaces and newlines
+        sql = re.sub(r'\n\s*\n', '\n', sql)
+        sql = re.sub(r'  +', ' ', sql)
+
+        # Fix BigQuery CTE column name conflicts - when a CTE and column have same name
+        # This causes "No matching signature for aggregate function" errors
+        # Solution: rename columns that conflict with CTE names
+        cte_pattern = r'WITH\s+(\w+)\s+AS'
+        cte_matches = re.findall(cte_pattern, sql, flags=re.IGNORECASE)
+        logger.info(f"CTE conflict check - found CTEs: {cte_matches}")
+        for cte_name in cte_matches:
+            # If a column has same name as CTE, rename it with _value suffix
+            col_pattern = rf'\b{cte_name}\s+AS\s+{cte_name}\b'
+            if re.search(col_pattern, sql, flags=re.IGNORECASE):
+                sql = re.sub(col_pattern, f'{cte_name} AS {cte_name}_value', sql, flags=re.IGNORECASE)
+                # Also update references to this column in aggregates
+                sql = re.sub(rf'AVG\s*\(\s*{cte_name}\s*\)', f'AVG({cte_name}_value)', sql, flags=re.IGNORECASE)
+                sql = re.sub(rf'SUM\s*\(\s*{cte_name}\s*\)', f'SUM({cte_name}_value)', sql, flags=re.IGNORECASE)
+                logger.info(f"Fixed CTE column name conflict for: {cte_name}")
+
+            # Also fix case where column is named same as CTE in subsequent CTEs
+            # e.g., SUM(...) AS monthly_revenue in CTE monthly_revenue
+            # Use .+? to handle nested parentheses like SUM(COALESCE(...))
+            sum_pattern = rf'(SUM\s*\(.+?\))\s+AS\s+{cte_name}\b'
+            sum_match = re.search(sum_pattern, sql, flags=re.IGNORECASE)
+            logger.info(f"CTE conflict check - SUM pattern for {cte_name}: {sum_match.group(0) if sum_match else 'No match'}")
+            if sum_match:
+                # Rename the column to avoid conflict
+                sql = re.sub(sum_pattern, rf'\1 AS {cte_name}_amount', sql, flags=re.IGNORECASE)
+                # Update all references to this column throughout the SQL
+                # But be careful not to replace the CTE name itself in FROM clauses
+                # Only replace column references (preceded by comma, SELECT, or in functions)
+                sql = re.sub(rf'AVG\s*\(\s*{cte_name}\s*\)', f'AVG({cte_name}_amount)', sql, flags=re.IGNORECASE)
+                sql = re.sub(rf',\s*\n\s*{cte_name}\s*,', f',\n {cte_name}_amount,', sql, flags=re.IGNORECASE)
+                sql = re.sub(rf',\s*{cte_name}\s*,', f', {cte_name}_amount,', sql, flags=re.IGNORECASE)
+                sql = re.sub(rf'SELECT\s+\n?\s*{cte_name}\s*,', f'SELECT\n {cte_name}_amount,', sql, flags=re.IGNORECASE)
+                sql = re.sub(rf'ROUND\s*\(\s*{cte_name}\s*,', f'ROUND({cte_name}_amount,', sql, flags=re.IGNORECASE)
+                # Also handle standalone column reference after SELECT or comma
+                sql = re.sub(rf'(?<=,)\s*{cte_name}(?=\s*,|\s+AS)', f' {cte_name}_amount', sql, flags=re.IGNORECASE)
+                sql = re.sub(rf'(?<=SELECT)\s+{cte_name}(?=\s*,)', f' {cte_name}_amount', sql, flags=re.IGNORECASE)
+                logger.info(f"Fixed CTE column name conflict (SUM pattern) for: {cte_name}")
+
+        if sql != original_sql:
+            logger.info(f"Fixed CURRENT_DATE() and/or REFERENCESDDOCUMENT in SQL")
+
+        return sql
+
+    def _fix_postgresql_syntax(self, sql: str) -> str:
+        """Fix common PostgreSQL syntax that might slip through to BigQuery"""
+        import re
+
+        fixed_sql = sql
+
+        # Fix to_char() -> FORMAT() - handle nested parentheses
+        # Pattern matches to_char with any content including nested parens
+        def fix_to_char(sql_str):
+            result = sql_str
+            # Find all to_char occurrences
+            while True:
+                match = re.search(r'to_char\s*\(', result, flags=re.IGNORECASE)
+                if not match:
+                    break
+
+                start = match.start()
+                # Find matching closing paren
+                paren_count = 0
+                end = match.end() - 1  # Position of opening paren
+                for i in range(match.end() - 1, len(result)):
+                    if result[i] == '(':
+                        paren_count += 1
+                    elif result[i] == ')':
+                        paren_count -= 1
+                        if paren_count == 0:
+                            end = i + 1
+                            break
+
+                # Extract the full to_char(...) call
+                to_char_call = result[start:end]
+
+                # Parse arguments (simple split by comma, handling nested parens)
+                inner = to_char_call[to_char_call.index('(') + 1:-1]
+
+                # Split on comma not inside parens
+                args = []
+                current_arg = ""
+                depth = 0
+                for char in inner:
+                    if char == '(':
+                        depth += 1
+                    elif char == ')':
+                        depth -= 1
+                    elif char == ',' and depth == 0:
+                        args.append(current_arg.strip())
+                        current_arg = ""
+                        continue
+                    current_arg += char
+                if current_arg.strip():
+                    args.append(current_arg.strip())
+
+                if len(args) >= 2:
+                    value = args[0]
+                    format_str = args[1].strip("'\"")
+                    # Replace with CAST and ROUND for number formatting
+                    # BigQuery FORMAT doesn't support %,.2f - use CAST instead
+                    replacement = f"CAST(ROUND({value}, 2) AS STRING)"
+                else:
+                    replacement = f"CAST({args[0]} AS STRING)" if args else to_char_call
+
+                result = result[:start] + replacement + result[end:]
+
+            return result
+
+        fixed_sql = fix_to_char(fixed_sql)
+
+        # Fix ::type casting -> CAST()
+        # Pattern: column::numeric, column::date, etc.
+        cast_pattern = r"(\w+)::(\w+)"
+        fixed_sql = re.sub(cast_pattern, r"CAST(\1 AS \2)", fixed_sql)
+
+        # Fix NOW() -> CURRENT_TIMESTAMP()
+        fixed_sql = re.sub(r'\bNOW\s*\(\s*\)', 'CURRENT_TIMESTAMP()', fixed_sql, flags=re.IGNORECASE)
+
+        # Fix CURRENT_DATE without parentheses -> CURRENT_DATE()
+        fixed_sql = re.sub(r'\bCURRENT_DATE\b(?!\s*\()', 'CURRENT_DATE()', fixed_sql, flags=re.IGNORECASE)
+
+        # Fix PostgreSQL DATE_TRUNC syntax: DATE_TRUNC('month', date) -> DATE_TRUNC(date, MONTH)
+        # BigQuery uses: DATE_TRUNC(date_expression, date_part)
+        def fix_date_trunc(sql_str):
+            """Convert PostgreSQL DATE_TRUNC to BigQuery syntax"""
+            result = sql_str
+            # Pattern: DATE_TRUNC('month', column) or DATE_TRUNC('year', column)
+            pattern = r"DATE_TRUNC\s*\(\s*['\"](\w+)['\"]\s*,\s*([^)]+)\)"
+
+            def replace_date_trunc(match):
+                date_part = match.group(1).upper()
+                date_expr = match.group(2).strip()
+                return f"DATE_TRUNC({date_expr}, {date_part})"
+
+            result = re.sub(pattern, replace_date_trunc, result, flags=re.IGNORECASE)
+            return result
+
+        fixed_sql = fix_date_trunc(fixed_sql)
+
+        # Fix PostgreSQL INTERVAL syntax: INTERVAL '2 years' -> INTERVAL 2 YEAR
+        # BigQuery uses: DATE_SUB/DATE_ADD with INTERVAL n UNIT
+        def fix_interval_syntax(sql_str):
+            """Convert PostgreSQL INTERVAL to BigQuery syntax"""
+            result = sql_str
+
+            # Pattern: CURRENT_DATE() - INTERVAL '2 years' -> DATE_SUB(CURRENT_DATE(), INTERVAL 2 YEAR)
+            # Also handle: date_col - INTERVAL '30 days'
+            pattern = r"(\w+(?:\(\))?)\s*-\s*INTERVAL\s*['\"](\d+)\s*(\w+)['\"]"
+
+            def replace_interval_sub(match):
+                date_expr = match.group(1)
+                num = match.group(2)
+                unit = match.group(3).upper().rstrip('S')  # Remove plural 's'
+                return f"DATE_SUB({date_expr}, INTERVAL {num} {unit})"
+
+            result = re.sub(pattern, replace_interval_sub, result, flags=re.IGNORECASE)
+
+            # Also fix: + INTERVAL '...'
+            pattern_add = r"(\w+(?:\(\))?)\s*\+\s*INTERVAL\s*['\"](\d+)\s*(\w+)['\"]"
+
+            def replace_interval_add(match):
+                date_expr = match.group(1)
+                num = match.group(2)
+                unit = match.group(3).upper().rstrip('S')
+                return f"DATE_ADD({date_expr}, INTERVAL {num} {unit})"
+
+            result = re.sub(pattern_add, replace_interval_add, result, flags=re.IGNORECASE)
+
+            # Fix standalone INTERVAL comparison: >= CURRENT_DATE() - INTERVAL 2 YEAR
+            # This pattern handles when DATE_SUB was already partially applied but the format is still wrong
+            pattern_standalone = r"INTERVAL\s*['\"]?(\d+)\s*(\w+)['\"]?"
+
+            def replace_standalone_interval(match):
+                num = match.group(1)
+                unit = match.group(2).upper().rstrip('S')
+                return f"INTERVAL {num} {unit}"
+
+            result = re.sub(pattern_standalone, replace_standalone_interval, result, flags=re.IGNORECASE)
+
+            return result
+
+        fixed_sql = fix_interval_syntax(fixed_sql)
+
+        # Fix malformed DATE_TRUNC with extra comma: DATE_TRUNC(CURRENT_DATE(, YEAR)) -> DATE_TRUNC(CURRENT_DATE(), YEAR)
+        fixed_sql = re.sub(r'DATE_TRUNC\s*\(\s*CURRENT_DATE\s*\(\s*,', 'DATE_TRUNC(CURRENT_DATE(),', fixed_sql, flags=re.IGNORECASE)
+
+        # Fix any remaining - INTERVAL patterns that weren't caught
+        # Pattern: expression - INTERVAL n UNIT (without quotes) -> DATE_SUB(expression, INTERVAL n UNIT)
+        def fix_remaining_interval(sql_str):
+            """Fix any remaining date - INTERVAL patterns"""
+            result = sql_str
+
+            # First, fix nested DATE_TRUNC with matching parens
+            # Pattern: DATE_TRUNC(DATE_TRUNC(...), UNIT)) - INTERVAL -> unbalanced parens issue
+            # Find and fix: DATE_TRUNC(...)) - INTERVAL (extra close paren before INTERVAL)
+            result = re.sub(r'\)\)\s*-\s*INTERVAL', ') - INTERVAL', result)
+
+            # Now handle DATE_TRUNC(...) - INTERVAL patterns properly
+            # Need to handle nested parens in DATE_TRUNC
+            def replace_with_date_sub(sql):
+                """Replace expr - INTERVAL with DATE_SUB(expr, INTERVAL)"""
+                # Find - INTERVAL patterns
+                interval_match = re.search(r'\s*-\s*(INTERVAL\s+\d+\s+\w+)', sql, flags=re.IGNORECASE)
+                if not interval_match:
+                    return sql
+
+                interval_start = interval_match.start()
+                interval_expr = interval_match.group(1)
+
+                # Find the expression before - INTERVAL by matching parens backwards
+                prefix = sql[:interval_start]
+
+                # Try to find a balanced expression ending before the -
+                # Could be: DATE_TRUNC(...), CURRENT_DATE(), or a column name
+                expr_end = len(prefix.rstrip())
+
+                # Check if it ends with a closing paren
+                if prefix.rstrip().endswith(')'):
+                    # Find matching open paren
+                    paren_count = 0
+                    expr_start = expr_end - 1
+                    for i in range(expr_end - 1, -1, -1):
+                        if prefix[i] == ')':
+                            paren_count += 1
+                        elif prefix[i] == '(':
+                            paren_count -= 1
+                            if paren_count == 0:
+                                # Found the matching open paren, now find function name
+                                # Go back to find word characters (function name)
+                                j = i - 1
+                                while j >= 0 and prefix[j] in ' \t\n':
+                                    j -= 1
+                                while j >= 0 and (prefix[j].isalnum() or prefix[j] == '_'):
+                                    j -= 1
+                                expr_start = j + 1
+                                break
+
+                    date_expr = prefix[expr_start:expr_end].strip()
+                    before_expr = prefix[:expr_start]
+                    after_interval = sql[interval_match.end():]
+
+                    return before_expr + f"DATE_SUB({date_expr}, {interval_expr})" + after_interval
+                else:
+                    # Simple column or word, use basic pattern
+                    word_match = re.search(r'(\w+)\s*$', prefix)
+                    if word_match:
+                        date_expr = word_match.group(1)
+                        before_expr = prefix[:word_match.start()]
+                        after_interval = sql[interval_match.end():]
+                        return before_expr + f"DATE_SUB({date_expr}, {interval_expr})" + after_interval
+
+                return sql
+
+            # Apply the fix iteratively until no more changes
+            prev_result = ""
+            while prev_result != result and '- INTERVAL' in result.upper():
+                prev_result = result
+                if 'DATE_SUB' not in result[result.upper().find('- INTERVAL')-20:result.upper().find('- INTERVAL')].upper():
+                    result = replace_with_date_sub(result)
+                else:
+                    break
+
+            return result
+
+        fixed_sql = fix_remaining_interval(fixed_sql)
+
+        # Fix ROUND on DATE columns: CAST(ROUND(month, 2) AS STRING) -> FORMAT_DATE('%Y-%m', month)
+        # This happens when LLM tries to format a DATE column incorrectly
+        def fix_round_on_date(sql_str):
+            """Fix ROUND applied to DATE columns"""
+            result = sql_str
+
+            # Pattern: CAST(ROUND(column, n) AS STRING) AS column
+            # where column is likely a date (named month, date, period, etc.)
+            pattern = r"CAST\s*\(\s*ROUND\s*\(\s*(\w+)\s*,\s*\d+\s*\)\s*AS\s+STRING\s*\)"
+
+            def replace_if_date(match):
+                col_name = match.group(1).lower()
+                # Check if this looks like a date column
+                date_indicators = ['month', 'date', 'period', 'day', 'year', 'week', 'quarter']
+                if any(ind in col_name for ind in date_indicators):
+                    # Replace with FORMAT_DATE for proper date formatting
+                    if 'month' in col_name:
+                        return f"FORMAT_DATE('%Y-%m', {match.group(1)})"
+                    elif 'year' in col_name:
+                        return f"FORMAT_DATE('%Y', {match.group(1)})"
+                    elif 'quarter' in col_name:
+                        return f"FORMAT_DATE('%Y-Q%Q', {match.group(1)})"
+                    else:
+                        return f"CAST({match.group(1)} AS STRING)"
+                return match.group(0)  # Keep original if not a date
+
+            result = re.sub(pattern, replace_if_date, result, flags=re.IGNORECASE)
+            return result
+
+        fixed_sql = fix_round_on_date(fixed_sql)
+
+        # Fix || string concatenation to CONCAT() - BigQuery prefers CONCAT
+        # Pattern: 'string' || expr or expr || 'string'
+        def fix_string_concat(sql_str):
+            """Convert || concatenation to CONCAT()"""
+            result = sql_str
+
+            # Simple pattern: expr || 'suffix'
+            # Match: CAST(...) || '%' or similar
+            pattern = r"((?:CAST\s*\([^)]+\)|[\w'\"]+(?:\([^)]*\))?)\s*\|\|\s*('[^']*'))"
+
+            def replace_concat(match):
+                left = match.group(1).strip()
+                right = match.group(2).strip()
+                return f"CONCAT({left}, {right})"
+
+            result = re.sub(pattern, replace_concat, result, flags=re.IGNORECASE)
+
+            # Also handle: 'prefix' || expr
+            pattern2 = r"('[^']*')\s*\|\|\s*((?:CAST\s*\([^)]+\)|[\w]+(?:\([^)]*\))?))"
+
+            result = re.sub(pattern2, replace_concat, result, flags=re.IGNORECASE)
+
+            return result
+
+        fixed_sql = fix_string_concat(fixed_sql)
+
+        # Fix malformed ROUND(ROUND(...) AS pattern - missing closing paren
+        # Pattern: ROUND(ROUND(expr, n) AS alias -> ROUND(expr, n) AS alias
+        def fix_double_round(sql_str):
+            """Fix double ROUND without proper closing"""
+            result = sql_str
+
+            # Pattern: ROUND(ROUND(something, n) AS - missing middle close paren
+            # This is malformed - simplify to single ROUND
+            pattern = r'ROUND\s*\(\s*ROUND\s*\(([^,]+),\s*(\d+)\s*\)\s+AS\s+'
+            result = re.sub(pattern, r'ROUND(\1, \2) AS ', result, flags=re.IGNORECASE)
+
+            return result
+
+        fixed_sql = fix_double_round(fixed_sql)
+
+        # Fix unbalanced parentheses - check whole SQL statement
+        def fix_unbalanced_parens(sql_str):
+            """Attempt to fix unbalanced parentheses in SQL at statement level"""
+            # Check overall balance first
+            total_open = sql_str.count('(')
+            total_close = sql_str.count(')')
+
+            if total_open == total_close:
+                return sql_str  # Already balanced
+
+            # If we have more opens than closes, we need to add closing parens
+            if total_open > total_close:
+                diff = total_open - total_close
+                # Add before LIMIT or at end of last SELECT line
+                if 'LIMIT' in sql_str.upper():
+                    limit_pos = sql_str.upper().rfind('LIMIT')
+                    # Find the start of LIMIT clause
+                    sql_str = sql_str[:limit_pos].rstrip() + ')' * diff + ' ' + sql_str[limit_pos:]
+                else:
+                    sql_str = sql_str.rstrip(';') + ')' * diff + ';'
+
+            return sql_str
+
+        fixed_sql = fix_unbalanced_parens(fixed_sql)
+
+        # Fix ORDER BY with original column name when using SELECT DISTINCT with aliases
+        # BigQuery requires ORDER BY to use the alias, not the original column
+        if 'SELECT DISTINCT' in fixed_sql.upper() and 'ORDER BY' in fixed_sql.upper():
+            # Find all aliases: pattern AS alias_name
+            alias_pattern = r'(\w+(?:\([^)]*\))?)\s+AS\s+(\w+)'
+            aliases = re.findall(alias_pattern, fixed_sql, re.IGNORECASE)
+            for original, alias in aliases:
+                # Replace ORDER BY original_col with ORDER BY alias
+                # Handle LOWER(col) and similar function calls
+                escaped_original = re.escape(original)
+                order_by_pattern = rf'(ORDER\s+BY\s+)({escaped_original})(\s|$|,)'
+                fixed_sql = re.sub(order_by_pattern, rf'\g<1>{alias}\g<3>', fixed_sql, flags=re.IGNORECASE)
+
+        # Remove currency formatting attempts - return raw numbers for frontend to format
+        def remove_currency_formatting(sql_str):
+            """Remove CONCAT('$', ...) patterns and return just the numeric expression"""
+            result = sql_str
+
+            # Pattern: CONCAT('$', CAST(ROUND(ROUND(expr, 2), 2) AS STRING))
+            # Find CONCAT('$', and extract the inner numeric expression
+            while True:
+                match = re.search(r"CONCAT\s*\(\s*'\$'\s*,\s*CAST\s*\(", result, flags=re.IGNORECASE)
+                if not match:
+                    break
+
+                start = match.start()
+                # Find the matching closing paren for CONCAT
+                paren_count = 0
+                concat_start = result.find('(', start)
+                end = concat_start
+                for i in range(concat_start, len(result)):
+                    if result[i] == '(':
+                        paren_count += 1
+                    elif result[i] == ')':
+                        paren_count -= 1
+                        if paren_count == 0:
+                            end = i + 1
+                            break
+
+                # Extract inner expression - find ROUND or the expression inside CAST
+                inner = result[match.end():end-1]  # Content after CAST(
+                # Find the actual numeric expression
+                round_match = re.search(r'ROUND\s*\(\s*ROUND\s*\((.+?),\s*2\s*\)\s*,\s*2\s*\)', inner, flags=re.IGNORECASE)
+                if round_match:
+                    numeric_expr = f"ROUND({round_match.group(1)}, 2)"
+                else:
+                    round_match = re.search(r'ROUND\s*\((.+?),\s*2\s*\)', inner, flags=re.IGNORECASE)
+                    if round_match:
+                        numeric_expr = f"ROUND({round_match.group(1)}, 2)"
+                    else:
+                        # Just use what's inside CAST
+                        as_match = re.search(r'(.+?)\s+AS\s+STRING', inner, flags=re.IGNORECASE)
+                        numeric_expr = as_match.group(1) if as_match else inner
+
+                result = result[:start] + numeric_expr + result[end:]
+
+            return result
+
+        fixed_sql = remove_currency_formatting(fixed_sql)
+
+        # Handle '$' || CAST(...) patterns - need to find matching parentheses
+        def remove_dollar_concat(sql_str):
+            """Remove '$' || CAST(...) patterns"""
+            result = sql_str
+            while True:
+                match = re.search(r"'\$'\s*\|\|\s*CAST\s*\(", result, flags=re.IGNORECASE)
+                if not match:
+                    break
+
+                start = match.start()
+                # Find the opening paren of CAST
+                cast_paren_start = result.find('(', match.end() - 1)
+                # Find matching closing paren
+                paren_count = 0
+                end = cast_paren_start
+                for i in range(cast_paren_start, len(result)):
+                    if result[i] == '(':
+                        paren_count += 1
+                    elif result[i] == ')':
+                        paren_count -= 1
+                        if paren_count == 0:
+                            end = i + 1
+                            break
+
+                # Extract content inside CAST(...)
+                cast_content = result[cast_paren_start + 1:end - 1]
+
+                # Find the actual expression (before AS STRING)
+                as_match = re.search(r'(.+?)\s+AS\s+STRING', cast_content, flags=re.IGNORECASE)
+                if as_match:
+                    inner_expr = as_match.group(1).strip()
+                    # Simplify double ROUND
+                    inner_expr = re.sub(r'ROUND\s*\(\s*ROUND\s*\((.+?),\s*2\s*\)\s*,\s*2\s*\)',
+                                       r'ROUND(\1, 2)', inner_expr, flags=re.IGNORECASE)
+                else:
+                    inner_expr = cast_content
+
+                result = result[:start] + inner_expr + result[end:]
+
+            return result
+
+        fixed_sql = remove_dollar_concat(fixed_sql)
+
+        # Fix ORDER BY with aggregate function referencing columns not in scope
+        # When using CTE, ORDER BY should use alias from SELECT, not recalculate
+        if 'WITH ' in fixed_sql.upper() and 'ORDER BY' in fixed_sql.upper():
+            # Find ORDER BY position
+            order_by_match = re.search(r'ORDER\s+BY\s+', fixed_sql, flags=re.IGNORECASE)
+            if order_by_match:
+                order_start = order_by_match.end()
+                # Check if it starts with an aggregate function
+                after_order = fixed_sql[order_start:].strip()
+                if re.match(r'(SUM|AVG|COUNT|MAX|MIN)\s*\(', after_order, flags=re.IGNORECASE):
+                    # Find the end of the aggregate function (matching parens)
+                    paren_count = 0
+                    func_end = 0
+                    for i, c in enumerate(after_order):
+                        if c == '(':
+                            paren_count += 1
+                        elif c == ')':
+                            paren_count -= 1
+                            if paren_count == 0:
+                                func_end = i + 1
+                                break
+
+                    # Find aliases for aggregate columns in the CTE
+                    select_part = fixed_sql.split('ORDER BY')[0]
+                    # Match ROUND(SUM(...), 2) AS alias or SUM(...) AS alias
+                    alias_pattern = r'(?:ROUND\s*\(\s*)?(SUM|AVG|COUNT|MAX|MIN)\s*\([^)]+\)[^)]*\)?\s*,?\s*\d*\s*\)?\s+AS\s+(\w+)'
+                    aliases = re.findall(alias_pattern, select_part, flags=re.IGNORECASE)
+                    if aliases:
+                        alias_name = aliases[-1][1]
+                        # Replace ORDER BY SUM(...) with ORDER BY alias
+                        fixed_sql = fixed_sql[:order_start] + alias_name + fixed_sql[order_start + func_end:]
+
+        if fixed_sql != sql:
+            logger.info("Fixed PostgreSQL syntax in generated SQL")
+
+        return fixed_sql
+
+    def _enforce_correct_dataset(self, sql: str) -> str:
+        """Replace any wrong project/dataset references with correct ones"""
+        import re
+
+        # Pattern to find any backtick-quoted table reference
+        # Matches: `anything.anything.tablename`
+        pattern = r'`([^`\.]+)\.([^`\.]+)\.([^`]+)`'
+
+        def replace_with_correct(match):
+            project = match.group(1)
+            dataset = match.group(2)
+            table = match.group(3)
+
+            # If project or dataset is wrong, fix it
+            if project != self.project_id or dataset != self.dataset_id:
+                logger.info(f"Fixing wrong reference: {project}.{dataset}.{table} -> {self.project_id}.{self.dataset_id}.{table}")
+                return f"`{self.project_id}.{self.dataset_id}.{table}`"
+            return match.group(0)
+
+        fixed_sql = re.sub(pattern, replace_with_correct, sql)
+        return fixed_sql
+
+    def _remove_lower_from_select(self, sql: str) -> str:
+        """Remove LOWER() function from SELECT columns to preserve original text case.
+
+        This is important for display columns like customer names, product names, etc.
+        LOWER() should only be used in WHERE clauses for filtering, not in SELECT.
+        """
+        import re
+
+        original_sql = sql
+
+        # Find ALL SELECT statements in the query (including CTEs)
+        # We need to handle each SELECT...FROM block separately
+        def remove_lower_from_select_block(match):
+            select_keyword = match.group(1)  # SELECT or SELECT DISTINCT
+            columns = match.group(2)          # The column expressions
+            from_keyword = match.group(3)     # FROM
+
+            # Replace LOWER(column) with just column
+            cleaned = re.sub(
+                r'LOWER\s*\(\s*([a-zA-Z_][a-zA-Z0-9_]*(?:\.[a-zA-Z_][a-zA-Z0-9_]*)?)\s*\)',
+                r'\1',
+                columns,
+                flags=re.IGNORECASE
+            )
+            return select_keyword + cleaned + from_keyword
+
+        # Pattern to match SELECT ... FROM blocks (handles CTEs and subqueries)
+        pattern = r'(SELECT\s+(?:DISTINCT\s+)?)(.*?)(\s+FROM\s+)'
+        sql = re.sub(pattern, remove_lower_from_select_block, sql, flags=re.IGNORECASE | re.DOTALL)
+
+        if sql != original_sql:
+            logger.info("Removed LOWER() from SELECT columns to preserve text case")
+
+        return sql
+
+    def _add_null_filters_for_identifiers(self, sql: str) -> str:
+        """Add IS NOT NULL filters for identifier columns when missing.
+
+        This is a safety net to prevent null rows from appearing in results
+        when querying for customers, products, distributors, etc.
+        """
+        import re
+
+        original_sql = sql
+
+        # Key identifier columns that should always filter nulls when selected
+        identifier_columns = {
+            'Sold_to_Number': 'Sold_to_Number',
+            'Sold_to_Name': 'Sold_to_Name',
+            'customer_id': 'Sold_to_Number',
+            'customer_name': 'Sold_to_Name',
+            'Material': 'Material',
+            'Material_Description': 'Material_Description',
+            'Distributor': 'Distributor',
+            'Payer_Name': 'Payer_Name',
+            'Bill_to_Party_Name': 'Bill_to_Party_Name',
+        }
+
+        # Check if this is a DISTINCT query or GROUP BY query on identifier columns
+        is_distinct = bool(re.search(r'SELECT\s+DISTINCT', sql, re.IGNORECASE))
+        has_group_by = bool(re.search(r'GROUP\s+BY', sql, re.IGNORECASE))
+
+        if not (is_distinct or has_group_by):
+            return sql  # Only apply to listing/aggregation queries
+
+        # Find which identifier columns are in the SELECT
+        columns_to_filter = []
+        for col_alias, actual_col in identifier_columns.items():
+            # Check if column is in SELECT clause
+            select_pattern = rf'SELECT\s+.*?\b{re.escape(col_alias)}\b.*?FROM'
+            if re.search(select_pattern, sql, re.IGNORECASE | re.DOTALL):
+                # Check if NOT NULL filter already exists
+                null_pattern = rf'\b{re.escape(actual_col)}\s+IS\s+NOT\s+NULL'
+                if not re.search(null_pattern, sql, re.IGNORECASE):
+                    columns_to_filter.append(actual_col)
+
+        if not columns_to_filter:
+            return sql
+
+        # Remove duplicates while preserving order
+        columns_to_filter = list(dict.fromkeys(columns_to_filter))
+
+        # Build the null filter clause
+        null_filters = ' AND '.join([f'{col} IS NOT NULL' for col in columns_to_filter])
+
+        # Add to WHERE clause
+        if re.search(r'\bWHERE\b', sql, re.IGNORECASE):
+            # WHERE exists - add to it
+            # Find WHERE and add after it
+            sql = re.sub(
+                r'(\bWHERE\s+)',
+                rf'\1{null_filters} AND ',
+                sql,
+                count=1,
+                flags=re.IGNORECASE
+            )
+        else:
+            # No WHERE - add one before GROUP BY, ORDER BY, or LIMIT
+            for clause in ['GROUP BY', 'ORDER BY', 'LIMIT']:
+                pattern = rf'(\s+{clause}\b)'
+                if re.search(pattern, sql, re.IGNORECASE):
+                    sql = re.sub(
+                        pattern,
+                        rf' WHERE {null_filters}\1',
+                        sql,
+                        count=1,
+                        flags=re.IGNORECASE
+                    )
+                    break
+            else:
+                # No GROUP BY, ORDER BY, or LIMIT - add before trailing semicolon or at end
+                sql = sql.rstrip(';').rstrip() + f' WHERE {null_filters};'
+
+        if sql != original_sql:
+            logger.info(f"Added null filters for identifier columns: {columns_to_filter}")
+
+        return sql
+
+def load_corpus(path: Path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_corpus(path: Path, entries):
+    with open(path, "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+def rewrite_context() -> RewriteContext:
+    return RewriteContext(project_id=PROJECT_ID, dataset_id=DATASET_ID, schema_tables=SCHEMA_TABLES,
+                          valid_tables=VALID_TABLES, default_table=DEFAULT_TABLE)
+
+
+def sql_tokens(sql: str) -> List[str]:
+    """Tokens of a statement without whitespace or a trailing semicolon (comments still end at a newline)."""
+    tokens = [token.text for token in flatten(fragment(sql)) if token.kind != "ws"]
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+    return tokens
+
+
+def check_corpus(entries, context: RewriteContext, legacy: LegacyRewriter, update: bool) -> int:
+    failures = 0
+    schemas = [{"table_name": table} for table in SCHEMA_TABLES]
+    for entry in entries:
+        report = rewrite_sql(entry["sql"], context)
+        rules = sorted(report.fired)
+        if update:
+            entry["expected_sql"] = legacy.rewrite(entry["sql"], schemas, VALID_TABLES)
+            entry["expected_rules"] = rules
+            continue
+        expected = entry.get("rewritten_sql", entry["expected_sql"])
+        if sql_tokens(report.sql) == sql_tokens(expected) and rules == entry["expected_rules"]:
+            continue
+        failures += 1
+        print(f"\n  REGRESSION {entry['id']}")
+        if rules != entry["expected_rules"]:
+            print(f"    rules: expected {entry['expected_rules']}, got {rules}")
+        if sql_tokens(report.sql) != sql_tokens(expected):
+            diff = difflib.unified_diff(expected.splitlines(), report.sql.splitlines(),
+                                        "expected", "actual", lineterm="")
+            print("    " + "\n    ".join(diff))
+    return failures
+
+
+def time_calls(fn, sqls, iterations: int):
+    """Per-call latencies in microseconds across all queries."""
+    samples = []
+    for sql in sqls:
+        fn(sql)  # Warm up regex and rule caches
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn(sql)
+            samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def print_timings(label: str, samples):
+    print(f"  {label:<12} p50 {percentile(samples, 0.5):8.1f} us   p95 {percentile(samples, 0.95):8.1f} us   "
+          f"mean {statistics.fmean(samples):8.1f} us")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay the SQL rewrite corpus and benchmark rewrite latency")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH, help="Corpus JSONL file")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed rewrites per query")
+    parser.add_argument("--no-legacy", action="store_true", help="Skip timing the legacy multi-pass chain")
+    parser.add_argument("--update", action="store_true",
+                        help="Record the legacy chain output and the current rule sets as expected")
+    args = parser.parse_args()
+
+    entries = load_corpus(args.corpus)
+    context = rewrite_context()
+    legacy = LegacyRewriter(PROJECT_ID, DATASET_ID)
+
+    print("=" * 70)
+    print(f"  SQL rewrite corpus: {len(entries)} queries ({args.corpus.name})")
+    print("=" * 70)
+
+    failures = check_corpus(entries, context, legacy, args.update)
+    if args.update:
+        save_corpus(args.corpus, entries)
+        print(f"\n  Updated expected output for {len(entries)} queries")
+        return
+    intended = [entry for entry in entries if "intended_difference" in entry]
+    print(f"\n  {len(entries) - failures}/{len(entries)} queries match the expected rewrite "
+          f"({len(intended)} intentionally differ from the legacy chain)")
+    for entry in intended:
+        print(f"    {entry['id']:<34} {entry['intended_difference']}")
+
+    fired = {}
+    for entry in entries:
+        for rule in entry["expected_rules"]:
+            fired[rule] = fired.get(rule, 0) + 1
+    print("\n  Queries per rule:")
+    for rule, count in sorted(fired.items(), key=lambda item: (-item[1], item[0])):
+        print(f"    {rule:<28} {count}")
+
+    sqls = [entry["sql"] for entry in entries]
+    tokens = sum(rewrite_sql(sql, context).tokens for sql in sqls)
+    print(f"\n  Latency per query ({args.iterations} iterations x {len(sqls)} queries, "
+          f"{tokens / len(sqls):.0f} tokens on average):")
+    engine = time_calls(lambda sql: rewrite_sql(sql, context), sqls, args.iterations)
+    print_timings("single-pass", engine)
+    if not args.no_legacy:
+        schemas = [{"table_name": table} for table in SCHEMA_TABLES]
+        timings = time_calls(lambda sql: legacy.rewrite(sql, schemas, VALID_TABLES), sqls, args.iterations)
+        print_timings("legacy", timings)
+        print(f"  speedup      {statistics.median(timings) / statistics.median(engine):.1f}x at the median")
+
+    if failures:
+        print(f"\nFAILED: {failures} regressions")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
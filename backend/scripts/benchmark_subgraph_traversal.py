@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark local subgraph traversal (src.core.knowledge_graph.subgraph_traversal).
+
+Builds a synthetic metric -> bucket -> GL account graph, runs every traversal
+strategy on it in memory, and reports how many Neo4j round trips the
+per-node GraphTraversalEngine would have made for the same BFS/DFS.
+
+Usage:
+    cd backend
+    python scripts/benchmark_subgraph_traversal.py [--metrics 20] [--buckets 8] [--accounts 40] [--depth 3]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+SCRIPT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from src.core.knowledge_graph.graph_traversal import TraversalOptions
+from src.core.knowledge_graph.models import GraphNode, GraphRelationship, NodeType, RelationType
+from src.core.knowledge_graph.subgraph_traversal import (
+    AdjacencyGraph,
+    all_paths,
+    bfs_paths,
+    dfs_paths,
+    shortest_paths,
+)
+
+
+def build_synthetic_graph(metrics: int = 20, buckets: int = 8, accounts: int = 40,
+                          shared: int = 3) -> AdjacencyGraph:
+    """Metric -> bucket -> GL account graph where each bucket also links to a few shared accounts."""
+    graph = AdjacencyGraph()
+
+    def link(source: str, target: str, rel_type: RelationType):
+        graph.add_relationship(GraphRelationship(source_id=source, target_id=target, type=rel_type, properties={}))
+
+    shared_ids = [f"shared_gl_{i}" for i in range(shared * buckets)]
+    for shared_id in shared_ids:
+        graph.add_node(GraphNode(id=shared_id, type=NodeType.GL_ACCOUNT, properties={"id": shared_id}))
+    for m in range(metrics):
+        metric_id = f"metric_{m}"
+        graph.add_node(GraphNode(id=metric_id, type=NodeType.L1_METRIC, properties={"id": metric_id}))
+        formula_id = f"formula_{m}"
+        graph.add_node(GraphNode(id=formula_id, type=NodeType.FORMULA, properties={"id": formula_id}))
+        link(metric_id, formula_id, RelationType.USES_FORMULA)
+        for b in range(buckets):
+            bucket_id = f"bucket_{m}_{b}"
+            graph.add_node(GraphNode(id=bucket_id, type=NodeType.L2_BUCKET, properties={"id": bucket_id}))
+            link(metric_id, bucket_id, RelationType.CONTAINS)
+            for a in range(accounts):
+                account_id = f"gl_{m}_{b}_{a}"
+                graph.add_node(GraphNode(id=account_id, type=NodeType.GL_ACCOUNT, properties={"id": account_id}))
+                link(bucket_id, account_id, RelationType.CONTAINS)
+            for s in range(shared):
+                link(bucket_id, shared_ids[(m + b * shared + s) % len(shared_ids)], RelationType.CONTAINS)
+    return graph
+
+
+def benchmark(metrics: int, buckets: int, accounts: int, max_depth: int, round_trip_ms: float):
+    """Local traversal on a synthetic graph vs the per-node round trips the Cypher engine would make."""
+    graph = build_synthetic_graph(metrics, buckets, accounts)
+    print(f"graph: {len(graph.nodes)} nodes, {graph.edge_count} relationships; start=metric_0, depth={max_depth}")
+    options = TraversalOptions(max_depth=max_depth, max_paths=50)
+    runs = [
+        ("bfs", lambda: bfs_paths(graph, "metric_0", NodeType.GL_ACCOUNT, None, options)),
+        ("dfs", lambda: dfs_paths(graph, "metric_0", NodeType.GL_ACCOUNT, None, options)),
+        ("shortest_path", lambda: (shortest_paths(graph, "metric_0", NodeType.GL_ACCOUNT, None, options), 0)),
+        ("all_paths", lambda: (all_paths(graph, "metric_0", NodeType.GL_ACCOUNT, None, options), 0)),
+    ]
+    for name, run in runs:
+        started = time.perf_counter()
+        paths, expanded = run()
+        local_ms = (time.perf_counter() - started) * 1000
+        line = f"{name:<14} paths={len(paths):<4} local_ms={local_ms:7.2f}  round_trips=1"
+        if expanded:
+            legacy = 2 * expanded
+            line += f"  legacy_round_trips={legacy} (~{legacy * round_trip_ms:.0f} ms at {round_trip_ms} ms each)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local subgraph traversal")
+    parser.add_argument("--metrics", type=int, default=20)
+    parser.add_argument("--buckets", type=int, default=8)
+    parser.add_argument("--accounts", type=int, default=40)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--round-trip-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    benchmark(args.metrics, args.buckets, args.accounts, args.depth, args.round_trip_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Local fake LLM server for tests and benchmarks.
+
+Implements the Ollama ``/api/generate`` endpoint with a fixed latency and
+optional injected failures. Responses are deterministic: shipment prompts get
+one shipment per 12-digit tracking number found in the prompt, any other
+prompt gets a small JSON object echoing the invoice number it mentions.
+
+Usage:
+    cd backend
+    python scripts/fake_llm_server.py --port 11435 --latency 0.5
+    python scripts/fake_llm_server.py --benchmark 30   # benchmark the chunk runner against it
+"""
+
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+# Add project root to path
+SCRIPT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from aiohttp import web
+
+TRACKING_PATTERN = re.compile(r"\b\d{12}\b")
+INVOICE_PATTERN = re.compile(r"invoice\s*(?:number|#)?[:\s]+(\d[\w-]*)", re.IGNORECASE)
+
+
+def fake_response(prompt: str) -> str:
+    """Deterministic model output for a prompt."""
+    if '"shipments"' in prompt:
+        shipments = [
+            {"tracking_number": tracking, "total_charge": float(int(tracking[-4:]) / 100)}
+            for tracking in dict.fromkeys(TRACKING_PATTERN.findall(prompt))
+        ]
+        return json.dumps({"shipments": shipments})
+    match = INVOICE_PATTERN.search(prompt)
+    return json.dumps({"invoice_number": match.group(1) if match else None})
+
+
+def create_app(latency: float = 0.5, fail_every: int = 0) -> web.Application:
+    """
+    Args:
+        latency: Seconds each request takes
+        fail_every: Return HTTP 503 for every Nth request (0 = never)
+    """
+    state = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+
+    async def generate(request: web.Request) -> web.Response:
+        state["requests"] += 1
+        request_number = state["requests"]
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            body = await request.json()
+            await asyncio.sleep(latency)
+            if fail_every and request_number % fail_every == 0:
+                return web.json_response({"error": "injected failure"}, status=503)
+            return web.json_response({
+                "model": body.get("model"),
+                "response": fake_response(body.get("prompt", "")),
+                "done": True
+            })
+        finally:
+            state["in_flight"] -= 1
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response(state)
+
+    async def health(request: web.Request) -> web.Response:
+        return web.Response(text="Fake LLM is running")
+
+    app = web.Application()
+    app["state"] = state
+    app.router.add_post("/api/generate", generate)
+    app.router.add_get("/stats", stats)
+    app.router.add_get("/", health)
+    return app
+
+
+@contextmanager
+def serve_in_background(port: int = 11435, latency: float = 0.5, fail_every: int = 0) -> Iterator[str]:
+    """Run the fake server on a background thread; yields its base URL."""
+    loop = asyncio.new_event_loop()
+    app = create_app(latency, fail_every)
+    runner = web.AppRunner(app)
+    ready = threading.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    ready.wait()
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+
+def benchmark(chunks: int, latency: float, concurrency: int, port: int):
+    """Serial (concurrency 1) vs concurrent chunk extraction against the fake server."""
+    from src.core.document_intelligence.llm_chunk_runner import ChunkExtractionRunner
+
+    prompts = [
+        f'Extract "shipments" from chunk {i}: ' + " ".join(f"{i:04d}{j:08d}" for j in range(5))
+        for i in range(chunks)
+    ]
+    with serve_in_background(port=port, latency=latency) as url:
+        for limit in (1, concurrency):
+            runner = ChunkExtractionRunner(ollama_url=url, max_concurrency=limit, cache_dir=None)
+            started = time.perf_counter()
+            runner.run(prompts)
+            elapsed = time.perf_counter() - started
+            print(f"concurrency={limit:<3} chunks={chunks} seconds={elapsed:.2f} chunks/sec={chunks / elapsed:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama-compatible LLM server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--fail-every", type=int, default=0)
+    parser.add_argument("--benchmark", type=int, default=0, help="Run a chunk-runner benchmark with N chunks")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.latency, args.concurrency, args.port)
+    else:
+        web.run_app(create_app(args.latency, args.fail_every), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
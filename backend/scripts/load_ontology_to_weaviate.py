@@ -6,9 +6,13 @@ Parses all TTL files from backend/src/ontology/{ap,copa,shared}/ using rdflib,
 extracts structured properties, generates embeddings via EmbeddingService,
 and indexes into the OntologyKnowledge collection in Weaviate.
 
+Entries are upserted by a deterministic UUID derived from their source file
+and name, so re-running the loader only re-embeds entries whose content
+changed. Use --recreate to drop and rebuild the collection.
+
 Usage:
     cd backend
-    python scripts/load_ontology_to_weaviate.py
+    python scripts/load_ontology_to_weaviate.py [--modules copa] [--recreate] [--force]
 """
 
 import json
@@ -29,6 +33,7 @@ from rdflib import Graph, Namespace, URIRef, Literal
 from rdflib.namespace import RDF, RDFS, OWL, SKOS, XSD
 
 from src.core.embeddings import EmbeddingService
+from src.db.weaviate_bulk_indexer import WeaviateBulkIndexer, IndexItem
 from src.config import settings
 
 # ── RDF Namespaces ──────────────────────────────────────────────────────────
@@ -59,6 +64,8 @@ PATH_TYPE_MAP = {
 ONTOLOGY_DIR = BACKEND_DIR / "src" / "ontology"
 COLLECTION_NAME = "OntologyKnowledge"
 BATCH_SIZE = 20  # Embedding batch size
+WRITE_BATCH_SIZE = 200  # Objects per Weaviate batch request
+MANIFEST_PATH = BACKEND_DIR / "cache" / "ontology_index_manifest.json"
 
 
 def classify_file(filepath: Path) -> tuple:
@@ -380,9 +387,12 @@ def collect_ttl_files(modules=None) -> list:
     return ttl_files
 
 
-def create_collection(client: weaviate.WeaviateClient):
-    """Create the OntologyKnowledge collection in Weaviate."""
+def create_collection(client: weaviate.WeaviateClient, recreate: bool = False):
+    """Create the OntologyKnowledge collection in Weaviate (kept if it exists unless recreate)."""
     if client.collections.exists(COLLECTION_NAME):
+        if not recreate:
+            print(f"  Using existing {COLLECTION_NAME} collection.")
+            return
         print(f"  Deleting existing {COLLECTION_NAME} collection...")
         client.collections.delete(COLLECTION_NAME)
 
@@ -403,44 +413,63 @@ def create_collection(client: weaviate.WeaviateClient):
             Property(name="source_file", data_type=DataType.TEXT),
             Property(name="content_json", data_type=DataType.TEXT),
             Property(name="combined_text", data_type=DataType.TEXT),
+            Property(name="content_hash", data_type=DataType.TEXT),
         ],
     )
     print(f"  {COLLECTION_NAME} collection created.")
 
 
+def build_index_items(entries: list) -> list:
+    """Wrap entries as IndexItems keyed by source file, type and name."""
+    items = []
+    seen = defaultdict(int)
+    for entry in entries:
+        key = f"{entry['source_file']}|{entry['knowledge_type']}|{entry['name']}"
+        seen[key] += 1
+        if seen[key] > 1:
+            key = f"{key}#{seen[key]}"
+        props = {
+            "name": entry["name"],
+            "description": entry["description"],
+            "module": entry["module"],
+            "knowledge_type": entry["knowledge_type"],
+            "synonyms": entry["synonyms"],
+            "source_file": entry["source_file"],
+            "content_json": entry["content_json"],
+            "combined_text": entry["combined_text"],
+        }
+        items.append(IndexItem(key=key, properties=props, text=entry["combined_text"]))
+    return items
+
+
 def index_entries(client: weaviate.WeaviateClient, entries: list,
-                  embedding_service: EmbeddingService):
-    """Generate embeddings and index all entries into Weaviate."""
+                  embedding_service: EmbeddingService, prune: bool = False,
+                  force: bool = False):
+    """Embed and upsert changed entries into Weaviate through the batch API."""
     collection = client.collections.get(COLLECTION_NAME)
+    indexer = WeaviateBulkIndexer(
+        collection,
+        embedding_service.generate_embeddings,
+        embedding_batch_size=BATCH_SIZE,
+        write_batch_size=WRITE_BATCH_SIZE,
+    )
 
-    # Generate embeddings in batches
-    print(f"\n  Generating embeddings for {len(entries)} entries...")
-    all_embeddings = []
-    for i in range(0, len(entries), BATCH_SIZE):
-        batch_texts = [e["combined_text"] for e in entries[i:i + BATCH_SIZE]]
-        batch_embeddings = embedding_service.generate_embeddings(batch_texts)
-        all_embeddings.extend(batch_embeddings)
-        print(f"    Embedded {min(i + BATCH_SIZE, len(entries))}/{len(entries)}")
-
-    # Insert into Weaviate
     print(f"\n  Indexing {len(entries)} entries into Weaviate...")
-    with collection.batch.dynamic() as batch:
-        for idx, entry in enumerate(entries):
-            props = {
-                "name": entry["name"],
-                "description": entry["description"],
-                "module": entry["module"],
-                "knowledge_type": entry["knowledge_type"],
-                "synonyms": entry["synonyms"],
-                "source_file": entry["source_file"],
-                "content_json": entry["content_json"],
-                "combined_text": entry["combined_text"],
-            }
-            batch.add_object(properties=props, vector=all_embeddings[idx])
+    report = indexer.index(build_index_items(entries), prune=prune, force=force)
+    report.write_manifest(str(MANIFEST_PATH))
+
+    print(f"  Unchanged (skipped): {report.skipped}")
+    print(f"  Indexed: {report.indexed} in {report.seconds:.2f}s ({report.objects_per_second} objects/s)")
+    if prune:
+        print(f"  Removed stale: {report.pruned}")
+    if report.failures:
+        print(f"  FAILED: {report.failed} — see {MANIFEST_PATH}")
+        for failure in report.failures[:10]:
+            print(f"    [{failure['stage']}] {failure['key']}: {failure['error']}")
 
     # Verify count
     result = collection.aggregate.over_all(total_count=True)
-    print(f"  Indexed {result.total_count} objects into {COLLECTION_NAME}.")
+    print(f"  {result.total_count} objects in {COLLECTION_NAME}.")
     return result.total_count
 
 
@@ -449,6 +478,10 @@ def main():
     parser = argparse.ArgumentParser(description="Load ontology TTL files into Weaviate")
     parser.add_argument("--modules", nargs="+", default=None,
                         help="Modules to load (e.g. --modules copa). Default: all")
+    parser.add_argument("--recreate", action="store_true",
+                        help="Drop and recreate the collection before indexing")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-embed and rewrite entries even if unchanged")
     args = parser.parse_args()
 
     print("=" * 70)
@@ -501,7 +534,7 @@ def main():
     )
     print(f"  Connected to Weaviate at {host}:{port}")
 
-    create_collection(client)
+    create_collection(client, recreate=args.recreate)
 
     # 4. Generate embeddings and index
     print("\n[4/4] Embedding & indexing...")
@@ -509,7 +542,9 @@ def main():
     print(f"  Embedding provider: {embedding_service.provider_type}")
     print(f"  Embedding dimension: {embedding_service.dimension}")
 
-    total = index_entries(client, all_entries, embedding_service)
+    # Stale entries are only removed on full runs; a --modules run leaves other modules alone
+    total = index_entries(client, all_entries, embedding_service,
+                          prune=modules is None, force=args.force)
 
     # Summary
     print("\n" + "=" * 70)
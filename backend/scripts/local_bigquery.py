@@ -0,0 +1,239 @@
+"""
+In-process stand-in for BigQueryClient backed by SQLite.
+
+LocalBigQueryClient exposes the BigQueryClient methods the generators use
+(execute_query, execute_query_arrow, validate_query, list_tables,
+get_table_schema, get_dataset_schema), so result handling can be exercised
+and benchmarked offline. SQLite rows are fetched in batches and turned into
+Arrow record batches, mirroring the Storage Read API path.
+
+Usage:
+    cd backend
+    python scripts/local_bigquery.py --rows 1000000
+"""
+
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add project root to path
+SCRIPT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import pyarrow as pa
+import structlog
+
+from src.db.arrow_results import ColumnarResult
+
+logger = structlog.get_logger()
+
+# SQLite declared type -> BigQuery field type
+_BQ_TYPES = {"INTEGER": "INT64", "INT": "INT64", "REAL": "FLOAT64", "FLOAT": "FLOAT64",
+             "NUMERIC": "NUMERIC", "TEXT": "STRING", "DATE": "DATE", "BOOLEAN": "BOOL"}
+
+SYNTHETIC_TABLE = "sales_results"
+
+
+class LocalBigQueryClient:
+    """BigQueryClient test double over an in-memory (or file) SQLite database."""
+
+    def __init__(self, database: str = ":memory:", dataset_id: str = "local",
+                 project_id: str = "local", batch_size: int = 65536):
+        self.project_id = project_id
+        self.dataset_id = dataset_id
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(database, check_same_thread=False)
+
+    def load_rows(self, table_name: str, rows: List[Dict[str, Any]]):
+        """Create (or replace) a table from row dictionaries."""
+        table = pa.Table.from_pylist(rows)
+        self.load_arrow(table_name, table)
+
+    def load_arrow(self, table_name: str, table: pa.Table):
+        """Create (or replace) a table from an Arrow table."""
+        def sqlite_type(arrow_type: pa.DataType) -> str:
+            if pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type):
+                return "INTEGER"
+            if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+                return "REAL"
+            return "TEXT"
+
+        columns = ", ".join(f'"{field.name}" {sqlite_type(field.type)}' for field in table.schema)
+        placeholders = ", ".join("?" for _ in table.schema)
+        with self.connection:
+            self.connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            self.connection.execute(f'CREATE TABLE "{table_name}" ({columns})')
+            for batch in table.to_batches(self.batch_size):
+                values = zip(*(column.to_pylist() for column in batch.columns))
+                self.connection.executemany(f'INSERT INTO "{table_name}" VALUES ({placeholders})', values)
+
+    def create_synthetic_table(self, rows: int, table_name: str = SYNTHETIC_TABLE):
+        """Generate a sales-like table of the given size inside SQLite."""
+        with self.connection:
+            self.connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            self.connection.execute(f'''
+                CREATE TABLE "{table_name}" (
+                    order_id TEXT, customer_name TEXT, region TEXT, posting_date TEXT,
+                    quantity INTEGER, revenue REAL, cost REAL, margin_pct REAL, discount_ratio REAL
+                )''')
+            self.connection.execute(f'''
+                WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+                INSERT INTO "{table_name}"
+                SELECT printf('SO%08d', n),
+                       'Customer ' || (n % 5000),
+                       CASE n % 4 WHEN 0 THEN 'North' WHEN 1 THEN 'South' WHEN 2 THEN 'East' ELSE 'West' END,
+                       date('2024-01-01', '+' || (n % 365) || ' days'),
+                       n % 250,
+                       (n % 100000) * 1.37,
+                       (n % 100000) * 0.91,
+                       (n % 1000) / 10.0,
+                       (n % 100) / 100.0
+                FROM seq''', (rows,))
+
+    def execute_query(self, query: str) -> List[Dict[str, Any]]:
+        """Execute a SQL query and return results as list of dictionaries."""
+        cursor = self.connection.execute(query)
+        names = [column[0] for column in cursor.description or ()]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def execute_query_arrow(self, query: str) -> ColumnarResult:
+        """Execute a SQL query and return the result as Arrow record batches."""
+        started = time.perf_counter()
+        cursor = self.connection.execute(query)
+        names = [column[0] for column in cursor.description or ()]
+
+        tables = []
+        first_batch_seconds = None
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+            if first_batch_seconds is None:
+                first_batch_seconds = time.perf_counter() - started
+            tables.append(pa.table([pa.array(column) for column in zip(*rows)], names=names))
+
+        if tables:
+            table = pa.concat_tables(tables, promote_options="permissive")
+        else:
+            table = pa.table({name: pa.array([], pa.null()) for name in names})
+        return ColumnarResult(table, stats={
+            "storage_api": False,
+            "batches": len(tables),
+            "first_batch_seconds": first_batch_seconds,
+            "seconds": time.perf_counter() - started,
+            "total_bytes_processed": 0,
+        })
+
+    def validate_query(self, query: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Validate a query without executing it (SQLite EXPLAIN; never cached)."""
+        try:
+            self.connection.execute(f"EXPLAIN {query}")
+            return {"valid": True, "total_bytes_processed": 0, "estimated_cost_usd": 0.0}
+        except sqlite3.Error as e:
+            return {"valid": False, "error": str(e)}
+
+    def list_tables(self) -> List[str]:
+        cursor = self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")
+        return [row[0] for row in cursor]
+
+    def get_table_schema(self, table_name: str) -> Dict[str, Any]:
+        columns = []
+        for _, name, declared_type, not_null, _, _ in self.connection.execute(f'PRAGMA table_info("{table_name}")'):
+            columns.append({
+                "name": name,
+                "type": _BQ_TYPES.get(declared_type.upper(), "STRING"),
+                "mode": "REQUIRED" if not_null else "NULLABLE",
+                "description": None,
+                "is_nullable": not not_null,
+            })
+        row_count = self.connection.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+        return {
+            "table_name": table_name,
+            "dataset": self.dataset_id,
+            "project": self.project_id,
+            "description": None,
+            "row_count": row_count,
+            "created": None,
+            "modified": None,
+            "columns": columns,
+        }
+
+    def get_dataset_schema(self) -> List[Dict[str, Any]]:
+        return [self.get_table_schema(table_name) for table_name in self.list_tables()]
+
+
+def benchmark(rows: int = 1_000_000, formatter: Optional[Any] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Compare the row-dict path with the columnar path on a synthetic result.
+
+    Args:
+        rows: Result size
+        formatter: BigQuerySQLGenerator-like object with _format_results/_format_columnar;
+            formatting is skipped when None
+    """
+    client = LocalBigQueryClient()
+    client.create_synthetic_table(rows)
+    query = f"SELECT * FROM {SYNTHETIC_TABLE}"
+    report: Dict[str, Dict[str, float]] = {}
+
+    started = time.perf_counter()
+    dict_rows = client.execute_query(query)
+    fetched = time.perf_counter()
+    if formatter is not None:
+        dict_rows = formatter._format_results(dict_rows, list(dict_rows[0].keys()))
+    formatted = time.perf_counter()
+    body = json.dumps(dict_rows, default=str).encode("utf-8")
+    done = time.perf_counter()
+    report["rows"] = {"fetch": fetched - started, "format": formatted - fetched,
+                      "json": done - formatted, "total": done - started, "bytes": len(body)}
+    del dict_rows, body
+
+    started = time.perf_counter()
+    result = client.execute_query_arrow(query)
+    fetched = time.perf_counter()
+    if formatter is not None:
+        result = formatter._format_columnar(result)
+    formatted = time.perf_counter()
+    body = result.to_json()
+    done = time.perf_counter()
+    csv_body = result.to_csv()
+    csv_done = time.perf_counter()
+    ipc_body = result.to_ipc()
+    ipc_done = time.perf_counter()
+    report["columnar"] = {"fetch": fetched - started, "format": formatted - fetched,
+                          "json": done - formatted, "total": done - started, "bytes": len(body),
+                          "csv": csv_done - done, "arrow_ipc": ipc_done - csv_done,
+                          "csv_bytes": len(csv_body), "arrow_ipc_bytes": len(ipc_body)}
+
+    for path, timings in report.items():
+        timings["rows_per_second"] = round(rows / timings["total"]) if timings["total"] else 0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark row vs columnar result handling offline")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--no-format", action="store_true", help="Skip value formatting")
+    args = parser.parse_args()
+
+    formatter = None
+    if not args.no_format:
+        from src.core.bigquery_sql_generator import BigQuerySQLGenerator
+        # Formatting uses no generator state, so skip the LLM/BigQuery setup
+        formatter = BigQuerySQLGenerator.__new__(BigQuerySQLGenerator)
+
+    report = benchmark(args.rows, formatter)
+    for path, timings in report.items():
+        print(f"{path:>9}: " + ", ".join(
+            f"{name}={value:.3f}s" if isinstance(value, float) else f"{name}={value:,}"
+            for name, value in timings.items()
+        ))
+
+
+if __name__ == "__main__":
+    main()
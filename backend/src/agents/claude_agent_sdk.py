@@ -19,6 +19,8 @@ import aiohttp
 from anthropic import Anthropic
 from pydantic import BaseModel, Field
 
+from src.core.llm_governor import governed_client
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -308,7 +310,7 @@ class Agent:
             
             if anthropic_api_key:
                 from anthropic import Anthropic
-                claude_client = Anthropic(api_key=anthropic_api_key)
+                claude_client = governed_client(Anthropic(api_key=anthropic_api_key), "anthropic")
                 
                 # Convert messages to Anthropic format
                 system_message = None
@@ -401,7 +403,7 @@ class ClaudeAgentSDK:
     """Main SDK class that orchestrates Claude-powered agents"""
     
     def __init__(self, anthropic_api_key: Optional[str] = None):
-        self.claude_client = Anthropic(api_key=anthropic_api_key)
+        self.claude_client = governed_client(Anthropic(api_key=anthropic_api_key), "anthropic")
         self.agents: Dict[str, Agent] = {}
         self.active_conversations: Dict[str, List[AgentMessage]] = {}
         
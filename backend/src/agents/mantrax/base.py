@@ -11,6 +11,7 @@ from openai import OpenAI
 import json
 from datetime import datetime
 from src.config import settings
+from src.core.llm_governor import governed_client
 
 logger = structlog.get_logger()
 
@@ -35,7 +36,7 @@ class MantraxAgent(ABC):
         # Initialize OpenAI client with API key from settings
         try:
             if settings.openai_api_key:
-                self.client = OpenAI(api_key=settings.openai_api_key)
+                self.client = governed_client(OpenAI(api_key=settings.openai_api_key), "openai")
                 logger.info(f"Initialized Mantrax agent: {name}")
             else:
                 self.client = None
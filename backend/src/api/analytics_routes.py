@@ -6,6 +6,7 @@ from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 from typing import Dict, Any, Optional
 import structlog
+import asyncio
 import time
 import json
 from decimal import Decimal
@@ -730,7 +731,8 @@ async def get_cohort_insights(
         }}"""
         
         # Get insights from Claude
-        response = llm_client.client.messages.create(
+        response = await asyncio.to_thread(
+            llm_client.client.messages.create,
             model=llm_client.model,
             max_tokens=2000,
             temperature=0.3,
@@ -2,16 +2,19 @@
 FastAPI routes for BigQuery queries - AXIS.AI
 Supports configurable datasets for multi-source connectivity
 """
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 import structlog
 from datetime import datetime, timezone
+import asyncio
 import uuid
 
 from src.core.bigquery_sql_generator import BigQuerySQLGenerator
 from src.db.mongodb_client import get_mongodb_client, MongoDBClient
 from src.models.conversation import Message
+from src.db.result_streaming import streaming_body
 from src.config import settings
 
 logger = structlog.get_logger()
@@ -142,9 +145,11 @@ async def query_bigquery(
 
         # Generate and execute query with conversation context
         if execute:
-            result = generator.generate_and_execute(request.question, max_tables, conversation_context=conversation_context)
+            result = await asyncio.to_thread(generator.generate_and_execute, request.question, max_tables,
+                                           conversation_context=conversation_context)
         else:
-            result = generator.generate_sql(request.question, max_tables, conversation_context=conversation_context)
+            result = await asyncio.to_thread(generator.generate_sql, request.question, max_tables,
+                                           conversation_context=conversation_context)
 
         # Extract execution results if available
         execution = result.get("execution", {})
@@ -209,6 +214,85 @@ async def query_bigquery(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def open_question_results(generator: BigQuerySQLGenerator, question: str,
+                          options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Generate SQL for a question and open a server-side result handle (HTTP 400 on failure)"""
+    options = options or {}
+    result = generator.generate_and_open(question, max_tables=options.get("max_tables", 5))
+    execution = result.get("execution") or {}
+    if result.get("error") or not execution.get("success"):
+        raise HTTPException(status_code=400, detail=result.get("error") or execution.get("error", "No SQL generated"))
+    return result
+
+
+def result_metadata(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Query metadata sent ahead of streamed or paged rows"""
+    execution = result["execution"]
+    return {
+        "handle_id": execution["handle"].handle_id,
+        "sql": result.get("sql"),
+        "explanation": result.get("explanation"),
+        "tables_used": result.get("tables_used", []),
+        "from_cache": result.get("from_cache", False),
+        "bytes_processed": execution.get("bytes_processed"),
+        "estimated_cost_usd": execution.get("estimated_cost_usd")
+    }
+
+
+@router.post("/query/stream")
+def stream_query_bigquery(
+    request: BigQueryRequest,
+    format: str = Query("ndjson", pattern="^(ndjson|json)$", description="ndjson (one row per line) or json"),
+    page_size: int = Query(settings.result_page_size, ge=1, le=100000),
+    generator: BigQuerySQLGenerator = Depends(get_bq_generator)
+):
+    """
+    Process a natural language query and stream rows as BigQuery pages arrive.
+
+    The body starts with the query metadata and ends with a summary holding
+    the row count and time to first row.
+    """
+    try:
+        if request.dataset and request.dataset != generator.dataset_id:
+            generator.set_dataset(request.dataset)
+
+        result = open_question_results(generator, request.question, request.options)
+        handle = result["execution"]["handle"]
+        body, media_type = streaming_body(handle, format, page_size, generator._format_results,
+                                          header=result_metadata(result))
+        return StreamingResponse(body, media_type=media_type, headers={"X-Result-Handle": handle.handle_id})
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"BigQuery streaming query failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/query/page")
+def page_query_bigquery(
+    request: BigQueryRequest,
+    page_size: int = Query(settings.result_page_size, ge=1, le=100000),
+    generator: BigQuerySQLGenerator = Depends(get_bq_generator)
+):
+    """
+    Process a natural language query and return its first page of rows.
+
+    Further pages come from GET /api/v1/results/{handle_id}?cursor=...
+    """
+    try:
+        if request.dataset and request.dataset != generator.dataset_id:
+            generator.set_dataset(request.dataset)
+
+        result = open_question_results(generator, request.question, request.options)
+        handle = result["execution"]["handle"]
+        return {**result_metadata(result), **handle.page(page_size, generator._format_results)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"BigQuery paged query failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/datasets", response_model=List[str])
 async def list_datasets(
     generator: BigQuerySQLGenerator = Depends(get_bq_generator)
@@ -304,6 +388,34 @@ async def execute_sql(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/execute/export")
+async def export_sql(
+    sql: str,
+    format: str = Query("json", pattern="^(json|ndjson|csv|arrow)$", description="json, ndjson, csv or arrow (IPC stream)"),
+    dataset: Optional[str] = Query(None, description="Dataset context"),
+    generator: BigQuerySQLGenerator = Depends(get_bq_generator)
+):
+    """Execute raw SQL and serialize the formatted result straight from its Arrow columns"""
+    try:
+        if dataset and dataset != generator.dataset_id:
+            generator.set_dataset(dataset)
+
+        execution = generator.execute_sql_columnar(sql)
+        if not execution.get("success"):
+            raise HTTPException(status_code=400, detail=execution.get("error"))
+
+        body, media_type = execution["result"].serialize(format)
+        return Response(content=body, media_type=media_type, headers={
+            "X-Row-Count": str(execution["row_count"]),
+            "X-Bytes-Processed": str(execution.get("bytes_processed") or 0),
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"SQL export failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/health")
 async def bigquery_health():
     """Check BigQuery connectivity"""
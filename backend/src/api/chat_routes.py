@@ -1,10 +1,12 @@
 """API routes for Ask AXIS chat functionality."""
 from typing import Dict, Any, Optional
+import asyncio
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 import structlog
 import anthropic
 from src.config import Settings
+from src.core.llm_governor import governed_client
 
 logger = structlog.get_logger()
 router = APIRouter(prefix="/api/v1/chat", tags=["chat"])
@@ -101,7 +103,7 @@ async def ask_axis(request: ChatRequest):
         context_description = build_context_prompt(request.context)
 
         # Create Anthropic client
-        client = anthropic.Anthropic(api_key=api_key)
+        client = governed_client(anthropic.Anthropic(api_key=api_key), "anthropic")
 
         # Build the system prompt
         system_prompt = f"""You are AXIS, an AI assistant for the MANTRA-X Decision Intelligence Platform.
@@ -113,8 +115,9 @@ Current Context:
 Provide helpful, accurate, and concise responses based on the user's question and the current context.
 If the context doesn't contain enough information to answer fully, acknowledge that and provide what you can."""
 
-        # Call Claude API
-        message = client.messages.create(
+        # Call Claude API; off the event loop so the call can queue in the LLM governor
+        message = await asyncio.to_thread(
+            client.messages.create,
             model="claude-3-5-sonnet-20241022",
             max_tokens=1024,
             system=system_prompt,
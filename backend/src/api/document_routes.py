@@ -1,4 +1,5 @@
 """Document Intelligence API routes."""
+import asyncio
 import logging
 import tempfile
 import os
@@ -317,7 +318,8 @@ Provide the extracted data in a clear, structured format."""
 Be thorough and specific about all visible content."""
 
             # Use vision API
-            response = llm_client.analyze_image(
+            response = await asyncio.to_thread(
+                llm_client.analyze_image,
                 image_data=image_bytes,
                 prompt=vision_prompt,
                 media_type=media_type,
@@ -373,7 +375,8 @@ Document content:
 """
 
             # Get analysis from Claude
-            response = llm_client.generate_completion(
+            response = await asyncio.to_thread(
+                llm_client.generate_completion,
                 prompt=prompt,
                 max_tokens=2000
             )
@@ -440,7 +443,8 @@ Provide your answer in JSON format:
 }}
 """
 
-            response = llm_client.analyze_image(
+            response = await asyncio.to_thread(
+                llm_client.analyze_image,
                 image_data=image_bytes,
                 prompt=vision_prompt,
                 media_type=media_type,
@@ -471,7 +475,8 @@ Provide your answer in JSON format:
 }}
 """
 
-            response = llm_client.generate_completion(
+            response = await asyncio.to_thread(
+                llm_client.generate_completion,
                 prompt=prompt,
                 max_tokens=1500
             )
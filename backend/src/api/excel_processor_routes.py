@@ -3,24 +3,29 @@ Excel AI Processor API Routes
 Handles Excel file processing with AI-powered templates
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+import asyncio
 import os
 import sys
-from datetime import datetime
 import traceback
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from src.cgs_generator import FinalHybridCGSGenerator
+from src.cgs_generator import cgs_input_hash
+from src.core.job_engine import get_job_engine
 
 router = APIRouter()
 
-# Store for processing status
-processing_status: Dict[str, Dict[str, Any]] = {}
+# Project root holds excel-input/, extracted_data/ and output/
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+PROJECT_ROOT = os.path.dirname(BACKEND_DIR)
+
+CGS_JOB_TYPE = "cgs"
+CGS_JOB_TARGET = "src.cgs_generator:run_cgs_job"
 
 
 class ProcessingRequest(BaseModel):
@@ -30,40 +35,82 @@ class ProcessingRequest(BaseModel):
 
 
 class ProcessingStatus(BaseModel):
-    status: str  # "pending", "processing", "completed", "error"
+    status: str  # "pending", "processing", "completed", "error", "cancelled"
     message: str
     progress: int  # 0-100
+    phase: Optional[str] = None  # "load", "transform", "write"
     output_file: Optional[str] = None
     error: Optional[str] = None
     started_at: Optional[str] = None
     completed_at: Optional[str] = None
 
 
+def _job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a job row into the status payload the frontend expects"""
+    status = {
+        "status": job["status"],
+        "message": job["message"],
+        "progress": job["progress"],
+        "phase": job["phase"],
+        "error": job["error"],
+        "started_at": job["started_at"] or job["created_at"],
+        "completed_at": job["completed_at"],
+    }
+    # output_file, row_count, phase_timings, load_stats
+    status.update(job["result"] or {})
+    return status
+
+
+def _get_job_or_404(job_id: str) -> Dict[str, Any]:
+    job = get_job_engine().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @router.post("/api/v1/excel/process/financial-analysis")
-async def process_financial_analysis(background_tasks: BackgroundTasks):
+async def process_financial_analysis(force: bool = False):
     """
     Process Financial Analysis CGS Generation
-    This is a long-running task that generates CGS reports
+    This is a long-running task that generates CGS reports. It runs in the
+    job engine's worker processes; resubmitting identical source files
+    returns the existing job unless force=true.
     """
     try:
-        # Generate a unique job ID
-        job_id = f"cgs_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-
-        # Initialize status
-        processing_status[job_id] = {
-            "status": "pending",
-            "message": "Job queued for processing",
-            "progress": 0,
-            "started_at": datetime.now().isoformat()
-        }
-
-        # Add to background tasks
-        background_tasks.add_task(run_cgs_generator, job_id)
+        engine = get_job_engine()
 
+        try:
+            input_hash = await asyncio.to_thread(cgs_input_hash, PROJECT_ROOT)
+        except FileNotFoundError:
+            # Let the job itself report the missing source file
+            input_hash = None
+
+        job, created = engine.submit(
+            CGS_JOB_TYPE,
+            CGS_JOB_TARGET,
+            params={"base_path": PROJECT_ROOT, "output_dir": "output"},
+            input_hash=input_hash,
+            force=force
+        )
+
+        # A completed job whose output was deleted is not reusable
+        output_file = (job["result"] or {}).get("output_file")
+        if not created and job["status"] == "completed" and not (output_file and os.path.exists(output_file)):
+            job, created = engine.submit(
+                CGS_JOB_TYPE,
+                CGS_JOB_TARGET,
+                params={"base_path": PROJECT_ROOT, "output_dir": "output"},
+                input_hash=input_hash,
+                force=True
+            )
+
+        job_id = job["job_id"]
         return {
             "success": True,
             "job_id": job_id,
-            "message": "Financial Analysis processing started",
+            "reused": not created,
+            "message": "Financial Analysis processing started" if created
+                       else "Identical inputs already submitted; returning existing job",
             "status_endpoint": f"/api/v1/excel/status/{job_id}"
         }
 
@@ -73,57 +120,12 @@ async def process_financial_analysis(background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def run_cgs_generator(job_id: str):
-    """
-    Background task to run the CGS generator
-    """
-    try:
-        # Update status to processing
-        processing_status[job_id]["status"] = "processing"
-        processing_status[job_id]["message"] = "Loading source files..."
-        processing_status[job_id]["progress"] = 10
-
-        # Get the project root directory
-        backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
-        project_root = os.path.dirname(backend_dir)
-
-        # Initialize generator
-        generator = FinalHybridCGSGenerator(base_path=project_root)
-
-        # Update progress
-        processing_status[job_id]["message"] = "Generating CGS report..."
-        processing_status[job_id]["progress"] = 30
-
-        # Run the generator
-        result_df, output_file = generator.generate(output_dir='output')
-
-        # Update status to completed
-        processing_status[job_id]["status"] = "completed"
-        processing_status[job_id]["message"] = "CGS report generated successfully"
-        processing_status[job_id]["progress"] = 100
-        processing_status[job_id]["output_file"] = output_file
-        processing_status[job_id]["completed_at"] = datetime.now().isoformat()
-        processing_status[job_id]["row_count"] = len(result_df)
-
-    except Exception as e:
-        # Update status to error
-        processing_status[job_id]["status"] = "error"
-        processing_status[job_id]["message"] = f"Error: {str(e)}"
-        processing_status[job_id]["error"] = traceback.format_exc()
-        processing_status[job_id]["completed_at"] = datetime.now().isoformat()
-        print(f"Error in CGS generation: {str(e)}")
-        traceback.print_exc()
-
-
 @router.get("/api/v1/excel/status/{job_id}")
 async def get_processing_status(job_id: str):
     """
     Get the status of a processing job
     """
-    if job_id not in processing_status:
-        raise HTTPException(status_code=404, detail="Job not found")
-
-    status = processing_status[job_id].copy()
+    status = _job_status(_get_job_or_404(job_id))
 
     # Add download URLs if completed
     if status.get("status") == "completed" and status.get("output_file"):
@@ -140,15 +142,40 @@ async def get_processing_status(job_id: str):
     }
 
 
+@router.get("/api/v1/excel/job/{job_id}/events")
+async def get_job_events(job_id: str, after_id: int = 0):
+    """
+    Get per-stage progress events for a job (poll with after_id for new events)
+    """
+    _get_job_or_404(job_id)
+    return {
+        "success": True,
+        "job_id": job_id,
+        "events": get_job_engine().events(job_id, after_id=after_id)
+    }
+
+
+@router.post("/api/v1/excel/job/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job
+    """
+    _get_job_or_404(job_id)
+    if not get_job_engine().cancel(job_id):
+        raise HTTPException(status_code=400, detail="Job already finished")
+
+    return {
+        "success": True,
+        "message": "Cancellation requested"
+    }
+
+
 @router.get("/api/v1/excel/download/{job_id}")
 async def download_output(job_id: str):
     """
     Download the generated output file
     """
-    if job_id not in processing_status:
-        raise HTTPException(status_code=404, detail="Job not found")
-
-    status = processing_status[job_id]
+    status = _job_status(_get_job_or_404(job_id))
 
     if status["status"] != "completed":
         raise HTTPException(status_code=400, detail="Job not completed yet")
@@ -171,19 +198,21 @@ async def list_jobs():
     List all processing jobs
     """
     jobs = []
-    for job_id, status in processing_status.items():
+    for job in get_job_engine().list(CGS_JOB_TYPE):
+        status = _job_status(job)
         jobs.append({
-            "job_id": job_id,
+            "job_id": job["job_id"],
             "status": status["status"],
             "message": status["message"],
             "progress": status["progress"],
+            "phase": status["phase"],
             "started_at": status.get("started_at"),
             "completed_at": status.get("completed_at")
         })
 
     return {
         "success": True,
-        "jobs": sorted(jobs, key=lambda x: x.get("started_at", ""), reverse=True)
+        "jobs": jobs
     }
 
 
@@ -192,10 +221,7 @@ async def delete_job(job_id: str):
     """
     Delete a processing job and its output file
     """
-    if job_id not in processing_status:
-        raise HTTPException(status_code=404, detail="Job not found")
-
-    status = processing_status[job_id]
+    status = _job_status(_get_job_or_404(job_id))
 
     # Delete output file if exists
     output_file = status.get("output_file")
@@ -205,8 +231,8 @@ async def delete_job(job_id: str):
         except Exception as e:
             print(f"Error deleting output file: {str(e)}")
 
-    # Remove from status
-    del processing_status[job_id]
+    # Cancel if still running and remove from the job table
+    get_job_engine().delete(job_id)
 
     return {
         "success": True,
@@ -7,14 +7,15 @@ from datetime import datetime
 import json
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Body, Form
-from fastapi.responses import JSONResponse
-import pymupdf
+from fastapi.responses import JSONResponse, StreamingResponse
 import sys
 from pathlib import Path
 
 # Add parent directory to path to import template_aware_extraction
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from template_aware_extraction import TemplateAwareExtractor
+from src.core.document_intelligence.pdf_extraction import get_pdf_extraction_service
+from src.core.document_intelligence.batch_extraction import BatchExtractionPipeline
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -54,13 +55,8 @@ async def extract_pdf_with_template(
 
         try:
             # Extract text from PDF
-            doc = pymupdf.open(tmp_file_path)
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text += f"\n--- Page {page_num + 1} ---\n"
-                text += page.get_text()
-            doc.close()
+            extraction = get_pdf_extraction_service().extract(tmp_file_path)
+            text = extraction.full_text()
 
             if not text.strip():
                 raise HTTPException(status_code=400, detail="No text could be extracted from PDF")
@@ -71,7 +67,7 @@ async def extract_pdf_with_template(
             # Check if auto-detection is requested or needed
             if template_data.get('auto_detect') or not template_data.get('required_fields'):
                 logger.info("Auto-detecting template...")
-                detected_type = extractor.auto_detect_template(text)
+                detected_type = extractor.auto_detect_template(text, extraction.sha256)
 
                 if detected_type and detected_type in extractor.templates:
                     logger.info(f"Using auto-detected template: {detected_type}")
@@ -79,29 +75,8 @@ async def extract_pdf_with_template(
                 else:
                     logger.warning("Auto-detection failed, using provided template")
 
-            # Create schema prompt
-            schema = extractor.create_schema_prompt(template_data)
-
             # Build extraction prompt
-            prompt = f"""You are a precise data extraction assistant. Extract information from this document using the schema below.
-
-DOCUMENT TYPE: {template_data.get('name', 'Document')}
-
-{schema}
-
-EXTRACTION RULES:
-1. Return ONLY valid JSON format
-2. Use null for missing fields (do not omit fields)
-3. For items/lists, use JSON arrays with proper structure
-4. Extract ALL required fields - they must be present in output
-5. Use exact field names from schema above
-6. For monetary values, use numbers without currency symbols
-7. For dates, preserve the format found in document
-
-DOCUMENT TEXT:
-{text}
-
-JSON OUTPUT (all required fields must be present):"""
+            prompt = extractor.create_extraction_prompt(template_data, text)
 
             # Query LLM for extraction
             response = extractor.query_ollama(prompt)
@@ -152,91 +127,81 @@ JSON OUTPUT (all required fields must be present):"""
 @router.post("/extract-batch")
 async def extract_pdf_batch(
     files: list[UploadFile] = File(...),
-    template: str = Form(...)
+    template: str = Form(...),
+    stream: bool = Form(False),
+    llm_concurrency: int = Form(4),
+    file_timeout: float = Form(600.0)
 ):
     """
     Extract data from multiple PDFs using the same template.
 
+    Files are parsed in a process pool and sent to the LLM concurrently
+    (at most llm_concurrency requests in flight), each with its own timeout.
+
     Args:
         files: List of PDF files to extract data from
         template: JSON string containing template definition
+        stream: Return NDJSON lines as each file completes, then a summary line
+        llm_concurrency: Maximum concurrent LLM requests
+        file_timeout: Seconds allowed per file
 
     Returns:
-        List of extraction results
+        List of extraction results and a batch summary
     """
     try:
         template_data = json.loads(template)
-        results = []
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid template JSON: {str(e)}")
 
+    try:
+        # Save uploads to temp files for the parsing workers
+        batch = []
         for file in files:
-            try:
-                # Process each file individually
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                    content = await file.read()
-                    tmp_file.write(content)
-                    tmp_file_path = tmp_file.name
-
-                # Extract text
-                doc = pymupdf.open(tmp_file_path)
-                text = ""
-                for page_num in range(len(doc)):
-                    page = doc[page_num]
-                    text += f"\n--- Page {page_num + 1} ---\n"
-                    text += page.get_text()
-                doc.close()
-
-                # Initialize extractor and extract
-                extractor = TemplateAwareExtractor()
-                schema = extractor.create_schema_prompt(template_data)
-
-                prompt = f"""You are a precise data extraction assistant. Extract information from this document using the schema below.
-
-DOCUMENT TYPE: {template_data.get('name', 'Document')}
-
-{schema}
-
-EXTRACTION RULES:
-1. Return ONLY valid JSON format
-2. Use null for missing fields (do not omit fields)
-3. For items/lists, use JSON arrays with proper structure
-4. Extract ALL required fields - they must be present in output
-5. Use exact field names from schema above
-6. For monetary values, use numbers without currency symbols
-7. For dates, preserve the format found in document
-
-DOCUMENT TEXT:
-{text}
-
-JSON OUTPUT (all required fields must be present):"""
-
-                response = extractor.query_ollama(prompt)
-                extracted_data = extractor.parse_llm_response(response) if response else {"error": "No response"}
-
-                # Clean up temp file
-                os.unlink(tmp_file_path)
-
-                results.append({
-                    "filename": file.filename,
-                    "success": "error" not in extracted_data,
-                    "data": extracted_data
-                })
-
-            except Exception as e:
-                results.append({
-                    "filename": file.filename,
-                    "success": False,
-                    "error": str(e)
-                })
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+                tmp_file.write(await file.read())
+                batch.append((file.filename, tmp_file.name))
+
+        def cleanup():
+            for _, tmp_file_path in batch:
+                if os.path.exists(tmp_file_path):
+                    os.unlink(tmp_file_path)
+
+        pipeline = BatchExtractionPipeline(
+            TemplateAwareExtractor(),
+            template_data,
+            llm_concurrency=llm_concurrency,
+            file_timeout=file_timeout
+        )
+
+        if stream:
+            async def ndjson_events():
+                try:
+                    async for event in pipeline.run(batch):
+                        yield json.dumps(event, default=str) + "\n"
+                finally:
+                    cleanup()
+
+            return StreamingResponse(ndjson_events(), media_type="application/x-ndjson")
+
+        results = [None] * len(batch)
+        summary = {}
+        try:
+            async for event in pipeline.run(batch):
+                if event.pop("type") == "summary":
+                    summary = event
+                else:
+                    results[event.pop("index")] = event
+        finally:
+            cleanup()
 
         return JSONResponse(content={
             "success": True,
             "total": len(results),
             "results": results,
+            "summary": summary,
             "timestamp": datetime.utcnow().isoformat()
         })
 
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid template JSON: {str(e)}")
     except Exception as e:
         logger.error(f"Batch extraction failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
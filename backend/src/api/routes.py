@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 import structlog
 import os
 import json
 import uuid
+import asyncio
 from datetime import datetime, date, time, timezone
 from src.api.models import (
     QueryRequest, QueryResponse,
@@ -25,9 +27,19 @@ from src.api.models import (
     ResearchReportResponse, ResearchInsightResponse, ResearchRecommendationResponse
 )
 from src.core.bigquery_sql_generator import BigQuerySQLGenerator as SQLGenerator
+from src.core.sql_generator import SQLGenerator as VectorSQLGenerator  # Owns the Weaviate schema index
 from src.db.database_client import DatabaseClient as PostgreSQLClient  # PostgreSQL database client
 from src.db.bigquery import BigQueryClient  # Actual BigQuery client for health checks
 from src.db.weaviate_client import WeaviateClient
+from src.config import settings
+from src.db.validation_cache import get_validation_cache
+from src.db.schema_object_cache import get_schema_object_cache
+from src.db.result_streaming import (
+    get_result_handle_registry, streaming_body, ResultHandleExpired, InvalidResultCursor
+)
+from src.core.prompt_cache import get_prompt_prefix_cache
+from src.core.single_flight import get_single_flight
+from src.core.llm_governor import LLMPriority, get_llm_governor, llm_priority
 from src.core.optimization import (
     MaterializedViewManager, MaterializedViewConfig, MaterializedViewOptimizer,
     create_copa_standard_mvs, get_copa_mv_recommendations, estimate_copa_mv_costs,
@@ -47,6 +59,7 @@ from src.models.conversation import (
 )
 from src.core.document_intelligence.document_service import DocumentService
 from src.api import analytics_routes, query_logs_routes, mantrax_routes, executive_routes
+from src.api.bigquery_routes import open_question_results, result_metadata
 from src.core.research_planner import ResearchPlanner, ResearchDepth
 from src.core.research_executor import ResearchExecutor, ExecutionStatus
 from src.core.research_synthesizer import ResearchSynthesizer
@@ -74,6 +87,7 @@ def convert_dates_to_datetime(obj):
 
 # Initialize once and reuse
 sql_generator = None
+schema_indexer = None
 bq_client = None
 weaviate_client = None
 mv_manager = None
@@ -97,6 +111,14 @@ def get_sql_generator() -> SQLGenerator:
     return sql_generator
 
 
+def get_schema_indexer() -> VectorSQLGenerator:
+    """The generator that indexes table schemas in Weaviate (created on first use)."""
+    global schema_indexer
+    if schema_indexer is None:
+        schema_indexer = VectorSQLGenerator()
+    return schema_indexer
+
+
 def get_bq_client() -> BigQueryClient:
     global bq_client
     if bq_client is None:
@@ -283,10 +305,11 @@ async def process_query(
         
         if execute:
             # Generate and execute
-            result = generator.generate_and_execute(request.question)
+            result = await asyncio.to_thread(generator.generate_and_execute, request.question)
         else:
             # Just generate SQL
-            result = generator.generate_sql(
+            result = await asyncio.to_thread(
+                generator.generate_sql,
                 request.question,
                 use_vector_search=use_vector_search,
                 max_tables=max_tables
@@ -373,7 +396,8 @@ async def generate_sql(
 ):
     """Generate SQL from natural language without executing."""
     try:
-        result = generator.generate_sql(
+        result = await asyncio.to_thread(
+            generator.generate_sql,
             request.question,
             use_vector_search=request.use_vector_search,
             max_tables=request.max_tables
@@ -385,6 +409,73 @@ async def generate_sql(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/query/stream")
+def stream_query(
+    request: QueryRequest,
+    format: str = Query("ndjson", pattern="^(ndjson|json)$", description="ndjson (one row per line) or json"),
+    page_size: int = Query(settings.result_page_size, ge=1, le=100000),
+    generator: SQLGenerator = Depends(get_sql_generator)
+):
+    """Process a natural language query and stream its rows as they arrive instead of one JSON document."""
+    try:
+        result = open_question_results(generator, request.question, request.options)
+        handle = result["execution"]["handle"]
+        body, media_type = streaming_body(handle, format, page_size, generator._format_results,
+                                          header=result_metadata(result))
+        return StreamingResponse(body, media_type=media_type, headers={"X-Result-Handle": handle.handle_id})
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Streaming query failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/query/page")
+def page_query(
+    request: QueryRequest,
+    page_size: int = Query(settings.result_page_size, ge=1, le=100000),
+    generator: SQLGenerator = Depends(get_sql_generator)
+):
+    """Process a natural language query and return the first page plus a handle for the rest."""
+    try:
+        result = open_question_results(generator, request.question, request.options)
+        handle = result["execution"]["handle"]
+        return {**result_metadata(result), **handle.page(page_size, generator._format_results)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Paged query failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/results/{handle_id}")
+def get_result_page(
+    handle_id: str,
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page; resumes expired BigQuery handles"),
+    page_size: int = Query(settings.result_page_size, ge=1, le=100000),
+    generator: SQLGenerator = Depends(get_sql_generator)
+):
+    """Next page of an open result handle."""
+    try:
+        handle = get_result_handle_registry().get(handle_id, cursor, bigquery_client=generator.bq_client.client)
+        return handle.page(page_size, generator._format_results)
+    except InvalidResultCursor as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ResultHandleExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to read result page: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/results/{handle_id}")
+def close_result_handle(handle_id: str):
+    """Close a result handle and release its cursor."""
+    if not get_result_handle_registry().close(handle_id):
+        raise HTTPException(status_code=404, detail=f"Result handle {handle_id} not found")
+    return {"success": True, "handle_id": handle_id}
+
+
 @router.post("/execute", response_model=ExecutionResponse)
 async def execute_sql(
     request: SQLExecuteRequest,
@@ -460,18 +551,23 @@ async def get_table_schema(
 
 @router.post("/schemas/reindex")
 async def reindex_schemas(
-    generator: SQLGenerator = Depends(get_sql_generator)
+    force: bool = False,
+    indexer: VectorSQLGenerator = Depends(get_schema_indexer)
 ):
-    """Reindex all table schemas in the vector database."""
+    """Reindex all table schemas in the vector database.
+
+    Unchanged tables are skipped and tables that no longer exist are removed;
+    force=true re-embeds every table.
+    """
     try:
-        # Clear existing schemas
-        generator.vector_client.delete_all_schemas()
-        
-        # Reindex
-        generator._index_schemas()
-        
-        return {"message": "Schemas reindexed successfully"}
-        
+        report = await asyncio.to_thread(indexer._index_schemas, force=force, prune=True)
+        if report is None:
+            raise HTTPException(status_code=500, detail="Schema indexing failed")
+
+        return {"message": "Schemas reindexed successfully", **report.to_dict()}
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to reindex schemas: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -479,6 +575,14 @@ async def reindex_schemas(
 
 # Cache Management Endpoints
 
+COMPONENT_CACHES = {
+    "schema_objects": get_schema_object_cache,
+    "validation": get_validation_cache,
+    "result_handles": get_result_handle_registry,
+    "prompt_prefix": get_prompt_prefix_cache,
+    "single_flight": get_single_flight,
+}
+
 @router.get("/cache/stats")
 async def get_cache_stats(
     generator: SQLGenerator = Depends(get_sql_generator)
@@ -489,12 +593,25 @@ async def get_cache_stats(
     
     try:
         stats = generator.cache_manager.get_stats()
+        # Process-wide caches; one that cannot report must not fail the whole endpoint
+        for name, get_component in COMPONENT_CACHES.items():
+            try:
+                stats[name] = get_component().get_stats()
+            except Exception as e:
+                logger.warning(f"Failed to get {name} stats: {e}")
+                stats[name] = {"error": str(e)}
         return stats
     except Exception as e:
         logger.error(f"Failed to get cache stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/llm/stats")
+async def get_llm_stats():
+    """Get LLM dispatch governor statistics: queue wait times per priority and per-provider budgets."""
+    return get_llm_governor().get_stats()
+
+
 @router.get("/cache/popular-queries")
 async def get_popular_queries(
     limit: int = 10,
@@ -647,8 +764,9 @@ async def warm_cache(
         
         for query in queries[:50]:  # Limit to 50 queries to prevent abuse
             try:
-                # Generate SQL for each query (will be cached)
-                result = generator.generate_sql(query, force_refresh=True)
+                # Generate SQL for each query (will be cached); off the event loop so it queues behind interactive calls
+                with llm_priority(LLMPriority.BACKGROUND):
+                    result = await asyncio.to_thread(generator.generate_sql, query, force_refresh=True)
                 if not result.get("error"):
                     warmed += 1
                 else:
@@ -1051,7 +1169,8 @@ async def correct_sql_error(
     """Attempt to correct SQL query based on error message."""
     try:
         # Use LLM to correct the error
-        correction_result = generator.llm_client.correct_sql_error(
+        correction_result = await asyncio.to_thread(
+            generator.llm_client.correct_sql_error,
             request.sql,
             request.error_message,
             request.table_schemas
@@ -1131,7 +1250,8 @@ Format the response in a business-friendly way, focusing on actionable insights
 """
 
         # Make LLM call for analysis
-        response = generator.llm_client.client.messages.create(
+        response = await asyncio.to_thread(
+            generator.llm_client.client.messages.create,
             model=generator.llm_client.model,
             max_tokens=2000,
             temperature=0.3,
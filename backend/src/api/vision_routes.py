@@ -132,12 +132,13 @@ async def call_openai_vision(image_base64: str, prompt: str) -> Dict[str, Any]:
     """Call OpenAI GPT-4 Vision API for auto-labeling"""
     import os
     from openai import AsyncOpenAI
+    from src.core.llm_governor import governed_client
     
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise HTTPException(status_code=500, detail="OpenAI API key not configured")
     
-    client = AsyncOpenAI(api_key=api_key)
+    client = governed_client(AsyncOpenAI(api_key=api_key), "openai")
     
     try:
         response = await client.chat.completions.create(
@@ -11,17 +11,35 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from src.data_operators import DataOperator
-from difflib import get_close_matches
-import re
-from openpyxl import load_workbook
+from src.facility_matcher import FacilityMatchIndex, normalize_facility_name
+import time
+from src.excel_stream_writer import StreamingExcelWriter, DATETIME_FORMAT
+from src.source_loader import SourceLoader, SourceSpec, file_sha256
+import hashlib
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+from openpyxl.utils import column_index_from_string
 import os
 
 
 class FinalHybridCGSGenerator:
-    def __init__(self, base_path='.'):
+    # Column kind → number format; numeric kinds are right-aligned
+    OUTPUT_NUMBER_FORMATS = {
+        'text': None,
+        'datetime': DATETIME_FORMAT,
+        'integer': '#,##0',
+        'currency': '$#,##0.00',
+        'percent': '0.00%'
+    }
+    NUMERIC_KINDS = ('integer', 'currency', 'percent')
+
+    def __init__(self, base_path='.', excel_chunk_size=5000,
+                 source_cache_dir='cache/cgs_sources', load_workers=None):
         self.base_path = base_path
+        self.excel_chunk_size = excel_chunk_size
+        self.source_cache_dir = source_cache_dir
+        self.load_workers = load_workers
+        self.load_stats = {}
+        self.phase_timings = {}
         self.operator = DataOperator()
         self.invoice_df = None
         self.cost_df = None
@@ -32,16 +50,13 @@ class FinalHybridCGSGenerator:
         self.distributor_mapping_msr = None
         self.historical_costs = None
         self.facility_name_map = {}
+        self.facility_index = None
+        self._facility_index_key = None
+        self.match_stats = {}
 
     def normalize_name(self, name):
         """Normalize facility/hospital names for matching"""
-        if pd.isna(name):
-            return ""
-        name = str(name).strip()
-        name = re.sub(r'\s*-\s*', ' ', name)
-        name = re.sub(r'\s+', ' ', name)
-        name = name.replace("'s", "s")
-        return name.strip().lower()
+        return normalize_facility_name(name)
 
     def fuzzy_match_facility(self, facility_name, reference_facilities, cutoff=0.75):
         """Find best matching facility name"""
@@ -51,21 +66,40 @@ class FinalHybridCGSGenerator:
         if facility_name in self.facility_name_map:
             return self.facility_name_map[facility_name]
 
-        normalized_facility = self.normalize_name(facility_name)
-        normalized_refs = {self.normalize_name(f): f for f in reference_facilities}
-
-        if normalized_facility in normalized_refs:
-            match = normalized_refs[normalized_facility]
-            self.facility_name_map[facility_name] = match
-            return match
-
-        matches = get_close_matches(normalized_facility, normalized_refs.keys(), n=1, cutoff=cutoff)
-        if matches:
-            match = normalized_refs[matches[0]]
+        match = self.get_facility_index(reference_facilities).match(facility_name, cutoff=cutoff)
+        if match is not None:
             self.facility_name_map[facility_name] = match
-            return match
-
-        return None
+        return match
+
+    def get_facility_index(self, reference_facilities):
+        """Return the facility match index for a reference set, building it once per run"""
+        cache_key = frozenset(reference_facilities)
+        if self.facility_index is None or self._facility_index_key != cache_key:
+            self.facility_index = FacilityMatchIndex(reference_facilities)
+            self._facility_index_key = cache_key
+        return self.facility_index
+
+    def match_facilities_batch(self, facility_names, cutoff=0.75):
+        """Resolve a column of facility names against the MSR index in one call"""
+        index = self.facility_index
+        pending = facility_names[~facility_names.isin(list(self.facility_name_map.keys()))]
+        matches = index.match_batch(pending, cutoff=cutoff)
+        for name, match in zip(pending, matches):
+            if match is not None and not pd.isna(name):
+                self.facility_name_map[name] = match
+        return facility_names.map(lambda x: self.facility_name_map.get(x) if not pd.isna(x) else None)
+
+    def record_pass_stats(self, pass_name, attempted, matched):
+        """Record rows attempted/matched for a distributor priority pass and return the hit rate"""
+        attempted = int(attempted)
+        matched = int(matched)
+        hit_rate = matched / attempted * 100 if attempted else 0.0
+        self.match_stats[pass_name] = {
+            'attempted': attempted,
+            'matched': matched,
+            'hit_rate': round(hit_rate, 2)
+        }
+        return hit_rate
 
     def extract_distributor_from_facility_name(self, facility_name):
         """Extract distributor name from facility name if embedded"""
@@ -80,31 +114,53 @@ class FinalHybridCGSGenerator:
                     return potential_dist
         return None
 
+    def source_specs(self):
+        """Source files read by the generator"""
+        return [
+            SourceSpec('invoice', f'{self.base_path}/excel-input/#1 - Invoice Data.xlsx'),
+            SourceSpec('cost', f'{self.base_path}/excel-input/#2 - Manufacturing Std Cost.xlsx'),
+            SourceSpec('item', f'{self.base_path}/excel-input/#3 - Item Data File.xlsx'),
+            SourceSpec(
+                'msr',
+                f'{self.base_path}/extracted_data/4_6_region_2025_msr_tab_2025_data_2025_data.csv',
+                reader='csv'
+            ),
+            SourceSpec(
+                'original_cgs',
+                f"{self.base_path}/excel-input/CGS Review - ASP - System, Units, Facility - '25 8-20-25 9-5.xlsx",
+                read_kwargs={'sheet_name': '2025 - Data', 'header': 2}
+            ),
+        ]
+
     def load_all_sources(self):
         """Load all source files"""
         print("\n" + "="*80)
         print("STEP 1: Loading Source Files")
         print("="*80)
 
-        self.invoice_df = pd.read_excel(f'{self.base_path}/excel-input/#1 - Invoice Data.xlsx')
+        cache_dir = f'{self.base_path}/{self.source_cache_dir}' if self.source_cache_dir else None
+        loader = SourceLoader(cache_dir=cache_dir, max_workers=self.load_workers)
+        frames = loader.load(self.source_specs())
+        self.load_stats = loader.stats
+
+        self.invoice_df = frames['invoice']
         print(f"  ✓ Invoice Data: {len(self.invoice_df):,} rows")
 
-        self.cost_df = pd.read_excel(f'{self.base_path}/excel-input/#2 - Manufacturing Std Cost.xlsx')
+        self.cost_df = frames['cost']
         print(f"  ✓ Manufacturing Std Cost: {len(self.cost_df):,} rows")
 
-        self.item_df = pd.read_excel(f'{self.base_path}/excel-input/#3 - Item Data File.xlsx')
+        self.item_df = frames['item']
         print(f"  ✓ Item Data: {len(self.item_df):,} rows")
 
-        self.msr_df = pd.read_csv(f'{self.base_path}/extracted_data/4_6_region_2025_msr_tab_2025_data_2025_data.csv')
+        self.msr_df = frames['msr']
         print(f"  ✓ MSR 2025 Data: {len(self.msr_df):,} rows")
 
-        self.original_cgs = pd.read_excel(
-            f"{self.base_path}/excel-input/CGS Review - ASP - System, Units, Facility - '25 8-20-25 9-5.xlsx",
-            sheet_name='2025 - Data',
-            header=2
-        )
+        self.original_cgs = frames['original_cgs']
         print(f"  ✓ Original CGS (for mapping & costs): {len(self.original_cgs):,} rows")
 
+        print(f"  ✓ Loaded in {self.load_stats['total_seconds']:.2f}s "
+              f"({self.load_stats['cache_hits']} cached, {self.load_stats['cache_misses']} parsed)")
+
     def extract_distributor_mapping_from_cgs(self):
         """Extract distributor mapping from Original CGS"""
         print("\n" + "="*80)
@@ -168,6 +224,13 @@ class FinalHybridCGSGenerator:
 
         print(f"  ✓ Created MSR fallback for {len(self.distributor_mapping_msr):,} hospitals")
 
+        # Build the fuzzy facility index once per run
+        self.facility_index = FacilityMatchIndex(self.distributor_mapping_msr['Hospital'])
+        self._facility_index_key = frozenset(self.distributor_mapping_msr['Hospital'])
+        print(f"  ✓ Facility match index: {len(self.facility_index):,} names, "
+              f"{len(self.facility_index.blocks):,} blocking keys "
+              f"({self.facility_index.build_seconds:.3f}s)")
+
     def apply_filters(self, df):
         """Apply business filters"""
         print("\n" + "="*80)
@@ -209,6 +272,9 @@ class FinalHybridCGSGenerator:
         print("="*80)
 
         df['Inv #_str'] = df['Inv #'].astype(str)
+        total_rows = len(df)
+        matched_fac = 0
+        self.match_stats = {}
 
         # Priority 1: Invoice# + Facility from CGS
         df = df.merge(
@@ -222,11 +288,13 @@ class FinalHybridCGSGenerator:
         )
 
         matched_inv_fac = df['Distributor'].notna().sum()
+        self.record_pass_stats('invoice_facility', total_rows, matched_inv_fac)
         print(f"  Priority 1 (Invoice+Facility): {matched_inv_fac:,} rows ({matched_inv_fac/len(df)*100:.1f}%)")
 
         # Priority 2: Facility-only from CGS
         unmatched_mask = df['Distributor'].isna()
         if unmatched_mask.sum() > 0:
+            attempted = unmatched_mask.sum()
             df_unmatched = df[unmatched_mask].drop(columns=['Distributor', 'Region', 'Type'], errors='ignore')
             df_matched = df[~unmatched_mask]
 
@@ -240,16 +308,22 @@ class FinalHybridCGSGenerator:
             df = pd.concat([df_matched, df_unmatched], ignore_index=True)
 
             matched_fac = df['Distributor'].notna().sum() - matched_inv_fac
-            print(f"  Priority 2 (Facility only): {matched_fac:,} rows")
+            hit_rate = self.record_pass_stats('facility_only', attempted, matched_fac)
+            print(f"  Priority 2 (Facility only): {matched_fac:,} rows (hit rate {hit_rate:.1f}%)")
 
         # Priority 3: MSR fuzzy match
         unmatched_mask = df['Distributor'].isna()
         if unmatched_mask.sum() > 0:
-            reference_hospitals = set(self.distributor_mapping_msr['Hospital'].unique())
-
-            df.loc[unmatched_mask, 'Hospital_Matched'] = df.loc[unmatched_mask, 'Facility'].apply(
-                lambda x: self.fuzzy_match_facility(x, reference_hospitals)
+            attempted = unmatched_mask.sum()
+            if self.facility_index is None:
+                self.get_facility_index(self.distributor_mapping_msr['Hospital'].unique())
+
+            # Resolve every unmatched row in one batch against the prebuilt index
+            match_start = time.perf_counter()
+            df.loc[unmatched_mask, 'Hospital_Matched'] = self.match_facilities_batch(
+                df.loc[unmatched_mask, 'Facility']
             )
+            match_seconds = time.perf_counter() - match_start
 
             df_unmatched = df[unmatched_mask].drop(columns=['Distributor', 'Region', 'Type'], errors='ignore')
             df_matched = df[~unmatched_mask]
@@ -271,20 +345,29 @@ class FinalHybridCGSGenerator:
             df = pd.concat([df_matched, df_unmatched], ignore_index=True)
 
             matched_msr = df['Distributor'].notna().sum() - matched_inv_fac - matched_fac
-            print(f"  Priority 3 (MSR fuzzy): {matched_msr:,} rows")
+            hit_rate = self.record_pass_stats('msr_fuzzy', attempted, matched_msr)
+            rows_per_second = attempted / match_seconds if match_seconds > 0 else 0
+            self.match_stats['msr_fuzzy']['matches_per_second'] = round(rows_per_second, 1)
+            self.match_stats['msr_fuzzy']['index'] = self.facility_index.summary()
+            print(f"  Priority 3 (MSR fuzzy): {matched_msr:,} rows (hit rate {hit_rate:.1f}%)")
+            print(f"    Fuzzy matching: {rows_per_second:,.0f} rows/s, "
+                  f"{self.facility_index.stats['lookups']:,} distinct names, "
+                  f"{self.facility_index.stats['candidates_scored']:,} candidates scored")
 
         # Priority 4: Extract from name
         unmatched_mask = df['Distributor'].isna()
         if unmatched_mask.sum() > 0:
+            attempted = unmatched_mask.sum()
             df.loc[unmatched_mask, 'Distributor_Extracted'] = df.loc[unmatched_mask, 'Facility'].apply(
                 self.extract_distributor_from_facility_name
             )
 
             extracted_count = df['Distributor_Extracted'].notna().sum()
+            hit_rate = self.record_pass_stats('extracted', attempted, extracted_count)
             if extracted_count > 0:
                 df.loc[df['Distributor'].isna() & df['Distributor_Extracted'].notna(), 'Distributor'] = \
                     df.loc[df['Distributor'].isna() & df['Distributor_Extracted'].notna(), 'Distributor_Extracted']
-                print(f"  Priority 4 (Extracted): {extracted_count:,} rows")
+                print(f"  Priority 4 (Extracted): {extracted_count:,} rows (hit rate {hit_rate:.1f}%)")
 
         df['Distributor'] = df['Distributor'].fillna('TBD')
         df['Region'] = df['Region'].fillna('TBD')
@@ -470,148 +553,67 @@ class FinalHybridCGSGenerator:
     def save_with_formatting(self, data_df, summary_df, output_file):
         """Save Excel file with full formatting, grouping, and colors"""
 
-        # First, save both sheets using pandas
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            # Write Summary sheet first
-            summary_df.to_excel(writer, sheet_name='2025 - Summary', index=False, startrow=3)
-            # Write Data sheet
-            data_df.to_excel(writer, sheet_name='2025 - Data', index=False)
+        # Stream both sheets through a write-only workbook; formats are
+        # registered once as named styles instead of being applied per cell
+        writer = StreamingExcelWriter(output_file, chunk_size=self.excel_chunk_size)
+        self.register_output_styles(writer)
 
-        # Now load the workbook to add formatting
-        wb = load_workbook(output_file)
+        # Write Summary sheet first
+        self.write_summary_sheet(writer, summary_df)
 
-        # Format Summary Sheet
-        self.format_summary_sheet(wb, summary_df)
+        # Write Data sheet
+        self.write_data_sheet(writer, data_df)
 
-        # Format Data Sheet
-        self.format_data_sheet(wb, data_df)
-
-        # Save the formatted workbook
-        wb.save(output_file)
-        wb.close()
+        writer.save()
 
         print(f"  ✓ Saved with formatting: {output_file}")
 
-    def format_summary_sheet(self, wb, summary_df):
-        """Apply formatting to Summary sheet with grouping, colors, and styles"""
-        ws = wb['2025 - Summary']
-
-        # Define styles
-        header_font = Font(name='Calibri', size=11, bold=True, color='FFFFFF')
-        header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-        header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-
-        # Facility grouping style (Level 1)
-        facility_font = Font(name='Calibri', size=11, bold=True)
-        facility_fill = PatternFill(start_color='D9E1F2', end_color='D9E1F2', fill_type='solid')
-
-        # Distributor grouping style (Level 2)
-        distributor_font = Font(name='Calibri', size=11, bold=True)
-        distributor_fill = PatternFill(start_color='E7E6E6', end_color='E7E6E6', fill_type='solid')
-
-        # System grouping style (Level 3)
-        system_font = Font(name='Calibri', size=10, bold=True)
-        system_fill = PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid')
-
-        # Data row style
-        data_alignment = Alignment(horizontal='left', vertical='center')
-        number_alignment = Alignment(horizontal='right', vertical='center')
-
-        # Border
+    def register_output_styles(self, writer):
+        """Register every cell format used by the Summary and Data sheets"""
         thin_border = Border(
             left=Side(style='thin', color='000000'),
             right=Side(style='thin', color='000000'),
             top=Side(style='thin', color='000000'),
             bottom=Side(style='thin', color='000000')
         )
+        number_alignment = Alignment(horizontal='right', vertical='center')
 
-        # Add title rows (rows 1-3)
-        ws['A1'] = 'ASP Worksheet - 2025'
-        ws['A1'].font = Font(name='Calibri', size=14, bold=True)
-        ws.merge_cells('A1:K1')
-
-        ws['A2'] = f'Generated: {datetime.now().strftime("%m/%d/%Y %H:%M")}'
-        ws['A2'].font = Font(name='Calibri', size=10, italic=True)
-        ws.merge_cells('A2:K2')
-
-        # Format header row (row 4)
-        header_row = 4
-        for col_num, column_title in enumerate(summary_df.columns, 1):
-            cell = ws.cell(row=header_row, column=col_num)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
-
-        # Track current grouping for formatting
-        current_facility = None
-        current_distributor = None
-        current_system = None
-
-        # Grand Total row style
-        grand_total_font = Font(name='Calibri', size=11, bold=True, color='FFFFFF')
-        grand_total_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-
-        # Format data rows (starting from row 5)
-        start_row = 5
-        for idx, row in summary_df.iterrows():
-            row_num = start_row + idx
-
-            # Check if facility changed (Level 1 grouping)
-            if row['Facility'] != current_facility:
-                current_facility = row['Facility']
-                current_distributor = None
-                current_system = None
-
-                # Apply facility grouping style
-                for col_num in range(1, 12):
-                    cell = ws.cell(row=row_num, column=col_num)
-                    cell.font = facility_font
-                    cell.fill = facility_fill
-                    cell.border = thin_border
-
-            # Check if distributor changed (Level 2 grouping)
-            elif row['Distributor'] != current_distributor:
-                current_distributor = row['Distributor']
-                current_system = None
-
-                # Apply distributor grouping style
-                for col_num in range(1, 12):
-                    cell = ws.cell(row=row_num, column=col_num)
-                    cell.font = distributor_font
-                    cell.fill = distributor_fill
-                    cell.border = thin_border
+        writer.register_style(
+            'cgs_header',
+            font=Font(name='Calibri', size=11, bold=True, color='FFFFFF'),
+            fill=PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid'),
+            alignment=Alignment(horizontal='center', vertical='center', wrap_text=True),
+            border=thin_border
+        )
+        writer.register_style('cgs_title', font=Font(name='Calibri', size=14, bold=True))
+        writer.register_style('cgs_subtitle', font=Font(name='Calibri', size=10, italic=True))
+
+        # Row level → (font, fill); 'total' is the Grand Total row
+        row_levels = {
+            'facility': (Font(name='Calibri', size=11, bold=True),
+                         PatternFill(start_color='D9E1F2', end_color='D9E1F2', fill_type='solid')),
+            'distributor': (Font(name='Calibri', size=11, bold=True),
+                            PatternFill(start_color='E7E6E6', end_color='E7E6E6', fill_type='solid')),
+            'system': (Font(name='Calibri', size=10, bold=True),
+                       PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid')),
+            'data': (None, None),
+            'total': (Font(name='Calibri', size=11, bold=True, color='FFFFFF'),
+                      PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid'))
+        }
 
-            # Check if system changed (Level 3 grouping)
-            elif row['System'] != current_system:
-                current_system = row['System']
-
-                # Apply system grouping style
-                for col_num in range(1, 12):
-                    cell = ws.cell(row=row_num, column=col_num)
-                    cell.font = system_font
-                    cell.fill = system_fill
-                    cell.border = thin_border
-            else:
-                # Regular data row
-                for col_num in range(1, 12):
-                    cell = ws.cell(row=row_num, column=col_num)
-                    cell.border = thin_border
-
-            # Set number formatting
-            # Columns: Facility(1), Distributor(2), System(3), ItemName(4), ItemCode(5),
-            #          Quantity(6), Sales(7), Cost(8), GM(9), GM%(10)
-            ws.cell(row=row_num, column=6).number_format = '#,##0'  # Quantity
-            ws.cell(row=row_num, column=7).number_format = '$#,##0.00'  # Sales
-            ws.cell(row=row_num, column=8).number_format = '$#,##0.00'  # Cost
-            ws.cell(row=row_num, column=9).number_format = '$#,##0.00'  # GM
-            ws.cell(row=row_num, column=10).number_format = '0.00%'  # GM%
-
-            # Align numbers to right
-            for col_num in [6, 7, 8, 9, 10]:
-                ws.cell(row=row_num, column=col_num).alignment = number_alignment
-
-        # Auto-adjust column widths
+        for level, (font, fill) in row_levels.items():
+            for kind, number_format in self.OUTPUT_NUMBER_FORMATS.items():
+                writer.register_style(
+                    f'cgs_{level}_{kind}',
+                    font=font,
+                    fill=fill,
+                    border=thin_border,
+                    alignment=number_alignment if kind in self.NUMERIC_KINDS else None,
+                    number_format=number_format
+                )
+
+    def write_summary_sheet(self, writer, summary_df):
+        """Write Summary sheet with grouping, colors, and styles"""
         column_widths = {
             'A': 35,  # Facility
             'B': 25,  # Distributor
@@ -625,153 +627,92 @@ class FinalHybridCGSGenerator:
             'J': 12   # GM%
         }
 
-        for col_letter, width in column_widths.items():
-            ws.column_dimensions[col_letter].width = width
-
         # Freeze panes (freeze header row)
-        ws.freeze_panes = 'A5'
+        ws = writer.create_sheet('2025 - Summary', column_widths=column_widths, freeze_panes='A5')
+
+        # Title rows (rows 1-3)
+        writer.append_row(ws, ['ASP Worksheet - 2025'], ['cgs_title'])
+        writer.append_row(ws, [f'Generated: {datetime.now().strftime("%m/%d/%Y %H:%M")}'], ['cgs_subtitle'])
+        writer.append_blank_rows(ws)
+        writer.merge_cells(ws, 'A1:K1')
+        writer.merge_cells(ws, 'A2:K2')
+
+        # Columns: Facility(1), Distributor(2), System(3), ItemName(4), ItemCode(5),
+        #          Quantity(6), Sales(7), Cost(8), GM(9), GM%(10); column 11 is
+        #          styled but empty so the grouping band spans A:K
+        column_kinds = ['text'] * 5 + ['integer', 'currency', 'currency', 'currency', 'percent', 'text']
+        level_styles = {
+            level: [f'cgs_{level}_{kind}' for kind in column_kinds]
+            for level in ('facility', 'distributor', 'system', 'data')
+        }
+
+        # Header row (row 4) + data rows (starting from row 5)
+        writer.write_dataframe(
+            ws,
+            summary_df,
+            column_styles=level_styles['data'],
+            header_style='cgs_header',
+            row_styles=(level_styles[level] for level in self.summary_row_levels(summary_df))
+        )
 
         # Add auto-filter to the data range
         last_data_row = len(summary_df) + 4  # +4 = 3 title rows + 1 header row + data rows
-        ws.auto_filter.ref = f'A4:{get_column_letter(len(summary_df.columns))}{last_data_row}'
-
-        # Add Grand Total row AFTER the filter range with formulas
-        grand_total_row = last_data_row + 2  # +2 to leave a blank row
-
-        # Add Grand Total label
-        ws.cell(row=grand_total_row, column=1).value = 'Grand Total'
-        ws.cell(row=grand_total_row, column=1).font = grand_total_font
-        ws.cell(row=grand_total_row, column=1).fill = grand_total_fill
-        ws.cell(row=grand_total_row, column=1).border = thin_border
-
-        # Empty cells for Distributor, System, Item Name, Item Code
-        for col_num in range(2, 6):
-            ws.cell(row=grand_total_row, column=col_num).value = ''
-            ws.cell(row=grand_total_row, column=col_num).font = grand_total_font
-            ws.cell(row=grand_total_row, column=col_num).fill = grand_total_fill
-            ws.cell(row=grand_total_row, column=col_num).border = thin_border
-
-        # Add SUBTOTAL formulas (will show filtered totals)
-        # Column F (6): Sum of Quantity
-        ws.cell(row=grand_total_row, column=6).value = f'=SUBTOTAL(9,F5:F{last_data_row})'
-        ws.cell(row=grand_total_row, column=6).font = grand_total_font
-        ws.cell(row=grand_total_row, column=6).fill = grand_total_fill
-        ws.cell(row=grand_total_row, column=6).border = thin_border
-        ws.cell(row=grand_total_row, column=6).number_format = '#,##0'
-        ws.cell(row=grand_total_row, column=6).alignment = number_alignment
-
-        # Column G (7): Sum of Total Sales
-        ws.cell(row=grand_total_row, column=7).value = f'=SUBTOTAL(9,G5:G{last_data_row})'
-        ws.cell(row=grand_total_row, column=7).font = grand_total_font
-        ws.cell(row=grand_total_row, column=7).fill = grand_total_fill
-        ws.cell(row=grand_total_row, column=7).border = thin_border
-        ws.cell(row=grand_total_row, column=7).number_format = '$#,##0.00'
-        ws.cell(row=grand_total_row, column=7).alignment = number_alignment
-
-        # Column H (8): Sum of Total Std Cost
-        ws.cell(row=grand_total_row, column=8).value = f'=SUBTOTAL(9,H5:H{last_data_row})'
-        ws.cell(row=grand_total_row, column=8).font = grand_total_font
-        ws.cell(row=grand_total_row, column=8).fill = grand_total_fill
-        ws.cell(row=grand_total_row, column=8).border = thin_border
-        ws.cell(row=grand_total_row, column=8).number_format = '$#,##0.00'
-        ws.cell(row=grand_total_row, column=8).alignment = number_alignment
-
-        # Column I (9): Sum of Total GM
-        ws.cell(row=grand_total_row, column=9).value = f'=SUBTOTAL(9,I5:I{last_data_row})'
-        ws.cell(row=grand_total_row, column=9).font = grand_total_font
-        ws.cell(row=grand_total_row, column=9).fill = grand_total_fill
-        ws.cell(row=grand_total_row, column=9).border = thin_border
-        ws.cell(row=grand_total_row, column=9).number_format = '$#,##0.00'
-        ws.cell(row=grand_total_row, column=9).alignment = number_alignment
-
-        # Column J (10): GM % (calculated from Grand Total GM / Grand Total Sales)
-        ws.cell(row=grand_total_row, column=10).value = f'=I{grand_total_row}/G{grand_total_row}'
-        ws.cell(row=grand_total_row, column=10).font = grand_total_font
-        ws.cell(row=grand_total_row, column=10).fill = grand_total_fill
-        ws.cell(row=grand_total_row, column=10).border = thin_border
-        ws.cell(row=grand_total_row, column=10).number_format = '0.00%'
-        ws.cell(row=grand_total_row, column=10).alignment = number_alignment
+        writer.set_auto_filter(ws, writer.data_range(4, last_data_row, len(summary_df.columns)))
+
+        # Add Grand Total row AFTER the filter range with SUBTOTAL formulas
+        # (will show filtered totals), leaving a blank row
+        grand_total_row = last_data_row + 2
+        writer.append_blank_rows(ws)
+        writer.append_row(
+            ws,
+            [
+                'Grand Total', '', '', '', '',
+                f'=SUBTOTAL(9,F5:F{last_data_row})',
+                f'=SUBTOTAL(9,G5:G{last_data_row})',
+                f'=SUBTOTAL(9,H5:H{last_data_row})',
+                f'=SUBTOTAL(9,I5:I{last_data_row})',
+                # GM % calculated from Grand Total GM / Grand Total Sales
+                f'=I{grand_total_row}/G{grand_total_row}'
+            ],
+            [f'cgs_total_{kind}' for kind in column_kinds[:10]]
+        )
 
         print(f"  ✓ Summary sheet formatted with grouping and colors")
         print(f"  ✓ Auto-filter added to range: {ws.auto_filter.ref}")
         print(f"  ✓ Grand Total row at {grand_total_row} (with SUBTOTAL formulas - always visible)")
 
-    def format_data_sheet(self, wb, data_df):
-        """Apply formatting to Data sheet"""
-        ws = wb['2025 - Data']
+    def summary_row_levels(self, summary_df):
+        """Yield the grouping level (facility/distributor/system/data) of each summary row"""
+        current_facility = None
+        current_distributor = None
+        current_system = None
 
-        # Define styles
-        header_font = Font(name='Calibri', size=11, bold=True, color='FFFFFF')
-        header_fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-        header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+        for facility, distributor, system in zip(
+            summary_df['Facility'], summary_df['Distributor'], summary_df['System']
+        ):
+            # Check if facility changed (Level 1 grouping)
+            if facility != current_facility:
+                current_facility = facility
+                current_distributor = None
+                current_system = None
+                yield 'facility'
 
-        thin_border = Border(
-            left=Side(style='thin', color='000000'),
-            right=Side(style='thin', color='000000'),
-            top=Side(style='thin', color='000000'),
-            bottom=Side(style='thin', color='000000')
-        )
+            # Check if distributor changed (Level 2 grouping)
+            elif distributor != current_distributor:
+                current_distributor = distributor
+                current_system = None
+                yield 'distributor'
 
-        # Format header row
-        for col_num in range(1, len(data_df.columns) + 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
+            # Check if system changed (Level 3 grouping)
+            elif system != current_system:
+                current_system = system
+                yield 'system'
 
-        # Format data rows
-        number_alignment = Alignment(horizontal='right', vertical='center')
+            else:
+                yield 'data'
 
-        for row_num in range(2, len(data_df) + 2):
-            # Apply borders to all cells
-            for col_num in range(1, len(data_df.columns) + 1):
-                ws.cell(row=row_num, column=col_num).border = thin_border
-
-            # Number formatting based on column names
-            # Quantity (column 11)
-            if 'Quantity' in data_df.columns:
-                qty_col = data_df.columns.get_loc('Quantity') + 1
-                ws.cell(row=row_num, column=qty_col).number_format = '#,##0'
-                ws.cell(row=row_num, column=qty_col).alignment = number_alignment
-
-            # Price Each (column 12)
-            if 'Price Each' in data_df.columns:
-                price_col = data_df.columns.get_loc('Price Each') + 1
-                ws.cell(row=row_num, column=price_col).number_format = '$#,##0.00'
-                ws.cell(row=row_num, column=price_col).alignment = number_alignment
-
-            # Total Sales (column 13)
-            if 'Total Sales' in data_df.columns:
-                sales_col = data_df.columns.get_loc('Total Sales') + 1
-                ws.cell(row=row_num, column=sales_col).number_format = '$#,##0.00'
-                ws.cell(row=row_num, column=sales_col).alignment = number_alignment
-
-            # Std Cost (column 14)
-            if 'Std Cost' in data_df.columns:
-                cost_col = data_df.columns.get_loc('Std Cost') + 1
-                ws.cell(row=row_num, column=cost_col).number_format = '$#,##0.00'
-                ws.cell(row=row_num, column=cost_col).alignment = number_alignment
-
-            # Total Std Cost (column 15)
-            if 'Total Std Cost' in data_df.columns:
-                tcost_col = data_df.columns.get_loc('Total Std Cost') + 1
-                ws.cell(row=row_num, column=tcost_col).number_format = '$#,##0.00'
-                ws.cell(row=row_num, column=tcost_col).alignment = number_alignment
-
-            # Total GM (column 16)
-            if 'Total GM' in data_df.columns:
-                gm_col = data_df.columns.get_loc('Total GM') + 1
-                ws.cell(row=row_num, column=gm_col).number_format = '$#,##0.00'
-                ws.cell(row=row_num, column=gm_col).alignment = number_alignment
-
-            # GM % (column 17)
-            if 'GM %' in data_df.columns:
-                gmpct_col = data_df.columns.get_loc('GM %') + 1
-                ws.cell(row=row_num, column=gmpct_col).number_format = '0.00%'
-                ws.cell(row=row_num, column=gmpct_col).alignment = number_alignment
-
-        # Auto-adjust column widths
+    def write_data_sheet(self, writer, data_df):
+        """Write Data sheet with headers and number formats"""
         column_widths = {
             'A': 25,  # Distributor
             'B': 15,  # Region
@@ -791,28 +732,70 @@ class FinalHybridCGSGenerator:
             'P': 14,  # Total GM
             'Q': 10   # GM %
         }
-
-        for col_letter, width in column_widths.items():
-            if col_letter in ws.column_dimensions:
-                ws.column_dimensions[col_letter].width = width
+        column_count = len(data_df.columns)
+        column_widths = {
+            letter: width for letter, width in column_widths.items()
+            if column_index_from_string(letter) <= column_count
+        }
 
         # Freeze panes (freeze header row)
-        ws.freeze_panes = 'A2'
+        ws = writer.create_sheet('2025 - Data', column_widths=column_widths, freeze_panes='A2')
+
+        # Number formatting based on column names, decided once per column
+        number_kinds = {
+            'Quantity': 'integer',
+            'Price Each': 'currency',
+            'Total Sales': 'currency',
+            'Std Cost': 'currency',
+            'Total Std Cost': 'currency',
+            'Total GM': 'currency',
+            'GM %': 'percent'
+        }
+        column_styles = []
+        for column in data_df.columns:
+            if column in number_kinds:
+                kind = number_kinds[column]
+            elif pd.api.types.is_datetime64_any_dtype(data_df[column]):
+                kind = 'datetime'
+            else:
+                kind = 'text'
+            column_styles.append(f'cgs_data_{kind}')
+
+        writer.write_dataframe(ws, data_df, column_styles=column_styles, header_style='cgs_header')
 
         # Add auto-filter to the data range
-        ws.auto_filter.ref = f'A1:{get_column_letter(len(data_df.columns))}{len(data_df) + 1}'
+        writer.set_auto_filter(ws, writer.data_range(1, len(data_df) + 1, column_count))
 
         print(f"  ✓ Data sheet formatted with headers and number formats")
         print(f"  ✓ Auto-filter added to range: {ws.auto_filter.ref}")
 
-    def generate(self, output_dir='output'):
-        """Main generation workflow"""
+    def generate(self, output_dir='output', progress_callback=None):
+        """
+        Main generation workflow
+
+        Args:
+            output_dir: Output directory relative to base_path
+            progress_callback: Optional callable(phase, progress, message) invoked
+                as each phase (load, transform, write) starts
+        """
+        def report(phase, progress, message):
+            if progress_callback:
+                progress_callback(phase, progress, message)
+
         print("\n" + "="*80)
         print("FINAL HYBRID CGS GENERATOR")
         print("With Historical Costs from Original CGS")
         print("="*80)
 
+        self.phase_timings = {}
+
+        report('load', 10, 'Loading source files...')
+        phase_start = time.perf_counter()
         self.load_all_sources()
+        self.phase_timings['load'] = time.perf_counter() - phase_start
+
+        report('transform', 30, 'Generating CGS report...')
+        phase_start = time.perf_counter()
         self.extract_distributor_mapping_from_cgs()
         self.extract_historical_costs_from_cgs()
         self.create_distributor_mapping_from_msr()
@@ -827,6 +810,7 @@ class FinalHybridCGSGenerator:
 
         # Create summary sheet
         summary_df = self.create_summary_sheet(result_df)
+        self.phase_timings['transform'] = time.perf_counter() - phase_start
 
         # Create output directory if it doesn't exist
         os.makedirs(f'{self.base_path}/{output_dir}', exist_ok=True)
@@ -837,11 +821,17 @@ class FinalHybridCGSGenerator:
         print("STEP 12: Saving Output with Formatting")
         print("="*80)
 
+        report('write', 80, 'Writing formatted workbook...')
+        phase_start = time.perf_counter()
         self.save_with_formatting(result_df, summary_df, output_file)
+        self.phase_timings['write'] = time.perf_counter() - phase_start
 
         print(f"\n✅ FINAL CGS file generated: {output_file}")
         print(f"   Data sheet rows: {len(result_df):,}")
         print(f"   Summary sheet rows: {len(summary_df):,}")
+        print(f"   Phase timings: " + ", ".join(
+            f"{phase} {seconds:.2f}s" for phase, seconds in self.phase_timings.items()
+        ))
 
         print("\n" + "="*80)
         print("GENERATION COMPLETE")
@@ -850,6 +840,32 @@ class FinalHybridCGSGenerator:
         return result_df, output_file
 
 
+def cgs_input_hash(base_path='.'):
+    """Content hash of every CGS source file, used to deduplicate identical jobs"""
+    generator = FinalHybridCGSGenerator(base_path=base_path)
+    digest = hashlib.sha256()
+    for spec in generator.source_specs():
+        digest.update(spec.name.encode())
+        digest.update(file_sha256(spec.path).encode())
+    return digest.hexdigest()
+
+
+def run_cgs_job(progress, base_path='.', output_dir='output'):
+    """Job engine target: generate a CGS report and return a JSON-safe summary"""
+    generator = FinalHybridCGSGenerator(base_path=base_path)
+    result_df, output_file = generator.generate(output_dir=output_dir, progress_callback=progress)
+    return {
+        'output_file': output_file,
+        'row_count': len(result_df),
+        'phase_timings': {phase: round(seconds, 3) for phase, seconds in generator.phase_timings.items()},
+        'load_stats': {
+            'total_seconds': round(generator.load_stats.get('total_seconds', 0), 3),
+            'cache_hits': generator.load_stats.get('cache_hits', 0),
+            'cache_misses': generator.load_stats.get('cache_misses', 0)
+        }
+    }
+
+
 if __name__ == "__main__":
     generator = FinalHybridCGSGenerator(base_path='.')
     result, output_file = generator.generate()
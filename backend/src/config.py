@@ -36,6 +36,8 @@ class Settings(BaseSettings):
     # Weaviate
     weaviate_url: str = Field(default="http://localhost:8082", alias="WEAVIATE_URL")
     weaviate_api_key: Optional[str] = Field(None, alias="WEAVIATE_API_KEY")
+    weaviate_embedding_batch_size: int = Field(default=64, alias="WEAVIATE_EMBEDDING_BATCH_SIZE")
+    weaviate_write_batch_size: int = Field(default=200, alias="WEAVIATE_WRITE_BATCH_SIZE")
 
     # Markets.AI API Keys (all free)
     fred_api_key: Optional[str] = Field(None, alias="FRED_API_KEY")
@@ -90,9 +92,41 @@ class Settings(BaseSettings):
         default=30 * 24 * 60 * 60, alias="CACHE_TTL_EMBEDDING"
     )  # 30 days
     cache_ttl_validation: int = Field(default=60 * 60, alias="CACHE_TTL_VALIDATION")  # 1 hour
+    cache_ttl_validation_invalid: int = Field(default=5 * 60, alias="CACHE_TTL_VALIDATION_INVALID")  # 5 minutes
+    bigquery_table_version_ttl: int = Field(default=5 * 60, alias="BIGQUERY_TABLE_VERSION_TTL")  # 5 minutes
     cache_ttl_result: int = Field(default=5 * 60, alias="CACHE_TTL_RESULT")  # 5 minutes
     cache_ttl_session: int = Field(default=24 * 60 * 60, alias="CACHE_TTL_SESSION")  # 24 hours
 
+    # Streaming / paginated results
+    result_handle_idle_ttl: int = Field(default=5 * 60, alias="RESULT_HANDLE_IDLE_TTL")  # 5 minutes
+    result_handle_max_open: int = Field(default=100, alias="RESULT_HANDLE_MAX_OPEN")
+    result_page_size: int = Field(default=1000, alias="RESULT_PAGE_SIZE")
+    # HMAC key for result cursors; must be shared by all workers for cursors to resume on any of them
+    result_cursor_secret: Optional[str] = Field(None, alias="RESULT_CURSOR_SECRET")
+
+    # Prompt-prefix caching for SQL generation
+    prompt_cache_enabled: bool = Field(default=True, alias="PROMPT_CACHE_ENABLED")  # Provider-side cache_control
+    prompt_prefix_cache_size: int = Field(default=64, alias="PROMPT_PREFIX_CACHE_SIZE")  # Rendered schema prefixes
+
+    # Single-flight coalescing of identical concurrent SQL generations
+    singleflight_enabled: bool = Field(default=True, alias="SINGLEFLIGHT_ENABLED")
+    singleflight_lock_timeout: float = Field(default=60.0, alias="SINGLEFLIGHT_LOCK_TIMEOUT")  # Redis lock lifetime
+    singleflight_wait_timeout: float = Field(default=60.0, alias="SINGLEFLIGHT_WAIT_TIMEOUT")  # Follower wait (capped at the lock timeout)
+    singleflight_result_ttl: int = Field(default=30, alias="SINGLEFLIGHT_RESULT_TTL")  # Published result lifetime
+
+    # LLM dispatch governor (budgets of 0 mean no per-minute budget)
+    llm_governor_enabled: bool = Field(default=True, alias="LLM_GOVERNOR_ENABLED")
+    llm_anthropic_max_concurrency: int = Field(default=8, alias="LLM_ANTHROPIC_MAX_CONCURRENCY")
+    llm_anthropic_requests_per_minute: int = Field(default=0, alias="LLM_ANTHROPIC_REQUESTS_PER_MINUTE")
+    llm_anthropic_tokens_per_minute: int = Field(default=0, alias="LLM_ANTHROPIC_TOKENS_PER_MINUTE")
+    llm_openai_max_concurrency: int = Field(default=8, alias="LLM_OPENAI_MAX_CONCURRENCY")
+    llm_openai_requests_per_minute: int = Field(default=0, alias="LLM_OPENAI_REQUESTS_PER_MINUTE")
+    llm_openai_tokens_per_minute: int = Field(default=0, alias="LLM_OPENAI_TOKENS_PER_MINUTE")
+    llm_batch_share: float = Field(default=0.75, alias="LLM_BATCH_SHARE")  # Research / document analysis
+    llm_background_share: float = Field(default=0.5, alias="LLM_BACKGROUND_SHARE")  # Pulse / cache warming
+    llm_governor_max_retries: int = Field(default=3, alias="LLM_GOVERNOR_MAX_RETRIES")
+    llm_governor_max_wait: float = Field(default=120.0, alias="LLM_GOVERNOR_MAX_WAIT")  # Seconds in the queue
+
     # Cache feature flags
     cache_enabled: bool = Field(default=True, alias="CACHE_ENABLED")
     cache_sql_enabled: bool = Field(default=True, alias="CACHE_SQL_ENABLED")
@@ -114,6 +148,16 @@ class Settings(BaseSettings):
     clerk_secret_key: Optional[str] = Field(None, alias="CLERK_SECRET_KEY")
     production_domain: Optional[str] = Field(None, alias="PRODUCTION_DOMAIN")
 
+    # Background job engine (Excel/CGS processing)
+    job_db_path: str = Field(default="cache/jobs.sqlite3", alias="JOB_DB_PATH")
+    job_workers: int = Field(default=2, alias="JOB_WORKERS")
+    job_lease_seconds: float = Field(default=60.0, alias="JOB_LEASE_SECONDS")
+
+    # Document intelligence storage (SQLite metadata + content-addressed blobs)
+    document_store_dir: str = Field(default="cache/document_store", alias="DOCUMENT_STORE_DIR")
+    graph_snapshot_dir: str = Field(default="cache/graph_snapshots", alias="GRAPH_SNAPSHOT_DIR")
+    column_type_memo_path: str = Field(default="cache/column_type_memo.json", alias="COLUMN_TYPE_MEMO_PATH")
+
     # Apache Jena Fuseki Configuration
     fuseki_url: str = Field(default="http://localhost:3030", alias="FUSEKI_URL")
     fuseki_dataset: str = Field(default="mantrix_csg", alias="FUSEKI_DATASET")
@@ -7,11 +7,18 @@ Integrates with WeaviateKnowledgeService for:
 - Synonym resolution (e.g., "revenue" -> "Gross_Sales")
 - Column type detection for formatting
 """
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 import structlog
 from src.core.llm_client import LLMClient
 from src.core.cache_manager import CacheManager
+from src.core.single_flight import flight_key, get_single_flight
+from src.core.llm_governor import get_llm_governor
 from src.db.bigquery import BigQueryClient
+from src.db.arrow_results import ColumnarResult
+from src.db.validation_cache import get_validation_cache
+from src.db.result_streaming import get_result_handle_registry
+from src.core.result_formatter import column_format, get_format_plan
+from src.core.sql_rewriter import RewriteContext, rewrite_sql
 from src.config import settings
 from src.core.ap_examples import AP_BUSINESS_RULES, select_relevant_ap_examples
 
@@ -27,6 +34,9 @@ except ImportError:
 
 logger = structlog.get_logger()
 
+# Table that unknown table references fall back to
+DEFAULT_TABLE = "dataset_25m_table"
+
 
 class BigQuerySQLGenerator:
     """SQL generator for BigQuery with configurable project/dataset"""
@@ -82,6 +92,14 @@ class BigQuerySQLGenerator:
                     max_connections=settings.redis_max_connections
                 )
                 logger.info("Cache manager initialized for BigQuery generator")
+                # Share dry-run results across workers and with SQLGenerator
+                get_validation_cache().attach(self.cache_manager)
+                # Coalesce identical in-flight generations across workers
+                get_single_flight().attach(self.cache_manager)
+                # Share LLM budgets and rate-limit cooldowns across workers
+                get_llm_governor().attach(self.cache_manager)
+                # Let any worker resume the result cursors this one issued
+                get_result_handle_registry().attach(self.cache_manager)
             except Exception as e:
                 logger.warning(f"Failed to initialize cache manager: {e}")
                 self.cache_manager = None
@@ -396,631 +414,17 @@ class BigQuerySQLGenerator:
         logger.info(f"Table selection: copa={is_copa}, sales={is_sales}, ap={is_ap}, tables={relevant_tables[:5]}")
         return relevant_tables[:5]
 
-    def _fix_current_date_queries(self, sql: str) -> str:
-        """Remove CURRENT_DATE() based filtering since data has fixed date range.
-
-        Also fixes wrong date column usage (REFERENCESDDOCUMENT -> Posting_Date).
-        """
-        import re
-
-        original_sql = sql
-
-        # CRITICAL FIX: Replace EXTRACT(YEAR FROM CURRENT_DATE()) with 2025 (max year in data)
-        # This catches patterns like: WHERE EXTRACT(YEAR FROM col) = EXTRACT(YEAR FROM CURRENT_DATE())
-        sql = re.sub(
-            r"EXTRACT\s*\(\s*YEAR\s+FROM\s+CURRENT_DATE\s*\(\s*\)\s*\)",
-            '2025',
-            sql,
-            flags=re.IGNORECASE
-        )
-
-        # CRITICAL FIX: Replace date_column with Posting_Date (LLM sometimes hallucinates this column)
-        sql = re.sub(r'\bdate_column\b', 'Posting_Date', sql, flags=re.IGNORECASE)
-
-        # CRITICAL FIX: Replace Order_Date in WHERE clause date filtering with Posting_Date
-        # Order_Date may not exist or have different meaning - Posting_Date is the canonical date
-        sql = re.sub(
-            r"EXTRACT\s*\(\s*(YEAR|MONTH|DAY|QUARTER)\s+FROM\s+Order_Date\s*\)",
-            r'EXTRACT(\1 FROM Posting_Date)',
-            sql,
-            flags=re.IGNORECASE
-        )
-
-        # CRITICAL FIX: Replace Header_Creation_Date with Posting_Date (LLM hallucinates this column)
-        sql = re.sub(
-            r"PARSE_DATE\s*\(\s*'[^']+'\s*,\s*Header_Creation_Date\s*\)",
-            'Posting_Date',
-            sql,
-            flags=re.IGNORECASE
-        )
-        sql = re.sub(r'\bHeader_Creation_Date\b', 'Posting_Date', sql, flags=re.IGNORECASE)
-
-        # Fix 1: Replace wrong date column parsing with Posting_Date
-        # Pattern: PARSE_DATE('%Y%m%d', SUBSTRING(REFERENCESDDOCUMENT, ...)) -> Posting_Date
-        sql = re.sub(
-            r"PARSE_DATE\s*\(\s*'%Y%m%d'\s*,\s*SUBSTRING\s*\(\s*REFERENCESDDOCUMENT[^)]*\)\s*\)",
-            'Posting_Date',
-            sql,
-            flags=re.IGNORECASE
-        )
-        # Pattern: CAST(SUBSTRING(REFERENCESDDOCUMENT, ...) AS DATE) -> Posting_Date
-        sql = re.sub(
-            r"CAST\s*\(\s*SUBSTRING\s*\(\s*REFERENCESDDOCUMENT[^)]*\)\s*AS\s+DATE\s*\)",
-            'Posting_Date',
-            sql,
-            flags=re.IGNORECASE
-        )
-
-        # Fix 2: Remove CURRENT_DATE() based filtering entirely
-        # Remove conditions like: AND Posting_Date >= DATE_SUB(CURRENT_DATE(), INTERVAL 6 MONTH)
-        sql = re.sub(
-            r"\s+AND\s+\w+\s*>=\s*DATE_SUB\s*\(\s*CURRENT_DATE\s*\(\s*\)\s*,\s*INTERVAL\s+\d+\s+\w+\s*\)",
-            '',
-            sql,
-            flags=re.IGNORECASE
-        )
-
-        # Remove standalone WHERE conditions with CURRENT_DATE (not preceded by AND)
-        sql = re.sub(
-            r"\s+AND\s+Posting_Date\s*>=\s*DATE_SUB\s*\(\s*CURRENT_DATE\s*\(\s*\)\s*,\s*INTERVAL\s+\d+\s+\w+\s*\)",
-            '',
-            sql,
-            flags=re.IGNORECASE
-        )
-
-        # Remove WHERE conditions with CURRENT_DATE when followed by GROUP/ORDER
-        sql = re.sub(
-            r"WHERE\s+\w+\s*>=\s*DATE_SUB\s*\(\s*CURRENT_DATE\s*\(\s*\)\s*,\s*INTERVAL\s+\d+\s+\w+\s*\)\s*(GROUP|ORDER)",
-            r'WHERE Posting_Date IS NOT NULL \1',
-            sql,
-            flags=re.IGNORECASE
+    def _rewrite_context(self, schema_tables: Optional[List[str]] = None,
+                         valid_tables: Optional[List[str]] = None) -> RewriteContext:
+        """Rewrite target for this generator's project and dataset."""
+        return RewriteContext(
+            project_id=self.project_id,
+            dataset_id=self.dataset_id,
+            schema_tables=schema_tables or [],
+            valid_tables=valid_tables or [],
+            default_table=DEFAULT_TABLE if valid_tables else None,
         )
 
-        # More general pattern - remove entire lines containing CURRENT_DATE()
-        lines = sql.split('\n')
-        filtered_lines = []
-        removed_count = 0
-        for line in lines:
-            line_upper = line.upper()
-            has_current_date = 'CURRENT_DATE' in line_upper
-            has_condition = 'AND' in line_upper or '>=' in line_upper
-            if has_current_date and has_condition:
-                # Skip lines with CURRENT_DATE in conditions
-                logger.warning(f"REMOVING CURRENT_DATE line: [{line.strip()}]")
-                removed_count += 1
-                continue
-            filtered_lines.append(line)
-        sql = '\n'.join(filtered_lines)
-        if removed_count > 0:
-            logger.warning(f"Removed {removed_count} lines containing CURRENT_DATE()")
-
-        # Remove the complex REFERENCESDDOCUMENT conditions entirely
-        sql = re.sub(
-            r"\s+AND\s+LENGTH\s*\(\s*REFERENCESDDOCUMENT\s*\)\s*>=\s*\d+",
-            '',
-            sql,
-            flags=re.IGNORECASE
-        )
-        sql = re.sub(
-            r"\s+AND\s+REGEXP_CONTAINS\s*\(\s*SUBSTRING\s*\(\s*REFERENCESDDOCUMENT[^)]*\)[^)]*\)",
-            '',
-            sql,
-            flags=re.IGNORECASE
-        )
-        sql = re.sub(
-            r"WHERE\s+REFERENCESDDOCUMENT\s+IS\s+NOT\s+NULL\s+AND",
-            'WHERE',
-            sql,
-            flags=re.IGNORECASE
-        )
-
-        # Clean up double spaces and newlines
-        sql = re.sub(r'\n\s*\n', '\n', sql)
-        sql = re.sub(r'  +', ' ', sql)
-
-        # Fix BigQuery CTE column name conflicts - when a CTE and column have same name
-        # This causes "No matching signature for aggregate function" errors
-        # Solution: rename columns that conflict with CTE names
-        cte_pattern = r'WITH\s+(\w+)\s+AS'
-        cte_matches = re.findall(cte_pattern, sql, flags=re.IGNORECASE)
-        logger.info(f"CTE conflict check - found CTEs: {cte_matches}")
-        for cte_name in cte_matches:
-            # If a column has same name as CTE, rename it with _value suffix
-            col_pattern = rf'\b{cte_name}\s+AS\s+{cte_name}\b'
-            if re.search(col_pattern, sql, flags=re.IGNORECASE):
-                sql = re.sub(col_pattern, f'{cte_name} AS {cte_name}_value', sql, flags=re.IGNORECASE)
-                # Also update references to this column in aggregates
-                sql = re.sub(rf'AVG\s*\(\s*{cte_name}\s*\)', f'AVG({cte_name}_value)', sql, flags=re.IGNORECASE)
-                sql = re.sub(rf'SUM\s*\(\s*{cte_name}\s*\)', f'SUM({cte_name}_value)', sql, flags=re.IGNORECASE)
-                logger.info(f"Fixed CTE column name conflict for: {cte_name}")
-
-            # Also fix case where column is named same as CTE in subsequent CTEs
-            # e.g., SUM(...) AS monthly_revenue in CTE monthly_revenue
-            # Use .+? to handle nested parentheses like SUM(COALESCE(...))
-            sum_pattern = rf'(SUM\s*\(.+?\))\s+AS\s+{cte_name}\b'
-            sum_match = re.search(sum_pattern, sql, flags=re.IGNORECASE)
-            logger.info(f"CTE conflict check - SUM pattern for {cte_name}: {sum_match.group(0) if sum_match else 'No match'}")
-            if sum_match:
-                # Rename the column to avoid conflict
-                sql = re.sub(sum_pattern, rf'\1 AS {cte_name}_amount', sql, flags=re.IGNORECASE)
-                # Update all references to this column throughout the SQL
-                # But be careful not to replace the CTE name itself in FROM clauses
-                # Only replace column references (preceded by comma, SELECT, or in functions)
-                sql = re.sub(rf'AVG\s*\(\s*{cte_name}\s*\)', f'AVG({cte_name}_amount)', sql, flags=re.IGNORECASE)
-                sql = re.sub(rf',\s*\n\s*{cte_name}\s*,', f',\n {cte_name}_amount,', sql, flags=re.IGNORECASE)
-                sql = re.sub(rf',\s*{cte_name}\s*,', f', {cte_name}_amount,', sql, flags=re.IGNORECASE)
-                sql = re.sub(rf'SELECT\s+\n?\s*{cte_name}\s*,', f'SELECT\n {cte_name}_amount,', sql, flags=re.IGNORECASE)
-                sql = re.sub(rf'ROUND\s*\(\s*{cte_name}\s*,', f'ROUND({cte_name}_amount,', sql, flags=re.IGNORECASE)
-                # Also handle standalone column reference after SELECT or comma
-                sql = re.sub(rf'(?<=,)\s*{cte_name}(?=\s*,|\s+AS)', f' {cte_name}_amount', sql, flags=re.IGNORECASE)
-                sql = re.sub(rf'(?<=SELECT)\s+{cte_name}(?=\s*,)', f' {cte_name}_amount', sql, flags=re.IGNORECASE)
-                logger.info(f"Fixed CTE column name conflict (SUM pattern) for: {cte_name}")
-
-        if sql != original_sql:
-            logger.info(f"Fixed CURRENT_DATE() and/or REFERENCESDDOCUMENT in SQL")
-
-        return sql
-
-    def _fix_postgresql_syntax(self, sql: str) -> str:
-        """Fix common PostgreSQL syntax that might slip through to BigQuery"""
-        import re
-
-        fixed_sql = sql
-
-        # Fix to_char() -> FORMAT() - handle nested parentheses
-        # Pattern matches to_char with any content including nested parens
-        def fix_to_char(sql_str):
-            result = sql_str
-            # Find all to_char occurrences
-            while True:
-                match = re.search(r'to_char\s*\(', result, flags=re.IGNORECASE)
-                if not match:
-                    break
-
-                start = match.start()
-                # Find matching closing paren
-                paren_count = 0
-                end = match.end() - 1  # Position of opening paren
-                for i in range(match.end() - 1, len(result)):
-                    if result[i] == '(':
-                        paren_count += 1
-                    elif result[i] == ')':
-                        paren_count -= 1
-                        if paren_count == 0:
-                            end = i + 1
-                            break
-
-                # Extract the full to_char(...) call
-                to_char_call = result[start:end]
-
-                # Parse arguments (simple split by comma, handling nested parens)
-                inner = to_char_call[to_char_call.index('(') + 1:-1]
-
-                # Split on comma not inside parens
-                args = []
-                current_arg = ""
-                depth = 0
-                for char in inner:
-                    if char == '(':
-                        depth += 1
-                    elif char == ')':
-                        depth -= 1
-                    elif char == ',' and depth == 0:
-                        args.append(current_arg.strip())
-                        current_arg = ""
-                        continue
-                    current_arg += char
-                if current_arg.strip():
-                    args.append(current_arg.strip())
-
-                if len(args) >= 2:
-                    value = args[0]
-                    format_str = args[1].strip("'\"")
-                    # Replace with CAST and ROUND for number formatting
-                    # BigQuery FORMAT doesn't support %,.2f - use CAST instead
-                    replacement = f"CAST(ROUND({value}, 2) AS STRING)"
-                else:
-                    replacement = f"CAST({args[0]} AS STRING)" if args else to_char_call
-
-                result = result[:start] + replacement + result[end:]
-
-            return result
-
-        fixed_sql = fix_to_char(fixed_sql)
-
-        # Fix ::type casting -> CAST()
-        # Pattern: column::numeric, column::date, etc.
-        cast_pattern = r"(\w+)::(\w+)"
-        fixed_sql = re.sub(cast_pattern, r"CAST(\1 AS \2)", fixed_sql)
-
-        # Fix NOW() -> CURRENT_TIMESTAMP()
-        fixed_sql = re.sub(r'\bNOW\s*\(\s*\)', 'CURRENT_TIMESTAMP()', fixed_sql, flags=re.IGNORECASE)
-
-        # Fix CURRENT_DATE without parentheses -> CURRENT_DATE()
-        fixed_sql = re.sub(r'\bCURRENT_DATE\b(?!\s*\()', 'CURRENT_DATE()', fixed_sql, flags=re.IGNORECASE)
-
-        # Fix PostgreSQL DATE_TRUNC syntax: DATE_TRUNC('month', date) -> DATE_TRUNC(date, MONTH)
-        # BigQuery uses: DATE_TRUNC(date_expression, date_part)
-        def fix_date_trunc(sql_str):
-            """Convert PostgreSQL DATE_TRUNC to BigQuery syntax"""
-            result = sql_str
-            # Pattern: DATE_TRUNC('month', column) or DATE_TRUNC('year', column)
-            pattern = r"DATE_TRUNC\s*\(\s*['\"](\w+)['\"]\s*,\s*([^)]+)\)"
-
-            def replace_date_trunc(match):
-                date_part = match.group(1).upper()
-                date_expr = match.group(2).strip()
-                return f"DATE_TRUNC({date_expr}, {date_part})"
-
-            result = re.sub(pattern, replace_date_trunc, result, flags=re.IGNORECASE)
-            return result
-
-        fixed_sql = fix_date_trunc(fixed_sql)
-
-        # Fix PostgreSQL INTERVAL syntax: INTERVAL '2 years' -> INTERVAL 2 YEAR
-        # BigQuery uses: DATE_SUB/DATE_ADD with INTERVAL n UNIT
-        def fix_interval_syntax(sql_str):
-            """Convert PostgreSQL INTERVAL to BigQuery syntax"""
-            result = sql_str
-
-            # Pattern: CURRENT_DATE() - INTERVAL '2 years' -> DATE_SUB(CURRENT_DATE(), INTERVAL 2 YEAR)
-            # Also handle: date_col - INTERVAL '30 days'
-            pattern = r"(\w+(?:\(\))?)\s*-\s*INTERVAL\s*['\"](\d+)\s*(\w+)['\"]"
-
-            def replace_interval_sub(match):
-                date_expr = match.group(1)
-                num = match.group(2)
-                unit = match.group(3).upper().rstrip('S')  # Remove plural 's'
-                return f"DATE_SUB({date_expr}, INTERVAL {num} {unit})"
-
-            result = re.sub(pattern, replace_interval_sub, result, flags=re.IGNORECASE)
-
-            # Also fix: + INTERVAL '...'
-            pattern_add = r"(\w+(?:\(\))?)\s*\+\s*INTERVAL\s*['\"](\d+)\s*(\w+)['\"]"
-
-            def replace_interval_add(match):
-                date_expr = match.group(1)
-                num = match.group(2)
-                unit = match.group(3).upper().rstrip('S')
-                return f"DATE_ADD({date_expr}, INTERVAL {num} {unit})"
-
-            result = re.sub(pattern_add, replace_interval_add, result, flags=re.IGNORECASE)
-
-            # Fix standalone INTERVAL comparison: >= CURRENT_DATE() - INTERVAL 2 YEAR
-            # This pattern handles when DATE_SUB was already partially applied but the format is still wrong
-            pattern_standalone = r"INTERVAL\s*['\"]?(\d+)\s*(\w+)['\"]?"
-
-            def replace_standalone_interval(match):
-                num = match.group(1)
-                unit = match.group(2).upper().rstrip('S')
-                return f"INTERVAL {num} {unit}"
-
-            result = re.sub(pattern_standalone, replace_standalone_interval, result, flags=re.IGNORECASE)
-
-            return result
-
-        fixed_sql = fix_interval_syntax(fixed_sql)
-
-        # Fix malformed DATE_TRUNC with extra comma: DATE_TRUNC(CURRENT_DATE(, YEAR)) -> DATE_TRUNC(CURRENT_DATE(), YEAR)
-        fixed_sql = re.sub(r'DATE_TRUNC\s*\(\s*CURRENT_DATE\s*\(\s*,', 'DATE_TRUNC(CURRENT_DATE(),', fixed_sql, flags=re.IGNORECASE)
-
-        # Fix any remaining - INTERVAL patterns that weren't caught
-        # Pattern: expression - INTERVAL n UNIT (without quotes) -> DATE_SUB(expression, INTERVAL n UNIT)
-        def fix_remaining_interval(sql_str):
-            """Fix any remaining date - INTERVAL patterns"""
-            result = sql_str
-
-            # First, fix nested DATE_TRUNC with matching parens
-            # Pattern: DATE_TRUNC(DATE_TRUNC(...), UNIT)) - INTERVAL -> unbalanced parens issue
-            # Find and fix: DATE_TRUNC(...)) - INTERVAL (extra close paren before INTERVAL)
-            result = re.sub(r'\)\)\s*-\s*INTERVAL', ') - INTERVAL', result)
-
-            # Now handle DATE_TRUNC(...) - INTERVAL patterns properly
-            # Need to handle nested parens in DATE_TRUNC
-            def replace_with_date_sub(sql):
-                """Replace expr - INTERVAL with DATE_SUB(expr, INTERVAL)"""
-                # Find - INTERVAL patterns
-                interval_match = re.search(r'\s*-\s*(INTERVAL\s+\d+\s+\w+)', sql, flags=re.IGNORECASE)
-                if not interval_match:
-                    return sql
-
-                interval_start = interval_match.start()
-                interval_expr = interval_match.group(1)
-
-                # Find the expression before - INTERVAL by matching parens backwards
-                prefix = sql[:interval_start]
-
-                # Try to find a balanced expression ending before the -
-                # Could be: DATE_TRUNC(...), CURRENT_DATE(), or a column name
-                expr_end = len(prefix.rstrip())
-
-                # Check if it ends with a closing paren
-                if prefix.rstrip().endswith(')'):
-                    # Find matching open paren
-                    paren_count = 0
-                    expr_start = expr_end - 1
-                    for i in range(expr_end - 1, -1, -1):
-                        if prefix[i] == ')':
-                            paren_count += 1
-                        elif prefix[i] == '(':
-                            paren_count -= 1
-                            if paren_count == 0:
-                                # Found the matching open paren, now find function name
-                                # Go back to find word characters (function name)
-                                j = i - 1
-                                while j >= 0 and prefix[j] in ' \t\n':
-                                    j -= 1
-                                while j >= 0 and (prefix[j].isalnum() or prefix[j] == '_'):
-                                    j -= 1
-                                expr_start = j + 1
-                                break
-
-                    date_expr = prefix[expr_start:expr_end].strip()
-                    before_expr = prefix[:expr_start]
-                    after_interval = sql[interval_match.end():]
-
-                    return before_expr + f"DATE_SUB({date_expr}, {interval_expr})" + after_interval
-                else:
-                    # Simple column or word, use basic pattern
-                    word_match = re.search(r'(\w+)\s*$', prefix)
-                    if word_match:
-                        date_expr = word_match.group(1)
-                        before_expr = prefix[:word_match.start()]
-                        after_interval = sql[interval_match.end():]
-                        return before_expr + f"DATE_SUB({date_expr}, {interval_expr})" + after_interval
-
-                return sql
-
-            # Apply the fix iteratively until no more changes
-            prev_result = ""
-            while prev_result != result and '- INTERVAL' in result.upper():
-                prev_result = result
-                if 'DATE_SUB' not in result[result.upper().find('- INTERVAL')-20:result.upper().find('- INTERVAL')].upper():
-                    result = replace_with_date_sub(result)
-                else:
-                    break
-
-            return result
-
-        fixed_sql = fix_remaining_interval(fixed_sql)
-
-        # Fix ROUND on DATE columns: CAST(ROUND(month, 2) AS STRING) -> FORMAT_DATE('%Y-%m', month)
-        # This happens when LLM tries to format a DATE column incorrectly
-        def fix_round_on_date(sql_str):
-            """Fix ROUND applied to DATE columns"""
-            result = sql_str
-
-            # Pattern: CAST(ROUND(column, n) AS STRING) AS column
-            # where column is likely a date (named month, date, period, etc.)
-            pattern = r"CAST\s*\(\s*ROUND\s*\(\s*(\w+)\s*,\s*\d+\s*\)\s*AS\s+STRING\s*\)"
-
-            def replace_if_date(match):
-                col_name = match.group(1).lower()
-                # Check if this looks like a date column
-                date_indicators = ['month', 'date', 'period', 'day', 'year', 'week', 'quarter']
-                if any(ind in col_name for ind in date_indicators):
-                    # Replace with FORMAT_DATE for proper date formatting
-                    if 'month' in col_name:
-                        return f"FORMAT_DATE('%Y-%m', {match.group(1)})"
-                    elif 'year' in col_name:
-                        return f"FORMAT_DATE('%Y', {match.group(1)})"
-                    elif 'quarter' in col_name:
-                        return f"FORMAT_DATE('%Y-Q%Q', {match.group(1)})"
-                    else:
-                        return f"CAST({match.group(1)} AS STRING)"
-                return match.group(0)  # Keep original if not a date
-
-            result = re.sub(pattern, replace_if_date, result, flags=re.IGNORECASE)
-            return result
-
-        fixed_sql = fix_round_on_date(fixed_sql)
-
-        # Fix || string concatenation to CONCAT() - BigQuery prefers CONCAT
-        # Pattern: 'string' || expr or expr || 'string'
-        def fix_string_concat(sql_str):
-            """Convert || concatenation to CONCAT()"""
-            result = sql_str
-
-            # Simple pattern: expr || 'suffix'
-            # Match: CAST(...) || '%' or similar
-            pattern = r"((?:CAST\s*\([^)]+\)|[\w'\"]+(?:\([^)]*\))?)\s*\|\|\s*('[^']*'))"
-
-            def replace_concat(match):
-                left = match.group(1).strip()
-                right = match.group(2).strip()
-                return f"CONCAT({left}, {right})"
-
-            result = re.sub(pattern, replace_concat, result, flags=re.IGNORECASE)
-
-            # Also handle: 'prefix' || expr
-            pattern2 = r"('[^']*')\s*\|\|\s*((?:CAST\s*\([^)]+\)|[\w]+(?:\([^)]*\))?))"
-
-            result = re.sub(pattern2, replace_concat, result, flags=re.IGNORECASE)
-
-            return result
-
-        fixed_sql = fix_string_concat(fixed_sql)
-
-        # Fix malformed ROUND(ROUND(...) AS pattern - missing closing paren
-        # Pattern: ROUND(ROUND(expr, n) AS alias -> ROUND(expr, n) AS alias
-        def fix_double_round(sql_str):
-            """Fix double ROUND without proper closing"""
-            result = sql_str
-
-            # Pattern: ROUND(ROUND(something, n) AS - missing middle close paren
-            # This is malformed - simplify to single ROUND
-            pattern = r'ROUND\s*\(\s*ROUND\s*\(([^,]+),\s*(\d+)\s*\)\s+AS\s+'
-            result = re.sub(pattern, r'ROUND(\1, \2) AS ', result, flags=re.IGNORECASE)
-
-            return result
-
-        fixed_sql = fix_double_round(fixed_sql)
-
-        # Fix unbalanced parentheses - check whole SQL statement
-        def fix_unbalanced_parens(sql_str):
-            """Attempt to fix unbalanced parentheses in SQL at statement level"""
-            # Check overall balance first
-            total_open = sql_str.count('(')
-            total_close = sql_str.count(')')
-
-            if total_open == total_close:
-                return sql_str  # Already balanced
-
-            # If we have more opens than closes, we need to add closing parens
-            if total_open > total_close:
-                diff = total_open - total_close
-                # Add before LIMIT or at end of last SELECT line
-                if 'LIMIT' in sql_str.upper():
-                    limit_pos = sql_str.upper().rfind('LIMIT')
-                    # Find the start of LIMIT clause
-                    sql_str = sql_str[:limit_pos].rstrip() + ')' * diff + ' ' + sql_str[limit_pos:]
-                else:
-                    sql_str = sql_str.rstrip(';') + ')' * diff + ';'
-
-            return sql_str
-
-        fixed_sql = fix_unbalanced_parens(fixed_sql)
-
-        # Fix ORDER BY with original column name when using SELECT DISTINCT with aliases
-        # BigQuery requires ORDER BY to use the alias, not the original column
-        if 'SELECT DISTINCT' in fixed_sql.upper() and 'ORDER BY' in fixed_sql.upper():
-            # Find all aliases: pattern AS alias_name
-            alias_pattern = r'(\w+(?:\([^)]*\))?)\s+AS\s+(\w+)'
-            aliases = re.findall(alias_pattern, fixed_sql, re.IGNORECASE)
-            for original, alias in aliases:
-                # Replace ORDER BY original_col with ORDER BY alias
-                # Handle LOWER(col) and similar function calls
-                escaped_original = re.escape(original)
-                order_by_pattern = rf'(ORDER\s+BY\s+)({escaped_original})(\s|$|,)'
-                fixed_sql = re.sub(order_by_pattern, rf'\g<1>{alias}\g<3>', fixed_sql, flags=re.IGNORECASE)
-
-        # Remove currency formatting attempts - return raw numbers for frontend to format
-        def remove_currency_formatting(sql_str):
-            """Remove CONCAT('$', ...) patterns and return just the numeric expression"""
-            result = sql_str
-
-            # Pattern: CONCAT('$', CAST(ROUND(ROUND(expr, 2), 2) AS STRING))
-            # Find CONCAT('$', and extract the inner numeric expression
-            while True:
-                match = re.search(r"CONCAT\s*\(\s*'\$'\s*,\s*CAST\s*\(", result, flags=re.IGNORECASE)
-                if not match:
-                    break
-
-                start = match.start()
-                # Find the matching closing paren for CONCAT
-                paren_count = 0
-                concat_start = result.find('(', start)
-                end = concat_start
-                for i in range(concat_start, len(result)):
-                    if result[i] == '(':
-                        paren_count += 1
-                    elif result[i] == ')':
-                        paren_count -= 1
-                        if paren_count == 0:
-                            end = i + 1
-                            break
-
-                # Extract inner expression - find ROUND or the expression inside CAST
-                inner = result[match.end():end-1]  # Content after CAST(
-                # Find the actual numeric expression
-                round_match = re.search(r'ROUND\s*\(\s*ROUND\s*\((.+?),\s*2\s*\)\s*,\s*2\s*\)', inner, flags=re.IGNORECASE)
-                if round_match:
-                    numeric_expr = f"ROUND({round_match.group(1)}, 2)"
-                else:
-                    round_match = re.search(r'ROUND\s*\((.+?),\s*2\s*\)', inner, flags=re.IGNORECASE)
-                    if round_match:
-                        numeric_expr = f"ROUND({round_match.group(1)}, 2)"
-                    else:
-                        # Just use what's inside CAST
-                        as_match = re.search(r'(.+?)\s+AS\s+STRING', inner, flags=re.IGNORECASE)
-                        numeric_expr = as_match.group(1) if as_match else inner
-
-                result = result[:start] + numeric_expr + result[end:]
-
-            return result
-
-        fixed_sql = remove_currency_formatting(fixed_sql)
-
-        # Handle '$' || CAST(...) patterns - need to find matching parentheses
-        def remove_dollar_concat(sql_str):
-            """Remove '$' || CAST(...) patterns"""
-            result = sql_str
-            while True:
-                match = re.search(r"'\$'\s*\|\|\s*CAST\s*\(", result, flags=re.IGNORECASE)
-                if not match:
-                    break
-
-                start = match.start()
-                # Find the opening paren of CAST
-                cast_paren_start = result.find('(', match.end() - 1)
-                # Find matching closing paren
-                paren_count = 0
-                end = cast_paren_start
-                for i in range(cast_paren_start, len(result)):
-                    if result[i] == '(':
-                        paren_count += 1
-                    elif result[i] == ')':
-                        paren_count -= 1
-                        if paren_count == 0:
-                            end = i + 1
-                            break
-
-                # Extract content inside CAST(...)
-                cast_content = result[cast_paren_start + 1:end - 1]
-
-                # Find the actual expression (before AS STRING)
-                as_match = re.search(r'(.+?)\s+AS\s+STRING', cast_content, flags=re.IGNORECASE)
-                if as_match:
-                    inner_expr = as_match.group(1).strip()
-                    # Simplify double ROUND
-                    inner_expr = re.sub(r'ROUND\s*\(\s*ROUND\s*\((.+?),\s*2\s*\)\s*,\s*2\s*\)',
-                                       r'ROUND(\1, 2)', inner_expr, flags=re.IGNORECASE)
-                else:
-                    inner_expr = cast_content
-
-                result = result[:start] + inner_expr + result[end:]
-
-            return result
-
-        fixed_sql = remove_dollar_concat(fixed_sql)
-
-        # Fix ORDER BY with aggregate function referencing columns not in scope
-        # When using CTE, ORDER BY should use alias from SELECT, not recalculate
-        if 'WITH ' in fixed_sql.upper() and 'ORDER BY' in fixed_sql.upper():
-            # Find ORDER BY position
-            order_by_match = re.search(r'ORDER\s+BY\s+', fixed_sql, flags=re.IGNORECASE)
-            if order_by_match:
-                order_start = order_by_match.end()
-                # Check if it starts with an aggregate function
-                after_order = fixed_sql[order_start:].strip()
-                if re.match(r'(SUM|AVG|COUNT|MAX|MIN)\s*\(', after_order, flags=re.IGNORECASE):
-                    # Find the end of the aggregate function (matching parens)
-                    paren_count = 0
-                    func_end = 0
-                    for i, c in enumerate(after_order):
-                        if c == '(':
-                            paren_count += 1
-                        elif c == ')':
-                            paren_count -= 1
-                            if paren_count == 0:
-                                func_end = i + 1
-                                break
-
-                    # Find aliases for aggregate columns in the CTE
-                    select_part = fixed_sql.split('ORDER BY')[0]
-                    # Match ROUND(SUM(...), 2) AS alias or SUM(...) AS alias
-                    alias_pattern = r'(?:ROUND\s*\(\s*)?(SUM|AVG|COUNT|MAX|MIN)\s*\([^)]+\)[^)]*\)?\s*,?\s*\d*\s*\)?\s+AS\s+(\w+)'
-                    aliases = re.findall(alias_pattern, select_part, flags=re.IGNORECASE)
-                    if aliases:
-                        alias_name = aliases[-1][1]
-                        # Replace ORDER BY SUM(...) with ORDER BY alias
-                        fixed_sql = fixed_sql[:order_start] + alias_name + fixed_sql[order_start + func_end:]
-
-        if fixed_sql != sql:
-            logger.info("Fixed PostgreSQL syntax in generated SQL")
-
-        return fixed_sql
-
     def _get_metric_context(self, query: str) -> Optional[Dict[str, Any]]:
         """Get relevant metric definitions from knowledge service.
 
@@ -1147,7 +551,30 @@ class BigQuerySQLGenerator:
         force_refresh: bool = False,
         conversation_context: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """Generate SQL from natural language query with optional conversation context"""
+        """Generate SQL from natural language query with optional conversation context.
+
+        Concurrent calls with the same normalized question and options share
+        one generation (see src.core.single_flight).
+        """
+        key = flight_key(f"bq_sql:{self.project_id}.{self.dataset_id}", query, {
+            "max_tables": max_tables,
+            "force_refresh": force_refresh,
+            "conversation_context": conversation_context or [],
+        })
+        result, coalesced = get_single_flight().do(
+            key, lambda: self._generate_sql(query, max_tables, force_refresh, conversation_context)
+        )
+        if coalesced:
+            result["coalesced"] = True
+        return result
+
+    def _generate_sql(
+        self,
+        query: str,
+        max_tables: int = 5,
+        force_refresh: bool = False,
+        conversation_context: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
         logger.info(f"Generating BigQuery SQL for: {query}")
 
         try:
@@ -1606,167 +1033,20 @@ class BigQuerySQLGenerator:
                         result["data_not_available"] = True
                         return result
 
-                # Fix common PostgreSQL syntax that might slip through
-                sql = self._fix_postgresql_syntax(sql)
-
-                # Ensure fully qualified table names
+                # Rewrite into BigQuery SQL in one pass (src.core.sql_rewriter): PostgreSQL
+                # syntax, table qualification, default LIMIT, fixed date range fixes,
+                # LOWER() in SELECT and identifier null filters
                 import re as regex_module
 
-                # First, fix any malformed table names where LLM split table_name incorrectly
-                # e.g., `arizona-poc.dataset.25m_table` should be `arizona-poc.copa_export_copa_data_000000000000.dataset_25m_table`
-                # e.g., `arizona-poc.dataset_25m.table` should be `arizona-poc.copa_export_copa_data_000000000000.dataset_25m_table`
-                for schema in schemas:
-                    table_name = schema['table_name']
-                    full_table = f"`{self.project_id}.{self.dataset_id}.{table_name}`"
-
-                    # Fix malformed table references where table name was split at underscores
-                    # e.g., dataset_25m_table became dataset.25m_table or dataset_25m.table
-                    if '_' in table_name:
-                        parts = table_name.split('_')
-                        # Generate all possible malformed variations
-                        for i in range(1, len(parts)):
-                            # Split at each underscore position
-                            prefix = '_'.join(parts[:i])
-                            suffix = '_'.join(parts[i:])
-
-                            # Pattern 1: `project.prefix.suffix` (underscore became dot)
-                            malformed1 = f"`{self.project_id}.{prefix}.{suffix}`"
-                            if malformed1 in sql:
-                                sql = sql.replace(malformed1, full_table)
-                                logger.info(f"Fixed malformed table name: {malformed1} -> {full_table}")
-
-                            # Pattern 2: `project.prefix_suffix.remaining` (partial split)
-                            for j in range(i + 1, len(parts)):
-                                partial_prefix = '_'.join(parts[:j])
-                                partial_suffix = '_'.join(parts[j:])
-                                malformed2 = f"`{self.project_id}.{partial_prefix}.{partial_suffix}`"
-                                if malformed2 in sql:
-                                    sql = sql.replace(malformed2, full_table)
-                                    logger.info(f"Fixed malformed table name: {malformed2} -> {full_table}")
-
-                    # Also fix cases where LLM used wrong dataset but correct table name
-                    # Pattern: `project.wrong_dataset.table_name`
-                    wrong_dataset_pattern = regex_module.compile(
-                        rf'`{regex_module.escape(self.project_id)}\.(?!{regex_module.escape(self.dataset_id)})[^`]+\.{regex_module.escape(table_name)}`'
-                    )
-                    sql = wrong_dataset_pattern.sub(full_table, sql)
-
-                # Catch-all: Find any table reference with project ID that doesn't have correct dataset
-                # Pattern: `project.anything.anything` where dataset is wrong
-                def fix_all_malformed_tables(sql_str, project, correct_dataset, valid_tables):
-                    """Fix all malformed table references in the SQL"""
-                    # Find all backtick-quoted table references for this project
-                    pattern = rf'`{regex_module.escape(project)}\.([^`\.]+)\.([^`]+)`'
-                    matches = regex_module.findall(pattern, sql_str)
-
-                    logger.info(f"Checking malformed tables. Found patterns: {matches}, valid tables: {valid_tables[:5]}...")
-
-                    for dataset_part, table_part in matches:
-                        if dataset_part == correct_dataset:
-                            continue  # Already correct
-
-                        # Try to find which valid table this might be
-                        combined = f"{dataset_part}_{table_part}"
-                        logger.info(f"Checking combined name: {combined}")
-
-                        for valid_table in valid_tables:
-                            # Check various match conditions
-                            if (valid_table == combined or
-                                valid_table == table_part or
-                                valid_table.endswith(table_part) or
-                                combined.endswith(valid_table) or
-                                valid_table.replace('_', '') == f"{dataset_part}{table_part}".replace('_', '')):
-
-                                old_ref = f"`{project}.{dataset_part}.{table_part}`"
-                                new_ref = f"`{project}.{correct_dataset}.{valid_table}`"
-                                logger.info(f"Replacing: {old_ref} -> {new_ref}")
-                                sql_str = sql_str.replace(old_ref, new_ref)
-                                break
-
-                    return sql_str
-
                 # Get ALL available tables, not just the ones selected as relevant
                 all_available_tables = self.list_tables()
                 valid_table_names = all_available_tables if all_available_tables else [s['table_name'] for s in schemas]
-                sql = fix_all_malformed_tables(sql, self.project_id, self.dataset_id, valid_table_names)
-
-                # Final catch-all: Replace any `project.wrong_dataset.valid_table` with correct dataset
-                for table_name in valid_table_names:
-                    correct_ref = f"`{self.project_id}.{self.dataset_id}.{table_name}`"
-                    # Pattern: `project.anything.table_name` where anything != correct_dataset
-                    wrong_dataset_pattern = regex_module.compile(
-                        rf'`{regex_module.escape(self.project_id)}\.([^`\.]+)\.{regex_module.escape(table_name)}`'
-                    )
-                    for match in wrong_dataset_pattern.finditer(sql):
-                        wrong_dataset = match.group(1)
-                        if wrong_dataset != self.dataset_id:
-                            old_ref = match.group(0)
-                            sql = sql.replace(old_ref, correct_ref)
-                            logger.info(f"Fixed wrong dataset: {old_ref} -> {correct_ref}")
-
-                # CRITICAL: Validate all table names in SQL and replace invalid ones with default
-                def replace_invalid_tables(sql_str, project, dataset, valid_tables, default_table='dataset_25m_table'):
-                    """Replace any invalid table names with the default table"""
-                    pattern = rf'`{regex_module.escape(project)}\.{regex_module.escape(dataset)}\.([^`]+)`'
-                    matches = regex_module.findall(pattern, sql_str)
-
-                    for table_name in matches:
-                        if table_name not in valid_tables:
-                            old_ref = f"`{project}.{dataset}.{table_name}`"
-                            new_ref = f"`{project}.{dataset}.{default_table}`"
-                            logger.warning(f"Invalid table '{table_name}' not in valid tables, replacing with default: {old_ref} -> {new_ref}")
-                            sql_str = sql_str.replace(old_ref, new_ref)
-
-                    return sql_str
-
-                sql = replace_invalid_tables(sql, self.project_id, self.dataset_id, valid_table_names)
-
-                for schema in schemas:
-                    table_name = schema['table_name']
-                    full_table = f"`{self.project_id}.{self.dataset_id}.{table_name}`"
-
-                    # Skip if already fully qualified
-                    if full_table in sql:
-                        continue
-
-                    # Replace backtick-quoted table name
-                    sql = sql.replace(f"`{table_name}`", full_table)
-
-                    # Replace FROM table_name (with word boundary to avoid partial matches)
-                    sql = regex_module.sub(
-                        rf'\bFROM\s+{regex_module.escape(table_name)}\b',
-                        f'FROM {full_table}',
-                        sql,
-                        flags=regex_module.IGNORECASE
-                    )
-
-                    # Replace JOIN table_name
-                    sql = regex_module.sub(
-                        rf'\bJOIN\s+{regex_module.escape(table_name)}\b',
-                        f'JOIN {full_table}',
-                        sql,
-                        flags=regex_module.IGNORECASE
-                    )
-
-                # Add LIMIT if not present (default 1000 to balance cost vs usability)
-                if "LIMIT" not in sql.upper() and "SELECT" in sql.upper():
-                    sql = sql.rstrip(';') + " LIMIT 1000;"
+                rewrite = rewrite_sql(sql, self._rewrite_context([s['table_name'] for s in schemas], valid_table_names))
+                sql = rewrite.sql
+                result["rewrite"] = rewrite.to_dict()
+                if "add_limit" in rewrite.fired:
                     result["limit_added"] = True
 
-                # CRITICAL: Remove CURRENT_DATE() based filtering - data has fixed date range
-                sql = self._fix_current_date_queries(sql)
-                logger.info(f"After _fix_current_date_queries - contains CURRENT_DATE: {'CURRENT_DATE' in sql.upper()}")
-
-                # CRITICAL: Force correct project/dataset in case LLM hallucinated different ones
-                # This catches cases like `arizona-poc.project_ops.table` and fixes to correct dataset
-                sql = self._enforce_correct_dataset(sql)
-
-                # Remove LOWER() from SELECT columns - preserves original text case
-                sql = self._remove_lower_from_select(sql)
-
-                # Add null filters for identifier columns (safety net)
-                sql = self._add_null_filters_for_identifiers(sql)
-
                 # VALIDATION: Check for invented/placeholder table names
                 logger.info(f"Validating SQL for placeholder tables. SQL preview: {sql[:200]}...")
                 invented_patterns = [
@@ -1839,226 +1119,25 @@ class BigQuerySQLGenerator:
         - Percentage formatting (X.XX%) for percentage/ratio columns
         - Comma separators for large numbers (quantity, count)
         - Preserves ID/code columns as strings
-        """
-        if value is None:
-            return None
-
-        # Convert to string if needed
-        str_value = str(value)
-
-        # Check if it's already formatted (has $ or %)
-        if str_value.startswith('$') or str_value.endswith('%'):
-            # Fix double %% even in pre-formatted values
-            if '%%' in str_value:
-                str_value = str_value.replace('%%', '%')
-            return str_value
-
-        column_lower = column_name.lower()
-
-        # SAP field names - always preserve as-is (never add commas or $)
-        import re
-        sap_fields = re.compile(
-            r'^(lifnr|belnr|ebeln|ebelp|bukrs|gjahr|matnr|werks|ekorg|banfn|bnfpo|'
-            r'mblnr|vbeln|posnr|kunnr|kostl|prctr|saknr|hkont|augbl|augdt|aedat|'
-            r'erdat|cpudt|budat|bldat|xblnr|zuonr|awkey|racct|ekgrp|waers|zterm|'
-            r'mandt|spras|zeile|kdauf|vgbel|vgpos|bsart|lfart|statu|reguh|regup)$',
-            re.IGNORECASE
-        )
-        if sap_fields.match(column_lower):
-            return str_value
-
-        # ID/Code/Year columns - preserve as-is (don't format as numbers)
-        # Use word-boundary-aware checks for short keywords to avoid false matches
-        preserve_keywords = [
-            'customer', '_id', 'code', 'sku', 'material', 'product_code',
-            'order', 'document', 'reference', '_key', '_number', '_no',
-            'account', 'gl_', 'segment', 'channel', 'region', 'territory',
-            'year', 'fiscal_year', 'fiscal_month', 'fiscal_period', 'calendar_year',
-            'posting_date', 'invoice_date', 'due_date', 'payment_date',
-            'created_date', 'modified_date',
-            'name', 'description', 'category', '_type', '_status',
-            'product', 'brand', 'supplier', 'distributor',
-            'employee', 'manager', 'owner'
-        ]
-        for kw in preserve_keywords:
-            if kw in column_lower:
-                return str_value  # Return as-is, preserve original format
-
-        # Try to parse as number
-        try:
-            # Remove any existing commas
-            clean_value = str_value.replace(',', '')
-            num_value = float(clean_value)
-        except (ValueError, TypeError):
-            return str_value  # Return as-is if not a number
-
-        # Currency columns - format as $X,XXX.XX
-        # NOTE: 'total' removed to avoid matching total_invoices, total_vendors etc.
-        # Quantity keywords (checked first) override currency for count-like columns.
-        currency_keywords = [
-            'revenue', 'sales', 'cost', 'margin', 'price', 'amount',
-            'gross', 'net', 'profit', 'expense', 'fee',
-            'cogs', 'cogm', 'cos', 'value', 'income', 'earning',
-            'payment', 'charge', 'discount', 'rebate', 'allowance',
-            'difference', 'delta', 'variance', 'budget', 'actual',
-            'spend', 'expenditure', 'liability', 'asset', 'balance',
-            'debit', 'credit', 'freight', 'outflow', 'accrual',
-            'shipping', 'handling', 'tax', 'duty', 'tariff',
-            'invoice_amount', 'billing_amount',
-        ]
-
-        # Percentage columns - already formatted or need % suffix
-        percentage_keywords = [
-            'percent', 'pct', 'ratio', 'rate', 'growth', 'change',
-            'margin_pct', 'margin_percent', 'percentage', 'yoy', 'mom',
-            'qoq', 'wow', 'contribution', 'share', 'proportion',
-            'utilization', 'efficiency', 'yield', 'conversion'
-        ]
 
-        # Quantity columns - just add comma separators, no decimals
-        quantity_keywords = [
-            'count', 'quantity', 'qty', 'units', 'items', 'rows',
-            'num_', '_num', 'total_count', 'sold', 'ordered',
-            'shipped', 'delivered', 'cases', 'volume',
-            'total_invoices', 'total_vendors', 'total_pos', 'total_orders',
-            'invoices_processed', 'invoices_above', 'invoices_below',
-            'matched_lines', 'po_lines', 'line_items',
-            '_processed', '_matched', 'num_invoices', 'num_vendors',
-            'invoice_count', 'vendor_count', 'order_count', 'po_count',
-            'days_late', 'days_early', 'days_to_', 'processing_days',
-            'cycle_days', 'avg_days', 'min_days', 'max_days',
-            'cycle_time', 'processing_time'
-        ]
-
-        # Priority order: percentage -> quantity -> currency
-        # This ensures 'margin_percentage' is percentage, 'quantity_sold' is quantity
-
-        # 1. Check for percentage columns FIRST
-        is_percentage = False
-        for kw in percentage_keywords:
-            if kw in column_lower:
-                is_percentage = True
-                break
-
-        if is_percentage:
-            # If value is already a percentage (e.g., "43.5%"), return as-is
-            if '%' in str_value:
-                return str_value
-            # If value is a ratio (0-1), multiply by 100
-            if -1 <= num_value <= 1 and 'ratio' in column_lower:
-                return f"{num_value * 100:,.2f}%"
-            # Otherwise just add % suffix
-            return f"{num_value:,.2f}%"
-
-        # 2. Check for quantity columns (before currency to avoid 'total_quantity' being currency)
-        is_quantity = False
-        for kw in quantity_keywords:
-            if kw in column_lower:
-                is_quantity = True
-                break
-
-        if is_quantity:
-            # Format with commas, no decimals for whole numbers, 2 decimals otherwise
-            if num_value == int(num_value):
-                return f"{int(num_value):,}"
-            return f"{num_value:,.2f}"
-
-        # 3. Check for currency columns (only if not percentage or quantity)
-        for kw in currency_keywords:
-            if kw in column_lower:
-                # Format as currency with $ and commas
-                if num_value < 0:
-                    return f"-${abs(num_value):,.2f}"
-                return f"${num_value:,.2f}"
-
-        # Default: if it's a large number, add commas but keep decimals
-        if abs(num_value) >= 1000:
-            if num_value == int(num_value):
-                return f"{int(num_value):,}"
-            return f"{num_value:,.2f}"
-
-        # Small numbers - return with 2 decimal places if has decimals
-        if num_value != int(num_value):
-            return f"{num_value:.2f}"
-
-        return str_value
+        The column's rules are decided once per column name (see src.core.result_formatter).
+        """
+        return column_format(column_name).format_value(value)
 
     def _clean_value(self, value: Any, column_name: str) -> Any:
         """Pre-process cleanup for known formatting issues before _format_value."""
-        if value is None:
-            return None
-
-        str_value = str(value)
-        column_lower = column_name.lower()
-
-        # 1. Fix relativedelta serialization: "relativedelta(days=+45)" → 45
-        if 'relativedelta' in str_value:
-            import re
-            match = re.search(r'days=\+?(-?\d+)', str_value)
-            if match:
-                return int(match.group(1))
-            # Try months
-            match = re.search(r'months=\+?(-?\d+)', str_value)
-            if match:
-                return int(match.group(1))
-            return str_value
-
-        # 2. Fix double %% → single %
-        if '%%' in str_value:
-            str_value = str_value.replace('%%', '%')
-
-        # 3. Remove $ from count/quantity columns (SQL sometimes incorrectly adds it)
-        count_indicators = ['count', 'qty', 'quantity', 'units', 'items', 'num_invoices',
-                           'num_vendors', 'num_orders', 'total_invoices', 'total_vendors',
-                           'total_pos', 'total_orders', 'invoice_count', 'vendor_count',
-                           'order_count', 'po_count', 'num_', '_count',
-                           'invoices_processed', 'invoices_above', 'invoices_below',
-                           'matched_lines', 'po_lines', 'line_items', '_processed']
-        is_count_col = any(ind in column_lower for ind in count_indicators)
-        if is_count_col and str_value.startswith('$'):
-            str_value = str_value[1:].strip()
-            # Try to convert to integer if it's a whole number
-            try:
-                clean = str_value.replace(',', '')
-                num = float(clean)
-                if num == int(num):
-                    return f"{int(num):,}"
-                return str_value
-            except (ValueError, TypeError):
-                pass
-
-        # 4. Round excessive decimals in raw numeric strings
-        if str_value and not str_value.startswith('$') and '%' not in str_value:
-            try:
-                clean = str_value.replace(',', '')
-                num = float(clean)
-                # If more than 2 decimal places, round to 2
-                if '.' in clean and len(clean.split('.')[1]) > 2:
-                    return round(num, 2)
-            except (ValueError, TypeError):
-                pass
-
-        return str_value
+        return column_format(column_name).clean_value(value)
 
     def _format_results(self, results: List[Dict[str, Any]], columns: List[str]) -> List[Dict[str, Any]]:
-        """Format all result values based on column names."""
-        if not results:
-            return results
-
-        formatted_results = []
-        for row in results:
-            formatted_row = {}
-            for col in columns:
-                value = row.get(col)
-                # Pre-process cleanup first, then format
-                cleaned = self._clean_value(value, col)
-                formatted_row[col] = self._format_value(cleaned, col)
-            formatted_results.append(formatted_row)
-
-        return formatted_results
+        """Format all result values based on column names, column by column."""
+        return get_format_plan(columns).format_rows(results)
 
-    def execute_sql(self, sql: str) -> Dict[str, Any]:
-        """Execute SQL query and return results"""
+    def _format_columnar(self, result: ColumnarResult) -> ColumnarResult:
+        """Format a columnar result column by column (same output as _format_results)."""
+        return get_format_plan(result.columns).format_columnar(result)
+
+    def execute_sql_columnar(self, sql: str) -> Dict[str, Any]:
+        """Execute SQL and keep the formatted result as Arrow columns under "result"."""
         try:
             logger.info(f"Executing BigQuery SQL: {sql[:100]}...")
 
@@ -2072,37 +1151,80 @@ class BigQuerySQLGenerator:
                     "error_type": "validation_error"
                 }
 
-            # Execute query
-            results = self.bq_client.execute_query(sql)
+            # Execute query as Arrow record batches
+            raw = self.bq_client.execute_query_arrow(sql)
 
-            # Format results
-            if results:
-                columns = list(results[0].keys()) if results else []
+            # Apply formatting to results (currency, percentages, etc.)
+            result = self._format_columnar(raw) if raw.num_rows else raw
 
-                # Apply formatting to results (currency, percentages, etc.)
-                formatted_results = self._format_results(results, columns)
+            return {
+                "success": True,
+                "result": result,
+                "columns": result.columns if raw.num_rows else [],
+                "row_count": raw.num_rows,
+                "sql": sql,
+                "bytes_processed": validation.get("total_bytes_processed"),
+                "estimated_cost_usd": validation.get("estimated_cost_usd"),
+                "fetch_stats": raw.stats
+            }
 
+        except Exception as e:
+            logger.error(f"Failed to execute BigQuery SQL: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "sql": sql,
+                "error_type": "execution_error"
+            }
+
+    def execute_sql(self, sql: str) -> Dict[str, Any]:
+        """Execute SQL query and return results"""
+        execution = self.execute_sql_columnar(sql)
+        if not execution.get("success"):
+            return execution
+
+        result = execution.pop("result")
+        execution.pop("fetch_stats", None)
+        if not execution["row_count"]:
+            return {
+                "success": True,
+                "data": [],
+                "columns": [],
+                "row_count": 0,
+                "sql": sql,
+                "message": "Query executed successfully but returned no results"
+            }
+
+        return {**execution, "data": result.to_pylist()}
+
+    def open_results(self, sql: str) -> Dict[str, Any]:
+        """
+        Validate and run SQL, returning a server-side result handle under "handle"
+        instead of the rows; pages are formatted with _format_results as they are read.
+        """
+        try:
+            logger.info(f"Opening BigQuery results for: {sql[:100]}...")
+
+            validation = self.bq_client.validate_query(sql)
+            if not validation.get("valid"):
                 return {
-                    "success": True,
-                    "data": formatted_results,
-                    "columns": columns,
-                    "row_count": len(results),
-                    "sql": sql,
-                    "bytes_processed": validation.get("total_bytes_processed"),
-                    "estimated_cost_usd": validation.get("estimated_cost_usd")
-                }
-            else:
-                return {
-                    "success": True,
-                    "data": [],
-                    "columns": [],
-                    "row_count": 0,
+                    "success": False,
+                    "error": validation.get("error", "Query validation failed"),
                     "sql": sql,
-                    "message": "Query executed successfully but returned no results"
+                    "error_type": "validation_error"
                 }
 
+            handle = get_result_handle_registry().open(self.bq_client.open_result_source(sql))
+            return {
+                "success": True,
+                "handle": handle,
+                "sql": sql,
+                "bytes_processed": validation.get("total_bytes_processed"),
+                "estimated_cost_usd": validation.get("estimated_cost_usd")
+            }
+
         except Exception as e:
-            logger.error(f"Failed to execute BigQuery SQL: {e}")
+            logger.error(f"Failed to open BigQuery results: {e}")
             return {
                 "success": False,
                 "error": str(e),
@@ -2110,8 +1232,14 @@ class BigQuerySQLGenerator:
                 "error_type": "execution_error"
             }
 
-    def generate_and_execute(self, query: str, max_tables: int = 5, max_retries: int = 2, conversation_context: Optional[List[str]] = None) -> Dict[str, Any]:
+    def generate_and_open(self, query: str, max_tables: int = 5, max_retries: int = 2, conversation_context: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Generate SQL and open a result handle for streaming or paging (same retry as generate_and_execute)"""
+        return self.generate_and_execute(query, max_tables, max_retries, conversation_context, executor=self.open_results)
+
+    def generate_and_execute(self, query: str, max_tables: int = 5, max_retries: int = 2, conversation_context: Optional[List[str]] = None,
+                             executor: Optional[Callable[[str], Dict[str, Any]]] = None) -> Dict[str, Any]:
         """Generate SQL from natural language and execute it with error retry"""
+        executor = executor or self.execute_sql
         # Generate SQL with conversation context
         generation_result = self.generate_sql(query, max_tables, conversation_context=conversation_context)
 
@@ -2121,7 +1249,7 @@ class BigQuerySQLGenerator:
         # Execute SQL
         sql = generation_result.get("sql")
         if sql:
-            execution_result = self.execute_sql(sql)
+            execution_result = executor(sql)
 
             # If execution failed with validation error, try to fix and retry
             retry_count = 0
@@ -2140,7 +1268,7 @@ class BigQuerySQLGenerator:
 
                 if fixed_sql and fixed_sql != sql:
                     sql = fixed_sql
-                    execution_result = self.execute_sql(sql)
+                    execution_result = executor(sql)
                     generation_result["sql"] = sql
                     generation_result["retry_count"] = retry_count + 1
                 else:
@@ -2202,14 +1330,9 @@ Return ONLY the corrected SQL, no explanation."""
             elif "```" in fixed_sql:
                 fixed_sql = fixed_sql.split("```")[1].split("```")[0].strip()
 
-            # Apply our syntax fixes
-            fixed_sql = self._fix_postgresql_syntax(fixed_sql)
-
-            # Force correct project/dataset in case LLM hallucinated different ones
-            fixed_sql = self._enforce_correct_dataset(fixed_sql)
-
-            # Fix CURRENT_DATE and CTE column name conflicts
-            fixed_sql = self._fix_current_date_queries(fixed_sql)
+            # Apply our syntax fixes, force the correct project/dataset and fix
+            # CURRENT_DATE and CTE column name conflicts
+            fixed_sql = rewrite_sql(fixed_sql, self._rewrite_context(), groups=("dialect", "dates", "tables")).sql
 
             logger.info("LLM provided SQL fix")
             return fixed_sql
@@ -2217,143 +1340,3 @@ Return ONLY the corrected SQL, no explanation."""
         except Exception as e:
             logger.warning(f"Failed to fix SQL with LLM: {e}")
             return None
-
-    def _enforce_correct_dataset(self, sql: str) -> str:
-        """Replace any wrong project/dataset references with correct ones"""
-        import re
-
-        # Pattern to find any backtick-quoted table reference
-        # Matches: `anything.anything.tablename`
-        pattern = r'`([^`\.]+)\.([^`\.]+)\.([^`]+)`'
-
-        def replace_with_correct(match):
-            project = match.group(1)
-            dataset = match.group(2)
-            table = match.group(3)
-
-            # If project or dataset is wrong, fix it
-            if project != self.project_id or dataset != self.dataset_id:
-                logger.info(f"Fixing wrong reference: {project}.{dataset}.{table} -> {self.project_id}.{self.dataset_id}.{table}")
-                return f"`{self.project_id}.{self.dataset_id}.{table}`"
-            return match.group(0)
-
-        fixed_sql = re.sub(pattern, replace_with_correct, sql)
-        return fixed_sql
-
-    def _remove_lower_from_select(self, sql: str) -> str:
-        """Remove LOWER() function from SELECT columns to preserve original text case.
-
-        This is important for display columns like customer names, product names, etc.
-        LOWER() should only be used in WHERE clauses for filtering, not in SELECT.
-        """
-        import re
-
-        original_sql = sql
-
-        # Find ALL SELECT statements in the query (including CTEs)
-        # We need to handle each SELECT...FROM block separately
-        def remove_lower_from_select_block(match):
-            select_keyword = match.group(1)  # SELECT or SELECT DISTINCT
-            columns = match.group(2)          # The column expressions
-            from_keyword = match.group(3)     # FROM
-
-            # Replace LOWER(column) with just column
-            cleaned = re.sub(
-                r'LOWER\s*\(\s*([a-zA-Z_][a-zA-Z0-9_]*(?:\.[a-zA-Z_][a-zA-Z0-9_]*)?)\s*\)',
-                r'\1',
-                columns,
-                flags=re.IGNORECASE
-            )
-            return select_keyword + cleaned + from_keyword
-
-        # Pattern to match SELECT ... FROM blocks (handles CTEs and subqueries)
-        pattern = r'(SELECT\s+(?:DISTINCT\s+)?)(.*?)(\s+FROM\s+)'
-        sql = re.sub(pattern, remove_lower_from_select_block, sql, flags=re.IGNORECASE | re.DOTALL)
-
-        if sql != original_sql:
-            logger.info("Removed LOWER() from SELECT columns to preserve text case")
-
-        return sql
-
-    def _add_null_filters_for_identifiers(self, sql: str) -> str:
-        """Add IS NOT NULL filters for identifier columns when missing.
-
-        This is a safety net to prevent null rows from appearing in results
-        when querying for customers, products, distributors, etc.
-        """
-        import re
-
-        original_sql = sql
-
-        # Key identifier columns that should always filter nulls when selected
-        identifier_columns = {
-            'Sold_to_Number': 'Sold_to_Number',
-            'Sold_to_Name': 'Sold_to_Name',
-            'customer_id': 'Sold_to_Number',
-            'customer_name': 'Sold_to_Name',
-            'Material': 'Material',
-            'Material_Description': 'Material_Description',
-            'Distributor': 'Distributor',
-            'Payer_Name': 'Payer_Name',
-            'Bill_to_Party_Name': 'Bill_to_Party_Name',
-        }
-
-        # Check if this is a DISTINCT query or GROUP BY query on identifier columns
-        is_distinct = bool(re.search(r'SELECT\s+DISTINCT', sql, re.IGNORECASE))
-        has_group_by = bool(re.search(r'GROUP\s+BY', sql, re.IGNORECASE))
-
-        if not (is_distinct or has_group_by):
-            return sql  # Only apply to listing/aggregation queries
-
-        # Find which identifier columns are in the SELECT
-        columns_to_filter = []
-        for col_alias, actual_col in identifier_columns.items():
-            # Check if column is in SELECT clause
-            select_pattern = rf'SELECT\s+.*?\b{re.escape(col_alias)}\b.*?FROM'
-            if re.search(select_pattern, sql, re.IGNORECASE | re.DOTALL):
-                # Check if NOT NULL filter already exists
-                null_pattern = rf'\b{re.escape(actual_col)}\s+IS\s+NOT\s+NULL'
-                if not re.search(null_pattern, sql, re.IGNORECASE):
-                    columns_to_filter.append(actual_col)
-
-        if not columns_to_filter:
-            return sql
-
-        # Remove duplicates while preserving order
-        columns_to_filter = list(dict.fromkeys(columns_to_filter))
-
-        # Build the null filter clause
-        null_filters = ' AND '.join([f'{col} IS NOT NULL' for col in columns_to_filter])
-
-        # Add to WHERE clause
-        if re.search(r'\bWHERE\b', sql, re.IGNORECASE):
-            # WHERE exists - add to it
-            # Find WHERE and add after it
-            sql = re.sub(
-                r'(\bWHERE\s+)',
-                rf'\1{null_filters} AND ',
-                sql,
-                count=1,
-                flags=re.IGNORECASE
-            )
-        else:
-            # No WHERE - add one before GROUP BY, ORDER BY, or LIMIT
-            for clause in ['GROUP BY', 'ORDER BY', 'LIMIT']:
-                pattern = rf'(\s+{clause}\b)'
-                if re.search(pattern, sql, re.IGNORECASE):
-                    sql = re.sub(
-                        pattern,
-                        rf' WHERE {null_filters}\1',
-                        sql,
-                        count=1,
-                        flags=re.IGNORECASE
-                    )
-                    break
-            else:
-                # No GROUP BY, ORDER BY, or LIMIT - add before trailing semicolon or at end
-                sql = sql.rstrip(';').rstrip() + f' WHERE {null_filters};'
-
-        if sql != original_sql:
-            logger.info(f"Added null filters for identifier columns: {columns_to_filter}")
-
-        return sql
@@ -350,7 +350,7 @@ class CacheManager:
     
     # Validation Caching
     
-    def cache_validation(self, sql: str, validation_result: Dict[str, Any]) -> None:
+    def cache_validation(self, sql: str, validation_result: Dict[str, Any], ttl: Optional[int] = None) -> None:
         """Cache SQL validation result."""
         key = self._generate_key(
             self.PREFIX_VALIDATION,
@@ -360,7 +360,7 @@ class CacheManager:
         try:
             self.redis.setex(
                 key,
-                self.TTL_VALIDATION,
+                ttl or self.TTL_VALIDATION,
                 json.dumps(validation_result)
             )
             
@@ -12,6 +12,7 @@ import json
 from src.core.sql_generator import SQLGenerator
 from src.utils.query_logger import QueryLogger
 from src.core.cache_manager import CacheManager
+from src.core.llm_governor import LLMPriority, llm_priority
 from src.core.financial_hierarchy import financial_hierarchy
 from src.config import settings
 
@@ -269,6 +270,7 @@ class SmartCacheWarmer:
         
         return queries
     
+    @llm_priority(LLMPriority.BACKGROUND)
     async def _execute_warming(self, queries: List[str]) -> Dict[str, Any]:
         """Execute cache warming for given queries."""
         results = {
@@ -293,8 +295,9 @@ class SmartCacheWarmer:
                     results["already_cached"] += 1
                     continue
                 
-                # Generate SQL (will be cached)
-                result = self.sql_generator.generate_sql(
+                # Generate SQL (will be cached); off the event loop so it can queue behind interactive calls
+                result = await asyncio.to_thread(
+                    self.sql_generator.generate_sql,
                     query,
                     use_vector_search=True,
                     force_refresh=True
@@ -0,0 +1,220 @@
+"""
+Concurrent batch PDF extraction.
+
+Each file goes through text extraction (CPU-bound, run in a process pool),
+optional template detection and an LLM extraction call (I/O-bound, run on the
+event loop behind a semaphore). Files are processed concurrently with a
+per-file timeout, and results are yielded as each file completes, followed by
+a batch summary with throughput and failure counts.
+"""
+
+import os
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+import structlog
+
+from .pdf_extraction import PdfExtractionService
+
+logger = structlog.get_logger()
+
+
+def _parse_pdf(pdf_path: str, cache_dir: str) -> Dict[str, Any]:
+    """Worker: extract PDF text inline (the batch already runs one file per process)."""
+    service = PdfExtractionService(cache_dir=cache_dir, max_workers=1)
+    result = service.extract(pdf_path)
+    return {
+        "text": result.full_text(),
+        "pages": result.page_count,
+        "sha256": result.sha256,
+        "cached": result.cached,
+    }
+
+
+class BatchExtractionPipeline:
+    """
+    Runs template extraction over many PDFs with bounded parse and LLM concurrency.
+
+    The LLM is reached over the Ollama ``/api/generate`` HTTP API at the
+    extractor's ``ollama_url``, so the pipeline can be pointed at a local stub
+    server for testing.
+    """
+
+    def __init__(
+        self,
+        extractor,
+        template_data: Dict[str, Any],
+        parse_executor: Optional[ProcessPoolExecutor] = None,
+        llm_concurrency: int = 4,
+        file_timeout: float = 600.0,
+        llm_timeout: float = 300.0,
+        max_retries: int = 3,
+        pdf_cache_dir: str = "/tmp/pdf_text_cache",
+    ):
+        """
+        Args:
+            extractor: TemplateAwareExtractor providing prompts, templates and the LLM endpoint
+            template_data: Template definition applied to every file (auto-detected per file
+                when it sets 'auto_detect' or has no required fields)
+            parse_executor: Process pool for PDF parsing (defaults to the shared pool)
+            llm_concurrency: Maximum LLM requests in flight
+            file_timeout: Seconds allowed per file, end to end
+            llm_timeout: Seconds allowed per LLM request
+            max_retries: Attempts per LLM request
+            pdf_cache_dir: Extraction cache shared with the PDF extraction service
+        """
+        self.extractor = extractor
+        self.template_data = template_data
+        self.parse_executor = parse_executor or get_parse_executor()
+        self.llm_concurrency = llm_concurrency
+        self.file_timeout = file_timeout
+        self.llm_timeout = llm_timeout
+        self.max_retries = max_retries
+        self.pdf_cache_dir = pdf_cache_dir
+
+    async def _query_llm(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, prompt: str) -> Optional[str]:
+        """Async equivalent of TemplateAwareExtractor.query_ollama."""
+        url = f"{self.extractor.ollama_url}/api/generate"
+        payload = {
+            "model": self.extractor.model,
+            "prompt": prompt,
+            "stream": False,
+            "temperature": 0.1
+        }
+        timeout = aiohttp.ClientTimeout(total=self.llm_timeout)
+
+        for attempt in range(self.max_retries):
+            try:
+                async with semaphore:
+                    async with session.post(url, json=payload, timeout=timeout) as response:
+                        response.raise_for_status()
+                        result = await response.json(content_type=None)
+                        return result.get("response", "")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries - 1:
+                    logger.warning(f"LLM request failed after {self.max_retries} attempts: {e}")
+                    return None
+                await asyncio.sleep(0.5 * (attempt + 1))
+        return None
+
+    async def _process_file(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        filename: str,
+        pdf_path: str,
+    ) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        timings = {}
+
+        started = time.perf_counter()
+        parsed = await loop.run_in_executor(self.parse_executor, _parse_pdf, pdf_path, self.pdf_cache_dir)
+        timings["parse_seconds"] = time.perf_counter() - started
+
+        text = parsed["text"]
+        if not text.strip():
+            raise ValueError("No text could be extracted from PDF")
+
+        template_data = self.template_data
+        llm_started = time.perf_counter()
+        if (template_data.get('auto_detect') or not template_data.get('required_fields')) and self.extractor.templates:
+            detected_type = self.extractor.classify_template(text, parsed["sha256"])
+            if not detected_type:
+                response = await self._query_llm(session, semaphore, self.extractor.create_detection_prompt(text))
+                detected_type = self.extractor.parse_detection_response(response) if response else None
+            if detected_type:
+                template_data = self.extractor.templates[detected_type]
+
+        prompt = self.extractor.create_extraction_prompt(template_data, text)
+        response = await self._query_llm(session, semaphore, prompt)
+        timings["llm_seconds"] = time.perf_counter() - llm_started
+
+        extracted_data = self.extractor.parse_llm_response(response) if response else {"error": "No response"}
+        return {
+            "filename": filename,
+            "success": "error" not in extracted_data,
+            "data": extracted_data,
+            "template": template_data.get('name'),
+            "pages": parsed["pages"],
+            "cached_text": parsed["cached"],
+            **{key: round(value, 3) for key, value in timings.items()},
+        }
+
+    async def _run_one(self, session, semaphore, filename: str, pdf_path: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                self._process_file(session, semaphore, filename, pdf_path),
+                timeout=self.file_timeout
+            )
+        except asyncio.TimeoutError:
+            result = {"filename": filename, "success": False, "timed_out": True,
+                      "error": f"Timed out after {self.file_timeout}s"}
+        except Exception as e:
+            result = {"filename": filename, "success": False, "error": str(e)}
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    async def run(self, files: List[Tuple[str, str]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process (filename, pdf_path) pairs concurrently.
+
+        Yields:
+            {"type": "result", "index": i, **result} for each file as it completes,
+            then {"type": "summary", ...} once the batch is done
+        """
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.llm_concurrency)
+        summary = {"total": len(files), "succeeded": 0, "failed": 0, "timed_out": 0, "pages": 0}
+
+        async with aiohttp.ClientSession() as session:
+            async def indexed(index: int, filename: str, pdf_path: str):
+                return index, await self._run_one(session, semaphore, filename, pdf_path)
+
+            tasks = [asyncio.ensure_future(indexed(i, name, path)) for i, (name, path) in enumerate(files)]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    index, result = await next_done
+                    if result["success"]:
+                        summary["succeeded"] += 1
+                    else:
+                        summary["failed"] += 1
+                    if result.get("timed_out"):
+                        summary["timed_out"] += 1
+                    summary["pages"] += result.get("pages", 0)
+                    yield {"type": "result", "index": index, **result}
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        elapsed = time.perf_counter() - started
+        summary.update({
+            "seconds": round(elapsed, 3),
+            "files_per_second": round(len(files) / elapsed, 2) if elapsed > 0 else 0.0,
+            "pages_per_second": round(summary["pages"] / elapsed, 1) if elapsed > 0 else 0.0,
+        })
+        logger.info("Batch extraction finished", **summary)
+        yield {"type": "summary", **summary}
+
+
+# Shared process pool for PDF parsing
+_parse_executor = None
+
+
+def get_parse_executor() -> ProcessPoolExecutor:
+    """Get or create the shared PDF parsing pool."""
+    global _parse_executor
+    if _parse_executor is None:
+        _parse_executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _parse_executor
+
+
+def shutdown_parse_executor():
+    """Stop the shared parsing pool, if it was started."""
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
@@ -0,0 +1,307 @@
+"""
+Retrieval index for multi-document Q&A.
+
+Documents are split into overlapping, page-tagged chunks at upload time and
+indexed for BM25 in SQLite (a postings table keyed by term), with an optional
+embedding vector per chunk. A question retrieves only the top-K chunks across
+the selected documents, so prompt size stays bounded no matter how many or
+how long the documents are.
+"""
+
+import re
+import math
+import heapq
+import sqlite3
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+
+from ..embeddings import EmbeddingProvider, HashingEmbeddings
+
+logger = structlog.get_logger()
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the
+this to was were will with what which who whom how when where why does do
+did can could should would there their they them these those than then
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric terms without stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def chunk_pages(
+    pages: Sequence[Tuple[Optional[int], str]],
+    chunk_chars: int = 1200,
+    overlap_chars: int = 200,
+) -> List[Tuple[Optional[int], str]]:
+    """
+    Split page texts into overlapping chunks that never cross a page boundary.
+
+    Args:
+        pages: (page_number, text) in document order
+        chunk_chars: Target chunk size
+        overlap_chars: Characters shared between consecutive chunks of a page
+
+    Returns:
+        (page_number, chunk_text) in document order
+    """
+    chunks = []
+    step = max(chunk_chars - overlap_chars, 1)
+    for page_number, text in pages:
+        text = text.strip()
+        start = 0
+        while start < len(text):
+            end = min(start + chunk_chars, len(text))
+            if end < len(text):
+                # Prefer to break on whitespace near the end of the window
+                split = text.rfind(" ", start + step, end)
+                if split > start:
+                    end = split
+            chunks.append((page_number, text[start:end]))
+            if end >= len(text):
+                break
+            start = max(end - overlap_chars, start + 1)
+    return chunks
+
+
+class DocumentRetrievalIndex:
+    """
+    BM25 + embedding index over document chunks, stored in SQLite.
+
+    Term statistics are computed over the documents selected for a question,
+    so scores are comparable across exactly the documents being asked about.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        embedding_provider: Optional[EmbeddingProvider] = None,
+        use_embeddings: bool = True,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        """
+        Args:
+            db_path: SQLite database file (shared with the document store)
+            embedding_provider: Chunk embedder (defaults to the offline HashingEmbeddings)
+            use_embeddings: Store and score chunk embeddings alongside BM25
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+        """
+        self.db_path = db_path
+        self.use_embeddings = use_embeddings
+        self.embedding_provider = embedding_provider or (HashingEmbeddings() if use_embeddings else None)
+        self.k1 = k1
+        self.b = b
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection that commits on success and always closes"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS retrieval_chunks (
+                    document_id TEXT NOT NULL,
+                    chunk_index INTEGER NOT NULL,
+                    page_number INTEGER,
+                    length INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    embedding BLOB,
+                    PRIMARY KEY (document_id, chunk_index)
+                );
+                CREATE TABLE IF NOT EXISTS retrieval_postings (
+                    term TEXT NOT NULL,
+                    document_id TEXT NOT NULL,
+                    chunk_index INTEGER NOT NULL,
+                    tf INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_postings_term ON retrieval_postings(term, document_id);
+                CREATE INDEX IF NOT EXISTS idx_postings_document ON retrieval_postings(document_id);
+            """)
+
+    def has_document(self, document_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM retrieval_chunks WHERE document_id = ? LIMIT 1", (document_id,)
+            ).fetchone()
+        return row is not None
+
+    def index_document(self, document_id: str, pages: Sequence[Tuple[Optional[int], str]]) -> int:
+        """
+        Chunk and index a document (replacing any previous index entries).
+
+        Returns:
+            Number of chunks indexed
+        """
+        chunks = chunk_pages(pages)
+        embeddings = None
+        if self.use_embeddings and chunks:
+            vectors = self.embedding_provider.generate_embeddings([text for _, text in chunks])
+            embeddings = [np.asarray(vector, dtype=np.float32).tobytes() for vector in vectors]
+
+        chunk_rows = []
+        posting_rows = []
+        for index, (page_number, text) in enumerate(chunks):
+            terms = Counter(tokenize(text))
+            chunk_rows.append((
+                document_id, index, page_number, sum(terms.values()), text,
+                embeddings[index] if embeddings else None,
+            ))
+            posting_rows.extend((term, document_id, index, tf) for term, tf in terms.items())
+
+        with self._connect() as conn:
+            conn.execute("DELETE FROM retrieval_postings WHERE document_id = ?", (document_id,))
+            conn.execute("DELETE FROM retrieval_chunks WHERE document_id = ?", (document_id,))
+            conn.executemany(
+                "INSERT INTO retrieval_chunks (document_id, chunk_index, page_number, length, text, embedding) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                chunk_rows,
+            )
+            conn.executemany(
+                "INSERT INTO retrieval_postings (term, document_id, chunk_index, tf) VALUES (?, ?, ?, ?)",
+                posting_rows,
+            )
+        return len(chunk_rows)
+
+    def remove_document(self, document_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM retrieval_postings WHERE document_id = ?", (document_id,))
+            conn.execute("DELETE FROM retrieval_chunks WHERE document_id = ?", (document_id,))
+
+    def _bm25_scores(self, conn, terms: List[str], document_ids: List[str]) -> Dict[Tuple[str, int], float]:
+        placeholders = ", ".join("?" * len(document_ids))
+        total, avg_length = conn.execute(
+            f"SELECT COUNT(*), AVG(length) FROM retrieval_chunks WHERE document_id IN ({placeholders})",
+            document_ids,
+        ).fetchone()
+        if not total or not terms:
+            return {}
+        avg_length = avg_length or 1.0
+
+        scores: Dict[Tuple[str, int], float] = {}
+        for term, query_tf in Counter(terms).items():
+            postings = conn.execute(
+                f"SELECT p.document_id, p.chunk_index, p.tf, c.length FROM retrieval_postings p "
+                f"JOIN retrieval_chunks c ON c.document_id = p.document_id AND c.chunk_index = p.chunk_index "
+                f"WHERE p.term = ? AND p.document_id IN ({placeholders})",
+                [term] + document_ids,
+            ).fetchall()
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for document_id, chunk_index, tf, length in postings:
+                key = (document_id, chunk_index)
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[key] = scores.get(key, 0.0) + query_tf * idf * tf * (self.k1 + 1) / norm
+        return scores
+
+    def _embedding_scores(self, conn, question: str, document_ids: List[str]) -> Dict[Tuple[str, int], float]:
+        query = np.asarray(self.embedding_provider.generate_embedding(question), dtype=np.float32)
+        query_norm = float(np.linalg.norm(query)) or 1.0
+        placeholders = ", ".join("?" * len(document_ids))
+        cursor = conn.execute(
+            f"SELECT document_id, chunk_index, embedding FROM retrieval_chunks "
+            f"WHERE document_id IN ({placeholders}) AND embedding IS NOT NULL",
+            document_ids,
+        )
+        scores = {}
+        while True:
+            rows = cursor.fetchmany(512)
+            if not rows:
+                break
+            matrix = np.stack([np.frombuffer(row["embedding"], dtype=np.float32) for row in rows])
+            if matrix.shape[1] != query.shape[0]:
+                continue  # indexed with a different provider
+            norms = np.linalg.norm(matrix, axis=1)
+            norms[norms == 0] = 1.0
+            similarities = matrix @ query / (norms * query_norm)
+            for row, similarity in zip(rows, similarities):
+                scores[(row["document_id"], row["chunk_index"])] = float(similarity)
+        return scores
+
+    def search(
+        self,
+        question: str,
+        document_ids: Sequence[str],
+        top_k: int = 8,
+        embedding_weight: float = 0.3,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-K chunks for a question across the given documents.
+
+        Args:
+            question: Natural-language question
+            document_ids: Documents to search
+            top_k: Number of chunks to return
+            embedding_weight: Share of the score from embedding similarity (0 = BM25 only)
+
+        Returns:
+            Chunks ordered by score, each with document_id, page_number, text and scores
+        """
+        document_ids = list(document_ids)
+        if not document_ids:
+            return []
+
+        with self._connect() as conn:
+            bm25 = self._bm25_scores(conn, tokenize(question), document_ids)
+            use_embeddings = self.use_embeddings and embedding_weight > 0
+            similarity = self._embedding_scores(conn, question, document_ids) if use_embeddings else {}
+
+            max_bm25 = max(bm25.values(), default=0.0) or 1.0
+            weight = embedding_weight if similarity else 0.0
+            combined = {
+                key: (1 - weight) * bm25.get(key, 0.0) / max_bm25 + weight * max(similarity.get(key, 0.0), 0.0)
+                for key in set(bm25) | set(similarity)
+            }
+            # Deterministic ordering: score, then document order
+            best = heapq.nlargest(top_k, combined.items(), key=lambda item: (item[1], -item[0][1], item[0][0]))
+
+            results = []
+            for (document_id, chunk_index), score in best:
+                if score <= 0:
+                    continue
+                row = conn.execute(
+                    "SELECT page_number, text FROM retrieval_chunks WHERE document_id = ? AND chunk_index = ?",
+                    (document_id, chunk_index),
+                ).fetchone()
+                results.append({
+                    "document_id": document_id,
+                    "chunk_index": chunk_index,
+                    "page_number": row["page_number"],
+                    "text": row["text"],
+                    "score": round(score, 4),
+                    "bm25": round(bm25.get((document_id, chunk_index), 0.0), 4),
+                    "similarity": round(similarity.get((document_id, chunk_index), 0.0), 4),
+                })
+        return results
+
+
+# Singleton instance
+_retrieval_index = None
+
+
+def get_retrieval_index() -> DocumentRetrievalIndex:
+    """Get or create the retrieval index, stored alongside the document store."""
+    global _retrieval_index
+    if _retrieval_index is None:
+        from .document_store import get_document_store
+        _retrieval_index = DocumentRetrievalIndex(get_document_store().db_path)
+    return _retrieval_index
@@ -11,15 +11,17 @@ from datetime import datetime, timezone
 import structlog
 import tempfile
 import mimetypes
-from pathlib import Path
 
 # Document processing libraries
-import pypdf
 import docx
 import pandas as pd
 from PIL import Image
 
 from ..llm_client import LLMClient
+from ..llm_governor import LLMPriority, llm_priority
+from .pdf_extraction import get_pdf_extraction_service
+from .document_store import get_document_store
+from .document_retrieval import get_retrieval_index
 
 logger = structlog.get_logger()
 
@@ -33,17 +35,25 @@ class DocumentService:
     }
     
     MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+
+    # Size of stored text chunks for non-paginated file types
+    TEXT_CHUNK_CHARS = 4000
+
+    # Chunks sent to the LLM per question, across all selected documents
+    QA_TOP_K = 8
     
     def __init__(self):
-        # Create upload directory
-        self.upload_dir = Path("/tmp/document_uploads")
-        self.upload_dir.mkdir(parents=True, exist_ok=True)
-        
-        # In-memory document store (in production, use a database)
-        self.documents = {}
+        # Persistent document store (SQLite metadata + content-addressed blobs)
+        self.store = get_document_store()
+
+        # BM25 + embedding index over page-tagged chunks for Q&A
+        self.retrieval_index = get_retrieval_index()
         
         # Initialize LLM client
         self.llm_client = LLMClient()
+
+        # Parallel, hash-cached PDF text extraction
+        self.pdf_extractor = get_pdf_extraction_service()
         
     def validate_file(self, filename: str, file_size: int) -> tuple[bool, str]:
         """Validate uploaded file."""
@@ -64,13 +74,7 @@ class DocumentService:
             ext = file_type.lower()
             
             if ext == 'pdf':
-                text = ""
-                with open(filepath, 'rb') as file:
-                    pdf_reader = pypdf.PdfReader(file)
-                    for page_num in range(len(pdf_reader.pages)):
-                        page = pdf_reader.pages[page_num]
-                        text += page.extract_text() + "\n"
-                return text
+                return self.pdf_extractor.extract(filepath).plain_text()
                 
             elif ext in ['doc', 'docx']:
                 doc = docx.Document(filepath)
@@ -105,16 +109,28 @@ class DocumentService:
             logger.error(f"Error extracting text from file: {e}")
             return f"[Error extracting content: {str(e)}]"
     
+    def extract_chunks_from_file(self, filepath: str, file_type: str) -> List[tuple]:
+        """Extract text as (page_number, text) chunks: one per PDF page, fixed-size slices otherwise."""
+        if file_type.lower() == 'pdf':
+            try:
+                pages = self.pdf_extractor.extract(filepath).pages
+                return [(page.page_number, page.text + "\n") for page in pages]
+            except Exception as e:
+                logger.error(f"Error extracting text from file: {e}")
+                return [(None, f"[Error extracting content: {str(e)}]")]
+
+        text = self.extract_text_from_file(filepath, file_type)
+        return [
+            (None, text[start:start + self.TEXT_CHUNK_CHARS])
+            for start in range(0, len(text), self.TEXT_CHUNK_CHARS)
+        ]
+
     def upload_document(self, file: BinaryIO, filename: str) -> Dict[str, Any]:
         """Upload and process a document."""
         try:
             # Generate unique document ID
             document_id = f"doc_{uuid.uuid4()}"
             
-            # Create safe filename
-            safe_filename = f"{document_id}_{filename}"
-            filepath = self.upload_dir / safe_filename
-            
             # Save file
             file_size = 0
             content = file.read()
@@ -125,44 +141,45 @@ class DocumentService:
             if not is_valid:
                 raise ValueError(message)
             
-            # Save to disk
-            with open(filepath, 'wb') as f:
-                f.write(content)
-            
             # Extract file type
             file_extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
 
+            # Save to disk as a content-addressed blob
+            blob_sha256, filepath = self.store.put_blob(content, file_extension)
+
             # Check if this is an image file
             is_image = file_extension in ['png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp']
 
-            # Extract text content for analysis
-            extracted_text = self.extract_text_from_file(str(filepath), file_extension)
+            # Extract text content for analysis, chunked by page
+            chunks = self.extract_chunks_from_file(str(filepath), file_extension)
+            preview = "".join(text for _, text in chunks[:2])[:1000]
 
             # Store document metadata
             doc_metadata = {
                 'document_id': document_id,
                 'filename': filename,
                 'filepath': str(filepath),
+                'blob_sha256': blob_sha256,
                 'size_bytes': file_size,
                 'upload_timestamp': datetime.now(timezone.utc).isoformat(),
                 'status': 'uploaded',
                 'mime_type': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
                 'file_type': file_extension,
-                'extracted_text': extracted_text[:1000],  # Store preview
-                'full_text': extracted_text,  # Store full text for analysis
+                'extracted_text': preview,  # Store preview
+                'page_count': sum(1 for page_number, _ in chunks if page_number is not None),
                 'is_image': is_image
             }
 
-            # Store raw image data for vision analysis
+            # Images are read back from the blob for vision analysis
             if is_image:
-                import base64
-                doc_metadata['image_data'] = base64.standard_b64encode(content).decode('utf-8')
                 doc_metadata['media_type'] = self._get_image_media_type(file_extension)
 
-            self.documents[document_id] = doc_metadata
+            self.store.add(doc_metadata, chunks)
+            if not is_image:
+                self.retrieval_index.index_document(document_id, chunks)
             
             logger.info(f"Document uploaded successfully: {document_id}")
-            return doc_metadata
+            return self.store.get(document_id)
             
         except Exception as e:
             logger.error(f"Failed to upload document: {e}")
@@ -170,37 +187,22 @@ class DocumentService:
     
     def list_documents(self) -> List[Dict[str, Any]]:
         """List all uploaded documents."""
-        # Return documents without full_text to reduce response size
-        docs = []
-        for doc in self.documents.values():
-            doc_copy = doc.copy()
-            doc_copy.pop('full_text', None)
-            doc_copy.pop('extracted_text', None)
-            docs.append(doc_copy)
+        # Metadata only; the text preview is dropped to reduce response size
+        docs = self.store.list()
+        for doc in docs:
+            doc.pop('extracted_text', None)
         return docs
     
     def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
         """Get document metadata by ID."""
-        doc = self.documents.get(document_id)
-        if doc:
-            doc_copy = doc.copy()
-            doc_copy.pop('full_text', None)  # Remove full text from response
-            return doc_copy
-        return None
+        return self.store.get(document_id)
     
     def delete_document(self, document_id: str) -> bool:
         """Delete a document."""
-        doc = self.documents.get(document_id)
-        if not doc:
+        # Removes metadata, text chunks, and the blob once no document shares it
+        if not self.store.delete(document_id):
             return False
-        
-        # Delete file from disk
-        filepath = Path(doc['filepath'])
-        if filepath.exists():
-            filepath.unlink()
-        
-        # Remove from store
-        del self.documents[document_id]
+        self.retrieval_index.remove_document(document_id)
         
         logger.info(f"Document deleted: {document_id}")
         return True
@@ -217,6 +219,20 @@ class DocumentService:
         }
         return media_types.get(file_extension.lower(), 'image/png')
 
+    def _retrieve_chunks(self, docs: List[Dict[str, Any]], question: str) -> List[Dict[str, Any]]:
+        """Top-K chunks for a question, indexing any documents stored before the index existed."""
+        for doc in docs:
+            if not self.retrieval_index.has_document(doc['document_id']):
+                pages = [(chunk['page_number'], chunk['text']) for chunk in self.store.iter_chunks(doc['document_id'])]
+                self.retrieval_index.index_document(doc['document_id'], pages)
+        return self.retrieval_index.search(question, [doc['document_id'] for doc in docs], top_k=self.QA_TOP_K)
+
+    def _load_image_data(self, document_id: str) -> str:
+        """Read an image blob from disk as base64 for the vision API."""
+        import base64
+        content = self.store.read_blob(document_id) or b''
+        return base64.standard_b64encode(content).decode('utf-8')
+
     def _compress_image_for_vision(self, image_data_b64: str, media_type: str, max_size_bytes: int = 3_500_000) -> tuple:
         """Compress image to fit within Claude's vision API limits.
 
@@ -294,7 +310,7 @@ class DocumentService:
         import base64
 
         try:
-            image_data = doc.get('image_data', '')
+            image_data = self._load_image_data(doc['document_id'])
             media_type = doc.get('media_type', 'image/png')
 
             # Compress image if needed for Claude's 5MB limit
@@ -426,20 +442,23 @@ Provide your response in JSON format:
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
 
+    @llm_priority(LLMPriority.BATCH)
     def analyze_document(self, document_id: str, analysis_type: str = 'comprehensive', options: Dict = None) -> Dict[str, Any]:
         """Analyze a document using Claude AI (with vision support for images)."""
-        doc = self.documents.get(document_id)
+        doc = self.store.get(document_id)
         if not doc:
             raise ValueError(f"Document {document_id} not found")
 
         is_image = doc.get('is_image', False)
 
         # For images, use vision API
-        if is_image and doc.get('image_data'):
+        if is_image:
             return self._analyze_image_document(doc, analysis_type)
 
-        # Get the full text content for non-image documents
-        text_content = doc.get('full_text', '')
+        # Truncate content if too long (Claude has token limits); only the
+        # chunks covering the first max_content_length characters are read
+        max_content_length = 8000
+        text_content = self.store.read_text(document_id, max_chars=max_content_length)
         if not text_content or len(text_content.strip()) < 10:
             return {
                 "document_id": document_id,
@@ -452,10 +471,8 @@ Provide your response in JSON format:
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
 
-        # Truncate content if too long (Claude has token limits)
-        max_content_length = 8000
-        if len(text_content) > max_content_length:
-            text_content = text_content[:max_content_length] + "\n\n[Content truncated for analysis]"
+        if doc['text_chars'] > max_content_length:
+            text_content = text_content + "\n\n[Content truncated for analysis]"
 
         try:
             # Prepare prompt based on analysis type
@@ -561,10 +578,10 @@ Provide your response in JSON format:
         text_docs = []
 
         for doc_id in document_ids:
-            doc = self.documents.get(doc_id)
+            doc = self.store.get(doc_id)
             if doc:
                 docs.append(doc)
-                if doc.get('is_image') and doc.get('image_data'):
+                if doc.get('is_image'):
                     image_docs.append(doc)
                 else:
                     text_docs.append(doc)
@@ -572,12 +589,13 @@ Provide your response in JSON format:
         if not docs:
             raise ValueError("No valid documents found")
 
+        citations = []
         try:
             # If we have image documents, use vision API
             if image_docs:
                 # Use vision for the first image document
                 img_doc = image_docs[0]
-                image_data = img_doc.get('image_data', '')
+                image_data = self._load_image_data(img_doc['document_id'])
                 media_type = img_doc.get('media_type', 'image/png')
 
                 vision_prompt = f"""Look at this image and answer the following question.
@@ -617,20 +635,31 @@ Provide your answer in JSON format:
                     ]
                 ).content[0].text
             else:
-                # Text-based Q&A for non-image documents
-                combined_content = ""
-                for doc in text_docs:
-                    combined_content += f"\n\n--- Document: {doc['filename']} ---\n"
-                    text_content = doc.get('full_text', '')[:4000]  # Limit per document
-                    combined_content += text_content
-
-                prompt = f"""Answer the following question based on the provided documents.
-If the answer cannot be found in the documents, say so clearly.
+                # Text-based Q&A: only the most relevant chunks are sent
+                filenames = {doc['document_id']: doc['filename'] for doc in text_docs}
+                retrieved = self._retrieve_chunks(text_docs, question)
+                excerpts = []
+                for chunk in retrieved:
+                    label = filenames[chunk['document_id']]
+                    if chunk['page_number'] is not None:
+                        label += f", page {chunk['page_number']}"
+                    excerpts.append(f"[{label}]\n{chunk['text']}")
+                    citations.append({
+                        "document_id": chunk['document_id'],
+                        "filename": filenames[chunk['document_id']],
+                        "page_number": chunk['page_number'],
+                        "score": chunk['score']
+                    })
+                combined_content = "\n\n".join(excerpts) or "[No relevant passages found]"
+
+                prompt = f"""Answer the following question based on the provided document excerpts.
+Each excerpt is labelled with its document and page; cite those labels in your sources.
+If the answer cannot be found in the excerpts, say so clearly.
 Also suggest 2-3 relevant follow-up questions.
 
 Documents provided: {', '.join([d['filename'] for d in docs])}
 
-Content:
+Excerpts:
 {combined_content}
 
 Question: {question}
@@ -639,7 +668,7 @@ Provide your answer in JSON format:
 {{
     "answer": "your detailed answer here",
     "confidence": 0.0-1.0,
-    "sources": ["relevant quotes or sections"],
+    "sources": ["[document, page N] relevant quote"],
     "follow_up_questions": ["question1", "question2", "question3"]
 }}"""
 
@@ -676,6 +705,7 @@ Provide your answer in JSON format:
             result.update({
                 "question": question,
                 "documents_used": [d['document_id'] for d in docs],
+                "citations": citations,
                 "timestamp": datetime.now(timezone.utc).isoformat()
             })
             
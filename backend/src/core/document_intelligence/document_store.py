@@ -0,0 +1,245 @@
+"""
+Persistent document store for document intelligence.
+
+Document metadata and page-chunked extracted text live in SQLite; uploaded
+files are kept as content-addressed blobs on local disk. Nothing is held in
+process memory, so every uvicorn worker sees the same documents and resident
+memory does not grow with the corpus.
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import structlog
+
+logger = structlog.get_logger()
+
+# Columns returned as document metadata (extracted text is never part of it)
+METADATA_COLUMNS = (
+    "document_id", "filename", "filepath", "blob_sha256", "size_bytes",
+    "upload_timestamp", "status", "mime_type", "file_type", "is_image",
+    "media_type", "page_count", "text_chars", "chunk_count", "extracted_text",
+)
+
+
+class DocumentStore:
+    """
+    SQLite metadata plus content-addressed blob storage.
+
+    Blobs are stored once per SHA-256 under ``blob_dir/ab/<sha256>.<ext>``;
+    identical re-uploads share a blob, which is removed when its last
+    document is deleted. Extracted text is stored as ordered chunks (one per
+    PDF page, fixed-size slices otherwise) and read lazily chunk by chunk.
+    """
+
+    def __init__(self, root_dir: Union[str, Path]):
+        self.root_dir = Path(root_dir)
+        self.blob_dir = self.root_dir / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(self.root_dir / "documents.sqlite3")
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection that commits on success and always closes"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    document_id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    filepath TEXT NOT NULL,
+                    blob_sha256 TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    upload_timestamp TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    mime_type TEXT,
+                    file_type TEXT,
+                    is_image INTEGER NOT NULL DEFAULT 0,
+                    media_type TEXT,
+                    page_count INTEGER NOT NULL DEFAULT 0,
+                    text_chars INTEGER NOT NULL DEFAULT 0,
+                    chunk_count INTEGER NOT NULL DEFAULT 0,
+                    extracted_text TEXT,
+                    extra TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_documents_blob ON documents(blob_sha256);
+                CREATE INDEX IF NOT EXISTS idx_documents_uploaded ON documents(upload_timestamp);
+                CREATE TABLE IF NOT EXISTS document_chunks (
+                    document_id TEXT NOT NULL,
+                    chunk_index INTEGER NOT NULL,
+                    page_number INTEGER,
+                    char_start INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (document_id, chunk_index)
+                );
+            """)
+
+    # ------------------------------------------------------------------
+    # Blobs
+    # ------------------------------------------------------------------
+
+    def blob_path(self, sha256: str, extension: str = "") -> Path:
+        suffix = f".{extension}" if extension else ""
+        return self.blob_dir / sha256[:2] / f"{sha256}{suffix}"
+
+    def put_blob(self, content: bytes, extension: str = "") -> Tuple[str, Path]:
+        """Write content under its SHA-256 (no-op if already stored)."""
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self.blob_path(sha256, extension)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return sha256, path
+
+    def read_blob(self, document_id: str) -> Optional[bytes]:
+        doc = self.get(document_id)
+        if not doc:
+            return None
+        with open(doc["filepath"], "rb") as f:
+            return f.read()
+
+    # ------------------------------------------------------------------
+    # Documents
+    # ------------------------------------------------------------------
+
+    def _row_to_metadata(self, row: sqlite3.Row) -> Dict[str, Any]:
+        doc = {column: row[column] for column in METADATA_COLUMNS}
+        doc["is_image"] = bool(doc["is_image"])
+        if row["extra"]:
+            doc.update(json.loads(row["extra"]))
+        return doc
+
+    def add(self, metadata: Dict[str, Any], chunks: Sequence[Tuple[Optional[int], str]]):
+        """
+        Insert a document and its text chunks.
+
+        Args:
+            metadata: Document fields (unknown keys are kept in an 'extra' JSON column)
+            chunks: (page_number, text) in document order
+        """
+        known = {key: metadata.get(key) for key in METADATA_COLUMNS}
+        extra = {key: value for key, value in metadata.items() if key not in METADATA_COLUMNS}
+
+        chunk_rows = []
+        position = 0
+        for index, (page_number, text) in enumerate(chunks):
+            chunk_rows.append((known["document_id"], index, page_number, position, text))
+            position += len(text)
+
+        known["is_image"] = 1 if known["is_image"] else 0
+        known["text_chars"] = position
+        known["chunk_count"] = len(chunk_rows)
+        known["page_count"] = known["page_count"] or 0
+
+        columns = list(METADATA_COLUMNS) + ["extra"]
+        values = [known[column] for column in METADATA_COLUMNS] + [json.dumps(extra) if extra else None]
+
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO documents ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values,
+            )
+            conn.executemany(
+                "INSERT INTO document_chunks (document_id, chunk_index, page_number, char_start, text) "
+                "VALUES (?, ?, ?, ?, ?)",
+                chunk_rows,
+            )
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Document metadata by ID (no extracted text beyond the preview)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+        return self._row_to_metadata(row) if row else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """All document metadata, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM documents ORDER BY upload_timestamp").fetchall()
+        return [self._row_to_metadata(row) for row in rows]
+
+    def delete(self, document_id: str) -> bool:
+        """Delete a document, its chunks, and its blob if no other document shares it."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT filepath, blob_sha256 FROM documents WHERE document_id = ?", (document_id,)
+            ).fetchone()
+            if not row:
+                return False
+            conn.execute("DELETE FROM document_chunks WHERE document_id = ?", (document_id,))
+            conn.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+            # The blob path includes the extension, so equal content uploaded as .pdf and .PDF
+            # (or .txt and .csv) is two blobs; only documents on the same path share one
+            shared = conn.execute(
+                "SELECT 1 FROM documents WHERE blob_sha256 = ? AND filepath = ? LIMIT 1",
+                (row["blob_sha256"], row["filepath"]),
+            ).fetchone()
+
+        if not shared:
+            filepath = Path(row["filepath"])
+            if filepath.exists():
+                filepath.unlink()
+        return True
+
+    # ------------------------------------------------------------------
+    # Text chunks
+    # ------------------------------------------------------------------
+
+    def iter_chunks(self, document_id: str, batch_size: int = 16) -> Iterator[Dict[str, Any]]:
+        """Yield text chunks in order, fetching a few rows at a time."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "SELECT chunk_index, page_number, char_start, text FROM document_chunks "
+                "WHERE document_id = ? ORDER BY chunk_index",
+                (document_id,),
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+
+    def read_text(self, document_id: str, max_chars: Optional[int] = None) -> str:
+        """Extracted text, reading only as many chunks as needed for max_chars."""
+        parts = []
+        remaining = max_chars
+        for chunk in self.iter_chunks(document_id):
+            text = chunk["text"]
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                text = text[:remaining]
+                remaining -= len(text)
+            parts.append(text)
+        return "".join(parts)
+
+
+# Singleton instance
+_document_store = None
+
+
+def get_document_store() -> DocumentStore:
+    """Get or create the shared document store."""
+    global _document_store
+    if _document_store is None:
+        from src.config import settings
+        _document_store = DocumentStore(settings.document_store_dir)
+    return _document_store
@@ -0,0 +1,149 @@
+"""
+Concurrent LLM extraction over document chunks.
+
+Chunk prompts are sent to an Ollama-compatible ``/api/generate`` endpoint
+over one pooled aiohttp session, with a parallelism limit and retry with
+exponential backoff. Responses come back in prompt order, and each response
+is cached on disk by prompt hash so a rerun only calls the LLM for chunks
+that have not finished before.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import aiohttp
+import structlog
+
+logger = structlog.get_logger()
+
+
+class ChunkExtractionRunner:
+    """Dispatches chunk prompts concurrently and caches each response."""
+
+    def __init__(
+        self,
+        ollama_url: str = "http://localhost:11434",
+        model: str = "qwen2.5:7b",
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_seconds: float = 1.0,
+        timeout: float = 600.0,
+        temperature: float = 0.1,
+        cache_dir: Optional[Union[str, Path]] = "/tmp/llm_chunk_cache",
+    ):
+        """
+        Args:
+            ollama_url: Base URL of the Ollama-compatible server
+            model: Model name sent with every request
+            max_concurrency: Maximum requests in flight
+            max_retries: Attempts per prompt
+            backoff_seconds: First retry delay; doubles on each further attempt
+            timeout: Seconds allowed per request
+            temperature: Sampling temperature sent with every request
+            cache_dir: Directory for cached responses (None disables caching)
+        """
+        self.ollama_url = ollama_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.temperature = temperature
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.stats: Dict[str, Any] = {}
+
+    def prompt_key(self, prompt: str) -> str:
+        """Cache key for a prompt under this runner's model and sampling settings."""
+        payload = json.dumps({"model": self.model, "temperature": self.temperature, "prompt": prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        return self.cache_dir / f"{key}.json" if self.cache_dir else None
+
+    def _read_cache(self, key: str) -> Optional[str]:
+        path = self._cache_path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["response"]
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable LLM chunk cache {path}: {e}")
+            return None
+
+    def _write_cache(self, key: str, response: str):
+        path = self._cache_path(key)
+        if path is None:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "response": response}, f)
+        os.replace(tmp_path, path)
+
+    async def _generate(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, index: int, prompt: str) -> Optional[str]:
+        key = self.prompt_key(prompt)
+        cached = self._read_cache(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "temperature": self.temperature
+        }
+        for attempt in range(self.max_retries):
+            try:
+                async with semaphore:
+                    self.stats["requests"] += 1
+                    async with session.post(f"{self.ollama_url}/api/generate", json=payload) as response:
+                        response.raise_for_status()
+                        result = await response.json(content_type=None)
+                if not isinstance(result, dict):
+                    raise ValueError(f"expected a JSON object, got {type(result).__name__}")
+                text = result.get("response", "")
+                self._write_cache(key, text)
+                return text
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries - 1:
+                    self.stats["failures"] += 1
+                    logger.warning(f"Chunk {index} failed after {self.max_retries} attempts: {e}")
+                    return None
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.backoff_seconds * (2 ** attempt))
+            except ValueError as e:
+                # Non-JSON or malformed response body; retrying the same prompt will not fix it
+                self.stats["failures"] += 1
+                logger.warning(f"Chunk {index} returned a malformed response: {e}")
+                return None
+        return None
+
+    async def run_async(self, prompts: List[str]) -> List[Optional[str]]:
+        """Send all prompts concurrently; responses are returned in prompt order (None on failure)."""
+        started = time.perf_counter()
+        self.stats = {"prompts": len(prompts), "requests": 0, "cache_hits": 0, "retries": 0, "failures": 0}
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            responses = await asyncio.gather(*[
+                self._generate(session, semaphore, index, prompt) for index, prompt in enumerate(prompts)
+            ])
+
+        self.stats["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info("Chunk extraction finished", **self.stats)
+        return list(responses)
+
+    def run(self, prompts: List[str]) -> List[Optional[str]]:
+        """Blocking wrapper around run_async for synchronous callers."""
+        return asyncio.run(self.run_async(prompts))
@@ -0,0 +1,322 @@
+"""
+Parallel page-level PDF text extraction with a content-hash disk cache.
+
+Pages are split into ranges and extracted in a process pool; results are
+assembled in page order with per-page character offsets. Extracted text and
+page layout are cached on local disk by the file's SHA-256, so re-uploads and
+repeated passes over the same invoice never re-parse the PDF.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import structlog
+
+try:
+    import pymupdf
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+try:
+    import pypdf
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+logger = structlog.get_logger()
+
+CACHE_FORMAT_VERSION = 1
+
+
+@dataclass
+class PdfPage:
+    """Text (and optional layout blocks) of a single page."""
+    page_number: int  # 1-based
+    text: str
+    width: Optional[float] = None
+    height: Optional[float] = None
+    # (x0, y0, x1, y1, text) per text block, when layout was extracted
+    blocks: Optional[List[Tuple[float, float, float, float, str]]] = None
+
+
+@dataclass
+class PdfExtractionResult:
+    """Extracted pages of one PDF plus extraction stats."""
+    sha256: str
+    engine: str
+    pages: List[PdfPage]
+    seconds: float = 0.0
+    cached: bool = False
+    page_offsets: List[int] = field(default_factory=list)
+    _full_text: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.page_count / self.seconds if self.seconds > 0 else 0.0
+
+    @staticmethod
+    def page_marker(page_number: int) -> str:
+        return f"\n--- Page {page_number} ---\n"
+
+    def full_text(self) -> str:
+        """All pages with '--- Page N ---' markers; page_offsets index into this string."""
+        if self._full_text is None:
+            parts = []
+            offsets = []
+            position = 0
+            for page in self.pages:
+                marker = self.page_marker(page.page_number)
+                parts.append(marker)
+                position += len(marker)
+                offsets.append(position)
+                parts.append(page.text)
+                position += len(page.text)
+            self._full_text = "".join(parts)
+            self.page_offsets = offsets
+        return self._full_text
+
+    def plain_text(self) -> str:
+        """All pages, each followed by a newline, without page markers."""
+        return "".join(page.text + "\n" for page in self.pages)
+
+    def page_range_text(self, start: int, end: int, markers: bool = True) -> str:
+        """Text of pages [start, end) by 0-based index, optionally with page markers."""
+        if markers:
+            return "".join(
+                self.page_marker(page.page_number) + page.text for page in self.pages[start:end]
+            )
+        return "".join(page.text for page in self.pages[start:end])
+
+    def page_for_offset(self, offset: int) -> int:
+        """1-based page number containing a character offset of full_text()."""
+        self.full_text()
+        page_number = 1
+        for index, page_offset in enumerate(self.page_offsets):
+            if page_offset > offset:
+                break
+            page_number = self.pages[index].page_number
+        return page_number
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sha256": self.sha256,
+            "engine": self.engine,
+            "pages": self.page_count,
+            "seconds": round(self.seconds, 4),
+            "pages_per_second": round(self.pages_per_second, 1),
+            "cached": self.cached,
+        }
+
+
+def sha256_file(path: Union[str, Path], block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _count_pages(path: str, engine: str) -> int:
+    if engine == "pymupdf":
+        with pymupdf.open(path) as doc:
+            return len(doc)
+    return len(pypdf.PdfReader(path).pages)
+
+
+def _extract_page_range(path: str, start: int, end: int, engine: str, include_layout: bool) -> List[Dict[str, Any]]:
+    """Worker: extract pages [start, end) from one open of the document."""
+    pages = []
+    if engine == "pymupdf":
+        with pymupdf.open(path) as doc:
+            for page_num in range(start, end):
+                page = doc[page_num]
+                entry = {"page_number": page_num + 1, "text": page.get_text()}
+                if include_layout:
+                    entry["width"] = page.rect.width
+                    entry["height"] = page.rect.height
+                    entry["blocks"] = [
+                        (b[0], b[1], b[2], b[3], b[4])
+                        for b in page.get_text("blocks")
+                        if b[6] == 0  # text blocks only
+                    ]
+                pages.append(entry)
+    else:
+        reader = pypdf.PdfReader(path)
+        for page_num in range(start, end):
+            page = reader.pages[page_num]
+            pages.append({
+                "page_number": page_num + 1,
+                "text": page.extract_text(),
+                "width": float(page.mediabox.width),
+                "height": float(page.mediabox.height),
+            })
+    return pages
+
+
+class PdfExtractionService:
+    """
+    Extracts PDF text page by page across a process pool, with a disk cache
+    keyed by file SHA-256 (plus engine and layout options).
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path] = "/tmp/pdf_text_cache",
+        max_workers: Optional[int] = None,
+        pages_per_task: int = 25,
+        parallel_threshold: int = 40,
+    ):
+        """
+        Args:
+            cache_dir: Directory for cached extractions (None disables caching)
+            max_workers: Pool size (defaults to CPU count)
+            pages_per_task: Pages extracted per worker task
+            parallel_threshold: Documents with fewer pages are extracted inline
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.parallel_threshold = parallel_threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _default_engine(self) -> str:
+        if PYMUPDF_AVAILABLE:
+            return "pymupdf"
+        if PYPDF_AVAILABLE:
+            return "pypdf"
+        raise RuntimeError("No PDF engine available: install pymupdf or pypdf")
+
+    def _cache_path(self, sha256: str, engine: str, include_layout: bool) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        layout = "layout" if include_layout else "text"
+        return self.cache_dir / f"{sha256}.{engine}.{layout}.v{CACHE_FORMAT_VERSION}.json"
+
+    def _read_cache(self, path: Optional[Path], sha256: str, engine: str) -> Optional[PdfExtractionResult]:
+        if path is None or not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            pages = [PdfPage(**page) for page in payload["pages"]]
+            return PdfExtractionResult(sha256=sha256, engine=engine, pages=pages, cached=True)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable PDF text cache {path}: {e}")
+            return None
+
+    def _write_cache(self, path: Optional[Path], result: PdfExtractionResult):
+        if path is None:
+            return
+        payload = {"version": CACHE_FORMAT_VERSION, "pages": [asdict(page) for page in result.pages]}
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write PDF text cache {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def extract(
+        self,
+        pdf_path: Union[str, Path],
+        engine: Optional[str] = None,
+        include_layout: Optional[bool] = None,
+    ) -> PdfExtractionResult:
+        """
+        Extract all pages of a PDF, serving repeated files from the cache.
+
+        Args:
+            pdf_path: PDF on local disk
+            engine: 'pymupdf' or 'pypdf' (defaults to pymupdf when installed)
+            include_layout: Also capture page size and text blocks (pymupdf only)
+
+        Returns:
+            PdfExtractionResult with pages in order
+        """
+        started = time.perf_counter()
+        path = str(pdf_path)
+        engine = engine or self._default_engine()
+        if include_layout is None:
+            include_layout = engine == "pymupdf"
+        if engine != "pymupdf":
+            include_layout = False
+
+        sha256 = sha256_file(path)
+        cache_path = self._cache_path(sha256, engine, include_layout)
+
+        cached = self._read_cache(cache_path, sha256, engine)
+        if cached is not None:
+            cached.seconds = time.perf_counter() - started
+            logger.info("PDF text served from cache", **cached.stats())
+            return cached
+
+        page_count = _count_pages(path, engine)
+        ranges = [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+
+        if page_count < self.parallel_threshold or self.max_workers <= 1:
+            page_dicts = _extract_page_range(path, 0, page_count, engine, include_layout)
+        else:
+            futures = [
+                self.executor.submit(_extract_page_range, path, start, end, engine, include_layout)
+                for start, end in ranges
+            ]
+            page_dicts = [page for future in futures for page in future.result()]
+
+        result = PdfExtractionResult(
+            sha256=sha256,
+            engine=engine,
+            pages=[PdfPage(**page) for page in page_dicts],
+            seconds=time.perf_counter() - started,
+        )
+        self._write_cache(cache_path, result)
+
+        logger.info("PDF text extracted", **result.stats())
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Singleton instance
+_pdf_extraction_service = None
+
+
+def get_pdf_extraction_service() -> PdfExtractionService:
+    """Get or create the shared PDF extraction service."""
+    global _pdf_extraction_service
+    if _pdf_extraction_service is None:
+        _pdf_extraction_service = PdfExtractionService()
+    return _pdf_extraction_service
+
+
+def shutdown_pdf_extraction_service():
+    """Stop the shared service's worker processes, if any were started."""
+    if _pdf_extraction_service is not None:
+        _pdf_extraction_service.shutdown()
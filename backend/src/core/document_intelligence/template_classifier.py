@@ -0,0 +1,247 @@
+"""
+Compiled template classifier for PDF extraction.
+
+All template keyword sets are compiled into one phrase table keyed by token
+n-grams. Classifying a document is a single pass over the tokens of its first
+pages with one dictionary lookup per n-gram, so the cost depends on the text
+length, not on how many templates are loaded. Results are cached per document
+SHA-256. Compiled classifiers are shared process-wide per template-library
+fingerprint, so extractors built per request reuse one classifier and its cache.
+"""
+
+import re
+import math
+import hashlib
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Explicit template keywords count more than phrases derived from field names
+KEYWORD_WEIGHT = 3.0
+FIELD_WEIGHT = 1.0
+
+
+# Compiled libraries kept at once (e.g. while templates are being edited)
+MAX_SHARED_CLASSIFIERS = 4
+
+
+def phrase_tokens(phrase: str) -> Tuple[str, ...]:
+    """Normalize a keyword or field name ('est_ship_date') to a token tuple."""
+    return tuple(TOKEN_PATTERN.findall(phrase.lower().replace("_", " ")))
+
+
+def library_fingerprint(templates: Dict[str, Dict[str, Any]]) -> str:
+    """Content hash of a template library."""
+    fingerprint_source = json.dumps(templates, sort_keys=True, default=str)
+    return hashlib.sha256(fingerprint_source.encode()).hexdigest()[:16]
+
+
+@dataclass
+class TemplateMatch:
+    """Best template for a document with its score breakdown."""
+    template_type: Optional[str]
+    coverage: float
+    confident: bool
+    scores: List[Tuple[str, float]] = field(default_factory=list)
+    matched: List[str] = field(default_factory=list)
+    cached: bool = False
+
+
+class TemplateClassifier:
+    """
+    Scores every template against a document in one pass.
+
+    Each template contributes its ``keywords`` (optional list in the template
+    JSON) plus phrases derived from its name, field names and item fields.
+    Phrases are weighted by inverse template frequency, so vocabulary shared
+    by every template ('date', 'total') counts for little. A template's
+    coverage is the weighted share of its phrases found in the document; ties
+    go to the template with more matched weight (the more specific one).
+    Templates with identical phrase sets are treated as one candidate.
+    """
+
+    def __init__(
+        self,
+        templates: Dict[str, Dict[str, Any]],
+        preferred: Iterable[str] = (),
+        min_coverage: float = 0.4,
+        sample_chars: int = 6000,
+        cache_size: int = 4096,
+    ):
+        """
+        Args:
+            templates: Template type -> template definition
+            preferred: Template types that win among identical duplicates
+            min_coverage: Minimum coverage for a confident match
+            sample_chars: Leading characters of the document that are scanned
+            cache_size: Number of per-document results kept
+        """
+        self.min_coverage = min_coverage
+        self.sample_chars = sample_chars
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], TemplateMatch]" = OrderedDict()
+        self._compile(templates, set(preferred))
+
+    def _template_phrases(self, template: Dict[str, Any]) -> Dict[Tuple[str, ...], float]:
+        phrases: Dict[Tuple[str, ...], float] = {}
+
+        def add(text: str, weight: float):
+            tokens = phrase_tokens(text)
+            if tokens:
+                phrases[tokens] = max(phrases.get(tokens, 0.0), weight)
+
+        for keyword in template.get("keywords") or []:
+            add(keyword, KEYWORD_WEIGHT)
+        add(template.get("name", ""), FIELD_WEIGHT)
+        for field_name in (template.get("required_fields") or []) + (template.get("optional_fields") or []):
+            add(field_name, FIELD_WEIGHT)
+        items_schema = template.get("items_schema") or {}
+        for field_name in (items_schema.get("required") or []) + (items_schema.get("optional") or []):
+            add(field_name, FIELD_WEIGHT)
+        return phrases
+
+    def _compile(self, templates: Dict[str, Dict[str, Any]], preferred: Set[str]):
+        # Collapse templates whose phrase sets are identical (copies of one template)
+        groups: Dict[frozenset, List[str]] = defaultdict(list)
+        template_phrases = {}
+        for template_type in sorted(templates):
+            phrases = self._template_phrases(templates[template_type])
+            template_phrases[template_type] = phrases
+            groups[frozenset(phrases.items())].append(template_type)
+
+        self.candidates: List[str] = []
+        self.aliases: Dict[str, List[str]] = {}
+        for members in groups.values():
+            members.sort(key=lambda name: (name not in preferred, name))
+            self.candidates.append(members[0])
+            self.aliases[members[0]] = members[1:]
+
+        # Inverse template frequency per phrase
+        template_count = len(self.candidates)
+        document_frequency: Dict[Tuple[str, ...], int] = defaultdict(int)
+        for candidate in self.candidates:
+            for phrase in template_phrases[candidate]:
+                document_frequency[phrase] += 1
+
+        # phrase -> [(candidate index, weight)]; one table for the whole library
+        self.phrase_table: Dict[Tuple[str, ...], List[Tuple[int, float]]] = defaultdict(list)
+        self.total_weight = [0.0] * template_count
+        for index, candidate in enumerate(self.candidates):
+            for phrase, base_weight in template_phrases[candidate].items():
+                idf = math.log(1 + template_count / document_frequency[phrase])
+                weight = base_weight * idf
+                self.phrase_table[phrase].append((index, weight))
+                self.total_weight[index] += weight
+        self.phrase_table = dict(self.phrase_table)
+        self.max_phrase_length = max((len(phrase) for phrase in self.phrase_table), default=1)
+
+        # Prefixes let the scan stop extending an n-gram as soon as nothing can match
+        self.prefixes = {phrase[:n] for phrase in self.phrase_table for n in range(1, len(phrase))}
+
+        self.fingerprint = library_fingerprint(templates)
+
+    def _scan(self, text: str) -> Set[Tuple[str, ...]]:
+        """Distinct known phrases occurring in the text."""
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        found = set()
+        phrase_table = self.phrase_table
+        prefixes = self.prefixes
+        for start in range(len(tokens)):
+            for end in range(start + 1, min(start + self.max_phrase_length, len(tokens)) + 1):
+                ngram = tuple(tokens[start:end])
+                if ngram in phrase_table:
+                    found.add(ngram)
+                if ngram not in prefixes:
+                    break
+        return found
+
+    def score(self, text: str) -> List[Tuple[str, float, float]]:
+        """(template_type, coverage, matched_weight) for every template, best first."""
+        return self._rank(self._scan(text[:self.sample_chars]))
+
+    def _rank(self, found: Set[Tuple[str, ...]]) -> List[Tuple[str, float, float]]:
+        matched_weight = [0.0] * len(self.candidates)
+        for phrase in found:
+            for index, weight in self.phrase_table[phrase]:
+                matched_weight[index] += weight
+
+        results = []
+        for index, candidate in enumerate(self.candidates):
+            total = self.total_weight[index]
+            coverage = matched_weight[index] / total if total else 0.0
+            results.append((candidate, coverage, matched_weight[index]))
+        results.sort(key=lambda item: (item[1], item[2]), reverse=True)
+        return results
+
+    def classify(self, text: str, doc_hash: Optional[str] = None) -> TemplateMatch:
+        """
+        Best-matching template for a document.
+
+        Args:
+            text: Extracted document text (only the first sample_chars are scanned)
+            doc_hash: Document SHA-256; repeated documents are served from the cache
+
+        Returns:
+            TemplateMatch; template_type is None when nothing matches confidently
+        """
+        cache_key = (doc_hash, self.fingerprint) if doc_hash else None
+        if cache_key and cache_key in self._cache:
+            self._cache.move_to_end(cache_key)
+            cached = self._cache[cache_key]
+            return TemplateMatch(**{**cached.__dict__, "cached": True})
+
+        found = self._scan(text[:self.sample_chars])
+        ranked = self._rank(found)
+        best_type, best_coverage, best_weight = ranked[0] if ranked else (None, 0.0, 0.0)
+        runner_up = ranked[1] if len(ranked) > 1 else (None, 0.0, 0.0)
+        confident = (
+            best_type is not None
+            and best_coverage >= self.min_coverage
+            and (best_coverage, best_weight) > (runner_up[1], runner_up[2])
+        )
+
+        match = TemplateMatch(
+            template_type=best_type if confident else None,
+            coverage=round(best_coverage, 4),
+            confident=confident,
+            scores=[(name, round(coverage, 4)) for name, coverage, _ in ranked[:3]],
+        )
+        if best_type is not None:
+            best_index = self.candidates.index(best_type)
+            match.matched = sorted(
+                " ".join(phrase) for phrase in found
+                if any(index == best_index for index, _ in self.phrase_table[phrase])
+            )
+
+        if cache_key:
+            self._cache[cache_key] = match
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return match
+
+
+_classifiers: "OrderedDict[Tuple[str, Tuple[str, ...]], TemplateClassifier]" = OrderedDict()
+_classifiers_lock = threading.Lock()
+
+
+def get_template_classifier(
+    templates: Dict[str, Dict[str, Any]],
+    preferred: Iterable[str] = (),
+) -> TemplateClassifier:
+    """Shared classifier for a template library, compiled once per library fingerprint."""
+    preferred = tuple(sorted(set(preferred)))
+    key = (library_fingerprint(templates), preferred)
+    with _classifiers_lock:
+        classifier = _classifiers.get(key)
+        if classifier is not None:
+            _classifiers.move_to_end(key)
+            return classifier
+        classifier = TemplateClassifier(templates, preferred=preferred)
+        _classifiers[key] = classifier
+        while len(_classifiers) > MAX_SHARED_CLASSIFIERS:
+            _classifiers.popitem(last=False)
+        return classifier
@@ -3,7 +3,10 @@ from abc import ABC, abstractmethod
 import structlog
 from openai import OpenAI
 import hashlib
+import math
+import re
 from src.config import settings
+from src.core.llm_governor import governed_client
 
 logger = structlog.get_logger()
 
@@ -35,7 +38,7 @@ class OpenAIEmbeddings(EmbeddingProvider):
         if not settings.openai_api_key:
             raise ValueError("OpenAI API key not configured")
         
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.client = governed_client(OpenAI(api_key=settings.openai_api_key), "openai")
         self.model = settings.openai_embedding_model
         self._dimension = 1536 if "text-embedding-3-small" in self.model else 3072
         logger.info(f"Initialized OpenAI embeddings with model: {self.model}")
@@ -105,6 +108,48 @@ class FallbackEmbeddings(EmbeddingProvider):
         return self._dimension
 
 
+class HashingEmbeddings(EmbeddingProvider):
+    """
+    Offline, deterministic bag-of-words embeddings.
+
+    Word tokens and word bigrams are hashed into signed buckets and the vector
+    is L2-normalized, so texts sharing vocabulary have high cosine similarity.
+    Unlike FallbackEmbeddings, similarity is meaningful, which makes this a
+    usable local stand-in for retrieval when no embedding API is available.
+    """
+
+    TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, dimension: int = 256):
+        self._dimension = dimension
+
+    def _bucket(self, feature: str) -> tuple:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self._dimension, 1.0 if (value >> 63) & 1 else -1.0
+
+    def generate_embedding(self, text: str) -> List[float]:
+        """Generate a hashed bag-of-words embedding."""
+        vector = [0.0] * self._dimension
+        tokens = self.TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            index, sign = self._bucket(feature)
+            vector[index] += sign
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for multiple texts."""
+        return [self.generate_embedding(text) for text in texts]
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+
 class EmbeddingService:
     """Service for managing embeddings with automatic fallback."""
     
@@ -0,0 +1,491 @@
+"""
+Background Job Engine
+Runs long CPU-bound jobs (CGS generation, workbook processing) in a process
+pool with a persistent SQLite job table, per-stage progress events,
+cancellation and idempotent resubmission by input hash.
+
+Every active job is leased to the engine that runs it. With several API
+worker processes sharing one job table, only the owner's heartbeat renews a
+lease, and another engine requeues a job only after its lease has expired.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import importlib
+import threading
+import traceback
+import structlog
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = structlog.get_logger()
+
+# Job lifecycle states
+PENDING = "pending"
+PROCESSING = "processing"
+COMPLETED = "completed"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (PENDING, PROCESSING)
+REUSABLE_STATES = (PENDING, PROCESSING, COMPLETED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when cancellation has been requested"""
+
+
+class JobStore:
+    """
+    SQLite-backed job table shared by the API process and pool workers.
+
+    Every call opens its own short-lived connection so the store is safe to
+    use from worker processes and threads; WAL mode lets readers poll status
+    while a worker writes progress.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Short-lived connection that commits on success and always closes"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    input_hash TEXT,
+                    status TEXT NOT NULL,
+                    phase TEXT,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    message TEXT,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    completed_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_input_hash ON jobs (job_type, input_hash);
+                CREATE TABLE IF NOT EXISTS job_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    phase TEXT,
+                    progress INTEGER,
+                    message TEXT,
+                    created_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events (job_id);
+            """)
+            # Lease columns were added after the first release of the table
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            if "lease_until" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL NOT NULL DEFAULT 0")
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"]) if job["params"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def create(self, job_id: str, job_type: str, target: str, params: Dict[str, Any],
+               input_hash: Optional[str], owner: Optional[str] = None,
+               lease_until: float = 0) -> Dict[str, Any]:
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO jobs (job_id, job_type, target, params, input_hash, status,
+                                     progress, message, created_at, owner, lease_until)
+                   VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)""",
+                (job_id, job_type, target, json.dumps(params), input_hash, PENDING,
+                 "Job queued for processing", datetime.now().isoformat(), owner, lease_until)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def find_by_input_hash(self, job_type: str, input_hash: str) -> Optional[Dict[str, Any]]:
+        """Most recent pending, running or completed job for the same inputs"""
+        placeholders = ",".join("?" for _ in REUSABLE_STATES)
+        with self._connect() as conn:
+            row = conn.execute(
+                f"""SELECT * FROM jobs
+                    WHERE job_type = ? AND input_hash = ? AND status IN ({placeholders})
+                    ORDER BY created_at DESC LIMIT 1""",
+                (job_type, input_hash, *REUSABLE_STATES)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list(self, job_type: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        query = "SELECT * FROM jobs"
+        args: Tuple = ()
+        if job_type:
+            query += " WHERE job_type = ?"
+            args = (job_type,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._connect() as conn:
+            rows = conn.execute(query, (*args, limit)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def list_active(self) -> List[Dict[str, Any]]:
+        placeholders = ",".join("?" for _ in ACTIVE_STATES)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs WHERE status IN ({placeholders}) ORDER BY created_at",
+                ACTIVE_STATES
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def claim_expired(self, owner: str, lease_until: float, now: float) -> List[Dict[str, Any]]:
+        """
+        Take over active jobs whose lease has expired (or that never had one).
+
+        The claim is a conditional UPDATE, so when several engines start at
+        once each job is claimed by exactly one of them.
+        """
+        claimed = []
+        for job in self.list_active():
+            if job["lease_until"] >= now:
+                continue
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    """UPDATE jobs SET owner = ?, lease_until = ?
+                       WHERE job_id = ? AND lease_until < ? AND status IN (?, ?)""",
+                    (owner, lease_until, job["job_id"], now, *ACTIVE_STATES)
+                )
+            if cursor.rowcount == 1:
+                claimed.append(job)
+        return claimed
+
+    def renew_leases(self, owner: str, job_ids: List[str], lease_until: float):
+        """Extend the leases this owner still holds"""
+        if not job_ids:
+            return
+        placeholders = ",".join("?" for _ in job_ids)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET lease_until = ? WHERE owner = ? AND job_id IN ({placeholders})",
+                (lease_until, owner, *job_ids)
+            )
+
+    def release_leases(self, owner: str, job_ids: List[str]):
+        """Expire this owner's leases so another engine can requeue the jobs right away"""
+        if not job_ids:
+            return
+        placeholders = ",".join("?" for _ in job_ids)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET lease_until = 0 WHERE owner = ? AND job_id IN ({placeholders})",
+                (owner, *job_ids)
+            )
+
+    def update(self, job_id: str, **fields):
+        if not fields:
+            return
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], default=str)
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def add_event(self, job_id: str, phase: str, progress: int, message: str):
+        """Record a progress event and mirror it onto the job row"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO job_events (job_id, phase, progress, message, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, phase, progress, message, datetime.now().isoformat())
+            )
+            conn.execute(
+                "UPDATE jobs SET phase = ?, progress = ?, message = ? WHERE job_id = ?",
+                (phase, progress, message, job_id)
+            )
+
+    def events(self, job_id: str, after_id: int = 0) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM job_events WHERE job_id = ? AND id > ? ORDER BY id",
+                (job_id, after_id)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def request_cancel(self, job_id: str):
+        self.update(job_id, cancel_requested=1)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def delete(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+
+def _resolve_target(target: str) -> Callable:
+    """Import a 'package.module:function' job target"""
+    module_name, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _execute_job(db_path: str, job_id: str, target: str, params: Dict[str, Any]):
+    """
+    Worker-process entry point.
+
+    The target is called as ``target(progress=callback, **params)`` and must
+    return a JSON-serializable dict. The progress callback records an event
+    and is also the cancellation checkpoint.
+    """
+    store = JobStore(db_path)
+
+    if store.is_cancel_requested(job_id):
+        store.update(job_id, status=CANCELLED, message="Job cancelled",
+                     completed_at=datetime.now().isoformat())
+        return
+
+    store.update(job_id, status=PROCESSING, started_at=datetime.now().isoformat())
+
+    def progress(phase: str, percent: int, message: str):
+        if store.is_cancel_requested(job_id):
+            raise JobCancelled(job_id)
+        store.add_event(job_id, phase, percent, message)
+
+    try:
+        result = _resolve_target(target)(progress=progress, **params)
+        store.update(
+            job_id,
+            status=COMPLETED,
+            progress=100,
+            message="Job completed successfully",
+            result=result or {},
+            completed_at=datetime.now().isoformat()
+        )
+    except JobCancelled:
+        store.update(job_id, status=CANCELLED, message="Job cancelled",
+                     completed_at=datetime.now().isoformat())
+    except Exception as e:
+        store.update(
+            job_id,
+            status=ERROR,
+            message=f"Error: {str(e)}",
+            error=traceback.format_exc(),
+            completed_at=datetime.now().isoformat()
+        )
+
+
+class JobEngine:
+    """
+    Local job execution engine.
+
+    Jobs run in a ProcessPoolExecutor, so heavy pandas/openpyxl work does not
+    hold the API process's GIL. State lives in the SQLite job table: status
+    survives restarts. Each engine holds a lease on the jobs it runs and
+    renews it from a heartbeat thread; jobs whose lease expired (their
+    engine stopped or crashed) are requeued by whichever engine claims them
+    first, on start or on a later heartbeat.
+    """
+
+    def __init__(self, db_path: str, max_workers: int = 2, lease_seconds: float = 60.0):
+        """
+        Args:
+            db_path: SQLite job table location
+            max_workers: Worker processes available to jobs
+            lease_seconds: How long a job stays owned by this engine without a heartbeat
+        """
+        self.store = JobStore(db_path)
+        self.max_workers = max_workers
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._shutting_down = False
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def start(self):
+        """Requeue jobs whose lease expired and start renewing this engine's leases"""
+        self._requeue_expired()
+        if self._heartbeat is None:
+            self._stop.clear()
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-engine-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _requeue_expired(self):
+        now = time.time()
+        for job in self.store.claim_expired(self.owner, now + self.lease_seconds, now):
+            if job["job_id"] in self._futures:
+                # Our own job whose lease lapsed before a late heartbeat: the claim renewed it
+                continue
+            if job["cancel_requested"]:
+                self.store.update(job["job_id"], status=CANCELLED, message="Job cancelled",
+                                  completed_at=datetime.now().isoformat())
+                continue
+            logger.info(f"Requeuing interrupted job {job['job_id']}")
+            self.store.update(job["job_id"], status=PENDING, message="Requeued after restart")
+            self._dispatch(job["job_id"], job["target"], job["params"])
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.store.renew_leases(self.owner, list(self._futures), time.time() + self.lease_seconds)
+                self._requeue_expired()
+            except Exception as e:
+                logger.warning(f"Job lease heartbeat failed: {e}")
+
+    def submit(
+        self,
+        job_type: str,
+        target: str,
+        params: Optional[Dict[str, Any]] = None,
+        input_hash: Optional[str] = None,
+        job_id: Optional[str] = None,
+        force: bool = False
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Submit a job, reusing an existing one for identical inputs
+
+        Args:
+            job_type: Job category, e.g. 'cgs'
+            target: 'package.module:function' run in a worker process
+            params: Keyword arguments for the target (JSON-serializable)
+            input_hash: Content hash of the job inputs for idempotent resubmission
+            job_id: Optional explicit job ID
+            force: Always create a new job even if the inputs match
+
+        Returns:
+            (job, created) - created is False when an existing job was returned
+        """
+        params = params or {}
+
+        if input_hash and not force:
+            existing = self.store.find_by_input_hash(job_type, input_hash)
+            if existing:
+                logger.info(f"Reusing job {existing['job_id']} for identical inputs")
+                return existing, False
+
+        job_id = job_id or f"{job_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        job = self.store.create(job_id, job_type, target, params, input_hash,
+                                owner=self.owner, lease_until=time.time() + self.lease_seconds)
+        self._dispatch(job_id, target, params)
+        return job, True
+
+    def _dispatch(self, job_id: str, target: str, params: Dict[str, Any]):
+        future = self.executor.submit(_execute_job, self.store.db_path, job_id, target, params)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+
+    def _on_done(self, job_id: str, future: Future):
+        self._futures.pop(job_id, None)
+        if self._shutting_down:
+            # Leave the row pending/processing so the next start requeues it
+            return
+        if future.cancelled():
+            self.store.update(job_id, status=CANCELLED, message="Job cancelled",
+                              completed_at=datetime.now().isoformat())
+        elif future.exception() is not None:
+            # The worker itself died (e.g. killed process) before recording a result
+            self.store.update(job_id, status=ERROR, message=f"Error: {future.exception()}",
+                              completed_at=datetime.now().isoformat())
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job. Queued jobs are dropped immediately; running jobs stop
+        at their next progress checkpoint.
+
+        Returns:
+            False if the job does not exist or has already finished
+        """
+        job = self.store.get(job_id)
+        if not job or job["status"] not in ACTIVE_STATES:
+            return False
+
+        self.store.request_cancel(job_id)
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def list(self, job_type: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        return self.store.list(job_type, limit)
+
+    def events(self, job_id: str, after_id: int = 0) -> List[Dict[str, Any]]:
+        return self.store.events(job_id, after_id)
+
+    def delete(self, job_id: str):
+        self.cancel(job_id)
+        self.store.delete(job_id)
+
+    def shutdown(self, wait: bool = False):
+        """Stop the worker pool; unfinished jobs are released for the next engine to requeue"""
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=5)
+            self._heartbeat = None
+        if self._executor is not None:
+            self._shutting_down = True
+            self.store.release_leases(self.owner, list(self._futures))
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            self._shutting_down = False
+
+
+# Singleton instance
+_job_engine = None
+
+
+def get_job_engine() -> JobEngine:
+    """Get or create the job engine singleton"""
+    global _job_engine
+    if _job_engine is None:
+        from src.config import settings
+        _job_engine = JobEngine(
+            db_path=settings.job_db_path,
+            max_workers=settings.job_workers,
+            lease_seconds=settings.job_lease_seconds
+        )
+        _job_engine.start()
+    return _job_engine
+
+
+def shutdown_job_engine():
+    """Shut down the job engine if it was started"""
+    global _job_engine
+    if _job_engine is not None:
+        _job_engine.shutdown()
+        _job_engine = None
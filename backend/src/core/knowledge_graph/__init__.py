@@ -33,6 +33,12 @@ try:
 except ImportError:
     pass
 
+try:
+    from .subgraph_traversal import SubgraphTraversalEngine, AdjacencyGraph
+    __all__.extend(["SubgraphTraversalEngine", "AdjacencyGraph"])
+except ImportError:
+    pass
+
 try:
     from .jena_client import JenaKnowledgeGraph
     __all__.append("JenaKnowledgeGraph")
@@ -0,0 +1,214 @@
+"""
+Column display-type classification for query results.
+
+Column names are classified by name-pattern rules first. Names no rule
+covers are embedded together in one batch and compared against a cached
+matrix of the known ColumnTypes vectors (cosine distance, as Weaviate
+computes it). Every result, including "no match", is memoized by column
+name and persisted, so a column that has been seen before costs one
+dictionary lookup.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import structlog
+
+logger = structlog.get_logger()
+
+# (display_type, name fragments, format_template); first matching rule wins
+PATTERN_RULES: List[Tuple[str, Tuple[str, ...], str]] = [
+    ("percentage", ('pct', 'percent', '%', 'ratio', 'rate', 'roi', 'roa', 'roe', 'roic'), "#.##%"),
+    ("currency", ('revenue', 'sales', 'amount', 'total', 'cost', 'margin', 'profit', 'price', 'fee',
+                  'income', 'expense'), "$#,##0.00"),
+    ("integer", ('quantity', 'qty', 'count', 'units', 'volume'), "#,##0"),
+    ("date", ('date', 'time', 'created', 'updated', 'period'), "YYYY-MM-DD"),
+]
+
+ReferenceLoader = Callable[[], Tuple[Sequence[Sequence[float]], List[Dict[str, Any]]]]
+BatchEmbedder = Callable[[List[str]], List[List[float]]]
+
+
+def match_pattern(column_name: str) -> Optional[Dict[str, Any]]:
+    """Rule-based type for a column name, or None when no rule applies."""
+    col_lower = column_name.lower()
+    for display_type, fragments, format_template in PATTERN_RULES:
+        if any(fragment in col_lower for fragment in fragments):
+            return {
+                "column_pattern": display_type,
+                "display_type": display_type,
+                "format_template": format_template,
+                "confidence": 1.0,
+                "source": "pattern",
+            }
+    return None
+
+
+class ColumnTypeClassifier:
+    """
+    Batch column classifier with a persistent name -> type memo.
+
+    The reference matrix is loaded lazily through ``load_references`` and
+    kept until refresh(); when its contents change, memoized semantic
+    results are discarded.
+    """
+
+    def __init__(
+        self,
+        embed_batch: BatchEmbedder,
+        load_references: ReferenceLoader,
+        memo_path: Optional[Union[str, Path]] = None,
+        max_distance: float = 0.4,
+    ):
+        """
+        Args:
+            embed_batch: Embeds a list of texts in one call
+            load_references: Returns (vectors, properties) for every known column type
+            memo_path: JSON file for the persistent memo (None keeps it in memory only)
+            max_distance: Maximum cosine distance for a semantic match
+        """
+        self.embed_batch = embed_batch
+        self.load_references = load_references
+        self.memo_path = Path(memo_path) if memo_path else None
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._references: List[Dict[str, Any]] = []
+        self._reference_version: Optional[str] = None
+        self.stats = {"memo_hits": 0, "pattern_matches": 0, "embedded": 0, "embedding_batches": 0}
+        self._memo_version, self._memo = self._load_memo()
+
+    def _load_memo(self) -> Tuple[Optional[str], Dict[str, Optional[Dict[str, Any]]]]:
+        if not self.memo_path or not self.memo_path.exists():
+            return None, {}
+        try:
+            with open(self.memo_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("reference_version"), data.get("columns", {})
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable column type memo {self.memo_path}: {e}")
+            return None, {}
+
+    def _save_memo(self):
+        if not self.memo_path:
+            return
+        try:
+            self.memo_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.memo_path.parent), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"reference_version": self._memo_version, "columns": self._memo}, f)
+            os.replace(tmp_path, self.memo_path)
+        except Exception as e:
+            logger.warning(f"Failed to save column type memo: {e}")
+
+    def _ensure_references(self) -> bool:
+        """Load the reference matrix once; returns False (and retries next time) when none is available."""
+        if self._matrix is not None:
+            return True
+
+        vectors, properties = self.load_references()
+        if not properties:
+            return False
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(properties), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1.0, norms)
+        self._matrix = matrix
+        self._references = properties
+        self._reference_version = hashlib.sha256(
+            json.dumps(properties, sort_keys=True, default=str).encode() + matrix.tobytes()
+        ).hexdigest()[:16]
+
+        if self._memo_version != self._reference_version:
+            # Semantic results were computed against other references; keep only rule results
+            self._memo = {name: match for name, match in self._memo.items()
+                          if match is not None and match.get("source") == "pattern"}
+            self._memo_version = self._reference_version
+        logger.info(f"Loaded {len(properties)} column type references")
+        return True
+
+    def refresh(self):
+        """Reload the reference matrix on next use."""
+        with self._lock:
+            self._matrix = None
+
+    def classify(self, column_names: Sequence[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Classify many columns; at most one embedding call for all unknown names.
+
+        Returns:
+            column name -> {column_pattern, display_type, format_template, confidence, source} or None
+        """
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        unknown: List[str] = []
+        memo_changed = False
+
+        with self._lock:
+            for name in dict.fromkeys(column_names):
+                key = name.lower()
+                if key in self._memo:
+                    self.stats["memo_hits"] += 1
+                    results[name] = self._memo[key]
+                    continue
+                match = match_pattern(name)
+                if match is not None:
+                    self.stats["pattern_matches"] += 1
+                    self._memo[key] = match
+                    memo_changed = True
+                    results[name] = match
+                else:
+                    unknown.append(name)
+
+            if unknown:
+                try:
+                    matches = self._classify_semantic(unknown)
+                except Exception as e:
+                    logger.error(f"Error classifying column types: {e}")
+                    matches = None
+                for index, name in enumerate(unknown):
+                    results[name] = matches[index] if matches is not None else None
+                if matches is not None:
+                    # Only memoize answers computed against real references
+                    self._memo.update((name.lower(), match) for name, match in zip(unknown, matches))
+                    memo_changed = True
+
+            if memo_changed:
+                self._save_memo()
+        return results
+
+    def _classify_semantic(self, names: List[str]) -> Optional[List[Optional[Dict[str, Any]]]]:
+        """Best reference per name, or None when no references are available."""
+        if not self._ensure_references():
+            return None
+
+        embeddings = np.asarray(self.embed_batch(names), dtype=np.float32)
+        self.stats["embedded"] += len(names)
+        self.stats["embedding_batches"] += 1
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms == 0, 1.0, norms)
+
+        similarities = embeddings @ self._matrix.T
+        best = similarities.argmax(axis=1)
+        matches: List[Optional[Dict[str, Any]]] = []
+        for row, index in enumerate(best):
+            distance = 1.0 - float(similarities[row, index])
+            if distance < self.max_distance:
+                reference = self._references[index]
+                matches.append({
+                    "column_pattern": reference["column_pattern"],
+                    "display_type": reference["display_type"],
+                    "format_template": reference["format_template"],
+                    "confidence": round(1.0 - distance, 6),
+                    "source": "semantic",
+                })
+            else:
+                matches.append(None)
+        return matches
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "memo_size": len(self._memo), "references": len(self._references)}
@@ -5,24 +5,31 @@ Resolves whether a person name is a surgeon or distributor.
 import os
 from typing import Optional, Dict, List, Tuple
 from rdflib import Graph, Namespace, Literal, URIRef
-from rdflib.namespace import RDF, RDFS
+from rdflib.namespace import RDF, RDFS, SKOS
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import structlog
 
+from .entity_index import EntityIndex
+
 logger = structlog.get_logger()
 
 # Define namespaces
 CSG = Namespace("http://mantrix.ai/ontology/csg#")
 DATA = Namespace("http://mantrix.ai/data/csg/")
 
+# Entity classes in increasing priority (distributors override surgeons on name conflicts)
+ENTITY_TYPES = {CSG.Surgeon: 'surgeon', CSG.Distributor: 'distributor'}
+NAME_PREDICATES = (CSG.personName, RDFS.label, SKOS.altLabel)
+
 
 class CSGEntityResolver:
     """Resolves entity types (surgeon vs distributor) using RDF knowledge graph."""
 
     def __init__(self):
         self.graph = None
-        self._entity_cache = {}  # Cache for quick lookups
+        self._index: Optional[EntityIndex] = None
+        self._index_version = None
         self._initialized = False
 
     def initialize(self, postgres_config: Dict):
@@ -42,8 +49,17 @@ class CSGEntityResolver:
         self._load_entities(postgres_config)
 
         self._initialized = True
+        index = self.get_index()
         logger.info(f"✅ Entity Resolver initialized with {len(self.graph)} triples")
-        logger.info(f"   Cached {len(self._entity_cache)} entities")
+        logger.info(f"   Indexed {index.entity_count} entities under {len(index)} labels")
+
+    def get_index(self) -> EntityIndex:
+        """Entity lookup index, rebuilt only when the graph changes."""
+        version = (id(self.graph), len(self.graph))
+        if self._index is None or self._index_version != version:
+            self._index = EntityIndex.from_graph(self.graph, ENTITY_TYPES, NAME_PREDICATES)
+            self._index_version = version
+        return self._index
 
     def _load_ontology(self):
         """Load the CSG ontology."""
@@ -90,17 +106,12 @@ class CSGEntityResolver:
             cursor.close()
             conn.close()
 
-            # Add to graph and cache
+            # Add to graph (the lookup index is built from it)
             for item in surgeons:
                 name = item['name']
                 uri = self._create_uri('surgeon', name)
                 self.graph.add((uri, RDF.type, CSG.Surgeon))
                 self.graph.add((uri, CSG.personName, Literal(name)))
-                self._entity_cache[name.lower()] = {
-                    'name': name,
-                    'type': 'surgeon',
-                    'uri': str(uri)
-                }
 
             for item in distributors:
                 name = item['name']
@@ -108,13 +119,6 @@ class CSGEntityResolver:
                 self.graph.add((uri, RDF.type, CSG.Distributor))
                 self.graph.add((uri, CSG.personName, Literal(name)))
 
-                # Add to cache (distributors override if name conflict)
-                self._entity_cache[name.lower()] = {
-                    'name': name,
-                    'type': 'distributor',
-                    'uri': str(uri)
-                }
-
             logger.info(f"Loaded {len(surgeons)} surgeons and {len(distributors)} distributors")
 
         except Exception as e:
@@ -141,32 +145,8 @@ class CSGEntityResolver:
             logger.warning("Entity resolver not initialized")
             return None
 
-        # Check cache first
-        cached = self._entity_cache.get(name.lower())
-        if cached:
-            return cached['type']
-
-        # Query the graph
-        surgeon_query = f"""
-            SELECT ?s WHERE {{
-                ?s a <{CSG.Surgeon}> .
-                ?s <{CSG.personName}> "{name}" .
-            }}
-        """
-
-        distributor_query = f"""
-            SELECT ?s WHERE {{
-                ?s a <{CSG.Distributor}> .
-                ?s <{CSG.personName}> "{name}" .
-            }}
-        """
-
-        if len(list(self.graph.query(surgeon_query))) > 0:
-            return 'surgeon'
-        elif len(list(self.graph.query(distributor_query))) > 0:
-            return 'distributor'
-
-        return None
+        entry = self.get_index().lookup(name)
+        return entry.type if entry else None
 
     def get_entity_info(self, name: str) -> Optional[Dict]:
         """
@@ -178,7 +158,8 @@ class CSGEntityResolver:
         if not self._initialized:
             return None
 
-        return self._entity_cache.get(name.lower())
+        entry = self.get_index().lookup(name)
+        return entry.to_dict() if entry else None
 
     def find_similar_entities(self, partial_name: str, entity_type: Optional[str] = None) -> List[Dict]:
         """
@@ -191,15 +172,44 @@ class CSGEntityResolver:
         Returns:
             List of entity info dicts
         """
-        partial_lower = partial_name.lower()
-        results = []
+        if not self._initialized:
+            return []
+
+        index = self.get_index()
+        results = [entry.to_dict() for entry in index.containing(partial_name, entity_type)]
+        if not results:
+            # Nothing contains the text verbatim; fall back to misspelling-tolerant candidates
+            results = [
+                {**entry.to_dict(), 'similarity': similarity}
+                for entry, similarity in index.fuzzy(partial_name, entity_type)
+            ]
+        return results
 
-        for name_lower, info in self._entity_cache.items():
-            if partial_lower in name_lower:
-                if entity_type is None or info['type'] == entity_type:
-                    results.append(info)
+    def resolve_entities(self, text: str, min_words: int = 2, title_case: bool = True) -> List[Dict]:
+        """
+        Find every known entity mentioned in a question in one pass.
 
-        return results
+        By default only title-case names of two or more words match, as with
+        the word-pair probing this replaced, so ordinary words that happen to
+        be a label ('Sales', 'north') are not taken for people.
+
+        Args:
+            text: Question text
+            min_words: Fewest words a matched name may have
+            title_case: Only match capitalized words
+
+        Returns:
+            List of dicts with 'mention', 'start', 'end', 'name', 'type', 'uri'
+            and the database 'column', in text order
+        """
+        if not self._initialized:
+            logger.warning("Entity resolver not initialized")
+            return []
+
+        mentions = self.get_index().find_mentions(text, min_words=min_words, title_case=title_case)
+        for mention in mentions:
+            mention['column'] = mention['type']
+        return mentions
 
     def get_column_for_entity(self, name: str) -> Tuple[Optional[str], Optional[str]]:
         """
@@ -0,0 +1,231 @@
+"""
+In-memory entity lookup index built from an RDF graph.
+
+Entity labels and aliases are normalized (lowercased, punctuation and extra
+whitespace removed) and mapped to their entities. On top of the exact
+label table the index keeps a sorted label list for prefix lookups, a
+character-trigram inverted index for substring and fuzzy candidates, and a
+word trie that finds every entity mention in a question in one pass.
+"""
+
+import re
+import bisect
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from rdflib import Graph, URIRef
+from rdflib.namespace import RDF, RDFS, SKOS
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Trie key marking the end of a complete label
+_TERMINAL = ""
+
+
+def normalize_label(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace: 'Dr.  Smith, J' -> 'dr smith j'."""
+    return " ".join(WORD_PATTERN.findall(text.lower()))
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class EntityEntry:
+    """One entity reachable from a label."""
+    name: str
+    type: str
+    uri: str
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"name": self.name, "type": self.type, "uri": self.uri}
+
+
+class EntityIndex:
+    """
+    Label -> entity index with prefix, trigram and multi-mention lookup.
+
+    When a label belongs to entities of several types, the type listed last
+    in ``type_priority`` is the primary match (matching the resolver's rule
+    that distributors override surgeons on name conflicts).
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, EntityEntry]], type_priority: Sequence[str] = ()):
+        """
+        Args:
+            entries: (label or alias, entity) pairs
+            type_priority: Entity types in increasing priority for label conflicts
+        """
+        rank = {entity_type: position for position, entity_type in enumerate(type_priority)}
+        by_label: Dict[str, List[EntityEntry]] = defaultdict(list)
+        for label, entry in entries:
+            key = normalize_label(label)
+            if key and entry not in by_label[key]:
+                by_label[key].append(entry)
+
+        self.labels: Dict[str, List[EntityEntry]] = {
+            key: sorted(found, key=lambda entry: rank.get(entry.type, -1), reverse=True)
+            for key, found in by_label.items()
+        }
+        self.sorted_labels = sorted(self.labels)
+        self.entity_count = len({entry.uri for found in self.labels.values() for entry in found})
+
+        self.trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        self.trigram_counts: Dict[str, int] = {}
+        self.trie: Dict[str, dict] = {}
+        for key in self.labels:
+            trigrams = _trigrams(key)
+            self.trigram_counts[key] = len(trigrams)
+            for trigram in trigrams:
+                self.trigram_index[trigram].add(key)
+            node = self.trie
+            for word in key.split():
+                node = node.setdefault(word, {})
+            node[_TERMINAL] = key
+        self.trigram_index = dict(self.trigram_index)
+
+    @classmethod
+    def from_graph(
+        cls,
+        graph: Graph,
+        entity_types: Dict[URIRef, str],
+        name_predicates: Sequence[URIRef] = (RDFS.label, SKOS.altLabel),
+    ) -> "EntityIndex":
+        """
+        Build the index from every instance of the given classes.
+
+        Args:
+            graph: Source graph
+            entity_types: RDF class -> entity type name, in increasing priority
+            name_predicates: Predicates whose literal values are labels or aliases;
+                the first one present on an entity is its display name
+        """
+        entries = []
+        for rdf_class, entity_type in entity_types.items():
+            for subject in graph.subjects(RDF.type, rdf_class):
+                labels = [str(value) for predicate in name_predicates for value in graph.objects(subject, predicate)]
+                if not labels:
+                    continue
+                entry = EntityEntry(name=labels[0], type=entity_type, uri=str(subject))
+                entries.extend((label, entry) for label in labels)
+        return cls(entries, type_priority=list(entity_types.values()))
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def lookup(self, name: str, entity_type: Optional[str] = None) -> Optional[EntityEntry]:
+        """Exact match on a normalized label or alias."""
+        for entry in self.labels.get(normalize_label(name), ()):
+            if entity_type is None or entry.type == entity_type:
+                return entry
+        return None
+
+    def prefix(self, text: str, limit: int = 20) -> List[str]:
+        """Labels starting with the normalized text."""
+        key = normalize_label(text)
+        start = bisect.bisect_left(self.sorted_labels, key)
+        found = []
+        for label in self.sorted_labels[start:]:
+            if not label.startswith(key) or len(found) >= limit:
+                break
+            found.append(label)
+        return found
+
+    def containing(self, text: str, entity_type: Optional[str] = None) -> List[EntityEntry]:
+        """Entities with a label containing the text (substring match narrowed by trigrams)."""
+        key = normalize_label(text)
+        if not key:
+            return []
+        if len(key) < 3:
+            candidates = self.labels.keys()
+        else:
+            inner = {key[i:i + 3] for i in range(len(key) - 2)}
+            postings = sorted((self.trigram_index.get(trigram, set()) for trigram in inner), key=len)
+            candidates = set.intersection(*postings) if postings else set()
+        return self._collect(sorted(label for label in candidates if key in label), entity_type)
+
+    def fuzzy(self, text: str, entity_type: Optional[str] = None, limit: int = 5,
+              min_similarity: float = 0.5) -> List[Tuple[EntityEntry, float]]:
+        """Closest labels by trigram Dice similarity, for misspelled names."""
+        key = normalize_label(text)
+        if not key:
+            return []
+        query_trigrams = _trigrams(key)
+        shared: Dict[str, int] = defaultdict(int)
+        for trigram in query_trigrams:
+            for label in self.trigram_index.get(trigram, ()):
+                shared[label] += 1
+
+        scored = []
+        for label, count in shared.items():
+            similarity = 2 * count / (len(query_trigrams) + self.trigram_counts[label])
+            if similarity >= min_similarity:
+                scored.append((similarity, label))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        results = []
+        seen = set()
+        for similarity, label in scored:
+            for entry in self.labels[label]:
+                if entry.uri not in seen and (entity_type is None or entry.type == entity_type):
+                    seen.add(entry.uri)
+                    results.append((entry, round(similarity, 3)))
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    def find_mentions(self, text: str, min_words: int = 1, title_case: bool = False) -> List[Dict]:
+        """
+        Every known label mentioned in the text, longest match first, in one pass.
+
+        Labels only match whole words. Matching ignores case unless title_case is set.
+
+        Args:
+            text: Text to scan
+            min_words: Ignore labels of fewer words (one-word labels are often ordinary words)
+            title_case: Only match words written with a leading capital, as names are
+
+        Returns:
+            [{'mention', 'start', 'end', 'name', 'type', 'uri'}] in text order
+        """
+        words = []
+        for match in WORD_PATTERN.finditer(text):
+            word = match.group()
+            # Under title_case a lowercase word never matches, so it also ends any name before it
+            key = word.lower() if not title_case or word[0].isupper() else None
+            words.append((key, match.start(), match.end()))
+        mentions = []
+        index = 0
+        while index < len(words):
+            node = self.trie
+            longest = None
+            cursor = index
+            while cursor < len(words) and words[cursor][0] in node:
+                node = node[words[cursor][0]]
+                cursor += 1
+                if _TERMINAL in node and cursor - index >= min_words:
+                    longest = (cursor, node[_TERMINAL])
+
+            if longest is None:
+                index += 1
+                continue
+
+            end_index, label = longest
+            start, end = words[index][1], words[end_index - 1][2]
+            mentions.append({"mention": text[start:end], "start": start, "end": end,
+                             **self.labels[label][0].to_dict()})
+            index = end_index
+        return mentions
+
+    def _collect(self, labels: Iterable[str], entity_type: Optional[str]) -> List[EntityEntry]:
+        results = []
+        seen = set()
+        for label in labels:
+            for entry in self.labels[label]:
+                if entry.uri not in seen and (entity_type is None or entry.type == entity_type):
+                    seen.add(entry.uri)
+                    results.append(entry)
+        return results
@@ -0,0 +1,377 @@
+"""
+Compact binary snapshots of RDF graphs.
+
+A snapshot interns every distinct term to an integer and stores the graph as
+flat arrays: term kinds, datatypes, language tags, a UTF-8 text blob with
+offsets, and an (n, 3) int32 triple array sorted by subject. Term ids follow
+(kind, text) order, so a term is found by binary search without decoding the
+term table. The file is
+memory-mapped read-only, so every worker on a host shares the same page-cache
+pages instead of holding its own parsed copy. Callers that only need lookups
+use the index view directly, or query it through SnapshotStore, a read-only
+rdflib store over the index (SPARQL included). A fully materialized rdflib
+Graph is built from it only on demand, which skips N-Triples/Turtle parsing
+entirely.
+"""
+
+import os
+import json
+import mmap
+import struct
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.plugins.stores.memory import Memory
+from rdflib.store import Store
+
+SNAPSHOT_MAGIC = b"KGSNAP\x00\x00"
+SNAPSHOT_VERSION = 1
+
+KIND_URI = ord("U")
+KIND_BNODE = ord("B")
+KIND_LITERAL = ord("L")
+
+# magic, version, header length
+_PREAMBLE = struct.Struct("<8sIQ")
+
+
+class SnapshotVersionError(ValueError):
+    """Raised when a snapshot was written by an incompatible format version"""
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _sort_key(term) -> Tuple[int, bytes, str, str]:
+    """(kind, UTF-8 text, datatype, language); term ids are assigned in this order."""
+    if isinstance(term, Literal):
+        return KIND_LITERAL, str(term).encode("utf-8"), str(term.datatype or ""), term.language or ""
+    kind = KIND_BNODE if isinstance(term, BNode) else KIND_URI
+    return kind, str(term).encode("utf-8"), "", ""
+
+
+def encode_graph(graph: Graph, source_hash: str = "") -> bytes:
+    """
+    Serialize a graph to the snapshot format.
+
+    Args:
+        graph: rdflib graph to snapshot
+        source_hash: Hash of the sources the graph was built from, for invalidation
+
+    Returns:
+        Snapshot file contents
+    """
+    terms = set()
+    for triple in graph:
+        terms.update(triple)
+    terms.update(URIRef(term.datatype) for term in list(terms)
+                 if isinstance(term, Literal) and term.datatype is not None)
+    ordered = sorted(terms, key=_sort_key)
+    term_ids: Dict[Any, int] = {term: term_id for term_id, term in enumerate(ordered)}
+
+    langs: Dict[str, int] = {}
+    kinds: List[int] = []
+    datatypes: List[int] = []
+    lang_codes: List[int] = []
+    texts: List[bytes] = []
+    for term in ordered:
+        kind, text, datatype, lang = _sort_key(term)
+        kinds.append(kind)
+        texts.append(text)
+        datatypes.append(term_ids[URIRef(datatype)] if datatype else -1)
+        lang_codes.append(langs.setdefault(lang, len(langs)) if lang else -1)
+
+    triples = np.array(
+        [(term_ids[s], term_ids[p], term_ids[o]) for s, p, o in graph],
+        dtype=np.int32,
+    ).reshape(-1, 3)
+    if len(triples):
+        triples = triples[np.lexsort((triples[:, 2], triples[:, 1], triples[:, 0]))]
+
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    if texts:
+        offsets[1:] = np.cumsum([len(text) for text in texts])
+
+    arrays = {
+        "kinds": np.asarray(kinds, dtype=np.uint8),
+        "datatypes": np.asarray(datatypes, dtype=np.int32),
+        "langs": np.asarray(lang_codes, dtype=np.int16),
+        "text_offsets": offsets,
+        "text": np.frombuffer(b"".join(texts), dtype=np.uint8),
+        "triples": triples.reshape(-1),
+    }
+
+    layout = {}
+    position = 0
+    for name, array in arrays.items():
+        position = _align(position)
+        layout[name] = {"offset": position, "dtype": array.dtype.str, "count": int(array.size)}
+        position += array.nbytes
+
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "source_hash": source_hash,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "term_count": len(kinds),
+        "triple_count": int(len(triples)),
+        "langs": sorted(langs, key=langs.get),
+        "namespaces": [[prefix, str(uri)] for prefix, uri in graph.namespaces()],
+        "arrays": layout,
+    }).encode("utf-8")
+
+    data_start = _align(_PREAMBLE.size + len(header))
+    buffer = bytearray(data_start + position)
+    _PREAMBLE.pack_into(buffer, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header))
+    buffer[_PREAMBLE.size:_PREAMBLE.size + len(header)] = header
+    for name, array in arrays.items():
+        start = data_start + layout[name]["offset"]
+        buffer[start:start + array.nbytes] = array.tobytes()
+    return bytes(buffer)
+
+
+def write_snapshot(graph: Graph, path: Union[str, Path], source_hash: str = "") -> Path:
+    """Write a snapshot file atomically."""
+    return write_snapshot_bytes(encode_graph(graph, source_hash), path)
+
+
+def write_snapshot_bytes(data: bytes, path: Union[str, Path]) -> Path:
+    """Write already-encoded snapshot bytes atomically (e.g. fetched from Redis)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_header(data) -> Tuple[Dict[str, Any], int]:
+    """Parse the snapshot header; returns (header, data_start)."""
+    magic, version, header_length = _PREAMBLE.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Not a graph snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotVersionError(f"Snapshot version {version}, expected {SNAPSHOT_VERSION}")
+    header = json.loads(bytes(data[_PREAMBLE.size:_PREAMBLE.size + header_length]))
+    return header, _align(_PREAMBLE.size + header_length)
+
+
+class GraphSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot.
+
+    Term decoding and the rdflib Graph are built lazily; triple lookups by
+    subject use binary search over the sorted triple array.
+    """
+
+    def __init__(self, buffer, header: Dict[str, Any], data_start: int, source: Optional[Path] = None):
+        self._buffer = buffer
+        self.header = header
+        self.source = source
+        self.source_hash = header["source_hash"]
+        self._langs = header["langs"]
+
+        def array(name: str) -> np.ndarray:
+            spec = header["arrays"][name]
+            return np.frombuffer(buffer, dtype=np.dtype(spec["dtype"]), count=spec["count"],
+                                 offset=data_start + spec["offset"])
+
+        self.kinds = array("kinds")
+        self.datatypes = array("datatypes")
+        self.langs = array("langs")
+        self.text_offsets = array("text_offsets")
+        self.text = array("text")
+        self.triples = array("triples").reshape(-1, 3)
+        self._terms: Optional[List[Any]] = None
+        self._term_index: Optional[Dict[Any, int]] = None
+        self._decoded: Dict[int, Any] = {}  # Terms decoded by lookups, before terms() is called
+        self._graph: Optional[Graph] = None
+        self._view: Optional[Graph] = None
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> "GraphSnapshot":
+        """Memory-map a snapshot file."""
+        path = Path(path)
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header, data_start = read_header(buffer)
+        return cls(buffer, header, data_start, source=path)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "GraphSnapshot":
+        header, data_start = read_header(data)
+        return cls(data, header, data_start)
+
+    def __len__(self) -> int:
+        return len(self.triples)
+
+    @property
+    def term_count(self) -> int:
+        return len(self.kinds)
+
+    def term(self, term_id: int):
+        """Decode one term to its rdflib object."""
+        if self._terms is not None:
+            return self._terms[term_id]
+        term = self._decoded.get(term_id)
+        if term is None:
+            term = self._decode(term_id)
+            self._decoded[term_id] = term
+        return term
+
+    def _decode(self, term_id: int):
+        text = self._text(term_id).decode("utf-8")
+        kind = self.kinds[term_id]
+        if kind == KIND_URI:
+            return URIRef(text)
+        if kind == KIND_BNODE:
+            return BNode(text)
+        lang = int(self.langs[term_id])
+        datatype = int(self.datatypes[term_id])
+        return Literal(
+            text,
+            lang=self._langs[lang] if lang >= 0 else None,
+            datatype=self.term(datatype) if datatype >= 0 else None,
+        )
+
+    def terms(self) -> List[Any]:
+        """All terms decoded once, indexed by term id."""
+        if self._terms is None:
+            self._terms = [self._decoded.get(term_id) or self._decode(term_id) for term_id in range(self.term_count)]
+            self._decoded = {}
+            self._term_index = {term: term_id for term_id, term in enumerate(self._terms)}
+        return self._terms
+
+    def _text(self, term_id: int) -> bytes:
+        return bytes(self.text[self.text_offsets[term_id]:self.text_offsets[term_id + 1]])
+
+    def term_id(self, term) -> Optional[int]:
+        """Integer id of an rdflib term, or None if it is not in the graph."""
+        if self._term_index is not None:
+            return self._term_index.get(term)
+
+        kind, text, _, _ = _sort_key(term)
+        target = (kind, text)
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if (int(self.kinds[middle]), self._text(middle)) < target:
+                low = middle + 1
+            else:
+                high = middle
+        # Literals with the same text differ only by datatype or language
+        while low < self.term_count and (int(self.kinds[low]), self._text(low)) == target:
+            if self.term(low) == term:
+                return low
+            low += 1
+        return None
+
+    def triples_for(self, subject=None, predicate=None, obj=None) -> Iterator[Tuple[Any, Any, Any]]:
+        """Triples matching a pattern (None is a wildcard), without building an rdflib Graph."""
+        rows = self.triples
+        if subject is not None:
+            subject_id = self.term_id(subject)
+            if subject_id is None:
+                return
+            start, end = np.searchsorted(rows[:, 0], [subject_id, subject_id + 1])
+            rows = rows[start:end]
+        for column, term in ((1, predicate), (2, obj)):
+            if term is not None:
+                term_id = self.term_id(term)
+                if term_id is None:
+                    return
+                rows = rows[rows[:, column] == term_id]
+        for s, p, o in rows.tolist():
+            yield self.term(s), self.term(p), self.term(o)
+
+    def count(self, subject=None, predicate=None, obj=None) -> int:
+        """Number of triples matching a pattern, without decoding any of them."""
+        rows = self.triples
+        for column, term in ((0, subject), (1, predicate), (2, obj)):
+            if term is not None:
+                term_id = self.term_id(term)
+                if term_id is None:
+                    return 0
+                rows = rows[rows[:, column] == term_id]
+        return len(rows)
+
+    def as_graph(self) -> Graph:
+        """Read-only rdflib Graph answered from the index (SPARQL works; nothing is materialized)."""
+        if self._view is None:
+            self._view = Graph(store=SnapshotStore(self))
+        return self._view
+
+    def to_graph(self) -> Graph:
+        """Build (once) an rdflib Memory graph from the snapshot."""
+        if self._graph is None:
+            terms = self.terms()
+            graph = Graph(store=Memory())
+            for prefix, uri in self.header.get("namespaces", []):
+                graph.bind(prefix, uri, override=True)
+            graph.addN((terms[s], terms[p], terms[o], graph) for s, p, o in self.triples.tolist())
+            self._graph = graph
+        return self._graph
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.header["version"],
+            "source_hash": self.source_hash,
+            "created_at": self.header["created_at"],
+            "terms": self.term_count,
+            "triples": len(self),
+            "path": str(self.source) if self.source else None,
+        }
+
+
+class SnapshotStore(Store):
+    """Read-only rdflib store that answers triple patterns from a GraphSnapshot."""
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, snapshot: GraphSnapshot):
+        super().__init__()
+        self.snapshot = snapshot
+        self._namespaces: Dict[str, URIRef] = {}
+        self._prefixes: Dict[URIRef, str] = {}
+        for prefix, uri in snapshot.header.get("namespaces", []):
+            self.bind(prefix, URIRef(uri))
+
+    def triples(self, triple_pattern, context=None):
+        subject, predicate, obj = triple_pattern
+        for triple in self.snapshot.triples_for(subject, predicate, obj):
+            yield triple, iter(())
+
+    def __len__(self, context=None) -> int:
+        return len(self.snapshot)
+
+    def add(self, triple, context=None, quoted=False):
+        raise TypeError("Graph snapshots are read-only")
+
+    def remove(self, triple_pattern, context=None):
+        raise TypeError("Graph snapshots are read-only")
+
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True) -> None:
+        if not override and (prefix in self._namespaces or namespace in self._prefixes):
+            return
+        old = self._namespaces.pop(prefix, None)
+        if old is not None:
+            self._prefixes.pop(old, None)
+        self._namespaces[prefix] = namespace
+        self._prefixes[namespace] = prefix
+
+    def namespace(self, prefix: str) -> Optional[URIRef]:
+        return self._namespaces.get(prefix)
+
+    def prefix(self, namespace: URIRef) -> Optional[str]:
+        return self._prefixes.get(namespace)
+
+    def namespaces(self):
+        yield from self._namespaces.items()
@@ -30,12 +30,17 @@ class JenaKnowledgeGraph:
         """
         self.data_file = data_file
         self.use_cache = use_cache
+        self._revision = 0
+        self._graph: Optional[Graph] = None
+        self.snapshot = None
         
         if use_cache == "redis":
-            # Use Redis-cached store for multi-process sharing
-            from .jena_redis_store import get_redis_graph
-            self.graph = get_redis_graph()
-            logger.info("Using Redis-cached RDF store")
+            # Use Redis-cached store for multi-process sharing. Lookups are answered
+            # from the memory-mapped snapshot; the rdflib Graph is only built if
+            # something needs the full graph (e.g. save()).
+            from .jena_redis_store import get_redis_snapshot
+            self.snapshot = get_redis_snapshot()
+            logger.info("Using Redis-cached RDF store", triples=len(self.snapshot))
             # Still need to define namespace
             self.FIN = Namespace("http://example.com/finance#")
             self._fin = lambda prop: self.FIN[prop]
@@ -348,10 +353,43 @@ class JenaKnowledgeGraph:
         
         logger.info(f"Loaded {len(rules)} business rules")
     
+    @property
+    def graph(self) -> Graph:
+        """The full rdflib graph; with the Redis cache it is materialized from the snapshot on first use."""
+        if self._graph is None and self.snapshot is not None:
+            from .jena_redis_store import get_redis_graph
+            self._graph = get_redis_graph()
+        return self._graph
+
+    @graph.setter
+    def graph(self, graph: Graph):
+        self._graph = graph
+
+    def _lookup_graph(self) -> Graph:
+        """Graph that answers lookups: the materialized graph if built, else the snapshot index view."""
+        if self._graph is None and self.snapshot is not None:
+            return self.snapshot.as_graph()
+        return self.graph
+
+    @property
+    def version(self) -> Tuple[int, int, int]:
+        """
+        Cheap change marker for indexes derived from the graph.
+
+        Changes when the graph object is replaced, its triple count changes,
+        or a writer calls mark_changed().
+        """
+        graph = self._lookup_graph()
+        return (id(graph), len(graph), self._revision)
+
+    def mark_changed(self):
+        """Invalidate derived indexes after an in-place edit that keeps the triple count."""
+        self._revision += 1
+
     def query(self, sparql_query: str, **kwargs) -> List[Dict[str, Any]]:
         """Execute a SPARQL query and return results."""
         try:
-            results = self.graph.query(sparql_query, initBindings=kwargs)
+            results = self._lookup_graph().query(sparql_query, initBindings=kwargs)
             return [dict(row.asdict()) for row in results]
         except Exception as e:
             logger.error(f"SPARQL query failed: {e}")
@@ -377,6 +415,12 @@ class JenaKnowledgeGraph:
             ("Client", self.FIN["Client"])
         ]
         
+        if self._graph is None and self.snapshot is not None:
+            for name, node_type in node_types:
+                stats[name] = self.snapshot.count(predicate=RDF.type, obj=node_type)
+            stats["TotalTriples"] = len(self.snapshot)
+            return stats
+
         for name, node_type in node_types:
             count_query = f"""
                 SELECT (COUNT(?s) as ?count)
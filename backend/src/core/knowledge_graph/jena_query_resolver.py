@@ -9,6 +9,7 @@ from dataclasses import dataclass
 import re
 
 from .jena_client import JenaKnowledgeGraph
+from .synonym_matcher import SynonymMatcher
 
 logger = structlog.get_logger()
 
@@ -43,6 +44,7 @@ class ResolvedQuery:
     business_rules: List[Dict[str, Any]]
     suggested_query: Optional[str] = None
     confidence_score: float = 0.0
+    synonym_rewrite_ms: float = 0.0
 
 
 class JenaQueryResolver:
@@ -50,14 +52,18 @@ class JenaQueryResolver:
     
     def __init__(self, graph_client: Optional[JenaKnowledgeGraph] = None):
         self.graph = graph_client or JenaKnowledgeGraph()
+        self._synonym_matcher: Optional[SynonymMatcher] = None
+        self._synonym_version = None
         
     def resolve_query(self, query: str, context: Optional[Dict[str, Any]] = None) -> ResolvedQuery:
         """Resolve a natural language query using RDF mappings."""
         logger.info(f"Resolving query: {query}")
         
         # 1. Resolve synonyms
-        synonyms_resolved = self._resolve_synonyms(query)
-        normalized_query = self._apply_synonyms(query, synonyms_resolved)
+        rewrite = self.get_synonym_matcher().rewrite(query)
+        synonyms_resolved = rewrite.matches
+        normalized_query = rewrite.text
+        logger.info(f"Resolved synonyms: {synonyms_resolved}", rewrite_ms=round(rewrite.seconds * 1000, 4))
         
         # 2. Detect query type
         query_type = self._detect_query_type(normalized_query)
@@ -81,14 +87,21 @@ class JenaQueryResolver:
             synonyms_resolved=synonyms_resolved,
             business_rules=business_rules,
             suggested_query=suggested_query,
-            confidence_score=self._calculate_confidence(query_type, metrics, gl_accounts)
+            confidence_score=self._calculate_confidence(query_type, metrics, gl_accounts),
+            synonym_rewrite_ms=round(rewrite.seconds * 1000, 4)
         )
     
-    def _resolve_synonyms(self, query: str) -> Dict[str, str]:
-        """Resolve synonyms from RDF."""
-        synonyms = {}
-        query_lower = query.lower()
-        
+    def get_synonym_matcher(self) -> SynonymMatcher:
+        """Synonym matcher compiled from the graph, rebuilt only when the graph version changes."""
+        version = self.graph.version
+        if self._synonym_matcher is None or self._synonym_version != version:
+            self._synonym_matcher = SynonymMatcher(self._load_synonym_table())
+            self._synonym_version = version
+            logger.info(f"Compiled synonym matcher ({self._synonym_matcher.size} synonyms)")
+        return self._synonym_matcher
+    
+    def _load_synonym_table(self) -> List[Tuple[str, str]]:
+        """All (synonym term, primary term) pairs from RDF."""
         # SPARQL query to find all synonyms
         sparql = """
         PREFIX fin: <http://example.com/finance#>
@@ -104,24 +117,15 @@ class JenaQueryResolver:
         """
         
         results = self.graph.query(sparql)
-        
-        for row in results:
-            syn_term = str(row["synonym_term"])
-            primary_term = str(row["primary_term"])
-            if syn_term.lower() in query_lower:
-                synonyms[syn_term] = primary_term
-                    
-        logger.info(f"Resolved synonyms: {synonyms}")
-        return synonyms
+        return sorted((str(row["synonym_term"]), str(row["primary_term"])) for row in results)
+    
+    def _resolve_synonyms(self, query: str) -> Dict[str, str]:
+        """Resolve synonyms from RDF."""
+        return self.get_synonym_matcher().rewrite(query).matches
     
     def _apply_synonyms(self, query: str, synonyms: Dict[str, str]) -> str:
         """Apply synonym replacements to query."""
-        normalized = query
-        for synonym, primary in synonyms.items():
-            # Case-insensitive replacement
-            pattern = re.compile(re.escape(synonym), re.IGNORECASE)
-            normalized = pattern.sub(primary, normalized)
-        return normalized
+        return SynonymMatcher(synonyms.items()).rewrite(query).text
     
     def _detect_query_type(self, query: str) -> str:
         """Detect if query is L1, L2, or L3 based on keywords and patterns."""
@@ -1,6 +1,10 @@
 """
 Redis-based caching for Jena RDF graphs.
 Uses the existing Redis instance for shared caching across processes.
+
+The graph is cached as a binary snapshot (see graph_snapshot): Redis holds
+the snapshot bytes, and each host keeps a copy on local disk that workers
+memory-map, so a worker start does not parse Turtle or N-Triples.
 """
 
 import os
@@ -13,6 +17,7 @@ from rdflib.plugins.stores.memory import Memory
 from pathlib import Path
 import redis
 from src.config import settings
+from .graph_snapshot import GraphSnapshot, SNAPSHOT_VERSION, write_snapshot_bytes, encode_graph
 
 logger = structlog.get_logger()
 
@@ -28,6 +33,10 @@ class JenaRedisStore:
         self.ttl_file = "financial_kg.ttl"
         self.cache_key = "jena:financial_kg:triples"
         self.hash_key = "jena:financial_kg:hash"
+        self.snapshot_key = f"jena:financial_kg:snapshot:v{SNAPSHOT_VERSION}"
+        self.snapshot_dir = Path(settings.graph_snapshot_dir)
+        self.ontology_path = Path(__file__).parent.parent.parent.parent / "ontologies" / "financial-core.ttl"
+        self.snapshot: Optional[GraphSnapshot] = None
         self.cache_ttl = 86400  # 24 hours
         
     def _create_redis_client(self) -> redis.Redis:
@@ -47,10 +56,54 @@ class JenaRedisStore:
         with open(filepath, 'rb') as f:
             return hashlib.md5(f.read()).hexdigest()
     
-    def _serialize_graph(self, graph: Graph) -> bytes:
-        """Serialize graph to N-Triples format for Redis storage."""
-        return graph.serialize(format='nt').encode('utf-8')
-    
+    def _source_hash(self) -> str:
+        """Hash of the ontology and data files the graph is built from."""
+        return hashlib.md5(
+            f"{self._get_file_hash(self.ontology_path)}:{self._get_file_hash(Path(self.ttl_file))}".encode()
+        ).hexdigest()
+
+    def _snapshot_path(self, source_hash: str) -> Path:
+        return self.snapshot_dir / f"financial_kg.{source_hash}.v{SNAPSHOT_VERSION}.kgsnap"
+
+    def _load_snapshot(self, source_hash: str) -> bool:
+        """Memory-map the local snapshot, fetching it from Redis if this host has none."""
+        path = self._snapshot_path(source_hash)
+        try:
+            if not path.exists():
+                data = self.redis.get(self.snapshot_key)
+                if not data:
+                    return False
+                snapshot = GraphSnapshot.from_bytes(data)
+                if snapshot.source_hash != source_hash:
+                    logger.info("Graph snapshot in Redis is stale")
+                    return False
+                write_snapshot_bytes(data, path)
+                logger.info(f"Fetched graph snapshot from Redis ({len(data)} bytes)")
+
+            self.snapshot = GraphSnapshot.open(path)
+            logger.info(f"Mapped graph snapshot {path.name} ({len(self.snapshot)} triples)")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to load graph snapshot: {e}")
+            return False
+
+    def _save_snapshot(self, source_hash: str) -> bytes:
+        """Write the snapshot to local disk and Redis; returns the snapshot bytes."""
+        data = encode_graph(self.graph, source_hash)
+        try:
+            write_snapshot_bytes(data, self._snapshot_path(source_hash))
+            self.redis.setex(self.snapshot_key, self.cache_ttl, data)
+            logger.info(f"Saved graph snapshot ({len(data)} bytes)")
+        except Exception as e:
+            logger.warning(f"Failed to save graph snapshot: {e}")
+        return data
+
+    def _bind_namespaces(self):
+        self.graph.bind("fin", Namespace("http://example.com/finance#"))
+        self.graph.bind("rdfs", Namespace("http://www.w3.org/2000/01/rdf-schema#"))
+        self.graph.bind("owl", Namespace("http://www.w3.org/2002/07/owl#"))
+        self.graph.bind("xsd", Namespace("http://www.w3.org/2001/XMLSchema#"))
+
     def _deserialize_graph(self, data: bytes) -> Graph:
         """Deserialize graph from N-Triples format."""
         g = Graph(store=Memory())
@@ -79,10 +132,7 @@ class JenaRedisStore:
             self.graph = self._deserialize_graph(cached_data)
             
             # Re-bind namespaces
-            self.graph.bind("fin", Namespace("http://example.com/finance#"))
-            self.graph.bind("rdfs", Namespace("http://www.w3.org/2000/01/rdf-schema#"))
-            self.graph.bind("owl", Namespace("http://www.w3.org/2002/07/owl#"))
-            self.graph.bind("xsd", Namespace("http://www.w3.org/2001/XMLSchema#"))
+            self._bind_namespaces()
             
             logger.info(f"Loaded RDF graph from Redis cache ({len(self.graph)} triples)")
             return True
@@ -91,60 +141,65 @@ class JenaRedisStore:
             logger.warning(f"Failed to load from Redis cache: {e}")
             return False
     
-    def _save_to_redis(self):
-        """Save graph to Redis cache."""
-        try:
-            # Serialize graph
-            serialized = self._serialize_graph(self.graph)
-            
-            # Save to Redis with TTL
-            self.redis.setex(self.cache_key, self.cache_ttl, serialized)
-            
-            # Save TTL file hash
-            ttl_path = Path(self.ttl_file)
-            if ttl_path.exists():
-                current_hash = self._get_file_hash(ttl_path)
-                self.redis.setex(self.hash_key, self.cache_ttl, current_hash)
-            
-            logger.info(f"Saved RDF graph to Redis cache ({len(serialized)} bytes)")
-            
-        except Exception as e:
-            logger.warning(f"Failed to save to Redis cache: {e}")
-    
+    def get_snapshot(self) -> GraphSnapshot:
+        """
+        Get the memory-mapped snapshot of the graph.
+
+        Index-only callers (term and pattern lookups) should use this instead
+        of get_graph, which additionally builds an rdflib Graph per worker.
+        """
+        if self.snapshot is not None:
+            return self.snapshot
+
+        source_hash = self._source_hash()
+        if not self._load_snapshot(source_hash):
+            self.snapshot = GraphSnapshot.from_bytes(self._build_graph(source_hash))
+        return self.snapshot
+
+    def _build_graph(self, source_hash: str) -> bytes:
+        """Build the graph from the legacy N-Triples cache or the TTL files, then snapshot it."""
+        if not self._load_from_redis():
+            logger.info("Loading RDF graph from TTL files...")
+            self.graph = Graph(store=Memory())
+
+            # Load ontology
+            if self.ontology_path.exists():
+                self.graph.parse(self.ontology_path, format="turtle")
+                logger.info("Loaded financial ontology")
+
+            # Load data
+            if os.path.exists(self.ttl_file):
+                self.graph.parse(self.ttl_file, format="turtle")
+                logger.info(f"Loaded {len(self.graph)} triples from {self.ttl_file}")
+            self._bind_namespaces()
+
+        return self._save_snapshot(source_hash)
+
     def get_graph(self) -> Graph:
         """Get or create the in-memory graph."""
         if self.graph is not None:
             return self.graph
-        
-        # Try to load from Redis first
-        if self._load_from_redis():
+
+        source_hash = self._source_hash()
+        if self.snapshot is None:
+            self._load_snapshot(source_hash)
+        if self.snapshot is not None and self.snapshot.source_hash == source_hash:
+            self.graph = self.snapshot.to_graph()
+            self._bind_namespaces()
             return self.graph
-        
-        # Otherwise load from TTL files
-        logger.info("Loading RDF graph from TTL files...")
-        self.graph = Graph(store=Memory())
-        
-        # Load ontology
-        ontology_path = Path(__file__).parent.parent.parent.parent / "ontologies" / "financial-core.ttl"
-        if ontology_path.exists():
-            self.graph.parse(ontology_path, format="turtle")
-            logger.info("Loaded financial ontology")
-        
-        # Load data
-        if os.path.exists(self.ttl_file):
-            self.graph.parse(self.ttl_file, format="turtle")
-            logger.info(f"Loaded {len(self.graph)} triples from {self.ttl_file}")
-        
-        # Save to Redis for next time
-        self._save_to_redis()
-        
+
+        self._build_graph(source_hash)
         return self.graph
     
     def clear_cache(self):
         """Clear Redis cache."""
         try:
-            self.redis.delete(self.cache_key, self.hash_key)
+            self.redis.delete(self.cache_key, self.hash_key, self.snapshot_key)
             self.graph = None
+            self.snapshot = None
+            if self.snapshot_dir.exists():
+                for path in self.snapshot_dir.glob("financial_kg.*.kgsnap"):
+                    path.unlink(missing_ok=True)
             logger.info("Cleared RDF Redis cache")
         except Exception as e:
             logger.warning(f"Failed to clear Redis cache: {e}")
@@ -160,7 +215,8 @@ class JenaRedisStore:
                 "exists": cache_exists,
                 "size_bytes": cache_size,
                 "ttl_seconds": ttl,
-                "triples_count": len(self.graph) if self.graph else 0
+                "triples_count": len(self.graph) if self.graph else 0,
+                "snapshot": self.snapshot.info() if self.snapshot else None
             }
         except Exception as e:
             logger.warning(f"Failed to get cache info: {e}")
@@ -179,6 +235,14 @@ def get_redis_graph(redis_client: Optional[redis.Redis] = None) -> Graph:
     return _redis_store.get_graph()
 
 
+def get_redis_snapshot(redis_client: Optional[redis.Redis] = None) -> GraphSnapshot:
+    """Get the memory-mapped graph snapshot without building an rdflib Graph."""
+    global _redis_store
+    if _redis_store is None:
+        _redis_store = JenaRedisStore(redis_client)
+    return _redis_store.get_snapshot()
+
+
 def clear_redis_cache():
     """Clear the Redis cache."""
     global _redis_store
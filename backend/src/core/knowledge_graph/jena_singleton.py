@@ -29,7 +29,7 @@ def get_jena_knowledge_graph(redis_client=None) -> JenaKnowledgeGraph:
                 _jena_graph = JenaKnowledgeGraph(use_cache="redis")
                 
                 # If Redis client provided, set it
-                if redis_client and hasattr(_jena_graph, 'graph'):
+                if redis_client:
                     from .jena_redis_store import _redis_store
                     if _redis_store:
                         _redis_store.redis = redis_client
@@ -0,0 +1,345 @@
+"""
+Traversal over a locally held adjacency graph.
+
+GraphTraversalEngine's BFS/DFS issue two Cypher queries per visited node.
+SubgraphTraversalEngine instead fetches the bounded neighbourhood of the
+start node in a single variable-length query (or keeps a periodically
+refreshed snapshot of the whole graph) and runs BFS, DFS, shortest-path and
+all-paths searches in memory, with relationship include/exclude filters
+applied locally.
+
+scripts/benchmark_subgraph_traversal.py compares it with the per-node round
+trips of GraphTraversalEngine on a synthetic business graph.
+"""
+
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import structlog
+
+from .graph_traversal import GraphTraversalEngine, TraversalOptions
+from .models import NodeType, RelationType, QueryPath, GraphNode, GraphRelationship
+
+logger = structlog.get_logger()
+
+# One round trip: every node within the bounded neighbourhood plus the edges among them
+NEIGHBOURHOOD_QUERY = """
+    MATCH (start {{id: $start_id}})
+    MATCH (start)-[{rel_filter}*0..{depth}]-(n)
+    WITH collect(DISTINCT n) AS nodes
+    UNWIND nodes AS a
+    OPTIONAL MATCH (a)-[r{rel_filter}]->(b)
+    WHERE b IN nodes
+    RETURN a AS node, labels(a) AS labels,
+           collect(CASE WHEN r IS NULL THEN NULL
+                        ELSE {{target: b.id, type: type(r), properties: properties(r)}} END) AS edges
+"""
+
+SNAPSHOT_QUERY = """
+    MATCH (a)
+    OPTIONAL MATCH (a)-[r]->(b)
+    RETURN a AS node, labels(a) AS labels,
+           collect(CASE WHEN r IS NULL THEN NULL
+                        ELSE {target: b.id, type: type(r), properties: properties(r)} END) AS edges
+"""
+
+
+def _node_type(labels: Iterable[str]) -> NodeType:
+    for label in labels:
+        try:
+            return NodeType(label)
+        except ValueError:
+            continue
+    return NodeType.L1_METRIC  # Default, as in GraphTraversalEngine
+
+
+def _relationship_type(rel_type: str) -> RelationType:
+    try:
+        return RelationType(rel_type)
+    except ValueError:
+        return RelationType.CONTAINS  # Default, as in GraphTraversalEngine
+
+
+class AdjacencyGraph:
+    """Nodes and undirected adjacency lists; relationships keep their stored direction."""
+
+    def __init__(self):
+        self.nodes: Dict[str, GraphNode] = {}
+        self.adjacency: Dict[str, List[Tuple[str, GraphRelationship]]] = {}
+        self.edge_count = 0
+        self.loaded_at = time.monotonic()
+
+    def add_node(self, node: GraphNode):
+        self.nodes[node.id] = node
+        self.adjacency.setdefault(node.id, [])
+
+    def add_relationship(self, relationship: GraphRelationship):
+        self.adjacency.setdefault(relationship.source_id, []).append((relationship.target_id, relationship))
+        if relationship.target_id != relationship.source_id:
+            self.adjacency.setdefault(relationship.target_id, []).append((relationship.source_id, relationship))
+        self.edge_count += 1
+
+    @classmethod
+    def from_records(cls, records: Iterable[Any]) -> "AdjacencyGraph":
+        """Build from rows of NEIGHBOURHOOD_QUERY / SNAPSHOT_QUERY (node, labels, edges)."""
+        graph = cls()
+        pending = []
+        for record in records:
+            properties = dict(record["node"])
+            node_id = properties.get("id")
+            if not node_id:
+                continue
+            graph.add_node(GraphNode(id=node_id, type=_node_type(record["labels"]), properties=properties))
+            for edge in record["edges"] or []:
+                if edge and edge.get("target"):
+                    pending.append(GraphRelationship(
+                        source_id=node_id,
+                        target_id=edge["target"],
+                        type=_relationship_type(edge["type"]),
+                        properties=dict(edge.get("properties") or {})
+                    ))
+        for relationship in pending:
+            if relationship.target_id in graph.nodes:
+                graph.add_relationship(relationship)
+        return graph
+
+    def neighbors(self, node_id: str, options: TraversalOptions) -> List[Tuple[str, GraphRelationship]]:
+        """
+        Neighbours reachable over relationships allowed by the options.
+
+        Each neighbour appears once, with the first allowed relationship to it,
+        like the DISTINCT neighbour ids of GraphTraversalEngine._get_neighbors;
+        parallel edges would otherwise yield duplicate paths.
+        """
+        include = options.include_relationships
+        exclude = options.exclude_relationships
+        seen: Set[str] = set()
+        neighbors = []
+        for neighbor_id, relationship in self.adjacency.get(node_id, ()):
+            if neighbor_id in seen:
+                continue
+            if (include and relationship.type not in include) or (exclude and relationship.type in exclude):
+                continue
+            seen.add(neighbor_id)
+            neighbors.append((neighbor_id, relationship))
+        return neighbors
+
+
+class SubgraphTraversalEngine(GraphTraversalEngine):
+    """
+    GraphTraversalEngine that runs every strategy against a local adjacency graph.
+
+    With ``snapshot_ttl`` set, the whole graph is loaded in one query and
+    reloaded once it is older than the TTL; otherwise each traversal fetches
+    only the start node's bounded neighbourhood (cached for ``cache_ttl``).
+    """
+
+    def __init__(self, graph=None, snapshot_ttl: Optional[float] = None,
+                 cache_ttl: float = 60.0, cache_size: int = 128):
+        """
+        Args:
+            graph: FinancialKnowledgeGraph client
+            snapshot_ttl: Seconds between whole-graph snapshot refreshes (None = per-traversal neighbourhoods)
+            cache_ttl: Seconds a fetched neighbourhood is reused
+            cache_size: Neighbourhoods kept
+        """
+        super().__init__(graph)
+        self.snapshot_ttl = snapshot_ttl
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._snapshot: Optional[AdjacencyGraph] = None
+        self._neighbourhoods: "OrderedDict[Tuple[str, int, str], AdjacencyGraph]" = OrderedDict()
+        self.stats = {"round_trips": 0, "cache_hits": 0, "legacy_round_trips": 0}
+
+    def refresh(self):
+        """Drop the snapshot and cached neighbourhoods so the next traversal reloads."""
+        self._snapshot = None
+        self._neighbourhoods.clear()
+
+    def _run(self, query: str, **parameters) -> AdjacencyGraph:
+        self.stats["round_trips"] += 1
+        with self.graph.driver.session() as session:
+            return AdjacencyGraph.from_records(session.run(query, **parameters))
+
+    def load_adjacency(self, start_id: str, options: TraversalOptions) -> AdjacencyGraph:
+        """Adjacency graph covering every node within options.max_depth hops of the start."""
+        now = time.monotonic()
+        if self.snapshot_ttl is not None:
+            if self._snapshot is None or now - self._snapshot.loaded_at > self.snapshot_ttl:
+                self._snapshot = self._run(SNAPSHOT_QUERY)
+                logger.info(f"Loaded graph snapshot ({len(self._snapshot.nodes)} nodes, "
+                            f"{self._snapshot.edge_count} relationships)")
+            else:
+                self.stats["cache_hits"] += 1
+            return self._snapshot
+
+        rel_filter = self._build_relationship_filter(options)
+        key = (start_id, options.max_depth, rel_filter)
+        cached = self._neighbourhoods.get(key)
+        if cached is not None and now - cached.loaded_at <= self.cache_ttl:
+            self._neighbourhoods.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return cached
+
+        query = NEIGHBOURHOOD_QUERY.format(rel_filter=rel_filter, depth=int(options.max_depth))
+        adjacency = self._run(query, start_id=start_id)
+        self._neighbourhoods[key] = adjacency
+        if len(self._neighbourhoods) > self.cache_size:
+            self._neighbourhoods.popitem(last=False)
+        return adjacency
+
+    def _find_shortest_paths(self, start_id: str, target_type: Optional[NodeType],
+                             target_id: Optional[str], options: TraversalOptions) -> List[QueryPath]:
+        """One shortest path to each matching node, nearest first."""
+        return shortest_paths(self.load_adjacency(start_id, options), start_id, target_type, target_id, options)
+
+    def _find_all_paths(self, start_id: str, target_type: Optional[NodeType],
+                        target_id: Optional[str], options: TraversalOptions) -> List[QueryPath]:
+        """All simple paths of 1..max_depth hops ending at a matching node."""
+        return all_paths(self.load_adjacency(start_id, options), start_id, target_type, target_id, options)
+
+    def _bfs_traversal(self, start_id: str, target_type: Optional[NodeType],
+                       target_id: Optional[str], options: TraversalOptions) -> List[QueryPath]:
+        """Breadth-first traversal."""
+        paths, expanded = bfs_paths(self.load_adjacency(start_id, options), start_id, target_type, target_id, options)
+        self.stats["legacy_round_trips"] += 2 * expanded
+        return paths
+
+    def _dfs_traversal(self, start_id: str, target_type: Optional[NodeType],
+                       target_id: Optional[str], options: TraversalOptions) -> List[QueryPath]:
+        """Depth-first traversal."""
+        paths, expanded = dfs_paths(self.load_adjacency(start_id, options), start_id, target_type, target_id, options)
+        self.stats["legacy_round_trips"] += 2 * expanded
+        return paths
+
+
+def _is_target(node: GraphNode, target_type: Optional[NodeType], target_id: Optional[str]) -> bool:
+    if target_id and node.id == target_id:
+        return True
+    if target_type and node.type == target_type:
+        return True
+    return not target_id and not target_type
+
+
+def bfs_paths(graph: AdjacencyGraph, start_id: str, target_type: Optional[NodeType],
+              target_id: Optional[str], options: TraversalOptions) -> Tuple[List[QueryPath], int]:
+    """
+    Same visiting order and depth rule as GraphTraversalEngine._bfs_traversal.
+
+    Returns:
+        (paths, number of nodes expanded)
+    """
+    paths = []
+    visited: Set[str] = set()
+    queue = deque([(start_id, [], [])])
+    expanded = 0
+
+    while queue and len(paths) < options.max_paths:
+        current_id, node_path, rel_path = queue.popleft()
+        if current_id in visited:
+            continue
+        visited.add(current_id)
+        expanded += 1
+
+        node = graph.nodes.get(current_id)
+        if node is None:
+            continue
+        new_nodes = node_path + [node]
+        if _is_target(node, target_type, target_id):
+            paths.append(QueryPath(nodes=new_nodes, relationships=rel_path, score=0.0, path_type="bfs"))
+
+        if len(new_nodes) < options.max_depth:
+            for neighbor_id, relationship in graph.neighbors(current_id, options):
+                if neighbor_id not in visited:
+                    queue.append((neighbor_id, new_nodes, rel_path + [relationship]))
+    return paths, expanded
+
+
+def dfs_paths(graph: AdjacencyGraph, start_id: str, target_type: Optional[NodeType],
+              target_id: Optional[str], options: TraversalOptions) -> Tuple[List[QueryPath], int]:
+    """
+    Same visiting order and depth rule as GraphTraversalEngine._dfs_traversal.
+
+    Returns:
+        (paths, number of nodes expanded)
+    """
+    paths = []
+    expanded = 0
+
+    def dfs(node_id: str, node_path: List[GraphNode], rel_path: List[GraphRelationship], on_path: Set[str]):
+        nonlocal expanded
+        if len(paths) >= options.max_paths or node_id in on_path or len(node_path) > options.max_depth:
+            return
+        node = graph.nodes.get(node_id)
+        expanded += 1
+        if node is None:
+            return
+
+        new_nodes = node_path + [node]
+        if _is_target(node, target_type, target_id):
+            paths.append(QueryPath(nodes=new_nodes, relationships=rel_path, score=0.0, path_type="dfs"))
+
+        on_path.add(node_id)
+        for neighbor_id, relationship in graph.neighbors(node_id, options):
+            dfs(neighbor_id, new_nodes, rel_path + [relationship], on_path)
+        on_path.discard(node_id)
+
+    dfs(start_id, [], [], set())
+    return paths, expanded
+
+
+def shortest_paths(graph: AdjacencyGraph, start_id: str, target_type: Optional[NodeType],
+                   target_id: Optional[str], options: TraversalOptions) -> List[QueryPath]:
+    """One shortest path (at most max_depth hops) to each matching node other than the start."""
+    if start_id not in graph.nodes:
+        return []
+    parents: Dict[str, Optional[Tuple[str, GraphRelationship]]] = {start_id: None}
+    queue = deque([(start_id, 0)])
+    paths = []
+
+    while queue and len(paths) < options.max_paths:
+        current_id, depth = queue.popleft()
+        node = graph.nodes[current_id]
+        if current_id != start_id and _is_target(node, target_type, target_id):
+            nodes, relationships = [], []
+            cursor = current_id
+            while cursor is not None:
+                nodes.append(graph.nodes[cursor])
+                parent = parents[cursor]
+                if parent is None:
+                    break
+                relationships.append(parent[1])
+                cursor = parent[0]
+            nodes.reverse()
+            relationships.reverse()
+            paths.append(QueryPath(nodes=nodes, relationships=relationships, score=0.0, path_type="shortest_path"))
+
+        if depth < options.max_depth:
+            for neighbor_id, relationship in graph.neighbors(current_id, options):
+                if neighbor_id not in parents and neighbor_id in graph.nodes:
+                    parents[neighbor_id] = (current_id, relationship)
+                    queue.append((neighbor_id, depth + 1))
+    return paths
+
+
+def all_paths(graph: AdjacencyGraph, start_id: str, target_type: Optional[NodeType],
+              target_id: Optional[str], options: TraversalOptions) -> List[QueryPath]:
+    """Simple paths of 1..max_depth hops to matching nodes, capped like the Cypher version."""
+    if start_id not in graph.nodes:
+        return []
+    limit = options.max_paths * 10
+    paths = []
+    stack = [(start_id, [graph.nodes[start_id]], [], {start_id})]
+
+    while stack and len(paths) < limit:
+        current_id, nodes, relationships, on_path = stack.pop()
+        if relationships and _is_target(nodes[-1], target_type, target_id) and nodes[-1].id != start_id:
+            paths.append(QueryPath(nodes=nodes, relationships=relationships, score=0.0, path_type="all_paths"))
+        if len(relationships) >= options.max_depth:
+            continue
+        for neighbor_id, relationship in reversed(graph.neighbors(current_id, options)):
+            if neighbor_id not in on_path and neighbor_id in graph.nodes:
+                stack.append((neighbor_id, nodes + [graph.nodes[neighbor_id]],
+                              relationships + [relationship], on_path | {neighbor_id}))
+    return paths
@@ -0,0 +1,100 @@
+"""
+Compiled synonym rewriting for natural language questions.
+
+The synonym table is compiled once into a word-level trie. Rewriting a
+question is one left-to-right pass over its words: at each word the trie is
+followed as far as it matches, the longest complete synonym wins and is
+replaced by its primary term, and scanning resumes after it. Matches always
+cover whole words, so 'mom' does not fire inside 'moment' and 'ebit' does not
+fire inside 'ebitda'.
+"""
+
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Trie key marking the end of a complete synonym
+_TERMINAL = ""
+
+
+@dataclass
+class SynonymRewrite:
+    """Result of rewriting one question."""
+    text: str
+    matches: Dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+class SynonymMatcher:
+    """Longest-match, whole-word synonym replacement over a precompiled trie."""
+
+    def __init__(self, synonyms: Iterable[Tuple[str, str]]):
+        """
+        Args:
+            synonyms: (synonym term, primary term) pairs; earlier pairs win on duplicates
+        """
+        self.trie: Dict[str, dict] = {}
+        self.size = 0
+        self.rewrites = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+        for synonym, primary in synonyms:
+            words = WORD_PATTERN.findall(synonym.lower())
+            if not words:
+                continue
+            node = self.trie
+            for word in words:
+                node = node.setdefault(word, {})
+            if _TERMINAL not in node:
+                node[_TERMINAL] = (synonym, primary)
+                self.size += 1
+
+    def rewrite(self, text: str) -> SynonymRewrite:
+        """Replace every synonym in the text with its primary term."""
+        started = time.perf_counter()
+        words = [(match.group().lower(), match.start(), match.end()) for match in WORD_PATTERN.finditer(text)]
+        pieces: List[str] = []
+        matches: Dict[str, str] = {}
+        position = 0
+        index = 0
+
+        while index < len(words):
+            node = self.trie
+            longest: Optional[Tuple[int, Tuple[str, str]]] = None
+            cursor = index
+            while cursor < len(words) and words[cursor][0] in node:
+                node = node[words[cursor][0]]
+                cursor += 1
+                if _TERMINAL in node:
+                    longest = (cursor, node[_TERMINAL])
+
+            if longest is None:
+                index += 1
+                continue
+
+            end_index, (synonym, primary) = longest
+            pieces.append(text[position:words[index][1]])
+            pieces.append(primary)
+            position = words[end_index - 1][2]
+            matches[synonym] = primary
+            index = end_index
+
+        pieces.append(text[position:])
+        elapsed = time.perf_counter() - started
+        self.rewrites += 1
+        self.total_seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+        return SynonymRewrite(text="".join(pieces), matches=matches, seconds=elapsed)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Rewrite latency statistics since the matcher was compiled."""
+        return {
+            "synonyms": self.size,
+            "rewrites": self.rewrites,
+            "avg_ms": round(self.total_seconds / self.rewrites * 1000, 4) if self.rewrites else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 4),
+        }
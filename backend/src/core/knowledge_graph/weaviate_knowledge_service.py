@@ -29,6 +29,7 @@ from dataclasses import dataclass, field
 import re
 
 from src.config import settings
+from .column_type_classifier import ColumnTypeClassifier
 
 logger = structlog.get_logger()
 
@@ -93,6 +94,7 @@ class WeaviateKnowledgeService:
         self.client = self._init_client()
         self._embedding_service = embedding_service
         self._collections_verified = False
+        self._column_classifier: Optional[ColumnTypeClassifier] = None
 
     def _init_client(self) -> Optional[weaviate.WeaviateClient]:
         """Initialize Weaviate client."""
@@ -303,6 +305,35 @@ class WeaviateKnowledgeService:
             logger.error(f"Error getting related metrics: {e}")
             return []
 
+    @property
+    def column_classifier(self) -> ColumnTypeClassifier:
+        """Lazy-load the batch column type classifier."""
+        if self._column_classifier is None:
+            self._column_classifier = ColumnTypeClassifier(
+                embed_batch=self.embedding_service.generate_embeddings,
+                load_references=self._load_column_type_references,
+                memo_path=settings.column_type_memo_path
+            )
+        return self._column_classifier
+
+    def _load_column_type_references(self) -> Tuple[List[List[float]], List[Dict[str, Any]]]:
+        """Fetch every ColumnTypes object with its vector in one pass."""
+        if not self._verify_collections():
+            return [], []
+
+        vectors, properties = [], []
+        collection = self.client.collections.get("ColumnTypes")
+        for item in collection.iterator(include_vector=True):
+            vector = item.vector.get("default") if isinstance(item.vector, dict) else item.vector
+            if vector:
+                vectors.append(vector)
+                properties.append({
+                    "column_pattern": item.properties["column_pattern"],
+                    "display_type": item.properties["display_type"],
+                    "format_template": item.properties["format_template"],
+                })
+        return vectors, properties
+
     def get_column_type(self, column_name: str) -> Optional[ColumnTypeMatch]:
         """Determine display type for a column based on its name.
 
@@ -312,74 +343,25 @@ class WeaviateKnowledgeService:
         Returns:
             ColumnTypeMatch with display_type and format_template
         """
-        # First try pattern matching (fast)
-        col_lower = column_name.lower()
-
-        # Direct pattern checks
-        if any(p in col_lower for p in ['pct', 'percent', '%', 'ratio', 'rate', 'roi', 'roa', 'roe', 'roic']):
-            return ColumnTypeMatch(
-                column_pattern="percentage",
-                display_type="percentage",
-                format_template="#.##%",
-                confidence=1.0
-            )
+        return self.get_column_types_batch([column_name]).get(column_name)
 
-        if any(p in col_lower for p in ['revenue', 'sales', 'amount', 'total', 'cost', 'margin', 'profit', 'price', 'fee', 'income', 'expense']):
-            return ColumnTypeMatch(
-                column_pattern="currency",
-                display_type="currency",
-                format_template="$#,##0.00",
-                confidence=1.0
-            )
-
-        if any(p in col_lower for p in ['quantity', 'qty', 'count', 'units', 'volume']):
-            return ColumnTypeMatch(
-                column_pattern="integer",
-                display_type="integer",
-                format_template="#,##0",
-                confidence=1.0
-            )
+    def get_column_types_batch(self, column_names: List[str]) -> Dict[str, ColumnTypeMatch]:
+        """Get display types for multiple columns.
 
-        if any(p in col_lower for p in ['date', 'time', 'created', 'updated', 'period']):
-            return ColumnTypeMatch(
-                column_pattern="date",
-                display_type="date",
-                format_template="YYYY-MM-DD",
-                confidence=1.0
+        Pattern rules and memoized names are answered locally; the remaining
+        names are embedded in one batch and matched against the cached
+        ColumnTypes vectors.
+        """
+        return {
+            col: ColumnTypeMatch(
+                column_pattern=match["column_pattern"],
+                display_type=match["display_type"],
+                format_template=match["format_template"],
+                confidence=match["confidence"]
             )
-
-        # Fall back to Weaviate semantic search
-        if self._verify_collections():
-            try:
-                embedding = self.embedding_service.generate_embedding(column_name)
-                collection = self.client.collections.get("ColumnTypes")
-
-                response = collection.query.near_vector(
-                    near_vector=embedding,
-                    limit=1,
-                    return_metadata=wvc.query.MetadataQuery(distance=True)
-                )
-
-                if response.objects:
-                    best = response.objects[0]
-                    distance = best.metadata.distance if best.metadata else 0.5
-
-                    if distance < 0.4:
-                        return ColumnTypeMatch(
-                            column_pattern=best.properties["column_pattern"],
-                            display_type=best.properties["display_type"],
-                            format_template=best.properties["format_template"],
-                            confidence=1 - distance
-                        )
-
-            except Exception as e:
-                logger.error(f"Error getting column type: {e}")
-
-        return None
-
-    def get_column_types_batch(self, column_names: List[str]) -> Dict[str, ColumnTypeMatch]:
-        """Get display types for multiple columns."""
-        return {col: match for col in column_names if (match := self.get_column_type(col)) is not None}
+            for col, match in self.column_classifier.classify(column_names).items()
+            if match is not None
+        }
 
     def get_similar_sql_examples(self, query: str, limit: int = 3, dialect: str = "bigquery") -> List[Dict[str, Any]]:
         """Find SQL examples similar to the user query for few-shot prompting.
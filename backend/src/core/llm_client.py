@@ -2,13 +2,17 @@ from typing import List, Dict, Any, Optional, Tuple
 import anthropic
 from anthropic import Anthropic
 import structlog
+import asyncio
 import json
 import time
 from src.config import settings
+from src.db.schema_object_cache import get_schema_object_cache
 from src.core.error_handler import QueryErrorHandler, ErrorType
 from src.core.schema_aware_generator import SchemaAwareGenerator
 from src.core.gross_margin_examples import GROSS_MARGIN_EXAMPLES, COPA_GROSS_MARGIN_RULES
 from src.core.financial_analysis_queries import FINANCIAL_ANALYSIS_QUERIES
+from src.core.prompt_cache import SQL_GENERATION_TOOL, get_prompt_prefix_cache
+from src.core.llm_governor import governed_client
 
 # Import knowledge service for semantic search (optional)
 try:
@@ -25,12 +29,14 @@ logger = structlog.get_logger()
 
 class LLMClient:
     def __init__(self):
-        self.client = Anthropic(api_key=settings.anthropic_api_key)
+        # API calls are queued and rate-limited by the process-wide LLM governor
+        self.client = governed_client(Anthropic(api_key=settings.anthropic_api_key), "anthropic")
         self.model = settings.anthropic_model
         self.error_handler = QueryErrorHandler(llm_client=self)
         self.max_retries = 3
         self.retry_delay = 1.0  # Base delay in seconds
         self.schema_aware = SchemaAwareGenerator()
+        self.prompt_cache = get_prompt_prefix_cache()
 
         # Initialize knowledge service for semantic search (optional)
         self.knowledge_service = None
@@ -196,69 +202,44 @@ ORDER BY current_inventory ASC"""
         logger.info(f"Financial context type: {type(financial_context)}")
         logger.info(f"Business context type: {type(business_context)}")
         try:
-            logger.info("Building system prompt...")
-            system_prompt = self._build_system_prompt(financial_context)
-            logger.info("System prompt built successfully")
-            
+            # Static prefix (tool, instructions, schema block) is memoized per schema version
+            # and marked for provider-side caching; only the question-specific prompt follows it
+            prefix = self.prompt_cache.prefix(
+                self.prompt_cache.instructions("sql_generation", self._build_instructions),
+                table_schemas,
+                self._build_schema_block,
+            )
+
             # Use provided examples or default few-shot examples
             logger.info("Getting relevant examples...")
             effective_examples = examples if examples else self._get_relevant_examples(user_query, financial_context)
             logger.info(f"Got {len(effective_examples) if effective_examples else 0} examples")
-            
-            logger.info("Building user prompt...")
-            user_prompt = self._build_user_prompt(user_query, table_schemas, effective_examples, financial_context, business_context, join_hints)
-            logger.info("User prompt built successfully")
+
+            logger.info("Building question prompt...")
+            question_prompt = self._build_question_prompt(user_query, table_schemas, effective_examples, financial_context, business_context, join_hints)
+            financial_rules = self._build_financial_rules(financial_context)
+            if financial_rules:
+                question_prompt = financial_rules.lstrip("\n") + "\n\n" + question_prompt
             if join_hints:
                 logger.info(f"JOIN hints included in prompt: {len(join_hints)} relationships")
-            
-            logger.info(f"Generating SQL for query: {user_query[:100]}...", retry_count=retry_count)
-            
-            # Define the tool for structured output
-            sql_generation_tool = {
-                "name": "generate_sql_query",
-                "description": "Generate a SQL query with metadata",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "sql": {
-                            "type": "string",
-                            "description": "The generated PostgreSQL SQL query"
-                        },
-                        "explanation": {
-                            "type": "string",
-                            "description": "Brief, user-friendly explanation from AXIS.AI's perspective about what you're doing to answer the question. Focus on the BUSINESS INTENT and high-level approach (e.g., 'I'm analyzing sales data for Audrey Le', 'I'm calculating total revenue across all regions'). Use first-person (I'm..., I've...). Keep it simple - avoid mentioning SQL syntax, CTEs, JOINs, or technical database details. Maximum 2-3 sentences."
-                        },
-                        "tables_used": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "List of table names referenced in the query"
-                        },
-                        "estimated_complexity": {
-                            "type": "string",
-                            "enum": ["low", "medium", "high"],
-                            "description": "Estimated query complexity"
-                        },
-                        "optimization_notes": {
-                            "type": "string",
-                            "description": "Any performance considerations or optimizations applied"
-                        }
-                    },
-                    "required": ["sql", "explanation", "tables_used", "estimated_complexity"]
-                }
-            }
-            
+
+            logger.info(f"Generating SQL for query: {user_query[:100]}...", retry_count=retry_count,
+                        schema_version=prefix.schema_version)
+
+            started = time.time()
             response = self.client.messages.create(
                 model=self.model,
                 max_tokens=2000,
                 temperature=0,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": user_prompt + "\n\nPlease use the generate_sql_query tool to provide your response."}
-                ],
-                tools=[sql_generation_tool],
-                tool_choice={"type": "tool", "name": "generate_sql_query"}
+                **self.prompt_cache.build_request(
+                    prefix,
+                    question_prompt + "\n\nPlease use the generate_sql_query tool to provide your response.",
+                    tool=SQL_GENERATION_TOOL,
+                )
             )
-            
+            if getattr(response, "usage", None) is not None:
+                self.prompt_cache.record_usage(response.usage, time.time() - started)
+
             # Debug logging for response structure
             logger.info(f"Response type: {type(response)}")
             logger.info(f"Response content type: {type(response.content)}")
@@ -395,18 +376,17 @@ ORDER BY current_inventory ASC"""
                     raise ValueError("No valid response from LLM")
             
         except anthropic.RateLimitError as e:
+            # The governor backs off and retries per retry-after in worker threads. On the event
+            # loop it cannot wait (and neither may we), so the error is returned straight away;
+            # request handlers call generate_sql through asyncio.to_thread.
             logger.warning(f"Rate limit hit: {e}")
-            if retry_count < self.max_retries:
-                time.sleep(self.retry_delay * (2 ** retry_count))  # Exponential backoff
-                return self.generate_sql(user_query, table_schemas, examples, retry_count + 1)
-            else:
-                error_result = self.error_handler.handle_error(
-                    e,
-                    {"user_query": user_query, "tables_used": [s["table_name"] for s in table_schemas] if table_schemas and isinstance(table_schemas[0], dict) else []},
-                    retry_count
-                )
-                error_result["sql"] = None
-                return error_result
+            error_result = self.error_handler.handle_error(
+                e,
+                {"user_query": user_query, "tables_used": [s["table_name"] for s in table_schemas] if table_schemas and isinstance(table_schemas[0], dict) else []},
+                retry_count
+            )
+            error_result["sql"] = None
+            return error_result
                 
         except anthropic.APIError as e:
             logger.error(f"API error: {e}")
@@ -440,7 +420,11 @@ ORDER BY current_inventory ASC"""
             return error_result
     
     def _build_system_prompt(self, financial_context: Optional[Dict[str, Any]] = None) -> str:
-        base_prompt = f"""You are an expert SQL query generator for PostgreSQL. Your task is to convert natural language questions into optimized PostgreSQL SQL queries.
+        return self._build_instructions() + self._build_financial_rules(financial_context)
+
+    def _build_instructions(self) -> str:
+        """SQL generation instructions; identical for every question, so they lead the cached prefix."""
+        return f"""You are an expert SQL query generator for PostgreSQL. Your task is to convert natural language questions into optimized PostgreSQL SQL queries.
 
 !!!! ABSOLUTELY CRITICAL - CASE-INSENSITIVE TEXT MATCHING !!!!
 ⚠️ PostgreSQL string comparisons are CASE-SENSITIVE by default! ⚠️
@@ -800,9 +784,12 @@ Rules:
     ✅ CORRECT: COUNT(*) AS invoice_count
     ✅ CORRECT: to_char(COUNT(*), 'FM999,999,999') AS invoice_count  -- commas OK, no $"""
 
-        # Add financial context if provided
-        if financial_context:
-            financial_rules = """
+    def _build_financial_rules(self, financial_context: Optional[Dict[str, Any]] = None) -> str:
+        """Financial rules and formulas for the question's financial context, if any."""
+        if not financial_context:
+            return ""
+
+        financial_rules = """
 
 Financial Query Rules:
 11. For financial metrics, use the provided formulas exactly as specified
@@ -811,22 +798,28 @@ Financial Query Rules:
 14. Apply the appropriate hierarchy level (L1, L2, or L3) based on the query intent
 15. For time-based financial queries, use fiscal periods when available
 16. Group financial data appropriately based on the requested dimensions"""
-            
-            if financial_context.get("formulas"):
-                financial_rules += "\n\nAvailable Financial Formulas:"
-                for metric, formula in financial_context["formulas"].items():
-                    # Handle both dict and string formula formats
-                    if isinstance(formula, dict):
-                        formula_str = list(formula.values())[0] if formula else 'N/A'
-                    else:
-                        formula_str = str(formula) if formula else 'N/A'
-                    financial_rules += f"\n- {metric}: {formula_str}"
-            
-            base_prompt += financial_rules
-        
-        return base_prompt
+
+        if financial_context.get("formulas"):
+            financial_rules += "\n\nAvailable Financial Formulas:"
+            for metric, formula in financial_context["formulas"].items():
+                # Handle both dict and string formula formats
+                if isinstance(formula, dict):
+                    formula_str = list(formula.values())[0] if formula else 'N/A'
+                else:
+                    formula_str = str(formula) if formula else 'N/A'
+                financial_rules += f"\n- {metric}: {formula_str}"
+
+        return financial_rules
     
-    def _build_user_prompt(
+    def _build_schema_block(self, schemas: List[Dict[str, Any]]) -> str:
+        """Table schemas with their column types; the cached part of the user prompt."""
+        schema_cache = get_schema_object_cache()
+        prompt_parts = ["Available tables and their schemas:"]
+        for schema in schemas:
+            prompt_parts.append(schema_cache.fragment(schema, "prompt"))
+        return self.schema_aware.enhance_prompt_with_type_info("\n".join(prompt_parts), schemas)
+
+    def _build_question_prompt(
         self,
         query: str,
         schemas: List[Dict[str, Any]],
@@ -835,6 +828,7 @@ Financial Query Rules:
         business_context: Optional[Dict[str, Any]] = None,
         join_hints: Optional[List[Dict[str, Any]]] = None
     ) -> str:
+        """Everything in the user prompt that depends on the question; sent after the cached prefix."""
         prompt_parts = []
 
         # Check if query contains names that need case-insensitive matching
@@ -859,23 +853,6 @@ Financial Query Rules:
             prompt_parts.append("Remember: Use '$' || to_char() for currency formatting")
             prompt_parts.append("")
 
-        # Add table schemas
-        prompt_parts.append("Available tables and their schemas:")
-        for schema in schemas:
-            table_info = f"\nTable: {schema['table_name']}"
-            if schema.get('description'):
-                table_info += f"\nDescription: {schema['description']}"
-            
-            table_info += "\nColumns:"
-            for col in schema['columns']:
-                col_info = f"\n  - {col['name']} ({col['type']})"
-                if col.get('description'):
-                    col_info += f": {col['description']}"
-                col_info += f" {'[REQUIRED]' if not col['is_nullable'] else '[NULLABLE]'}"
-                table_info += col_info
-            
-            prompt_parts.append(table_info)
-
         # Add JOIN hints if multiple tables are involved
         if join_hints and len(join_hints) > 0:
             prompt_parts.append("\n\n⚠️ MULTI-TABLE QUERY DETECTED - JOIN REQUIRED ⚠️")
@@ -1012,12 +989,8 @@ Financial Query Rules:
         
         # Store examples used for confidence calculation
         self._last_examples_used = examples
-        
-        # Enhance prompt with type information
-        final_prompt = "\n".join(prompt_parts)
-        final_prompt = self.schema_aware.enhance_prompt_with_type_info(final_prompt, schemas)
-        
-        return final_prompt
+
+        return "\n".join(prompt_parts)
     
     def _get_table_alias(self, table_name: str) -> str:
         """Generate a short alias for a table name."""
@@ -1196,6 +1169,12 @@ Return a JSON object with:
         embedding_service = EmbeddingService()
         return embedding_service.generate_embedding(text)
 
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for many texts in one batch request."""
+        from src.core.embeddings import EmbeddingService
+        embedding_service = EmbeddingService()
+        return embedding_service.generate_embeddings(texts)
+
     def get_metric_context(self, query: str) -> Optional[Dict[str, Any]]:
         """Get relevant financial metric definitions from knowledge service.
 
@@ -1516,15 +1495,8 @@ Return the corrected SQL in the same JSON format."""
     
     def _format_schemas_for_prompt(self, schemas: List[Dict[str, Any]]) -> str:
         """Format schemas concisely for error correction prompt."""
-        formatted = []
-        for schema in schemas:
-            table_info = f"Table: {schema['table_name']}"
-            columns = [f"{col['name']} ({col['type']})" for col in schema['columns'][:10]]  # Limit columns
-            table_info += "\nColumns: " + ", ".join(columns)
-            if len(schema['columns']) > 10:
-                table_info += f" ... and {len(schema['columns']) - 10} more"
-            formatted.append(table_info)
-        return "\n\n".join(formatted)
+        schema_cache = get_schema_object_cache()
+        return "\n\n".join(schema_cache.fragment(schema, "summary") for schema in schemas)
 
     def generate_completion(self, prompt: str, max_tokens: int = 2000, system_prompt: str = None) -> str:
         """Generate a text completion using Claude.
@@ -1559,6 +1531,10 @@ Return the corrected SQL in the same JSON format."""
             logger.error(f"Error generating completion: {e}")
             raise
 
+    async def generate_text(self, prompt: str, max_tokens: int = 2000, system_prompt: str = None) -> str:
+        """Async generate_completion; runs off the event loop so the call can wait in the LLM governor's queue."""
+        return await asyncio.to_thread(self.generate_completion, prompt, max_tokens, system_prompt)
+
     def analyze_image(
         self,
         image_data: bytes,
@@ -0,0 +1,643 @@
+"""
+Process-wide dispatch governor for Anthropic and OpenAI calls.
+
+Interactive queries, deep-research steps, document analysis, Pulse insights
+and cache warming used to call the providers independently. A research run
+or a warming sweep could therefore use up the rate limit and stall
+interactive chat. Every SDK client created through governed_client() now
+sends its create() calls through one LLMGovernor, which admits them per
+provider:
+
+- Priority queues: waiting calls are admitted interactive first, then
+  batch (research, document analysis), then background (Pulse, cache
+  warming). Within a tier, calls are admitted in arrival order. The tier
+  comes from the llm_priority context, so it crosses asyncio.to_thread.
+- Concurrency caps per provider. Lower tiers may only use a share of the
+  cap, so interactive calls always find a free slot.
+- Request and token budgets per minute, with the same shares for the lower
+  tiers. When a CacheManager is attached, the budget counters and rate-limit
+  cooldowns live in Redis, so all workers draw on one budget. Otherwise they
+  are tracked in-process.
+- Backoff that honours retry-after: a 429/529 response puts the provider in
+  a cooldown for the retry-after period (or an exponential backoff) and the
+  call re-queues, up to max_retries.
+
+Calls made on an event-loop thread are never held in the queue or put to
+sleep, because that would block every other request on the loop. They are
+admitted immediately, still count against the caps and budgets, and
+re-raise rate-limit errors after starting the cooldown. Request handlers
+make LLM calls through asyncio.to_thread so that they queue like any other
+call. Redis is only called with the governor's lock released. Queue wait times per tier are
+exported by get_stats().
+"""
+
+import asyncio
+import email.utils
+import functools
+import heapq
+import inspect
+import itertools
+import math
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import structlog
+from src.config import settings
+
+logger = structlog.get_logger()
+
+PREFIX_BUDGET = "llm_governor:budget:"
+PREFIX_COOLDOWN = "llm_governor:cooldown:"
+
+WINDOW_SECONDS = 60.0
+# Longest a queued call sleeps before re-checking shared budgets and cooldowns
+POLL_SECONDS = 0.25
+# Exponential backoff when a rate-limit response carries no retry-after
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+# Rough token cost of an image block when estimating a request
+IMAGE_TOKEN_ESTIMATE = 1600
+WAIT_SAMPLES = 1000
+
+
+class LLMPriority(IntEnum):
+    INTERACTIVE = 0
+    BATCH = 1
+    BACKGROUND = 2
+
+
+class LLMQueueTimeout(TimeoutError):
+    """A call waited longer than the governor's max_wait for a dispatch slot."""
+
+
+_current_priority: ContextVar[LLMPriority] = ContextVar("llm_priority", default=LLMPriority.INTERACTIVE)
+
+
+def current_priority() -> LLMPriority:
+    return _current_priority.get()
+
+
+class llm_priority:
+    """
+    Run the LLM calls made inside a block, or inside a decorated (async)
+    function, at the given priority.
+
+        with llm_priority(LLMPriority.BACKGROUND):
+            ...
+
+        @llm_priority(LLMPriority.BATCH)
+        async def execute_plan(...): ...
+    """
+
+    def __init__(self, priority: LLMPriority):
+        self.priority = LLMPriority(priority)
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_current_priority.set(self.priority))
+        return self
+
+    def __exit__(self, *exc):
+        _current_priority.reset(self._tokens.pop())
+
+    def __call__(self, fn: Callable) -> Callable:
+        priority = self.priority
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                token = _current_priority.set(priority)
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    _current_priority.reset(token)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            token = _current_priority.set(priority)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current_priority.reset(token)
+        return wrapper
+
+
+def estimate_tokens(request: Dict[str, Any]) -> int:
+    """Rough token count of a create() request: prompt characters / 4 plus the output allowance."""
+    def chars(value: Any) -> int:
+        if isinstance(value, str):
+            return len(value)
+        if isinstance(value, dict):
+            if value.get("type") in ("image", "image_url"):
+                return IMAGE_TOKEN_ESTIMATE * 4
+            return sum(chars(item) for item in value.values())
+        if isinstance(value, (list, tuple)):
+            return sum(chars(item) for item in value)
+        return 0
+
+    prompt = sum(chars(request.get(key)) for key in ("system", "messages", "input", "tools"))
+    return prompt // 4 + int(request.get("max_tokens") or 0)
+
+
+def usage_tokens(response: Any) -> Optional[int]:
+    """Tokens a response counted against the provider's limits, if it reports usage."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    total = getattr(usage, "total_tokens", None)  # OpenAI
+    if isinstance(total, int):
+        return total
+    return sum(getattr(usage, name, 0) or 0
+               for name in ("input_tokens", "output_tokens", "cache_creation_input_tokens"))
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Anthropic/OpenAI rate-limit (429) or overloaded (529) errors."""
+    return _status_code(error) in (429, 529) or type(error).__name__ in ("RateLimitError", "OverloadedError")
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the provider's retry-after-ms / retry-after headers."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def on_event_loop() -> bool:
+    """True when called on a thread that is running an asyncio event loop."""
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+@dataclass
+class _Reservation:
+    """Budget taken by one admitted call, corrected with its real usage afterwards."""
+    tokens: int
+    window_entry: Optional[List[float]] = None
+    bucket_key: Optional[str] = None
+
+
+@dataclass
+class _SharedState:
+    """A provider's cooldown and current budget bucket as recorded in Redis by all workers."""
+    cooldown_until: float
+    requests: int
+    tokens: int
+    frees_in: float
+
+
+@dataclass
+class _ProviderState:
+    name: str
+    max_concurrency: int
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    in_flight: int = 0
+    queue: List[List[Any]] = field(default_factory=list)  # Heap of [priority, order]
+    window: Deque[List[float]] = field(default_factory=deque)  # [timestamp, tokens] of recent calls
+    cooldown_until: float = 0.0
+    # Admitted calls whose budget is not yet recorded (in Redis or the window)
+    pending_requests: int = 0
+    pending_tokens: int = 0
+    stats: Dict[str, int] = field(default_factory=lambda: {
+        "dispatched": 0, "rate_limited": 0, "retries": 0, "queue_timeouts": 0, "event_loop_dispatches": 0,
+    })
+
+
+class LLMGovernor:
+    """Priority queues, concurrency caps, token/request budgets and backoff per LLM provider."""
+
+    def __init__(self, limits: Dict[str, Dict[str, int]], shares: Dict[LLMPriority, float],
+                 max_retries: int = 3, max_wait: float = 120.0, enabled: bool = True):
+        """
+        Args:
+            limits: Provider -> {"max_concurrency", "requests_per_minute", "tokens_per_minute"} (0 = no budget)
+            shares: Fraction of each provider's concurrency and budgets a tier may use
+            max_retries: Rate-limit retries per call
+            max_wait: Seconds a call may wait in the queue before LLMQueueTimeout
+            enabled: Dispatch through the queues at all
+        """
+        self.limits = limits
+        self.shares = shares
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.enabled = enabled
+        self.cache_manager = None
+        self._providers: Dict[str, _ProviderState] = {}
+        self._cond = threading.Condition()
+        self._order = itertools.count()
+        self._waits: Dict[LLMPriority, Deque[float]] = {p: deque(maxlen=WAIT_SAMPLES) for p in LLMPriority}
+        self._wait_totals: Dict[LLMPriority, List[float]] = {p: [0, 0.0, 0.0] for p in LLMPriority}  # count, sum, max
+        self._queued: Dict[LLMPriority, int] = {p: 0 for p in LLMPriority}
+
+    def attach(self, cache_manager):
+        """Share budgets and cooldowns with other workers through the CacheManager's Redis connection."""
+        self.cache_manager = cache_manager
+
+    def _redis(self):
+        if self.cache_manager is None or not getattr(self.cache_manager, "enabled", False):
+            return None
+        return self.cache_manager.redis
+
+    def _provider(self, name: str) -> _ProviderState:
+        state = self._providers.get(name)
+        if state is None:
+            limits = self.limits.get(name, {})
+            state = _ProviderState(
+                name=name,
+                max_concurrency=max(1, limits.get("max_concurrency", 8)),
+                requests_per_minute=limits.get("requests_per_minute", 0),
+                tokens_per_minute=limits.get("tokens_per_minute", 0),
+            )
+            self._providers[name] = state
+        return state
+
+    # Budget windows: Redis minute buckets when attached, otherwise a local sliding window.
+    # Redis is only ever called without self._cond held, so a slow round trip
+    # cannot stall admission for every other thread.
+
+    def _read_shared(self, state: _ProviderState, now: float) -> Optional[_SharedState]:
+        """The provider's shared cooldown and budget bucket in one round trip (None without Redis)."""
+        redis_client = self._redis()
+        if redis_client is None:
+            return None
+        minute = int(now // WINDOW_SECONDS)
+        try:
+            pipe = redis_client.pipeline()
+            pipe.get(PREFIX_COOLDOWN + state.name)
+            pipe.hmget(f"{PREFIX_BUDGET}{state.name}:{minute}", "requests", "tokens")
+            cooldown_until, (requests, tokens) = pipe.execute()
+        except Exception as e:
+            logger.warning(f"LLM governor shared state unavailable, using local state: {e}")
+            return None
+        return _SharedState(
+            cooldown_until=float(cooldown_until) if cooldown_until else 0.0,
+            requests=int(requests or 0),
+            tokens=int(tokens or 0),
+            frees_in=(minute + 1) * WINDOW_SECONDS - now,
+        )
+
+    def _local_window(self, state: _ProviderState, now: float):
+        """(requests, tokens, seconds until the window frees up) of the in-process sliding window."""
+        while state.window and state.window[0][0] <= now - WINDOW_SECONDS:
+            state.window.popleft()
+        tokens = sum(entry[1] for entry in state.window)
+        frees_in = state.window[0][0] + WINDOW_SECONDS - now if state.window else 0.0
+        return len(state.window), tokens, frees_in
+
+    def _admit(self, state: _ProviderState, tokens: int):
+        """Take a slot; the budget counts as pending until _reserve records it. Call holding self._cond."""
+        state.in_flight += 1
+        state.pending_requests += 1
+        state.pending_tokens += tokens
+
+    def _reserve(self, state: _ProviderState, tokens: int, now: float) -> _Reservation:
+        """Record an admitted call's budget. Call without holding self._cond."""
+        reservation = _Reservation(tokens=tokens)
+        redis_client = self._redis()
+        if redis_client is not None:
+            try:
+                key = f"{PREFIX_BUDGET}{state.name}:{int(now // WINDOW_SECONDS)}"
+                pipe = redis_client.pipeline()
+                pipe.hincrby(key, "requests", 1)
+                pipe.hincrby(key, "tokens", tokens)
+                pipe.expire(key, int(WINDOW_SECONDS * 2))
+                pipe.execute()
+                reservation.bucket_key = key
+            except Exception as e:
+                logger.warning(f"LLM governor budget unavailable, using local window: {e}")
+        with self._cond:
+            state.pending_requests -= 1
+            state.pending_tokens -= tokens
+            if reservation.bucket_key is None:
+                reservation.window_entry = [now, tokens]
+                state.window.append(reservation.window_entry)
+        return reservation
+
+    def _settle(self, reservation: _Reservation, actual_tokens: Optional[int]):
+        """Replace the estimated tokens of a finished call with what it really used."""
+        if actual_tokens is None or actual_tokens == reservation.tokens:
+            return
+        if reservation.window_entry is not None:
+            reservation.window_entry[1] = actual_tokens
+        elif reservation.bucket_key is not None:
+            try:
+                self._redis().hincrby(reservation.bucket_key, "tokens", actual_tokens - reservation.tokens)
+            except Exception as e:
+                logger.warning(f"Failed to settle LLM token budget: {e}")
+
+    def _start_cooldown(self, state: _ProviderState, seconds: float):
+        until = time.time() + seconds
+        with self._cond:
+            state.cooldown_until = max(state.cooldown_until, until)
+        redis_client = self._redis()
+        if redis_client is not None:
+            try:
+                redis_client.set(PREFIX_COOLDOWN + state.name, str(until), px=max(1, int(seconds * 1000)))
+            except Exception as e:
+                logger.warning(f"Failed to share LLM cooldown: {e}")
+
+    # Admission
+
+    def _admission_delay(self, state: _ProviderState, priority: LLMPriority, tokens: int,
+                         shared: Optional[_SharedState], now: float) -> Optional[float]:
+        """0 if the call may start now, seconds until it might, or None to wait for a slot to free up."""
+        cooldown_until = max(state.cooldown_until, shared.cooldown_until if shared else 0.0)
+        if cooldown_until > now:
+            return cooldown_until - now
+        share = self.shares.get(priority, 1.0)
+        if state.in_flight >= max(1, math.ceil(state.max_concurrency * share)):
+            return None
+        if state.requests_per_minute or state.tokens_per_minute:
+            if shared is not None:
+                requests, used, frees_in = shared.requests, shared.tokens, shared.frees_in
+            else:
+                requests, used, frees_in = self._local_window(state, now)
+            requests += state.pending_requests
+            used += state.pending_tokens
+            over_requests = state.requests_per_minute and requests + 1 > state.requests_per_minute * share
+            # An empty window always admits one call, however large
+            over_tokens = state.tokens_per_minute and requests and used + tokens > state.tokens_per_minute * share
+            if over_requests or over_tokens:
+                return max(POLL_SECONDS, frees_in)
+        return 0
+
+    def _acquire(self, state: _ProviderState, priority: LLMPriority, tokens: int, order: int) -> _Reservation:
+        started = time.monotonic()
+        if on_event_loop():
+            # Waiting here would block the loop: admit now and let the counters reflect it
+            with self._cond:
+                self._admit(state, tokens)
+                state.stats["event_loop_dispatches"] += 1
+            self._record_wait(priority, 0.0)
+            return self._reserve(state, tokens, time.time())
+
+        deadline = started + self.max_wait
+        entry = [priority, order]
+        with self._cond:
+            heapq.heappush(state.queue, entry)
+            self._queued[priority] += 1
+        try:
+            while True:
+                with self._cond:
+                    at_head = state.queue[0] is entry
+                # Only the head of the queue needs the shared state; it is read with the lock released
+                shared = self._read_shared(state, time.time()) if at_head else None
+                with self._cond:
+                    delay = None
+                    if state.queue[0] is entry:
+                        if not at_head:
+                            continue  # Became the head meanwhile: read the shared state first
+                        delay = self._admission_delay(state, priority, tokens, shared, time.time())
+                        if delay == 0:
+                            heapq.heappop(state.queue)
+                            self._admit(state, tokens)
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        state.queue.remove(entry)
+                        heapq.heapify(state.queue)
+                        state.stats["queue_timeouts"] += 1
+                        raise LLMQueueTimeout(
+                            f"Waited {self.max_wait:g}s for a {state.name} dispatch slot ({priority.name.lower()})"
+                        )
+                    self._cond.wait(min(remaining, delay or POLL_SECONDS, POLL_SECONDS * 4))
+        finally:
+            with self._cond:
+                self._queued[priority] -= 1
+                self._cond.notify_all()  # The next call in line may be admissible now
+
+        reservation = self._reserve(state, tokens, time.time())
+        waited = time.monotonic() - started
+        self._record_wait(priority, waited)
+        if waited > 1.0:
+            logger.info("LLM call queued", provider=state.name, priority=priority.name.lower(),
+                        wait_ms=round(waited * 1000))
+        return reservation
+
+    def _release(self, state: _ProviderState, reservation: _Reservation, actual_tokens: Optional[int]):
+        with self._cond:
+            state.in_flight -= 1
+            self._cond.notify_all()
+        self._settle(reservation, actual_tokens)
+
+    def _record_wait(self, priority: LLMPriority, seconds: float):
+        self._waits[priority].append(seconds)
+        totals = self._wait_totals[priority]
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+
+    def _backoff(self, state: _ProviderState, error: Exception, attempt: int) -> float:
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)) * random.uniform(0.5, 1.0)
+        self._start_cooldown(state, delay)
+        return delay
+
+    # Dispatch
+
+    def call(self, provider: str, fn: Callable[[], Any], estimated_tokens: int = 0,
+             priority: Optional[LLMPriority] = None) -> Any:
+        """Run fn (one provider API call) once the provider admits it at the caller's priority."""
+        if not self.enabled:
+            return fn()
+        priority = LLMPriority(priority) if priority is not None else current_priority()
+        state = self._provider(provider)
+        order = next(self._order)  # Retries keep their place in line
+        attempt = 0
+        while True:
+            reservation = self._acquire(state, priority, estimated_tokens, order)
+            try:
+                response = fn()
+            except Exception as e:
+                self._release(state, reservation, None)
+                if not is_rate_limited(e):
+                    raise
+                state.stats["rate_limited"] += 1
+                delay = self._backoff(state, e, attempt)
+                logger.warning("LLM provider rate limited", provider=provider, priority=priority.name.lower(),
+                               attempt=attempt + 1, cooldown_s=round(delay, 2))
+                if attempt >= self.max_retries or on_event_loop():
+                    raise
+                attempt += 1
+                state.stats["retries"] += 1
+                continue
+            self._release(state, reservation, usage_tokens(response))
+            state.stats["dispatched"] += 1
+            return response
+
+    async def acall(self, provider: str, fn: Callable[[], Any], estimated_tokens: int = 0,
+                    priority: Optional[LLMPriority] = None) -> Any:
+        """Async variant for async SDK clients: queues off the event loop, awaits the call on it."""
+        if not self.enabled:
+            return await fn()
+        priority = LLMPriority(priority) if priority is not None else current_priority()
+        state = self._provider(provider)
+        order = next(self._order)
+        attempt = 0
+        while True:
+            reservation = await asyncio.to_thread(self._acquire, state, priority, estimated_tokens, order)
+            try:
+                response = await fn()
+            except Exception as e:
+                self._release(state, reservation, None)
+                if not is_rate_limited(e):
+                    raise
+                state.stats["rate_limited"] += 1
+                self._backoff(state, e, attempt)
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                state.stats["retries"] += 1
+                continue
+            self._release(state, reservation, usage_tokens(response))
+            state.stats["dispatched"] += 1
+            return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        priorities = {}
+        for priority in LLMPriority:
+            samples = sorted(self._waits[priority])
+            count, total, longest = self._wait_totals[priority]
+            priorities[priority.name.lower()] = {
+                "queued": self._queued[priority],
+                "admitted": int(count),
+                "wait_ms_mean": round(total * 1000 / count, 1) if count else 0.0,
+                "wait_ms_p50": round(samples[len(samples) // 2] * 1000, 1) if samples else 0.0,
+                "wait_ms_p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1)
+                if samples else 0.0,
+                "wait_ms_max": round(longest * 1000, 1),
+            }
+
+        now = time.time()
+        providers = {}
+        for name, state in list(self._providers.items()):
+            shared = self._read_shared(state, now)
+            with self._cond:
+                if shared is not None:
+                    requests, tokens = shared.requests, shared.tokens
+                else:
+                    requests, tokens, _ = self._local_window(state, now)
+                cooldown_until = max(state.cooldown_until, shared.cooldown_until if shared else 0.0)
+            providers[name] = {
+                **state.stats,
+                "in_flight": state.in_flight,
+                "queued": len(state.queue),
+                "max_concurrency": state.max_concurrency,
+                "requests_per_minute": state.requests_per_minute,
+                "tokens_per_minute": state.tokens_per_minute,
+                "window_requests": requests,
+                "window_tokens": tokens,
+                "cooldown_ms": max(0, round((cooldown_until - now) * 1000)),
+            }
+        return {
+            "enabled": self.enabled,
+            "distributed": self._redis() is not None,
+            "priorities": priorities,
+            "providers": providers,
+        }
+
+
+class GovernedClient:
+    """
+    Provider SDK client whose create() calls go through the governor.
+
+    Only messages.create (Anthropic), chat.completions.create and
+    embeddings.create (OpenAI) are governed; every other attribute is the
+    wrapped client's own.
+    """
+
+    GOVERNED_PATHS = {("messages",), ("chat", "completions"), ("embeddings",)}
+
+    def __init__(self, client: Any, provider: str, path: tuple = (), asynchronous: bool = False):
+        self._client = client
+        self._provider_name = provider
+        self._path = path
+        self._asynchronous = asynchronous
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name == "create" and self._path in self.GOVERNED_PATHS:
+            return functools.partial(self._create, attr)
+        path = self._path + (name,)
+        if any(governed[:len(path)] == path for governed in self.GOVERNED_PATHS):
+            return GovernedClient(attr, self._provider_name, path, self._asynchronous)
+        return attr
+
+    def _create(self, create: Callable, *args, **kwargs):
+        governor = get_llm_governor()
+        call = functools.partial(create, *args, **kwargs)
+        if self._asynchronous:
+            return governor.acall(self._provider_name, call, estimated_tokens=estimate_tokens(kwargs))
+        return governor.call(self._provider_name, call, estimated_tokens=estimate_tokens(kwargs))
+
+
+def governed_client(client: Any, provider: str) -> GovernedClient:
+    """Wrap an Anthropic/OpenAI client (sync or async) so its API calls are governed."""
+    # SDK create() methods are wrapped by decorators, so tell async clients apart by class
+    return GovernedClient(client, provider, asynchronous=type(client).__name__.startswith("Async"))
+
+
+_llm_governor: Optional[LLMGovernor] = None
+
+
+def get_llm_governor() -> LLMGovernor:
+    """Get the process-wide LLM dispatch governor."""
+    global _llm_governor
+    if _llm_governor is None:
+        _llm_governor = LLMGovernor(
+            limits={
+                "anthropic": {
+                    "max_concurrency": settings.llm_anthropic_max_concurrency,
+                    "requests_per_minute": settings.llm_anthropic_requests_per_minute,
+                    "tokens_per_minute": settings.llm_anthropic_tokens_per_minute,
+                },
+                "openai": {
+                    "max_concurrency": settings.llm_openai_max_concurrency,
+                    "requests_per_minute": settings.llm_openai_requests_per_minute,
+                    "tokens_per_minute": settings.llm_openai_tokens_per_minute,
+                },
+            },
+            shares={
+                LLMPriority.INTERACTIVE: 1.0,
+                LLMPriority.BATCH: settings.llm_batch_share,
+                LLMPriority.BACKGROUND: settings.llm_background_share,
+            },
+            max_retries=settings.llm_governor_max_retries,
+            max_wait=settings.llm_governor_max_wait,
+            enabled=settings.llm_governor_enabled,
+        )
+    return _llm_governor
@@ -0,0 +1,233 @@
+"""
+Prompt assembly for NL→SQL generation with provider-side prefix caching.
+
+Anthropic caches prompt prefixes in the order tools → system → messages, so
+the request puts everything that is identical across questions first:
+
+1. the generate_sql_query tool definition,
+2. the SQL generation instructions (system prompt),
+3. the schema block for the selected tables, with their column types.
+
+The instructions and the schema block each end with a cache_control
+breakpoint. After the breakpoints come the per-question parts: financial
+rules, name-matching hints, JOIN hints, examples, business context and the
+question itself. These are sent as uncached input.
+
+Rendered schema blocks are memoized per schema version. The version is the
+content hash the schema object cache already tracks, or a hash of the
+definition for schemas that did not come from it. The usage of every
+response is folded into the stats, so that cached and uncached input tokens
+and response latency appear on /cache/stats.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import structlog
+from src.config import settings
+from src.db.schema_object_cache import get_schema_object_cache
+
+logger = structlog.get_logger()
+
+SQL_GENERATION_TOOL = {
+    "name": "generate_sql_query",
+    "description": "Generate a SQL query with metadata",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "sql": {
+                "type": "string",
+                "description": "The generated PostgreSQL SQL query"
+            },
+            "explanation": {
+                "type": "string",
+                "description": "Brief, user-friendly explanation from AXIS.AI's perspective about what you're doing to answer the question. Focus on the BUSINESS INTENT and high-level approach (e.g., 'I'm analyzing sales data for Audrey Le', 'I'm calculating total revenue across all regions'). Use first-person (I'm..., I've...). Keep it simple - avoid mentioning SQL syntax, CTEs, JOINs, or technical database details. Maximum 2-3 sentences."
+            },
+            "tables_used": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "List of table names referenced in the query"
+            },
+            "estimated_complexity": {
+                "type": "string",
+                "enum": ["low", "medium", "high"],
+                "description": "Estimated query complexity"
+            },
+            "optimization_notes": {
+                "type": "string",
+                "description": "Any performance considerations or optimizations applied"
+            }
+        },
+        "required": ["sql", "explanation", "tables_used", "estimated_complexity"]
+    }
+}
+
+# Relative input price of cache writes and reads versus uncached input tokens
+CACHE_WRITE_COST = 1.25
+CACHE_READ_COST = 0.1
+
+SchemaRenderer = Callable[[List[Dict[str, Any]]], str]
+
+
+@dataclass
+class PromptPrefix:
+    """Static part of a SQL generation request, shared by every question on the same schemas."""
+    instructions: str
+    schema_block: str
+    schema_version: str
+
+
+def schema_version(schemas: List[Dict[str, Any]]) -> str:
+    """Version of a set of table schemas, stable while none of their definitions change."""
+    schema_cache = get_schema_object_cache()
+    parts = []
+    for schema in schemas:
+        version = schema_cache.version(schema)
+        if version is None:
+            definition = json.dumps(
+                [schema.get("table_name"), schema.get("description"), schema.get("columns")],
+                sort_keys=True, default=str,
+            )
+            version = hashlib.sha1(definition.encode()).hexdigest()
+        parts.append(f"{schema.get('project')}.{schema.get('dataset')}.{schema.get('table_name')}@{version}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+class PromptPrefixCache:
+    """Schema version -> rendered prompt prefix, plus cached/uncached input token accounting."""
+
+    def __init__(self, max_entries: int = 64, provider_caching: bool = True):
+        """
+        Args:
+            max_entries: Number of rendered schema blocks kept in the LRU
+            provider_caching: Mark the prefix with cache_control breakpoints
+        """
+        self.max_entries = max_entries
+        self.provider_caching = provider_caching
+        self._instructions: Dict[str, str] = {}
+        self._schema_blocks: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"prefix_hits": 0, "prefix_renders": 0}
+        self.usage = {
+            "requests": 0,
+            "cache_hit_requests": 0,
+            "input_tokens": 0,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "output_tokens": 0,
+            "cached_response_seconds": 0.0,
+            "uncached_response_seconds": 0.0,
+        }
+
+    def instructions(self, name: str, render: Callable[[], str]) -> str:
+        """Static instruction text, rendered once per process."""
+        text = self._instructions.get(name)
+        if text is None:
+            text = render()
+            self._instructions[name] = text
+        return text
+
+    def prefix(self, instructions: str, schemas: List[Dict[str, Any]], render: SchemaRenderer) -> PromptPrefix:
+        """Prefix for the given schemas, rendering the schema block only when their version is new."""
+        version = schema_version(schemas)
+        with self._lock:
+            block = self._schema_blocks.get(version)
+            if block is not None:
+                self._schema_blocks.move_to_end(version)
+                self.stats["prefix_hits"] += 1
+        if block is None:
+            block = render(schemas)
+            with self._lock:
+                self._schema_blocks[version] = block
+                while len(self._schema_blocks) > self.max_entries:
+                    self._schema_blocks.popitem(last=False)
+                self.stats["prefix_renders"] += 1
+        return PromptPrefix(instructions=instructions, schema_block=block, schema_version=version)
+
+    def _text(self, text: str, cached: bool) -> Dict[str, Any]:
+        block: Dict[str, Any] = {"type": "text", "text": text}
+        if cached and self.provider_caching:
+            block["cache_control"] = {"type": "ephemeral"}
+        return block
+
+    def build_request(self, prefix: PromptPrefix, question_prompt: str,
+                      tool: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """messages.create arguments: static prefix first, the question-specific prompt last."""
+        request = {
+            "system": [self._text(prefix.instructions, cached=True)],
+            "messages": [{
+                "role": "user",
+                "content": [
+                    self._text(prefix.schema_block, cached=True),
+                    self._text(question_prompt, cached=False),
+                ],
+            }],
+        }
+        if tool is not None:
+            request["tools"] = [tool]
+            request["tool_choice"] = {"type": "tool", "name": tool["name"]}
+        return request
+
+    def record_usage(self, usage: Any, seconds: float) -> Dict[str, int]:
+        """Fold a response's usage into the totals and return its token counts."""
+        counts = {
+            "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+            "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        }
+        cache_hit = counts["cache_read_input_tokens"] > 0
+        with self._lock:
+            self.usage["requests"] += 1
+            for key, value in counts.items():
+                self.usage[key] += value
+            if cache_hit:
+                self.usage["cache_hit_requests"] += 1
+                self.usage["cached_response_seconds"] += seconds
+            else:
+                self.usage["uncached_response_seconds"] += seconds
+        logger.info("SQL generation prompt usage", cache_hit=cache_hit, response_ms=round(seconds * 1000), **counts)
+        return counts
+
+    def clear(self):
+        with self._lock:
+            self._schema_blocks.clear()
+        self._instructions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        usage = dict(self.usage)
+        cached_seconds = usage.pop("cached_response_seconds")
+        uncached_seconds = usage.pop("uncached_response_seconds")
+        hits = usage["cache_hit_requests"]
+        misses = usage["requests"] - hits
+        total_input = usage["input_tokens"] + usage["cache_read_input_tokens"] + usage["cache_creation_input_tokens"]
+        weighted_input = (usage["input_tokens"] + CACHE_WRITE_COST * usage["cache_creation_input_tokens"]
+                          + CACHE_READ_COST * usage["cache_read_input_tokens"])
+        return {
+            **self.stats,
+            **usage,
+            "entries": len(self._schema_blocks),
+            "provider_caching": self.provider_caching,
+            "cached_input_ratio": round(usage["cache_read_input_tokens"] / total_input, 3) if total_input else 0.0,
+            "input_cost_ratio": round(weighted_input / total_input, 3) if total_input else 1.0,
+            "avg_cached_response_ms": round(cached_seconds * 1000 / hits, 1) if hits else None,
+            "avg_uncached_response_ms": round(uncached_seconds * 1000 / misses, 1) if misses else None,
+        }
+
+
+_prompt_prefix_cache: Optional[PromptPrefixCache] = None
+
+
+def get_prompt_prefix_cache() -> PromptPrefixCache:
+    """Get the process-wide prompt prefix cache shared by every LLMClient."""
+    global _prompt_prefix_cache
+    if _prompt_prefix_cache is None:
+        _prompt_prefix_cache = PromptPrefixCache(
+            max_entries=settings.prompt_prefix_cache_size,
+            provider_caching=settings.prompt_cache_enabled,
+        )
+    return _prompt_prefix_cache
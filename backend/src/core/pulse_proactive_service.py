@@ -12,6 +12,7 @@ from .pulse_proactive_patterns import get_all_patterns, get_pattern, get_pattern
 from .pulse_monitor_service import PulseMonitorService, serialize_for_json
 from ..db.bigquery import BigQueryClient
 from .llm_client import LLMClient
+from .llm_governor import LLMPriority, llm_priority
 
 logger = structlog.get_logger()
 
@@ -39,6 +40,7 @@ class PulseProactiveService:
         """Get a single pattern template with full detail."""
         return get_pattern(pattern_id)
 
+    @llm_priority(LLMPriority.BACKGROUND)
     async def run_pattern(
         self,
         pattern_id: str,
@@ -9,6 +9,7 @@ from typing import List, Dict, Any
 from ..db.postgresql_client import PostgreSQLClient
 from .pulse_monitor_service import PulseMonitorService
 from .pulse_proactive_service import PulseProactiveService
+from .llm_governor import LLMPriority, llm_priority
 
 logger = structlog.get_logger()
 
@@ -84,6 +85,7 @@ class PulseScheduler:
         monitors = self.pg_client.execute_query(query)
         return monitors or []
 
+    @llm_priority(LLMPriority.BACKGROUND)
     async def _execute_monitor_safe(self, monitor_id: str):
         """Execute a proactive agent with error handling.
         Branches by action_level: if a pattern_id and action_level are set,
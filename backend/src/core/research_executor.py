@@ -11,6 +11,7 @@ import structlog
 
 from src.core.research_planner import ResearchPlan, ResearchStep, StepType
 from src.core.sql_generator import SQLGenerator
+from src.core.llm_governor import LLMPriority, llm_priority
 from src.db.database_client import DatabaseClient as BigQueryClient
 
 logger = structlog.get_logger()
@@ -92,6 +93,7 @@ class ResearchExecutor:
         self.active_executions: Dict[str, ResearchExecution] = {}
         self.enhanced_mode = False  # Flag to enable enhanced research features
         
+    @llm_priority(LLMPriority.BATCH)
     async def execute_plan(
         self,
         plan: ResearchPlan,
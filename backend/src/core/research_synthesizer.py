@@ -10,6 +10,7 @@ import structlog
 from src.core.research_planner import ResearchPlan, StepType
 from src.core.research_executor import ResearchExecution, StepResult, ExecutionStatus
 from src.core.llm_client import LLMClient
+from src.core.llm_governor import LLMPriority, llm_priority
 
 logger = structlog.get_logger()
 
@@ -61,6 +62,7 @@ class ResearchSynthesizer:
     def __init__(self, llm_client: LLMClient):
         self.llm_client = llm_client
         
+    @llm_priority(LLMPriority.BATCH)
     def synthesize_results(
         self,
         plan: ResearchPlan,
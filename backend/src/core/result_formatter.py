@@ -0,0 +1,421 @@
+"""
+Column-wise formatting of query results for display.
+
+Each column is classified once from its name (SAP field / preserved ID,
+percentage, quantity, currency or default) into a ColumnFormat; a
+FormatPlan holds the ColumnFormats of one result shape and is cached, so
+every page of a query reuses it. Integer and float columns are formatted in
+bulk with NumPy (rounding, sign, magnitude and integrality are computed
+array-wide and only the final string rendering runs per value), and
+string columns are screened with Arrow compute so that only strings the
+rules would change are formatted individually. Everything else goes through
+the scalar clean_value/format_value rules, which define the output.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.types as pa_types
+
+from src.db.arrow_results import ColumnarResult
+
+# SAP field names - always preserve as-is (never add commas or $)
+SAP_FIELDS = re.compile(
+    r'^(lifnr|belnr|ebeln|ebelp|bukrs|gjahr|matnr|werks|ekorg|banfn|bnfpo|'
+    r'mblnr|vbeln|posnr|kunnr|kostl|prctr|saknr|hkont|augbl|augdt|aedat|'
+    r'erdat|cpudt|budat|bldat|xblnr|zuonr|awkey|racct|ekgrp|waers|zterm|'
+    r'mandt|spras|zeile|kdauf|vgbel|vgpos|bsart|lfart|statu|reguh|regup)$',
+    re.IGNORECASE
+)
+
+# ID/Code/Year columns - preserve as-is (don't format as numbers)
+PRESERVE_KEYWORDS = [
+    'customer', '_id', 'code', 'sku', 'material', 'product_code',
+    'order', 'document', 'reference', '_key', '_number', '_no',
+    'account', 'gl_', 'segment', 'channel', 'region', 'territory',
+    'year', 'fiscal_year', 'fiscal_month', 'fiscal_period', 'calendar_year',
+    'posting_date', 'invoice_date', 'due_date', 'payment_date',
+    'created_date', 'modified_date',
+    'name', 'description', 'category', '_type', '_status',
+    'product', 'brand', 'supplier', 'distributor',
+    'employee', 'manager', 'owner'
+]
+
+# Currency columns - format as $X,XXX.XX
+# NOTE: 'total' removed to avoid matching total_invoices, total_vendors etc.
+CURRENCY_KEYWORDS = [
+    'revenue', 'sales', 'cost', 'margin', 'price', 'amount',
+    'gross', 'net', 'profit', 'expense', 'fee',
+    'cogs', 'cogm', 'cos', 'value', 'income', 'earning',
+    'payment', 'charge', 'discount', 'rebate', 'allowance',
+    'difference', 'delta', 'variance', 'budget', 'actual',
+    'spend', 'expenditure', 'liability', 'asset', 'balance',
+    'debit', 'credit', 'freight', 'outflow', 'accrual',
+    'shipping', 'handling', 'tax', 'duty', 'tariff',
+    'invoice_amount', 'billing_amount',
+]
+
+# Percentage columns - already formatted or need % suffix
+PERCENTAGE_KEYWORDS = [
+    'percent', 'pct', 'ratio', 'rate', 'growth', 'change',
+    'margin_pct', 'margin_percent', 'percentage', 'yoy', 'mom',
+    'qoq', 'wow', 'contribution', 'share', 'proportion',
+    'utilization', 'efficiency', 'yield', 'conversion'
+]
+
+# Quantity columns - just add comma separators, no decimals
+QUANTITY_KEYWORDS = [
+    'count', 'quantity', 'qty', 'units', 'items', 'rows',
+    'num_', '_num', 'total_count', 'sold', 'ordered',
+    'shipped', 'delivered', 'cases', 'volume',
+    'total_invoices', 'total_vendors', 'total_pos', 'total_orders',
+    'invoices_processed', 'invoices_above', 'invoices_below',
+    'matched_lines', 'po_lines', 'line_items',
+    '_processed', '_matched', 'num_invoices', 'num_vendors',
+    'invoice_count', 'vendor_count', 'order_count', 'po_count',
+    'days_late', 'days_early', 'days_to_', 'processing_days',
+    'cycle_days', 'avg_days', 'min_days', 'max_days',
+    'cycle_time', 'processing_time'
+]
+
+# Count columns where a leading $ added by the SQL is removed during cleanup
+COUNT_INDICATORS = [
+    'count', 'qty', 'quantity', 'units', 'items', 'num_invoices',
+    'num_vendors', 'num_orders', 'total_invoices', 'total_vendors',
+    'total_pos', 'total_orders', 'invoice_count', 'vendor_count',
+    'order_count', 'po_count', 'num_', '_count',
+    'invoices_processed', 'invoices_above', 'invoices_below',
+    'matched_lines', 'po_lines', 'line_items', '_processed'
+]
+
+PRESERVE = "preserve"
+PERCENTAGE = "percentage"
+QUANTITY = "quantity"
+CURRENCY = "currency"
+DEFAULT = "default"
+
+# Floats this close to zero print in scientific notation, which the cleanup step does not round
+_SCIENTIFIC_BELOW = 1e-4
+# Beyond this magnitude values are left to the scalar path (int64 range, exact rounding)
+_BULK_LIMIT = 1e13
+
+
+def _render(fmt: str, values: np.ndarray) -> List[str]:
+    return list(map(fmt.format, values.tolist()))
+
+
+class ColumnFormat:
+    """Formatting rules of one column, decided from its name."""
+
+    def __init__(self, name: str):
+        self.name = name
+        column_lower = name.lower()
+        self.is_count = any(ind in column_lower for ind in COUNT_INDICATORS)
+        self.is_ratio = 'ratio' in column_lower
+        # Priority order: preserved -> percentage -> quantity -> currency
+        # This ensures 'margin_percentage' is percentage, 'quantity_sold' is quantity
+        if SAP_FIELDS.match(column_lower) or any(kw in column_lower for kw in PRESERVE_KEYWORDS):
+            self.kind = PRESERVE
+        elif any(kw in column_lower for kw in PERCENTAGE_KEYWORDS):
+            self.kind = PERCENTAGE
+        elif any(kw in column_lower for kw in QUANTITY_KEYWORDS):
+            self.kind = QUANTITY
+        elif any(kw in column_lower for kw in CURRENCY_KEYWORDS):
+            self.kind = CURRENCY
+        else:
+            self.kind = DEFAULT
+
+    def __repr__(self) -> str:
+        return f"ColumnFormat({self.name!r}, kind={self.kind!r})"
+
+    def clean_value(self, value: Any) -> Any:
+        """Pre-process cleanup for known formatting issues before format_value."""
+        if value is None:
+            return None
+
+        str_value = str(value)
+
+        # 1. Fix relativedelta serialization: "relativedelta(days=+45)" → 45
+        if 'relativedelta' in str_value:
+            match = re.search(r'days=\+?(-?\d+)', str_value)
+            if match:
+                return int(match.group(1))
+            # Try months
+            match = re.search(r'months=\+?(-?\d+)', str_value)
+            if match:
+                return int(match.group(1))
+            return str_value
+
+        # 2. Fix double %% → single %
+        if '%%' in str_value:
+            str_value = str_value.replace('%%', '%')
+
+        # 3. Remove $ from count/quantity columns (SQL sometimes incorrectly adds it)
+        if self.is_count and str_value.startswith('$'):
+            str_value = str_value[1:].strip()
+            # Try to convert to integer if it's a whole number
+            try:
+                clean = str_value.replace(',', '')
+                num = float(clean)
+                if num == int(num):
+                    return f"{int(num):,}"
+                return str_value
+            except (ValueError, TypeError):
+                pass
+
+        # 4. Round excessive decimals in raw numeric strings
+        if str_value and not str_value.startswith('$') and '%' not in str_value:
+            try:
+                clean = str_value.replace(',', '')
+                num = float(clean)
+                # If more than 2 decimal places, round to 2
+                if '.' in clean and len(clean.split('.')[1]) > 2:
+                    return round(num, 2)
+            except (ValueError, TypeError):
+                pass
+
+        return str_value
+
+    def format_value(self, value: Any) -> Optional[str]:
+        """Format one (cleaned) value for display."""
+        if value is None:
+            return None
+
+        # Convert to string if needed
+        str_value = str(value)
+
+        # Check if it's already formatted (has $ or %)
+        if str_value.startswith('$') or str_value.endswith('%'):
+            # Fix double %% even in pre-formatted values
+            if '%%' in str_value:
+                str_value = str_value.replace('%%', '%')
+            return str_value
+
+        if self.kind == PRESERVE:
+            return str_value  # Return as-is, preserve original format
+
+        # Try to parse as number
+        try:
+            # Remove any existing commas
+            clean_value = str_value.replace(',', '')
+            num_value = float(clean_value)
+        except (ValueError, TypeError):
+            return str_value  # Return as-is if not a number
+
+        if self.kind == PERCENTAGE:
+            # If value is already a percentage (e.g., "43.5%"), return as-is
+            if '%' in str_value:
+                return str_value
+            # If value is a ratio (0-1), multiply by 100
+            if -1 <= num_value <= 1 and self.is_ratio:
+                return f"{num_value * 100:,.2f}%"
+            # Otherwise just add % suffix
+            return f"{num_value:,.2f}%"
+
+        if self.kind == QUANTITY:
+            # Format with commas, no decimals for whole numbers, 2 decimals otherwise
+            if num_value == int(num_value):
+                return f"{int(num_value):,}"
+            return f"{num_value:,.2f}"
+
+        if self.kind == CURRENCY:
+            # Format as currency with $ and commas
+            if num_value < 0:
+                return f"-${abs(num_value):,.2f}"
+            return f"${num_value:,.2f}"
+
+        # Default: if it's a large number, add commas but keep decimals
+        if abs(num_value) >= 1000:
+            if num_value == int(num_value):
+                return f"{int(num_value):,}"
+            return f"{num_value:,.2f}"
+
+        # Small numbers - return with 2 decimal places if has decimals
+        if num_value != int(num_value):
+            return f"{num_value:.2f}"
+
+        return str_value
+
+    def format_scalar(self, value: Any) -> Optional[str]:
+        return self.format_value(self.clean_value(value))
+
+    def format_values(self, values: Sequence[Any]) -> List[Optional[str]]:
+        """Format a column of Python values (bulk path for int or float columns)."""
+        kinds = set(map(type, values))
+        kinds.discard(type(None))
+        if kinds == {str}:
+            return self.format_arrow(pa.chunked_array([pa.array(values, pa.string())]))
+        if kinds == {float} or kinds == {int}:
+            present = [value is not None for value in values]
+            dense = [value for value in values if value is not None]
+            try:
+                array = np.array(dense, dtype=np.float64 if kinds == {float} else np.int64)
+            except OverflowError:
+                return [self.format_scalar(value) for value in values]
+            return self._scatter(self.format_numbers(array), present)
+        return [self.format_scalar(value) for value in values]
+
+    def format_arrow(self, column: pa.ChunkedArray) -> List[Optional[str]]:
+        """Format an Arrow column, reading int/float columns straight into NumPy."""
+        arrow_type = column.type
+        if pa_types.is_integer(arrow_type) or pa_types.is_floating(arrow_type):
+            if pa_types.is_unsigned_integer(arrow_type) and arrow_type.bit_width == 64:
+                return self.format_values(column.to_pylist())
+            dtype = np.float64 if pa_types.is_floating(arrow_type) else np.int64
+            if column.null_count:
+                present = column.is_valid().to_numpy(zero_copy_only=False)
+                array = column.drop_null().to_numpy().astype(dtype, copy=False)
+                return self._scatter(self.format_numbers(array), present.tolist())
+            return self.format_numbers(column.to_numpy().astype(dtype, copy=False))
+        if pa_types.is_string(arrow_type) or pa_types.is_large_string(arrow_type):
+            values = column.to_pylist()
+            unchanged = self._unchanged_strings(column)
+            if unchanged.all():
+                return values
+            return [value if keep else self.format_scalar(value) for value, keep in zip(values, unchanged.tolist())]
+        return self.format_values(column.to_pylist())
+
+    def _unchanged_strings(self, column: pa.ChunkedArray) -> np.ndarray:
+        """
+        Mask of strings that format_scalar returns unchanged.
+
+        Preserved columns only change strings with %%, relativedelta, a
+        decimal point (rounding) or a leading $ (count columns); other columns
+        also change anything that parses as a number.
+        """
+        changed = pc.or_(pc.match_substring(column, "%%"), pc.match_substring(column, "relativedelta"))
+        if self.is_count:
+            changed = pc.or_(changed, pc.starts_with(column, "$"))
+        if self.kind == PRESERVE:
+            changed = pc.or_(changed, pc.match_substring(column, "."))
+        else:
+            changed = pc.or_(changed, pc.match_substring_regex(column, r"\p{Nd}|(?i:nan|inf)"))
+        return pc.invert(pc.fill_null(changed, False)).to_numpy(zero_copy_only=False)
+
+    @staticmethod
+    def _scatter(formatted: List[Optional[str]], present: List[bool]) -> List[Optional[str]]:
+        """Re-insert None for missing values."""
+        if all(present):
+            return formatted
+        values = iter(formatted)
+        return [next(values) if is_present else None for is_present in present]
+
+    def format_numbers(self, array: np.ndarray) -> List[Optional[str]]:
+        """
+        Format an int64 or float64 array exactly as format_scalar would format each value.
+
+        Values the bulk rules do not cover (NaN, infinity, floats printed in
+        scientific notation without a fraction, magnitudes beyond 1e13) are
+        formatted by format_scalar.
+        """
+        is_float = array.dtype.kind == 'f'
+        numbers = array.astype(np.float64) if not is_float else array
+        with np.errstate(invalid='ignore'):
+            magnitude = np.abs(numbers)
+            scalar = ~np.isfinite(numbers) | (magnitude >= _BULK_LIMIT)
+            if is_float:
+                scalar |= (magnitude < _SCIENTIFIC_BELOW) & (numbers != 0)
+
+        out: List[Optional[str]] = [None] * len(array)
+        bulk = np.flatnonzero(~scalar)
+        if len(bulk):
+            originals = array[bulk]
+            numbers = numbers[bulk]
+            if is_float:
+                # clean_value rounds floats to 2 decimals before formatting
+                numbers = _round2(numbers)
+            for position, text in zip(bulk.tolist(), self._format_bulk(numbers, originals, is_float)):
+                out[position] = text
+        for position in np.flatnonzero(scalar).tolist():
+            out[position] = self.format_scalar(array[position].item())
+        return out
+
+    def _format_bulk(self, numbers: np.ndarray, originals: np.ndarray, is_float: bool) -> List[str]:
+        if self.kind == PRESERVE:
+            return _render("{!r}", numbers) if is_float else _render("{}", originals)
+
+        if self.kind == PERCENTAGE:
+            if self.is_ratio:
+                numbers = np.where((numbers >= -1) & (numbers <= 1), numbers * 100, numbers)
+            return _render("{:,.2f}%", numbers)
+
+        if self.kind == CURRENCY:
+            negative = numbers < 0
+            out = np.empty(len(numbers), dtype=object)
+            out[negative] = _render("-${:,.2f}", np.abs(numbers[negative]))
+            out[~negative] = _render("${:,.2f}", numbers[~negative])
+            return out.tolist()
+
+        whole = numbers == np.trunc(numbers)
+        out = np.empty(len(numbers), dtype=object)
+        if self.kind == QUANTITY:
+            out[whole] = _render("{:,}", numbers[whole].astype(np.int64))
+            out[~whole] = _render("{:,.2f}", numbers[~whole])
+            return out.tolist()
+
+        # Default: commas for large numbers, 2 decimals for small fractional ones
+        large = np.abs(numbers) >= 1000
+        out[large & whole] = _render("{:,}", numbers[large & whole].astype(np.int64))
+        out[large & ~whole] = _render("{:,.2f}", numbers[large & ~whole])
+        out[~large & ~whole] = _render("{:.2f}", numbers[~large & ~whole])
+        small_whole = ~large & whole
+        out[small_whole] = _render("{!r}", numbers[small_whole]) if is_float \
+            else _render("{}", originals[small_whole])
+        return out.tolist()
+
+
+def _round2(numbers: np.ndarray) -> np.ndarray:
+    """
+    round(x, 2) for every element.
+
+    NumPy rounds x * 100 which can land on the wrong side of a .5 boundary;
+    values whose scaled fraction is that close to .5 are rounded by Python.
+    """
+    scaled = numbers * 100
+    rounded = np.round(numbers, 2)
+    distance = np.abs(scaled - np.floor(scaled) - 0.5)
+    suspect = np.flatnonzero(distance <= np.maximum(1e-6, np.abs(scaled) * 1e-12))
+    if len(suspect):
+        rounded[suspect] = [round(value, 2) for value in numbers[suspect].tolist()]
+    return rounded
+
+
+@lru_cache(maxsize=4096)
+def column_format(name: str) -> ColumnFormat:
+    """Cached ColumnFormat for a column name."""
+    return ColumnFormat(name)
+
+
+class FormatPlan:
+    """ColumnFormats for one result shape, applied column by column."""
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = list(columns)
+        self.formats = [column_format(name) for name in self.columns]
+
+    def format_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Format row dictionaries (output rows hold exactly the plan's columns)."""
+        if not rows:
+            return rows
+        formatted = [fmt.format_values([row.get(fmt.name) for row in rows]) for fmt in self.formats]
+        return [dict(zip(self.columns, values)) for values in zip(*formatted)]
+
+    def format_columnar(self, result: ColumnarResult) -> ColumnarResult:
+        """Format a columnar result without materializing rows."""
+        return result.map_columns(
+            lambda name, column: column_format(name).format_arrow(column), arrow=True
+        )
+
+
+@lru_cache(maxsize=256)
+def _cached_plan(columns: Tuple[str, ...]) -> FormatPlan:
+    return FormatPlan(columns)
+
+
+def get_format_plan(columns: Sequence[str]) -> FormatPlan:
+    """FormatPlan for a column list, shared by every page of results with that shape."""
+    return _cached_plan(tuple(columns))
@@ -0,0 +1,290 @@
+"""
+Single-flight coalescing for identical in-flight SQL generations.
+
+When a dashboard loads or several users ask the same question, each request
+would otherwise miss the SQL cache and start its own LLM call, because the
+cache is only written when the first generation finishes. SingleFlight gives
+every key one leader: concurrent callers with the same key wait for the
+leader's result instead of generating their own.
+
+Keys are the target project and dataset, the normalized question and the
+generation options. Within a process, followers wait on the leader's
+flight. Across workers, the leader holds a Redis lock (``SET NX PX``) whose
+value is a random token. It publishes its result under a short-TTL key
+derived from that token. Workers that lose the race poll for the result of
+the lock holder they saw. Only JSON-native results are published, so remote
+followers get the same types a local caller would; for any other result
+they find the lock released and generate it themselves.
+
+- The lock expires after lock_timeout, so a crashed leader cannot block a
+  key forever.
+- A lock with no expiry is treated as stale and broken.
+- A follower that finds the lock gone without a result takes over and
+  generates the result itself.
+- A follower that waits longer than wait_timeout stops waiting and generates
+  the result itself. The wait is capped at lock_timeout, after which the
+  leader's lock has expired anyway.
+
+Waiting blocks the calling thread, so callers on an event-loop thread are
+not coalesced: they generate directly rather than stall every other request
+on the loop. Async routes should call the generator in a worker thread.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import structlog
+from src.config import settings
+from src.core.llm_governor import on_event_loop
+
+logger = structlog.get_logger()
+
+PREFIX_LOCK = "singleflight:lock:"
+PREFIX_RESULT = "singleflight:result:"
+
+# Poll interval while waiting on another worker's lock (doubles up to the max)
+POLL_MIN_SECONDS = 0.05
+POLL_MAX_SECONDS = 0.5
+
+# Delete the lock only if it still holds our token
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def flight_key(namespace: str, question: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """Key for a generation: namespace (with the target project and dataset), normalized question, options."""
+    normalized = " ".join((question or "").lower().split())
+    payload = json.dumps({"q": normalized, "o": options or {}}, sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+class _Flight:
+    """One in-process generation that concurrent callers wait on."""
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one generation, in-process and across workers."""
+
+    def __init__(self, enabled: bool = True, lock_timeout: float = 60.0,
+                 wait_timeout: float = 90.0, result_ttl: int = 30):
+        """
+        Args:
+            enabled: Coalesce calls at all (otherwise every call generates)
+            lock_timeout: Seconds a worker's Redis lock lives; should exceed a normal generation
+            wait_timeout: Seconds a follower waits before generating on its own (at most lock_timeout)
+            result_ttl: Seconds a leader's published result stays readable by other workers
+        """
+        self.enabled = enabled
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = min(wait_timeout, lock_timeout)
+        self.result_ttl = result_ttl
+        self.cache_manager = None
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "leaders": 0,
+            "coalesced_local": 0,
+            "coalesced_remote": 0,
+            "takeovers": 0,
+            "stale_locks_broken": 0,
+            "wait_timeouts": 0,
+            "event_loop_calls": 0,
+        }
+
+    def attach(self, cache_manager):
+        """Coordinate with other workers through the CacheManager's Redis connection."""
+        self.cache_manager = cache_manager
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _redis(self):
+        if self.cache_manager is None or not getattr(self.cache_manager, "enabled", False):
+            return None
+        return self.cache_manager.redis
+
+    def do(self, key: str, fn: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Run fn once for all concurrent callers of key.
+
+        Returns:
+            Tuple of (result, coalesced). Coalesced results are copies of the
+            leader's result, so callers may modify them.
+        """
+        if not self.enabled:
+            return fn(), False
+        if on_event_loop():
+            # Waiting on a leader here would block the loop
+            self._count("event_loop_calls")
+            return fn(), False
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                flight.waiters += 1
+
+        if not leader:
+            if not flight.done.wait(self.wait_timeout):
+                self._count("wait_timeouts")
+                logger.warning("Single-flight wait timed out, generating independently", key=key[:24])
+                return fn(), False
+            if flight.error is not None:
+                raise flight.error
+            self._count("coalesced_local")
+            return copy.deepcopy(flight.result), True
+
+        try:
+            result, coalesced = self._run_distributed(key, fn)
+            # Followers copy from a snapshot so the leader's caller can modify its own result
+            flight.result = copy.deepcopy(result)
+            if flight.waiters:
+                logger.info("Coalesced concurrent SQL generations", key=key[:24], waiters=flight.waiters)
+            return result, coalesced
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _run_distributed(self, key: str, fn: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """Lead the generation across workers, or wait for the worker that holds the lock."""
+        redis_client = self._redis()
+        if redis_client is None:
+            self._count("leaders")
+            return fn(), False
+
+        lock_key = PREFIX_LOCK + key
+        token = uuid.uuid4().hex
+        deadline = time.time() + self.wait_timeout
+        delay = POLL_MIN_SECONDS
+        holder = None  # Token of the worker we are waiting on; its result is published under it
+
+        while True:
+            if holder is not None:
+                shared = self._fetch(redis_client, PREFIX_RESULT + key + ":" + holder)
+                if shared is not None:
+                    self._count("coalesced_remote")
+                    return shared, True
+
+            try:
+                acquired = redis_client.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000))
+                current = None if acquired else redis_client.get(lock_key)
+            except Exception as e:
+                logger.warning(f"Single-flight lock unavailable, generating without it: {e}")
+                self._count("leaders")
+                return fn(), False
+
+            if acquired:
+                self._count("leaders")
+                if holder is not None:
+                    # The worker we waited on released or lost its lock without publishing a result
+                    self._count("takeovers")
+                try:
+                    result = fn()
+                    self._publish(redis_client, PREFIX_RESULT + key + ":" + token, result)
+                    return result, False
+                finally:
+                    self._release(redis_client, lock_key, token)
+
+            if current is not None:
+                holder = current.decode("utf-8") if isinstance(current, bytes) else current
+                self._break_stale_lock(redis_client, lock_key)
+            if time.time() >= deadline:
+                self._count("wait_timeouts")
+                logger.warning("Single-flight lock wait timed out, generating independently", key=key[:24])
+                return fn(), False
+
+            time.sleep(delay)
+            delay = min(delay * 2, POLL_MAX_SECONDS)
+
+    def _publish(self, redis_client, result_key: str, result: Dict[str, Any]):
+        try:
+            # No default=str: a datetime or Decimal would reach other workers as a string
+            payload = json.dumps(result)
+        except (TypeError, ValueError) as e:
+            logger.info(f"Single-flight result is not JSON-native, not sharing it across workers: {e}")
+            return
+        try:
+            redis_client.setex(result_key, self.result_ttl, payload)
+        except Exception as e:
+            logger.warning(f"Failed to publish single-flight result: {e}")
+
+    def _fetch(self, redis_client, result_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            payload = redis_client.get(result_key)
+        except Exception as e:
+            logger.warning(f"Failed to read single-flight result: {e}")
+            return None
+        if payload is None:
+            return None
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        return json.loads(payload)
+
+    def _release(self, redis_client, lock_key: str, token: str):
+        try:
+            redis_client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            logger.warning(f"Failed to release single-flight lock: {e}")
+
+    def _break_stale_lock(self, redis_client, lock_key: str):
+        """Delete a lock that has no expiry (e.g. written by a crashed or misconfigured worker)."""
+        try:
+            if redis_client.pttl(lock_key) != -1:
+                return
+            holder = redis_client.get(lock_key)
+            if holder is not None and redis_client.eval(_RELEASE_SCRIPT, 1, lock_key, holder):
+                self._count("stale_locks_broken")
+                logger.warning("Broke stale single-flight lock", lock=lock_key[:40])
+        except Exception as e:
+            logger.warning(f"Failed to check single-flight lock: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            in_flight = len(self._flights)
+        return {
+            **stats,
+            "coalesced": stats["coalesced_local"] + stats["coalesced_remote"],
+            "in_flight": in_flight,
+            "distributed": self._redis() is not None,
+        }
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide single-flight registry shared by the SQL generators."""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight(
+            enabled=settings.singleflight_enabled,
+            lock_timeout=settings.singleflight_lock_timeout,
+            wait_timeout=settings.singleflight_wait_timeout,
+            result_ttl=settings.singleflight_result_ttl,
+        )
+    return _single_flight
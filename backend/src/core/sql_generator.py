@@ -5,6 +5,9 @@ from src.core.llm_client import LLMClient
 from src.core.query_optimizer import QueryOptimizer
 from src.core.industry_configs import IndustryConfigManager
 from src.core.cache_manager import CacheManager
+from src.core.single_flight import flight_key, get_single_flight
+from src.core.llm_governor import get_llm_governor
+from src.db.result_streaming import get_result_handle_registry
 from src.core.query_suggestions import QuerySuggestionService
 from src.core.financial_hierarchy import HierarchyLevel, financial_hierarchy
 from src.core.financial_semantic_parser import financial_parser, QueryIntent, QueryType
@@ -37,6 +40,7 @@ except ImportError:
     CSG_ENTITY_RESOLVER_AVAILABLE = False
     get_entity_resolver = lambda x: None
 from src.db.database_client import DatabaseClient as BigQueryClient
+from src.db.validation_cache import get_validation_cache
 from src.db.weaviate_client import WeaviateClient
 from src.config import settings
 
@@ -74,6 +78,14 @@ class SQLGenerator:
                 logger.info("Cache manager initialized successfully")
                 # Update suggestion service with cache manager
                 self.suggestion_service.cache_manager = self.cache_manager
+                # Share dry-run results across workers
+                get_validation_cache().attach(self.cache_manager)
+                # Coalesce identical in-flight generations across workers
+                get_single_flight().attach(self.cache_manager)
+                # Share LLM budgets and rate-limit cooldowns across workers
+                get_llm_governor().attach(self.cache_manager)
+                # Let any worker resume the result cursors this one issued
+                get_result_handle_registry().attach(self.cache_manager)
             except Exception as e:
                 logger.warning(f"Failed to initialize cache manager: {e}. Running without cache.")
                 self.cache_manager = None
@@ -186,44 +198,51 @@ class SQLGenerator:
         # Skip automatic indexing on startup - will be done lazily on first use
         # self._index_schemas()
     
-    def _index_schemas(self):
-        """Index all table schemas in the vector database."""
+    def _index_schemas(self, force: bool = False, prune: bool = False):
+        """Bulk index all table schemas in the vector database; unchanged tables are skipped."""
         try:
             logger.info("Indexing BigQuery table schemas...")
             schemas = self.bq_client.get_dataset_schema()
-            
-            for schema in schemas:
-                # Cache schema if caching is enabled
-                if self.cache_manager and settings.cache_schema_enabled:
+
+            # Cache schemas if caching is enabled
+            if self.cache_manager and settings.cache_schema_enabled:
+                for schema in schemas:
                     self.cache_manager.cache_schema(
                         self.bq_client.project_id,
                         self.bq_client.dataset_id,
                         schema['table_name'],
                         schema
                     )
-                
-                # Generate embedding for the schema
-                schema_text = self._schema_to_text(schema)
-                
-                # Check cache for embedding first
-                embedding = None
-                if self.cache_manager and settings.cache_embedding_enabled:
-                    embedding = self.cache_manager.get_embedding(schema_text)
-                
-                if embedding is None:
-                    embedding = self.llm_client.generate_embedding(schema_text)
-                    # Cache the embedding
-                    if self.cache_manager and settings.cache_embedding_enabled:
-                        self.cache_manager.cache_embedding(schema_text, embedding)
-                
-                # Index in vector database
-                self.vector_client.index_table_schema(schema, embedding)
-            
-            logger.info(f"Indexed {len(schemas)} table schemas")
+
+            report = self.vector_client.bulk_index_table_schemas(
+                schemas,
+                embed_batch=self._embed_schema_texts,
+                text_for=self._schema_to_text,
+                prune=prune,
+                force=force,
+            )
+            if report.failures:
+                logger.warning(f"{report.failed} table schemas failed to index", failures=report.failures[:10])
+            return report
         except Exception as e:
             logger.error(f"Failed to index schemas: {e}")
             # Continue even if indexing fails
-    
+
+    def _embed_schema_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed schema texts in one batch call, reusing cached embeddings."""
+        use_cache = self.cache_manager and settings.cache_embedding_enabled
+        embeddings: List[Optional[List[float]]] = [
+            self.cache_manager.get_embedding(text) if use_cache else None for text in texts
+        ]
+        missing = [index for index, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            generated = self.llm_client.generate_embeddings([texts[index] for index in missing])
+            for index, embedding in zip(missing, generated):
+                embeddings[index] = embedding
+                if use_cache:
+                    self.cache_manager.cache_embedding(texts[index], embedding)
+        return embeddings
+
     def _schema_to_text(self, schema: Dict[str, Any]) -> str:
         """Convert schema to text for embedding generation."""
         parts = [
@@ -247,7 +266,32 @@ class SQLGenerator:
         auto_optimize: bool = True,
         force_refresh: bool = False
     ) -> Dict[str, Any]:
-        """Generate SQL from natural language query."""
+        """Generate SQL from natural language query.
+
+        Concurrent calls with the same normalized question and options share
+        one generation (see src.core.single_flight).
+        """
+        key = flight_key(f"sql:{self.bq_client.project_id}.{self.bq_client.dataset_id}", query, {
+            "use_vector_search": use_vector_search,
+            "max_tables": max_tables,
+            "auto_optimize": auto_optimize,
+            "force_refresh": force_refresh,
+        })
+        result, coalesced = get_single_flight().do(
+            key, lambda: self._generate_sql(query, use_vector_search, max_tables, auto_optimize, force_refresh)
+        )
+        if coalesced:
+            result["coalesced"] = True
+        return result
+
+    def _generate_sql(
+        self,
+        query: str,
+        use_vector_search: bool = True,
+        max_tables: int = 5,
+        auto_optimize: bool = True,
+        force_refresh: bool = False
+    ) -> Dict[str, Any]:
         logger.info(f">>> SQL Generator: Starting generation for query: {query}")
         try:
             # Apply financial hierarchy parsing if enabled
@@ -387,29 +431,24 @@ class SQLGenerator:
             entity_hints = {}
 
             if self.entity_resolver:
-                # Extract potential person names from query
-                import re
-                # Simple name extraction: capitalize words (2+ words likely a name)
-                words = query.split()
-                for i in range(len(words) - 1):
-                    potential_name = f"{words[i]} {words[i+1]}"
-                    # Check if this could be a name (titlecase words)
-                    if words[i][0].isupper() and words[i+1][0].isupper():
-                        entity_type = self.entity_resolver.resolve_entity_type(potential_name)
-                        if entity_type:
-                            column, _ = self.entity_resolver.get_column_for_entity(potential_name)
-                            if column:
-                                entity_hints[potential_name] = {
-                                    'type': entity_type,
-                                    'column': column
-                                }
-                                logger.info(f"🔍 Resolved '{potential_name}' as {entity_type} → use column '{column}'")
+                # Resolve every known person name in the query in one pass
+                pieces = []
+                position = 0
+                for mention in self.entity_resolver.resolve_entities(query):
+                    potential_name = mention['mention']
+                    entity_type = mention['type']
+                    entity_hints[potential_name] = {
+                        'type': entity_type,
+                        'column': mention['column']
+                    }
+                    logger.info(f"🔍 Resolved '{potential_name}' as {entity_type} → use column '{mention['column']}'")
 
-                                # Modify query to be more specific
-                                processed_query = query.replace(
-                                    f"{potential_name}",
-                                    f"{potential_name} (a {entity_type})"
-                                )
+                    # Modify query to be more specific
+                    pieces.append(query[position:mention['end']])
+                    pieces.append(f" (a {entity_type})")
+                    position = mention['end']
+                if pieces:
+                    processed_query = "".join(pieces) + query[position:]
 
             # Apply industry-specific preprocessing
             if settings.enable_industry_features and self.industry_manager.active_config:
@@ -912,17 +951,8 @@ class SQLGenerator:
                                 result["explanation"] = "Query correctly uses Gross_Revenue column for revenue calculations (auto-corrected)"
                             result["auto_corrected"] = True
             
-            # Validate the generated SQL (with caching)
-            validation = None
-            if self.cache_manager and settings.cache_validation_enabled:
-                validation = self.cache_manager.get_validation(result["sql"])
-            
-            if validation is None:
-                validation = self.bq_client.validate_query(result["sql"])
-                # Cache validation result
-                if self.cache_manager and settings.cache_validation_enabled and not result.get("error"):
-                    self.cache_manager.cache_validation(result["sql"], validation)
-            
+            # Validate the generated SQL (cached per normalized SQL and table versions)
+            validation = self.bq_client.validate_query(result["sql"])
             result["validation"] = validation
             
             # Apply query optimization if enabled and query is valid
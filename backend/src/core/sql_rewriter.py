@@ -0,0 +1,1346 @@
+"""
+Single-pass rewriting of LLM-generated SQL into BigQuery SQL.
+
+The SQL is tokenized once and nested into parenthesized groups, then walked
+once in order. Registered rules are dispatched by their trigger: token rules
+by the upper-cased keyword, function name or operator (or by token kind such
+as "@quoted"), "pre" rules the same way but before a function's arguments are
+visited, sequence rules once per parenthesized level after its tokens, and
+finalizers once on the flattened token stream. A rewritten span is re-scanned
+at its own level so rules compose (to_char -> CAST(ROUND(...)) -> FORMAT_DATE)
+without another pass over the statement. String literals and comments are
+never rewritten.
+
+Rules belong to groups so callers can pick a subset; the LLM repair path, for
+example, does not add LIMIT or identifier null filters. Every rewrite returns
+a RewriteReport with the SQL and the rules that fired.
+
+scripts/benchmark_sql_rewriter.py replays scripts/sql_rewrite_corpus.jsonl
+(previously generated queries with their expected rewrites) and measures
+rewrite latency against the legacy multi-pass regex fixes.
+"""
+
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import structlog
+
+logger = structlog.get_logger()
+
+RULE_GROUPS = ("dialect", "dates", "tables", "limit", "presentation")
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<quoted>`[^`]*`)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>::|\|\||>=|<=|<>|!=|[(),;.=<>+\-*/%])
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+_TRIVIA = frozenset({"ws", "comment"})
+
+# Keywords that can never be an operand (a column, literal or call) of an expression
+_KEYWORDS = frozenset({
+    "SELECT", "DISTINCT", "FROM", "WHERE", "GROUP", "BY", "HAVING", "ORDER", "LIMIT", "QUALIFY",
+    "WINDOW", "WITH", "AS", "ON", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "OUTER",
+    "UNION", "EXCEPT", "INTERSECT", "ALL", "AND", "OR", "NOT", "IN", "IS", "NULL", "LIKE",
+    "BETWEEN", "CASE", "WHEN", "THEN", "ELSE", "END", "EXISTS", "OVER", "PARTITION", "ASC", "DESC",
+    "INTERVAL",
+})
+
+# Keyword -> clause it opens at its level (GROUP/ORDER only when followed by BY)
+_CLAUSES = {
+    "WITH": "WITH", "SELECT": "SELECT", "FROM": "FROM", "JOIN": "FROM", "ON": "ON",
+    "WHERE": "WHERE", "GROUP": "GROUP BY", "HAVING": "HAVING", "QUALIFY": "QUALIFY",
+    "WINDOW": "WINDOW", "ORDER": "ORDER BY", "LIMIT": "LIMIT",
+    "UNION": None, "EXCEPT": None, "INTERSECT": None,
+}
+
+# Keywords that end a select list, predicate or ORDER BY list at the same level
+_CLAUSE_STOP = frozenset({
+    "FROM", "WHERE", "GROUP", "HAVING", "QUALIFY", "WINDOW", "ORDER", "LIMIT",
+    "UNION", "EXCEPT", "INTERSECT",
+})
+
+_MAX_REWRITES = 5000  # Per statement; guards against rules that keep re-triggering each other
+
+
+class Token:
+    """A lexical token; words carry their upper-cased text for dispatch."""
+
+    __slots__ = ("kind", "text", "upper")
+
+    def __init__(self, kind: str, text: str):
+        self.kind = kind
+        self.text = text
+        self.upper = text.upper() if kind == "word" else text
+
+    def __repr__(self):
+        return f"Token({self.kind}, {self.text!r})"
+
+
+class Group:
+    """A parenthesized group; closed is False when the SQL never closed it."""
+
+    __slots__ = ("children", "closed", "visited")
+    kind = "group"
+    upper = "("
+
+    def __init__(self, children: Optional[list] = None, closed: bool = True):
+        self.children = children if children is not None else []
+        self.closed = closed
+        self.visited = False
+
+    def __repr__(self):
+        return f"Group({render(self.children)!r})"
+
+
+Node = Union[Token, Group]
+
+
+def parse(sql: str) -> Tuple[List[Node], int, int]:
+    """Tokenize once and nest tokens by parentheses.
+
+    Returns:
+        (nodes, number of groups never closed, number of tokens)
+    """
+    root: List[Node] = []
+    stack = [root]
+    open_groups = []
+    count = 0
+    for match in _TOKEN_RE.finditer(sql):
+        kind = match.lastgroup
+        text = match.group()
+        count += 1
+        if kind == "op":
+            if text == "(":
+                group = Group(closed=False)
+                stack[-1].append(group)
+                stack.append(group.children)
+                open_groups.append(group)
+                continue
+            if text == ")" and open_groups:
+                open_groups.pop().closed = True
+                stack.pop()
+                continue
+        stack[-1].append(Token(kind, text))
+    return root, len(open_groups), count
+
+
+def render(nodes: Sequence[Node]) -> str:
+    return "".join(token.text for token in flatten(nodes))
+
+
+def flatten(nodes: Sequence[Node], out: Optional[List[Token]] = None) -> List[Token]:
+    """The token stream of a tree, with groups expanded back to parentheses."""
+    if out is None:
+        out = []
+    for node in nodes:
+        if node.kind == "group":
+            out.append(Token("op", "("))
+            flatten(node.children, out)
+            if node.closed:
+                out.append(Token("op", ")"))
+        else:
+            out.append(node)
+    return out
+
+
+def fragment(sql: str) -> List[Node]:
+    """Nodes for replacement SQL; its groups are visited when the span is re-scanned."""
+    return parse(sql)[0]
+
+
+# ---------------------------------------------------------------------------
+# Navigation helpers used by rules
+# ---------------------------------------------------------------------------
+
+def next_sig(seq: List[Node], i: int) -> Optional[int]:
+    """Index of the next non-whitespace, non-comment node after i."""
+    i += 1
+    n = len(seq)
+    while i < n and seq[i].kind in _TRIVIA:
+        i += 1
+    return i if i < n else None
+
+
+def prev_sig(seq: List[Node], i: int) -> Optional[int]:
+    i -= 1
+    while i >= 0 and seq[i].kind in _TRIVIA:
+        i -= 1
+    return i if i >= 0 else None
+
+
+def significant(nodes: Sequence[Node]) -> List[Node]:
+    return [node for node in nodes if node.kind not in _TRIVIA]
+
+
+def strip(nodes: Sequence[Node]) -> List[Node]:
+    """nodes without leading and trailing whitespace and comments."""
+    start, end = 0, len(nodes)
+    while start < end and nodes[start].kind in _TRIVIA:
+        start += 1
+    while end > start and nodes[end - 1].kind in _TRIVIA:
+        end -= 1
+    return list(nodes[start:end])
+
+
+def is_word(node: Node, *names: str) -> bool:
+    return node.kind == "word" and (not names or node.upper in names)
+
+
+def is_op(node: Node, text: str) -> bool:
+    return node.kind == "op" and node.text == text
+
+
+def call_args(seq: List[Node], i: int) -> Optional[int]:
+    """Index of the argument group when the word at i is called, e.g. NOW ()."""
+    j = next_sig(seq, i)
+    return j if j is not None and seq[j].kind == "group" else None
+
+
+def split_args(group: Group) -> List[List[Node]]:
+    """Top-level comma-separated arguments of a group, each stripped."""
+    args: List[List[Node]] = [[]]
+    for node in group.children:
+        if node.kind == "op" and node.text == ",":
+            args.append([])
+        else:
+            args[-1].append(node)
+    return [strip(arg) for arg in args]
+
+
+def contains_word(nodes: Sequence[Node], name: str) -> bool:
+    for node in nodes:
+        if node.kind == "group":
+            if contains_word(node.children, name):
+                return True
+        elif node.kind == "word" and node.upper == name:
+            return True
+    return False
+
+
+def contains_call(nodes: List[Node], name: str) -> bool:
+    for k, node in enumerate(nodes):
+        if node.kind == "group":
+            if contains_call(node.children, name):
+                return True
+        elif node.kind == "word" and node.upper == name:
+            j = next_sig(nodes, k)
+            if j is not None and nodes[j].kind == "group":
+                return True
+    return False
+
+
+def is_operand(node: Node) -> bool:
+    """Whether node can end (or start) an expression operand."""
+    if node.kind == "word":
+        return node.upper not in _KEYWORDS
+    return node.kind in ("group", "number", "string", "quoted")
+
+
+def operand_start(seq: List[Node], end: int) -> int:
+    """Start of the operand ending at end: a literal, group, call or qualified name."""
+    k = end
+    if seq[k].kind == "group":
+        p = prev_sig(seq, k)
+        if p is not None and seq[p].kind == "word" and seq[p].upper not in _KEYWORDS:
+            k = p
+    while True:
+        d = prev_sig(seq, k)
+        if d is None or not is_op(seq[d], ".") or seq[k].kind not in ("word", "quoted"):
+            return k
+        w = prev_sig(seq, d)
+        if w is None or seq[w].kind not in ("word", "quoted"):
+            return k
+        k = w
+
+
+def operand_end(seq: List[Node], start: int) -> int:
+    """End of the operand starting at start (see operand_start)."""
+    k = start
+    while seq[k].kind in ("word", "quoted"):
+        d = next_sig(seq, k)
+        if d is None or not is_op(seq[d], "."):
+            break
+        w = next_sig(seq, d)
+        if w is None or seq[w].kind not in ("word", "quoted"):
+            break
+        k = w
+    if seq[k].kind == "word":
+        g = next_sig(seq, k)
+        if g is not None and seq[g].kind == "group":
+            k = g
+    return k
+
+
+def make_call(name: str, *args: Union[str, List[Node]]) -> List[Node]:
+    """NAME(arg, ...) built from existing nodes or SQL text."""
+    children: List[Node] = []
+    for n, arg in enumerate(args):
+        if n:
+            children += [Token("op", ","), Token("ws", " ")]
+        children += fragment(arg) if isinstance(arg, str) else arg
+    return [Token("word", name), Group(children)]
+
+
+def splice(seq: List[Node], start: int, end: int, replacement: Union[str, List[Node]]) -> int:
+    """Replace seq[start:end + 1]; returns start, where scanning resumes."""
+    seq[start:end + 1] = fragment(replacement) if isinstance(replacement, str) else replacement
+    return start
+
+
+# ---------------------------------------------------------------------------
+# Rule registry
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class RewriteRule:
+    """
+    A registered rewrite rule.
+
+    Token and pre rules are called as apply(seq, i, run) for the node seq[i]
+    and return the index to resume scanning at when they changed something
+    (normally the start of the replacement, which gets re-scanned), else None.
+    Sequence rules are called as apply(seq, run) and finalizers as
+    apply(tokens, run); both return True when they changed something.
+    """
+    name: str
+    group: str
+    triggers: Tuple[str, ...]
+    apply: Callable
+    phase: str = "token"
+
+
+_RULES: List[RewriteRule] = []
+
+
+def rewrite_rule(name: str, group: str, triggers: Iterable[str] = (), phase: str = "token"):
+    """
+    Register a rewrite rule.
+
+    Args:
+        name: Name reported when the rule fires (several functions may share one)
+        group: One of RULE_GROUPS
+        triggers: Upper-cased words or operators, or "@<kind>" for every token of a kind
+        phase: "pre", "token", "sequence" or "finalize"
+    """
+    def register(fn):
+        _RULES.append(RewriteRule(name, group, tuple(triggers), fn, phase))
+        return fn
+    return register
+
+
+def registered_rules() -> List[RewriteRule]:
+    return list(_RULES)
+
+
+@dataclass
+class RewriteContext:
+    """The dataset the table rules qualify towards and defaults for the other rules."""
+    project_id: Optional[str] = None
+    dataset_id: Optional[str] = None
+    schema_tables: Sequence[str] = ()     # Tables whose bare names are qualified
+    valid_tables: Sequence[str] = ()      # All tables; unknown ones fall back to default_table
+    default_table: Optional[str] = None
+    data_year: int = 2025                 # Latest year in the (fixed range) data
+    date_column: str = "Posting_Date"
+    row_limit: int = 1000
+    schema_index: Dict[str, str] = field(init=False, repr=False)
+    valid_set: frozenset = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.schema_index = {table.upper(): table for table in self.schema_tables}
+        self.valid_set = frozenset(self.valid_tables)
+
+    def qualified(self, table: str) -> str:
+        return f"{self.project_id}.{self.dataset_id}.{table}"
+
+
+@dataclass
+class RewriteReport:
+    """Result of one rewrite."""
+    sql: str
+    original_sql: str
+    fired: Dict[str, int] = field(default_factory=dict)
+    tokens: int = 0
+    seconds: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        return self.sql != self.original_sql
+
+    def to_dict(self) -> Dict:
+        return {
+            "rules": dict(self.fired),
+            "changed": self.changed,
+            "tokens": self.tokens,
+            "rewrite_ms": round(self.seconds * 1000, 3),
+        }
+
+
+class RewriteRun:
+    """Per-statement traversal state shared by the rules."""
+
+    def __init__(self, context: RewriteContext, unclosed: int):
+        self.context = context
+        self.unclosed = unclosed
+        self.fired: Dict[str, int] = {}
+        self.rewrites = 0
+        self.clause: Optional[str] = None     # Clause at the current level
+        self.call: Optional[str] = None       # Word owning the current group (function, IN, OVER, ...)
+        self.has_select = False
+        self.has_distinct = False
+        self.has_group_by = False
+        self.has_with = False
+        self.clause_tokens: Dict[str, List[Token]] = {}  # WHERE/GROUP/ORDER/LIMIT tokens in order
+        self.select_words = set()             # Upper-cased words seen in select lists
+        self.not_null = set()                 # Columns with an IS NOT NULL filter
+        self.ctes: Dict[str, str] = {}
+        self.cte_renames: Dict[str, str] = {}
+        self.aggregate_alias: Optional[str] = None
+        self.order_by_seen = False
+
+    def fire(self, name: str):
+        self.fired[name] = self.fired.get(name, 0) + 1
+
+
+def _index_rules(rules: Iterable[RewriteRule]) -> Dict[str, List[RewriteRule]]:
+    index: Dict[str, List[RewriteRule]] = {}
+    for rule in rules:
+        for trigger in rule.triggers:
+            index.setdefault(trigger, []).append(rule)
+    return index
+
+
+class SQLRewriter:
+    """Applies the registered rules of the selected groups in one traversal."""
+
+    def __init__(self, groups: Optional[Iterable[str]] = None):
+        selected = set(groups) if groups is not None else set(RULE_GROUPS)
+        unknown = selected - set(RULE_GROUPS)
+        if unknown:
+            raise ValueError(f"Unknown rewrite rule groups: {sorted(unknown)}")
+        rules = [rule for rule in _RULES if rule.group in selected]
+        self.groups = tuple(group for group in RULE_GROUPS if group in selected)
+        self._pre = _index_rules(rule for rule in rules if rule.phase == "pre")
+        self._token = _index_rules(rule for rule in rules if rule.phase == "token")
+        self._sequence = [rule for rule in rules if rule.phase == "sequence"]
+        self._finalize = [rule for rule in rules if rule.phase == "finalize"]
+
+    def rewrite(self, sql: str, context: Optional[RewriteContext] = None) -> RewriteReport:
+        started = time.perf_counter()
+        nodes, unclosed, count = parse(sql)
+        run = RewriteRun(context or RewriteContext(), unclosed)
+        self._visit(nodes, run, None, None)
+        tokens = flatten(nodes)
+        for rule in self._finalize:
+            if rule.apply(tokens, run):
+                run.fire(rule.name)
+        report = RewriteReport(
+            sql="".join(token.text for token in tokens),
+            original_sql=sql,
+            fired=run.fired,
+            tokens=count,
+            seconds=time.perf_counter() - started,
+        )
+        if report.fired:
+            logger.info(f"SQL rewrite rules fired: {report.fired}")
+        return report
+
+    def _visit(self, seq: List[Node], run: RewriteRun, clause: Optional[str], call: Optional[str]):
+        saved = run.clause, run.call
+        run.clause, run.call = clause, call
+        token_rules = self._token
+        i = 0
+        while i < len(seq):
+            node = seq[i]
+            kind = node.kind
+            if kind == "group":
+                if not node.visited:
+                    self._visit_group(seq, i, run)
+                i += 1
+                continue
+            if kind == "word":
+                upper = node.upper
+                if upper in _CLAUSES:
+                    self._enter_clause(seq, i, run)
+                elif run.clause == "SELECT":
+                    run.select_words.add(upper)
+                j = next_sig(seq, i)
+                if j is not None and seq[j].kind == "group" and not seq[j].visited:
+                    resume = self._dispatch(self._pre.get(upper), seq, i, run)
+                    if resume is not None:
+                        i = resume
+                        continue
+                    self._visit_group(seq, j, run)
+                resume = self._dispatch(token_rules.get(upper), seq, i, run)
+                if resume is None:
+                    resume = self._dispatch(token_rules.get("@word"), seq, i, run)
+            else:
+                resume = self._dispatch(token_rules.get(node.text if kind == "op" else "@" + kind), seq, i, run)
+            i = i + 1 if resume is None else resume
+        for rule in self._sequence:
+            if rule.apply(seq, run):
+                run.fire(rule.name)
+        run.clause, run.call = saved
+
+    def _visit_group(self, seq: List[Node], j: int, run: RewriteRun):
+        group = seq[j]
+        group.visited = True
+        p = prev_sig(seq, j)
+        call = seq[p].upper if p is not None and seq[p].kind == "word" else None
+        self._visit(group.children, run, run.clause, call)
+
+    @staticmethod
+    def _enter_clause(seq: List[Node], i: int, run: RewriteRun):
+        node = seq[i]
+        upper = node.upper
+        if upper in ("GROUP", "ORDER"):
+            j = next_sig(seq, i)
+            if j is None or not is_word(seq[j], "BY"):
+                return
+        run.clause = _CLAUSES[upper]
+        if upper == "SELECT":
+            run.has_select = True
+            j = next_sig(seq, i)
+            if j is not None and is_word(seq[j], "DISTINCT"):
+                run.has_distinct = True
+        elif upper == "WITH":
+            run.has_with = True
+        elif upper == "GROUP":
+            run.has_group_by = True
+        if upper in ("WHERE", "GROUP", "ORDER", "LIMIT") and run.call != "OVER":
+            run.clause_tokens.setdefault(upper, []).append(node)
+
+    @staticmethod
+    def _dispatch(rules: Optional[List[RewriteRule]], seq: List[Node], i: int, run: RewriteRun) -> Optional[int]:
+        if not rules or run.rewrites >= _MAX_REWRITES:
+            return None
+        for rule in rules:
+            resume = rule.apply(seq, i, run)
+            if resume is not None:
+                run.fire(rule.name)
+                run.rewrites += 1
+                if run.rewrites == _MAX_REWRITES:
+                    logger.warning(f"SQL rewrite stopped after {_MAX_REWRITES} rewrites (last rule: {rule.name})")
+                return resume
+        return None
+
+
+_rewriters: Dict[Optional[Tuple[str, ...]], SQLRewriter] = {}
+
+
+def rewrite_sql(sql: str, context: Optional[RewriteContext] = None,
+                groups: Optional[Iterable[str]] = None) -> RewriteReport:
+    """Rewrite sql with all rules (or only those of groups)."""
+    key = tuple(sorted(groups)) if groups is not None else None
+    rewriter = _rewriters.get(key)
+    if rewriter is None:
+        rewriter = _rewriters[key] = SQLRewriter(groups)
+    return rewriter.rewrite(sql, context)
+
+
+# ---------------------------------------------------------------------------
+# Shared rule helpers
+# ---------------------------------------------------------------------------
+
+def _clause_end(seq: List[Node], start: int) -> int:
+    k = start
+    while k < len(seq):
+        node = seq[k]
+        if (node.kind == "word" and node.upper in _CLAUSE_STOP) or is_op(node, ";"):
+            break
+        k += 1
+    return k
+
+
+def _split_top(seq: List[Node], start: int, end: int) -> List[Tuple[int, int]]:
+    """[start, end) split on commas at this level, as (start, end) spans."""
+    spans = []
+    a = start
+    for k in range(start, end):
+        if is_op(seq[k], ","):
+            spans.append((a, k))
+            a = k + 1
+    spans.append((a, end))
+    return spans
+
+
+_KEY_SPACE_RE = re.compile(r"\s+")
+_KEY_LOWER_RE = re.compile(r"LOWER\(([\w.]+)\)")
+
+
+def _expression_key(nodes: Sequence[Node]) -> str:
+    """Whitespace- and case-insensitive key; LOWER(col) matches col."""
+    return _KEY_LOWER_RE.sub(r"\1", _KEY_SPACE_RE.sub("", render(nodes)).upper())
+
+
+def _is_string(nodes: Sequence[Node]) -> bool:
+    return len(nodes) == 1 and nodes[0].kind == "string"
+
+
+def _is_dollar(nodes: Sequence[Node]) -> bool:
+    return _is_string(nodes) and nodes[0].text[1:-1] == "$"
+
+
+def _uncast_string(nodes: Sequence[Node]) -> Optional[List[Node]]:
+    """x for CAST(x AS STRING), with ROUND(ROUND(x, 2), 2) simplified to ROUND(x, 2)."""
+    sig = significant(nodes)
+    if len(sig) != 2 or not is_word(sig[0], "CAST") or sig[1].kind != "group":
+        return None
+    children = sig[1].children
+    inner = [k for k, node in enumerate(children) if node.kind not in _TRIVIA]
+    if len(inner) < 3 or not is_word(children[inner[-2]], "AS") or not is_word(children[inner[-1]], "STRING"):
+        return None
+    expr = strip(children[:inner[-2]])
+    parts = significant(expr)
+    if len(parts) == 2 and is_word(parts[0], "ROUND") and parts[1].kind == "group":
+        outer = split_args(parts[1])
+        if len(outer) == 2 and _render_is(outer[1], "2"):
+            rounded = significant(outer[0])
+            if len(rounded) == 2 and is_word(rounded[0], "ROUND") and rounded[1].kind == "group":
+                args = split_args(rounded[1])
+                if len(args) == 2 and _render_is(args[1], "2"):
+                    return outer[0]
+    return expr
+
+
+def _render_is(nodes: Sequence[Node], text: str) -> bool:
+    return len(nodes) == 1 and nodes[0].text == text
+
+
+def _is_column_ref(nodes: Sequence[Node]) -> bool:
+    """name or qualifier.name"""
+    if not nodes or len(nodes) % 2 == 0:
+        return False
+    return all(node.kind == "word" if k % 2 == 0 else is_op(node, ".") for k, node in enumerate(nodes))
+
+
+def _is_reference_substring(nodes: Sequence[Node]) -> bool:
+    """SUBSTRING(REFERENCESDDOCUMENT, ...)"""
+    if len(nodes) != 2 or not is_word(nodes[0], "SUBSTRING", "SUBSTR") or nodes[1].kind != "group":
+        return False
+    args = significant(nodes[1].children)
+    return bool(args) and is_word(args[0], "REFERENCESDDOCUMENT")
+
+
+def _statement_end(tokens: List[Token]) -> int:
+    """Index after the last token that is not whitespace or a semicolon."""
+    k = len(tokens)
+    while k and (tokens[k - 1].kind == "ws" or is_op(tokens[k - 1], ";")):
+        k -= 1
+    return k
+
+
+def _insertion(tokens: List[Token], k: int, text: str) -> List[Token]:
+    """Tokens for text inserted at k, moved to a new line if k directly follows a -- comment."""
+    if k and tokens[k - 1].kind == "comment" and tokens[k - 1].text.startswith("--"):
+        return fragment("\n" + text.lstrip())
+    return fragment(text)
+
+
+def _present(tokens: List[Token], candidates: Sequence[Token]) -> List[int]:
+    """Indexes of the candidate tokens still in the stream, in stream order."""
+    if not candidates:
+        return []
+    wanted = {id(token) for token in candidates}
+    return [k for k, token in enumerate(tokens) if id(token) in wanted]
+
+
+def _first_present(tokens: List[Token], candidates: Sequence[Token]) -> Optional[int]:
+    positions = _present(tokens, candidates)
+    return positions[0] if positions else None
+
+
+# ---------------------------------------------------------------------------
+# dialect: PostgreSQL syntax that slips through, and malformed expressions
+# ---------------------------------------------------------------------------
+
+@rewrite_rule("to_char", "dialect", ["TO_CHAR"])
+def _to_char(seq, i, run):
+    """to_char(x, fmt) -> CAST(ROUND(x, 2) AS STRING); BigQuery FORMAT has no %,.2f."""
+    g = call_args(seq, i)
+    if g is None:
+        return None
+    args = split_args(seq[g])
+    if not args[0]:
+        return None
+    value = make_call("ROUND", args[0], "2") if len(args) >= 2 else args[0]
+    return splice(seq, i, g, make_call("CAST", value + fragment(" AS STRING")))
+
+
+# Postgres types BigQuery does not accept under the same name
+_PG_TYPES = {
+    "TEXT": "STRING", "VARCHAR": "STRING", "CHAR": "STRING",
+    "FLOAT": "FLOAT64", "FLOAT4": "FLOAT64", "FLOAT8": "FLOAT64", "REAL": "FLOAT64", "DOUBLE": "FLOAT64",
+    "INT4": "INT64", "INT8": "INT64",
+}
+
+
+@rewrite_rule("pg_cast", "dialect", ["::"])
+def _pg_cast(seq, i, run):
+    """x::type -> CAST(x AS type)"""
+    p, n = prev_sig(seq, i), next_sig(seq, i)
+    if p is None or n is None or seq[n].kind != "word" or not is_operand(seq[p]):
+        return None
+    start = operand_start(seq, p)
+    type_name = _PG_TYPES.get(seq[n].upper, seq[n].text)
+    return splice(seq, start, n, make_call("CAST", seq[start:p + 1] + fragment(f" AS {type_name}")))
+
+
+@rewrite_rule("now", "dialect", ["NOW"])
+def _now(seq, i, run):
+    g = call_args(seq, i)
+    if g is None or significant(seq[g].children):
+        return None
+    return splice(seq, i, g, "CURRENT_TIMESTAMP()")
+
+
+@rewrite_rule("current_date_call", "dialect", ["CURRENT_DATE"])
+def _current_date_call(seq, i, run):
+    """Bare CURRENT_DATE -> CURRENT_DATE(); also repairs CURRENT_DATE(, YEAR)."""
+    g = call_args(seq, i)
+    if g is None:
+        p = prev_sig(seq, i)
+        if p is not None and is_op(seq[p], "."):
+            return None
+        return splice(seq, i, i, "CURRENT_DATE()")
+    inner = significant(seq[g].children)
+    if inner and is_op(inner[0], ","):
+        return splice(seq, i, g, [Token("word", seq[i].text), Group()] + seq[g].children)
+    return None
+
+
+_QUOTED_PART_RE = re.compile(r"['\"](\w+)['\"]")
+
+
+@rewrite_rule("date_trunc_args", "dialect", ["DATE_TRUNC"])
+def _date_trunc_args(seq, i, run):
+    """DATE_TRUNC('month', x) -> DATE_TRUNC(x, MONTH)"""
+    g = call_args(seq, i)
+    if g is None:
+        return None
+    args = split_args(seq[g])
+    if len(args) != 2 or not _is_string(args[0]):
+        return None
+    match = _QUOTED_PART_RE.fullmatch(args[0][0].text)
+    if not match or not args[1]:
+        return None
+    return splice(seq, i, g, make_call(seq[i].text, args[1], match.group(1).upper()))
+
+
+_INTERVAL_STRING_RE = re.compile(r"['\"]\s*(\d+)\s*(\w+)\s*['\"]")
+
+
+def _interval_at(seq, i) -> Optional[Tuple[str, str, int]]:
+    """(count, unit, index of last token) for INTERVAL '2 years' or INTERVAL 2 YEARS at i."""
+    j = next_sig(seq, i)
+    if j is None:
+        return None
+    node = seq[j]
+    if node.kind == "string":
+        match = _INTERVAL_STRING_RE.fullmatch(node.text)
+        if match:
+            return match.group(1), match.group(2).upper().rstrip("S"), j
+    elif node.kind == "number" and node.text.isdigit():
+        k = next_sig(seq, j)
+        if k is not None and seq[k].kind == "word":
+            return node.text, seq[k].upper.rstrip("S"), k
+    return None
+
+
+@rewrite_rule("interval_literal", "dialect", ["INTERVAL"])
+def _interval_literal(seq, i, run):
+    """INTERVAL '2 years' -> INTERVAL 2 YEAR"""
+    parts = _interval_at(seq, i)
+    if parts is None:
+        return None
+    replacement = f"INTERVAL {parts[0]} {parts[1]}"
+    if render(seq[i:parts[2] + 1]) == replacement:
+        return None
+    return splice(seq, i, parts[2], replacement)
+
+
+@rewrite_rule("interval_arithmetic", "dialect", ["-", "+"])
+def _interval_arithmetic(seq, i, run):
+    """x - INTERVAL n UNIT -> DATE_SUB(x, INTERVAL n UNIT); + becomes DATE_ADD."""
+    n = next_sig(seq, i)
+    if n is None or not is_word(seq[n], "INTERVAL"):
+        return None
+    parts = _interval_at(seq, n)
+    p = prev_sig(seq, i)
+    if parts is None or p is None or not is_operand(seq[p]):
+        return None
+    start = operand_start(seq, p)
+    function = "DATE_SUB" if seq[i].text == "-" else "DATE_ADD"
+    return splice(seq, start, parts[2],
+                  make_call(function, seq[start:p + 1], f"INTERVAL {parts[0]} {parts[1]}"))
+
+
+_DATE_NAME_PARTS = ("month", "date", "period", "day", "year", "week", "quarter")
+
+
+@rewrite_rule("round_on_date", "dialect", ["CAST"])
+def _round_on_date(seq, i, run):
+    """CAST(ROUND(month, 2) AS STRING) -> FORMAT_DATE('%Y-%m', month) for date-like columns."""
+    g = call_args(seq, i)
+    if g is None:
+        return None
+    inner = significant(seq[g].children)
+    if (len(inner) != 4 or not is_word(inner[0], "ROUND") or inner[1].kind != "group"
+            or not is_word(inner[2], "AS") or not is_word(inner[3], "STRING")):
+        return None
+    args = split_args(inner[1])
+    if len(args) != 2 or len(args[0]) != 1 or args[0][0].kind != "word" or not _render_is_number(args[1]):
+        return None
+    column = args[0][0].text
+    name = column.lower()
+    if not any(part in name for part in _DATE_NAME_PARTS):
+        return None
+    if "month" in name:
+        replacement = f"FORMAT_DATE('%Y-%m', {column})"
+    elif "year" in name:
+        replacement = f"FORMAT_DATE('%Y', {column})"
+    elif "quarter" in name:
+        replacement = f"FORMAT_DATE('%Y-Q%Q', {column})"
+    else:
+        replacement = f"CAST({column} AS STRING)"
+    return splice(seq, i, g, replacement)
+
+
+def _render_is_number(nodes: Sequence[Node]) -> bool:
+    return len(nodes) == 1 and nodes[0].kind == "number" and nodes[0].text.isdigit()
+
+
+@rewrite_rule("double_round", "dialect", ["ROUND"])
+def _double_round(seq, i, run):
+    """ROUND(ROUND(x, n) AS alias (outer call never closed) -> ROUND(x, n) AS alias"""
+    g = call_args(seq, i)
+    if g is None or seq[g].closed:
+        return None
+    children = seq[g].children
+    inner = [k for k, node in enumerate(children) if node.kind not in _TRIVIA]
+    if (len(inner) < 3 or not is_word(children[inner[0]], "ROUND") or children[inner[1]].kind != "group"
+            or not is_word(children[inner[2]], "AS")):
+        return None
+    run.unclosed -= 1
+    return splice(seq, i, g, children[inner[0]:])
+
+
+@rewrite_rule("string_concat", "dialect", ["||"])
+def _string_concat(seq, i, run):
+    """a || 'b' || c -> CONCAT(a, 'b', c); '$' || CAST(x AS STRING) -> x (the frontend formats currency)."""
+    p = prev_sig(seq, i)
+    if p is None or not is_operand(seq[p]):
+        return None
+    start = operand_start(seq, p)
+    operands = [seq[start:p + 1]]
+    end = p
+    k: Optional[int] = i
+    while k is not None and is_op(seq[k], "||"):
+        a = next_sig(seq, k)
+        if a is None or not is_operand(seq[a]):
+            break
+        end = operand_end(seq, a)
+        operands.append(seq[a:end + 1])
+        k = next_sig(seq, end)
+    if len(operands) < 2:
+        return None
+    uncast = _uncast_string(operands[1]) if _is_dollar(strip(operands[0])) else None
+    if uncast is not None:
+        operands = [uncast] + operands[2:]
+    if len(operands) == 1:
+        replacement = operands[0]
+    elif any(_is_string(strip(operand)) for operand in operands):
+        replacement = make_call("CONCAT", *operands)
+    elif uncast is not None:
+        replacement = list(operands[0])
+        for operand in operands[1:]:
+            replacement += fragment(" || ") + operand
+    else:
+        return None
+    return splice(seq, start, end, replacement)
+
+
+@rewrite_rule("currency_concat", "dialect", ["CONCAT"])
+def _currency_concat(seq, i, run):
+    """CONCAT('$', CAST(x AS STRING)) -> x; the frontend formats currency."""
+    g = call_args(seq, i)
+    if g is None:
+        return None
+    args = split_args(seq[g])
+    if len(args) < 2 or not _is_dollar(args[0]):
+        return None
+    numeric = _uncast_string(args[1])
+    if numeric is None:
+        return None
+    return splice(seq, i, g, numeric)
+
+
+@rewrite_rule("distinct_order_by_alias", "dialect", phase="sequence")
+def _distinct_order_by_alias(seq, run):
+    """With SELECT DISTINCT, ORDER BY an aliased select expression must use the alias."""
+    select = order = None
+    for k, node in enumerate(seq):
+        if node.kind != "word":
+            continue
+        if node.upper == "SELECT" and select is None:
+            d = next_sig(seq, k)
+            if d is not None and is_word(seq[d], "DISTINCT"):
+                select = d
+        elif node.upper == "ORDER" and select is not None:
+            b = next_sig(seq, k)
+            if b is not None and is_word(seq[b], "BY"):
+                order = b
+                break
+    if select is None or order is None:
+        return False
+    aliases = {}
+    for a, b in _split_top(seq, select + 1, _clause_end(seq, select + 1)):
+        item = significant(seq[a:b])
+        if (len(item) in (3, 4) and is_word(item[-2], "AS") and item[-1].kind == "word"
+                and is_word(item[0]) and (len(item) == 3 or item[1].kind == "group")):
+            aliases[_expression_key(item[:-2])] = item[-1].text
+    changed = False
+    for a, b in reversed(_split_top(seq, order + 1, _clause_end(seq, order + 1))):
+        expr = [k for k in range(a, b) if seq[k].kind not in _TRIVIA]
+        while expr and is_word(seq[expr[-1]], "ASC", "DESC"):
+            expr.pop()
+        if not expr:
+            continue
+        alias = aliases.get(_expression_key(seq[expr[0]:expr[-1] + 1]))
+        if alias is None or (len(expr) == 1 and seq[expr[0]].text == alias):
+            continue
+        seq[expr[0]:expr[-1] + 1] = [Token("word", alias)]
+        changed = True
+    return changed
+
+
+_AGGREGATES = frozenset({"SUM", "AVG", "COUNT", "MAX", "MIN"})
+
+
+@rewrite_rule("order_by_aggregate_alias", "dialect", ["AS"])
+def _track_aggregate_alias(seq, i, run):
+    """Remember the latest alias of an aggregate (or ROUND of one) in a select list."""
+    if run.clause != "SELECT" or run.call in ("CAST", "SAFE_CAST"):
+        return None
+    p, a = prev_sig(seq, i), next_sig(seq, i)
+    if p is None or a is None or seq[p].kind != "group" or seq[a].kind != "word":
+        return None
+    f = prev_sig(seq, p)
+    if f is None or seq[f].kind != "word":
+        return None
+    if seq[f].upper in _AGGREGATES:
+        run.aggregate_alias = seq[a].text
+    elif seq[f].upper == "ROUND":
+        first = significant(seq[p].children)
+        if first and is_word(first[0]) and first[0].upper in _AGGREGATES:
+            run.aggregate_alias = seq[a].text
+    return None
+
+
+@rewrite_rule("order_by_aggregate_alias", "dialect", ["ORDER"])
+def _order_by_aggregate_alias(seq, i, run):
+    """In a WITH query, ORDER BY SUM(...) -> ORDER BY <latest aggregate alias>."""
+    if run.order_by_seen or run.call == "OVER":
+        return None
+    b = next_sig(seq, i)
+    if b is None or not is_word(seq[b], "BY"):
+        return None
+    run.order_by_seen = True
+    if not run.has_with or run.aggregate_alias is None:
+        return None
+    f = next_sig(seq, b)
+    if f is None or not is_word(seq[f]) or seq[f].upper not in _AGGREGATES:
+        return None
+    g = call_args(seq, f)
+    if g is None:
+        return None
+    return splice(seq, f, g, [Token("word", run.aggregate_alias)])
+
+
+@rewrite_rule("balance_parentheses", "dialect", phase="finalize")
+def _balance_parentheses(tokens, run):
+    """Close groups the SQL left open, before the last LIMIT or at the end."""
+    if run.unclosed <= 0:
+        return False
+    closing = [Token("op", ")") for _ in range(run.unclosed)]
+    limits = _present(tokens, run.clause_tokens.get("LIMIT", []))
+    if limits:
+        k = limits[-1]
+        while k and tokens[k - 1].kind == "ws":
+            del tokens[k - 1]
+            k -= 1
+        tokens[k:k] = _insertion(tokens, k, "") + closing + [Token("ws", " ")]
+    else:
+        end = _statement_end(tokens)
+        tokens[end:] = _insertion(tokens, end, "") + closing + [Token("op", ";")]
+    return True
+
+
+# ---------------------------------------------------------------------------
+# dates: the data covers a fixed date range, so relative date filters are
+# dropped and hallucinated date columns map to the posting date
+# ---------------------------------------------------------------------------
+
+@rewrite_rule("current_year", "dates", ["EXTRACT"])
+def _current_year(seq, i, run):
+    """EXTRACT(YEAR FROM CURRENT_DATE()) -> the latest year in the data"""
+    g = call_args(seq, i)
+    if g is None:
+        return None
+    inner = significant(seq[g].children)
+    if (len(inner) in (3, 4) and is_word(inner[0], "YEAR") and is_word(inner[1], "FROM")
+            and is_word(inner[2], "CURRENT_DATE")
+            and (len(inner) == 3 or (inner[3].kind == "group" and not significant(inner[3].children)))):
+        return splice(seq, i, g, [Token("number", str(run.context.data_year))])
+    return None
+
+
+@rewrite_rule("order_date_column", "dates", ["EXTRACT"])
+def _order_date_column(seq, i, run):
+    """EXTRACT(part FROM Order_Date) -> EXTRACT(part FROM Posting_Date)"""
+    g = call_args(seq, i)
+    if g is None:
+        return None
+    children = seq[g].children
+    inner = [k for k, node in enumerate(children) if node.kind not in _TRIVIA]
+    if (len(inner) == 3 and is_word(children[inner[0]], "YEAR", "MONTH", "DAY", "QUARTER")
+            and is_word(children[inner[1]], "FROM") and is_word(children[inner[2]], "ORDER_DATE")):
+        children[inner[2]] = Token("word", run.context.date_column)
+        return i + 1
+    return None
+
+
+@rewrite_rule("date_column_alias", "dates", ["DATE_COLUMN", "HEADER_CREATION_DATE"])
+def _date_column_alias(seq, i, run):
+    """Columns the LLM invents for dates -> Posting_Date"""
+    seq[i] = Token("word", run.context.date_column)
+    return i + 1
+
+
+@rewrite_rule("parsed_date_column", "dates", ["PARSE_DATE", "CAST"], phase="pre")
+def _parsed_date_column(seq, i, run):
+    """Dates parsed out of REFERENCESDDOCUMENT or Header_Creation_Date -> Posting_Date"""
+    g = call_args(seq, i)
+    if g is None:
+        return None
+    if seq[i].upper == "PARSE_DATE":
+        args = split_args(seq[g])
+        if len(args) != 2 or not _is_string(args[0]):
+            return None
+        target = significant(args[1])
+        if not ((len(target) == 1 and is_word(target[0], "HEADER_CREATION_DATE"))
+                or (args[0][0].text[1:-1] == "%Y%m%d" and _is_reference_substring(target))):
+            return None
+    else:
+        inner = significant(seq[g].children)
+        if (len(inner) != 4 or not _is_reference_substring(inner[:2])
+                or not is_word(inner[2], "AS") or not is_word(inner[3], "DATE")):
+            return None
+    return splice(seq, i, g, [Token("word", run.context.date_column)])
+
+
+def _and_terms(seq, start, end) -> Optional[List[Tuple[int, int, int]]]:
+    """AND-ed terms of a predicate as (separator start, term start, term end); None if it has a top-level OR."""
+    terms = []
+    term_start = last = None
+    separator = start
+    in_between = False
+    for k in range(start, end):
+        node = seq[k]
+        if node.kind in _TRIVIA:
+            continue
+        if node.kind == "word":
+            if node.upper == "OR":
+                return None
+            if node.upper == "BETWEEN":
+                in_between = True
+            elif node.upper == "AND":
+                if in_between:
+                    in_between = False
+                elif term_start is not None:
+                    terms.append((separator, term_start, last + 1))
+                    separator = last + 1
+                    term_start = None
+                    continue
+        if term_start is None:
+            term_start = k
+        last = k
+    if term_start is not None:
+        terms.append((separator, term_start, last + 1))
+    return terms
+
+
+def _is_relative_date_filter(nodes) -> bool:
+    """A predicate relative to today (other than an age computed with DATE_DIFF) or on REFERENCESDDOCUMENT dates."""
+    if contains_word(nodes, "CURRENT_DATE") or contains_word(nodes, "CURRENT_TIMESTAMP"):
+        return not contains_word(nodes, "DATE_DIFF")
+    sig = significant(nodes)
+    if len(sig) >= 2 and sig[1].kind == "group":
+        args = significant(sig[1].children)
+        if is_word(sig[0], "LENGTH"):
+            return len(args) == 1 and is_word(args[0], "REFERENCESDDOCUMENT")
+        if is_word(sig[0], "REGEXP_CONTAINS"):
+            return _is_reference_substring(args[:2])
+    return (len(sig) == 4 and is_word(sig[0], "REFERENCESDDOCUMENT") and is_word(sig[1], "IS")
+            and is_word(sig[2], "NOT") and is_word(sig[3], "NULL"))
+
+
+@rewrite_rule("drop_relative_date_filters", "dates", phase="sequence")
+def _drop_relative_date_filters(seq, run):
+    """Remove AND-ed WHERE/HAVING terms filtering relative to today (and WHERE itself if nothing is left)."""
+    changed = False
+    keywords = [k for k, node in enumerate(seq) if node.kind == "word" and node.upper in ("WHERE", "HAVING")]
+    for w in reversed(keywords):
+        end = _clause_end(seq, w + 1)
+        terms = _and_terms(seq, w + 1, end)
+        if not terms:
+            continue
+        kept = [term for term in terms if not _is_relative_date_filter(seq[term[1]:term[2]])]
+        if len(kept) == len(terms):
+            continue
+        changed = True
+        trailing = seq[terms[-1][2]:end]
+        if kept:
+            body = list(seq[w + 1:terms[0][1]])
+            for n, (separator, a, b) in enumerate(kept):
+                if n:
+                    body += seq[separator:a]
+                body += seq[a:b]
+            seq[w + 1:end] = body + trailing
+        else:
+            start = w
+            while start and seq[start - 1].kind == "ws":
+                start -= 1
+            seq[start:end] = trailing
+    return changed
+
+
+_BLANK_LINES_RE = re.compile(r"\n\s*\n")
+_SPACES_RE = re.compile(r"  +")
+
+
+@rewrite_rule("collapse_whitespace", "dates", ["@ws"])
+def _collapse_whitespace(seq, i, run):
+    text = seq[i].text
+    if len(text) < 2:
+        return None
+    cleaned = _SPACES_RE.sub(" ", _BLANK_LINES_RE.sub("\n", text))
+    if cleaned == text:
+        return None
+    seq[i] = Token("ws", cleaned)
+    return i + 1
+
+
+# BigQuery rejects aggregates over a column named like the CTE it is read
+# from ("No matching signature for aggregate function"), so such columns are
+# renamed (x AS x -> x_value, SUM(...) AS x -> x_amount) together with the
+# later references to them.
+
+@rewrite_rule("cte_column_conflict", "dates", ["WITH"])
+def _register_ctes(seq, i, run):
+    k = next_sig(seq, i)
+    if k is not None and is_word(seq[k], "RECURSIVE"):
+        k = next_sig(seq, k)
+    while k is not None and seq[k].kind == "word":
+        a = next_sig(seq, k)
+        g = next_sig(seq, a) if a is not None else None
+        if a is None or g is None or not is_word(seq[a], "AS") or seq[g].kind != "group":
+            break
+        run.ctes[seq[k].upper] = seq[k].text
+        c = next_sig(seq, g)
+        if c is None or not is_op(seq[c], ","):
+            break
+        k = next_sig(seq, c)
+    return None
+
+
+@rewrite_rule("cte_column_conflict", "dates", ["AS"])
+def _rename_cte_alias(seq, i, run):
+    if not run.ctes or run.clause != "SELECT":
+        return None
+    a = next_sig(seq, i)
+    if a is None or seq[a].kind != "word" or seq[a].upper not in run.ctes:
+        return None
+    k = i - 1
+    while k >= 0 and not is_op(seq[k], ",") and not is_word(seq[k], "SELECT", "DISTINCT"):
+        k -= 1
+    item = significant(seq[k + 1:i])
+    if len(item) == 1 and is_word(item[0], seq[a].upper):
+        renamed = f"{seq[a].text}_value"
+    elif contains_call(seq[k + 1:i], "SUM"):
+        renamed = f"{seq[a].text}_amount"
+    else:
+        return None
+    run.cte_renames[seq[a].upper] = renamed
+    seq[a] = Token("word", renamed)
+    return i
+
+
+@rewrite_rule("cte_column_conflict", "dates", ["@word"])
+def _rename_cte_reference(seq, i, run):
+    if not run.cte_renames:
+        return None
+    renamed = run.cte_renames.get(seq[i].upper)
+    if renamed is None or run.clause in ("FROM", "WITH"):
+        return None
+    p, n = prev_sig(seq, i), next_sig(seq, i)
+    if p is not None and (is_op(seq[p], ".") or is_word(seq[p], "AS", "FROM", "JOIN")):
+        return None
+    if n is not None and (is_op(seq[n], ".") or seq[n].kind == "group"):
+        return None
+    seq[i] = Token("word", renamed)
+    return i + 1
+
+
+# ---------------------------------------------------------------------------
+# tables: fully qualified references to the configured project and dataset
+# ---------------------------------------------------------------------------
+
+def _match_split_table(dataset_part: str, table_part: str, valid_tables: Sequence[str]) -> Optional[str]:
+    """The valid table an LLM split at an underscore, e.g. `p.dataset.25m_table`."""
+    combined = f"{dataset_part}_{table_part}"
+    for valid_table in valid_tables:
+        if (valid_table == combined or valid_table == table_part or valid_table.endswith(table_part)
+                or combined.endswith(valid_table)
+                or valid_table.replace("_", "") == f"{dataset_part}{table_part}".replace("_", "")):
+            return valid_table
+    return None
+
+
+def _resolve_table(reference: str, context: RewriteContext) -> Optional[str]:
+    parts = reference.split(".")
+    if len(parts) == 1:
+        return context.qualified(reference) if context.schema_index.get(reference.upper()) == reference else None
+    if len(parts) < 3:
+        return None
+    project, dataset, table = parts[0], parts[1], ".".join(parts[2:])
+    if project != context.project_id:
+        return context.qualified(table)
+    if dataset == context.dataset_id:
+        if context.valid_set and context.default_table and table not in context.valid_set:
+            logger.warning(f"Invalid table '{table}' not in valid tables, replacing with {context.default_table}")
+            return context.qualified(context.default_table)
+        return None
+    return context.qualified(_match_split_table(dataset, table, context.valid_tables) or table)
+
+
+@rewrite_rule("table_reference", "tables", ["@quoted"])
+def _qualify_quoted_table(seq, i, run):
+    """Wrong project/dataset, tables split at underscores, unknown and bare quoted tables"""
+    context = run.context
+    if not context.project_id or not context.dataset_id:
+        return None
+    resolved = _resolve_table(seq[i].text[1:-1], context)
+    if resolved is None or resolved == seq[i].text[1:-1]:
+        return None
+    seq[i] = Token("quoted", f"`{resolved}`")
+    return i + 1
+
+
+@rewrite_rule("table_reference", "tables", ["FROM", "JOIN"])
+def _qualify_bare_table(seq, i, run):
+    """FROM table_name -> FROM `project.dataset.table_name`"""
+    context = run.context
+    n = next_sig(seq, i)
+    if not context.project_id or not context.dataset_id or n is None or seq[n].kind != "word":
+        return None
+    table = context.schema_index.get(seq[n].upper)
+    m = next_sig(seq, n)
+    if table is None or (m is not None and (is_op(seq[m], ".") or seq[m].kind == "group")):
+        return None
+    seq[n] = Token("quoted", f"`{context.qualified(table)}`")
+    return n + 1
+
+
+# ---------------------------------------------------------------------------
+# limit
+# ---------------------------------------------------------------------------
+
+@rewrite_rule("add_limit", "limit", phase="finalize")
+def _add_limit(tokens, run):
+    """Default LIMIT when the statement has none (balances cost against usability)."""
+    if not run.has_select or run.clause_tokens.get("LIMIT"):
+        return False
+    end = _statement_end(tokens)
+    limit = _insertion(tokens, end, f" LIMIT {run.context.row_limit};")
+    tokens[end:] = limit
+    # Later finalizers (identifier_null_filters) insert their clauses before it
+    run.clause_tokens.setdefault("LIMIT", []).extend(token for token in limit if is_word(token, "LIMIT"))
+    return True
+
+
+# ---------------------------------------------------------------------------
+# presentation: keep display text as stored and keep null identifiers out
+# ---------------------------------------------------------------------------
+
+@rewrite_rule("select_lower", "presentation", ["LOWER"])
+def _select_lower(seq, i, run):
+    """LOWER(column) in a select list -> column; LOWER belongs in filters, not in displayed text."""
+    if run.clause != "SELECT":
+        return None
+    g = call_args(seq, i)
+    if g is None or not _is_column_ref(significant(seq[g].children)):
+        return None
+    return splice(seq, i, g, strip(seq[g].children))
+
+
+_IDENTIFIER_COLUMNS = {
+    "Sold_to_Number": "Sold_to_Number",
+    "Sold_to_Name": "Sold_to_Name",
+    "customer_id": "Sold_to_Number",
+    "customer_name": "Sold_to_Name",
+    "Material": "Material",
+    "Material_Description": "Material_Description",
+    "Distributor": "Distributor",
+    "Payer_Name": "Payer_Name",
+    "Bill_to_Party_Name": "Bill_to_Party_Name",
+}
+
+
+@rewrite_rule("identifier_null_filters", "presentation", ["IS"])
+def _track_not_null(seq, i, run):
+    p, n = prev_sig(seq, i), next_sig(seq, i)
+    m = next_sig(seq, n) if n is not None else None
+    if (p is not None and m is not None and seq[p].kind == "word"
+            and is_word(seq[n], "NOT") and is_word(seq[m], "NULL")):
+        run.not_null.add(seq[p].upper)
+    return None
+
+
+@rewrite_rule("identifier_null_filters", "presentation", phase="finalize")
+def _identifier_null_filters(tokens, run):
+    """Listing and aggregation queries over identifier columns filter out NULL identifiers."""
+    if not (run.has_distinct or run.has_group_by):
+        return False
+    columns = []
+    for alias, column in _IDENTIFIER_COLUMNS.items():
+        if alias.upper() in run.select_words and column.upper() not in run.not_null and column not in columns:
+            columns.append(column)
+    if not columns:
+        return False
+    filters = " AND ".join(f"{column} IS NOT NULL" for column in columns)
+    where = _first_present(tokens, run.clause_tokens.get("WHERE", []))
+    if where is not None:
+        k = where + 1
+        while k < len(tokens) and tokens[k].kind == "ws":
+            k += 1
+        tokens[k:k] = fragment(f"{filters} AND ")
+        return True
+    for clause in ("GROUP", "ORDER", "LIMIT"):
+        k = _first_present(tokens, run.clause_tokens.get(clause, []))
+        if k is not None:
+            while k and tokens[k - 1].kind == "ws":
+                k -= 1
+            tokens[k:k] = _insertion(tokens, k, f" WHERE {filters}")
+            return True
+    end = _statement_end(tokens)
+    tokens[end:] = _insertion(tokens, end, f" WHERE {filters};")
+    return True
@@ -0,0 +1,220 @@
+"""
+Columnar query results backed by Apache Arrow.
+
+A ColumnarResult wraps a pyarrow.Table fetched as record batches and keeps it
+columnar through formatting (map_columns) and serialization: JSON is built by
+encoding each column with Arrow compute kernels and joining the encoded
+columns element-wise into rows, CSV and Arrow IPC are written by pyarrow
+directly. Rows as dictionaries are only
+materialized when a caller asks for to_pylist().
+"""
+
+import io
+import json
+import math
+import datetime
+from decimal import Decimal
+from json.encoder import encode_basestring
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.types as pa_types
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+# JSON string escapes applied in Arrow compute; other control characters fall back to Python
+_STRING_ESCAPES = [("\\", "\\\\"), ('"', '\\"'), ("\n", "\\n"), ("\r", "\\r"), ("\t", "\\t")]
+_UNESCAPED_CONTROL = "[\\x00-\\x08\\x0b\\x0c\\x0e-\\x1f]"
+
+
+def _encode_float(value: float) -> str:
+    return repr(value) if math.isfinite(value) else "null"
+
+
+def _encode_other(value: Any) -> str:
+    if isinstance(value, Decimal):
+        return _encode_float(float(value))
+    if isinstance(value, (datetime.date, datetime.time)):
+        return encode_basestring(value.isoformat())
+    return json.dumps(value, default=str)
+
+
+def _encode_python(column: pa.ChunkedArray) -> pa.Array:
+    """Per-value JSON encoding for types Arrow compute cannot render (temporal, nested, odd strings)."""
+    encode = encode_basestring if pa_types.is_string(column.type) or pa_types.is_large_string(column.type) \
+        else _encode_other
+    return pa.array(["null" if value is None else encode(value) for value in column.to_pylist()], pa.large_string())
+
+
+def encode_column(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """
+    JSON text for every value of a column as an Arrow string column (nulls become 'null').
+
+    Numbers and booleans are cast in Arrow compute, strings are escaped with
+    vectorized substring replacement; only temporal and nested columns (or
+    strings with rare control characters) are encoded value by value.
+    """
+    arrow_type = column.type
+    if pa_types.is_null(arrow_type):
+        return pa.chunked_array([pa.array(["null"] * len(column), pa.large_string())])
+
+    if pa_types.is_string(arrow_type) or pa_types.is_large_string(arrow_type):
+        if pc.any(pc.match_substring_regex(column, _UNESCAPED_CONTROL)).as_py():
+            return pa.chunked_array([_encode_python(column)])
+        encoded = column.cast(pa.large_string())
+        for old, new in _STRING_ESCAPES:
+            encoded = pc.replace_substring(encoded, old, new)
+        quote = pa.scalar('"', pa.large_string())
+        encoded = pc.binary_join_element_wise(quote, encoded, quote, pa.scalar("", pa.large_string()))
+    elif pa_types.is_boolean(arrow_type) or pa_types.is_integer(arrow_type):
+        encoded = column.cast(pa.large_string())
+    elif pa_types.is_floating(arrow_type) or pa_types.is_decimal(arrow_type):
+        as_float = column.cast(pa.float64())
+        # NaN and infinity are not JSON numbers
+        encoded = pc.if_else(pc.is_finite(as_float), as_float.cast(pa.large_string()),
+                             pa.scalar(None, pa.large_string()))
+    else:
+        return pa.chunked_array([_encode_python(column)])
+    return pc.fill_null(encoded, "null")
+
+
+def _joined(pieces: List[Any]) -> bytes:
+    """Concatenate element-wise joined pieces of every row into one byte string."""
+    pieces = [pa.scalar(piece, pa.large_string()) if isinstance(piece, str) else piece for piece in pieces]
+    joined = pc.binary_join_element_wise(*pieces, pa.scalar("", pa.large_string()))
+    if isinstance(joined, pa.ChunkedArray):
+        joined = joined.combine_chunks()
+    if len(joined) == 0:
+        return b""
+    offsets = np.frombuffer(joined.buffers()[1], dtype=np.int64)
+    start, end = offsets[joined.offset], offsets[joined.offset + len(joined)]
+    return memoryview(joined.buffers()[2])[start:end].tobytes()
+
+
+class ColumnarResult:
+    """Query result held as an Arrow table."""
+
+    def __init__(self, table: pa.Table, stats: Optional[Dict[str, Any]] = None):
+        self.table = table
+        self.stats = stats or {}
+
+    @classmethod
+    def from_batches(cls, batches: Iterable[pa.RecordBatch], schema: Optional[pa.Schema] = None,
+                     stats: Optional[Dict[str, Any]] = None) -> "ColumnarResult":
+        batches = list(batches)
+        if not batches and schema is None:
+            return cls(pa.table({}), stats)
+        return cls(pa.Table.from_batches(batches, schema=schema), stats)
+
+    @classmethod
+    def from_pylist(cls, rows: List[Dict[str, Any]]) -> "ColumnarResult":
+        return cls(pa.Table.from_pylist(rows))
+
+    @property
+    def columns(self) -> List[str]:
+        return self.table.column_names
+
+    @property
+    def num_rows(self) -> int:
+        return self.table.num_rows
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def slice(self, offset: int, length: Optional[int] = None) -> "ColumnarResult":
+        return ColumnarResult(self.table.slice(offset, length), self.stats)
+
+    def to_pylist(self) -> List[Dict[str, Any]]:
+        """Rows as dictionaries (the row-oriented shape the JSON APIs return)."""
+        return self.table.to_pylist()
+
+    def map_columns(self, transform: Callable[[str, Any], List[Any]], arrow: bool = False) -> "ColumnarResult":
+        """
+        New result with every column replaced by transform(name, values).
+
+        values is the column as a Python list, or the pyarrow.ChunkedArray
+        itself when arrow=True. Transformed columns are stored as strings
+        when the transform returns mixed types (formatted values are display
+        strings).
+        """
+        arrays = []
+        for name in self.columns:
+            column = self.table.column(name)
+            values = transform(name, column if arrow else column.to_pylist())
+            try:
+                arrays.append(pa.array(values))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                arrays.append(pa.array([None if value is None else str(value) for value in values], pa.string()))
+        return ColumnarResult(pa.table(arrays, names=self.columns), self.stats)
+
+    def _row_pieces(self, suffix: str) -> List[Any]:
+        """Pieces that binary_join_element_wise turns into one JSON object per row."""
+        pieces: List[Any] = []
+        for position, name in enumerate(self.columns):
+            pieces.append(("{" if position == 0 else ",") + encode_basestring(name) + ":")
+            pieces.append(encode_column(self.table.column(name)))
+        pieces.append(suffix)
+        return pieces
+
+    def to_json(self, orient: str = "records") -> bytes:
+        """
+        JSON built from the columns.
+
+        Args:
+            orient: "records" for a list of row objects, "columns" for
+                {"columns": [...], "data": {column: [values]}}
+        """
+        header = ",".join(encode_basestring(name) for name in self.columns)
+        if orient == "columns":
+            data = b",".join(
+                encode_basestring(name).encode("utf-8") + b":[" +
+                _joined([encode_column(self.table.column(name)), ","])[:-1] + b"]"
+                for name in self.columns
+            )
+            return b'{"columns":[' + header.encode("utf-8") + b'],"data":{' + data + b"}}"
+        if not self.columns or not self.num_rows:
+            return b"[]"
+        return b"[" + _joined(self._row_pieces("},"))[:-1] + b"]"
+
+    def to_ndjson(self) -> bytes:
+        """One JSON object per line."""
+        if not self.columns or not self.num_rows:
+            return b""
+        return _joined(self._row_pieces("}\n"))
+
+    def to_csv(self) -> bytes:
+        """CSV written by pyarrow; REPEATED and RECORD columns are written as JSON text."""
+        table = self.table
+        for position, field in enumerate(table.schema):
+            if pa_types.is_nested(field.type):
+                # The CSV writer has no representation for lists and structs
+                values = table.column(position).to_pylist()
+                encoded = pa.array([None if value is None else json.dumps(value, default=str) for value in values],
+                                   pa.string())
+                table = table.set_column(position, field.name, encoded)
+        sink = io.BytesIO()
+        pa_csv.write_csv(table, sink)
+        return sink.getvalue()
+
+    def to_ipc(self) -> bytes:
+        """Arrow IPC stream format."""
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, self.table.schema) as writer:
+            writer.write_table(self.table)
+        return sink.getvalue().to_pybytes()
+
+    def serialize(self, fmt: str = "json") -> Tuple[bytes, str]:
+        """Serialized body and its media type for fmt in json, ndjson, csv, arrow."""
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported result format: {fmt}")
+        body = {"json": self.to_json, "ndjson": self.to_ndjson, "csv": self.to_csv, "arrow": self.to_ipc}[fmt]()
+        return body, MEDIA_TYPES[fmt]
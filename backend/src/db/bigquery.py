@@ -3,8 +3,19 @@ from google.cloud import bigquery
 from google.oauth2 import service_account
 from google.auth import default
 import json
+import time
 import structlog
 from src.config import settings
+from src.db.arrow_results import ColumnarResult
+from src.db.validation_cache import get_validation_cache, is_definitive_error
+from src.db.result_streaming import BigQueryResultSource
+
+# BigQuery Storage Read API (optional): streams Arrow record batches instead of paging JSON rows
+try:
+    from google.cloud import bigquery_storage
+    BQ_STORAGE_AVAILABLE = True
+except ImportError:
+    BQ_STORAGE_AVAILABLE = False
 
 logger = structlog.get_logger()
 
@@ -14,6 +25,8 @@ class BigQueryClient:
         self.project_id = settings.google_cloud_project
         self.dataset_id = settings.bigquery_dataset
         self.client = self._initialize_client()
+        self._bqstorage_client = None
+        self.validation_cache = get_validation_cache()
     
     def _initialize_client(self) -> bigquery.Client:
         """Initialize BigQuery client using gcloud SDK or service account."""
@@ -83,6 +96,58 @@ class BigQueryClient:
             logger.error(f"Query execution failed: {e}")
             raise
     
+    def open_result_source(self, query: str) -> BigQueryResultSource:
+        """Run a query and page through its results by page token instead of loading them all."""
+        logger.info(f"Opening result source for query: {query[:100]}...")
+        return BigQueryResultSource(self.client, sql=query)
+
+    def _get_bqstorage_client(self):
+        """Storage Read API client sharing the BigQuery credentials, or None when unavailable."""
+        if not BQ_STORAGE_AVAILABLE:
+            return None
+        if self._bqstorage_client is None:
+            try:
+                self._bqstorage_client = bigquery_storage.BigQueryReadClient(credentials=self.client._credentials)
+            except Exception as e:
+                logger.warning(f"BigQuery Storage client unavailable, using REST pages: {e}")
+                return None
+        return self._bqstorage_client
+
+    def execute_query_arrow(self, query: str) -> ColumnarResult:
+        """Execute a SQL query and return the result as Arrow record batches.
+
+        Uses the Storage Read API when google-cloud-bigquery-storage is installed;
+        otherwise the REST pages are converted to Arrow page by page.
+        """
+        try:
+            logger.info(f"Executing query (arrow): {query[:100]}...")
+            started = time.perf_counter()
+            query_job = self.client.query(query)
+            rows = query_job.result()
+            bqstorage_client = self._get_bqstorage_client()
+
+            first_batch_seconds = None
+            batches = []
+            for batch in rows.to_arrow_iterable(bqstorage_client=bqstorage_client):
+                if first_batch_seconds is None:
+                    first_batch_seconds = time.perf_counter() - started
+                batches.append(batch)
+
+            schema = batches[0].schema if batches else None
+            result = ColumnarResult.from_batches(batches, schema=schema, stats={
+                "job_id": query_job.job_id,
+                "storage_api": bqstorage_client is not None,
+                "batches": len(batches),
+                "first_batch_seconds": first_batch_seconds,
+                "seconds": time.perf_counter() - started,
+                "total_bytes_processed": query_job.total_bytes_processed,
+            })
+            logger.info(f"Query returned {result.num_rows} rows in {len(batches)} Arrow batches")
+            return result
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            raise
+
     def get_table_schema(self, table_name: str) -> Dict[str, Any]:
         """Get schema information for a specific table."""
         try:
@@ -140,19 +205,55 @@ class BigQueryClient:
         
         return schemas
     
-    def validate_query(self, query: str) -> Dict[str, Any]:
-        """Validate a query without executing it."""
+    def get_table_versions(self, table_ids: List[str]) -> Dict[str, Optional[str]]:
+        """Last-modified timestamp of each table ("project.dataset.table"); None when unavailable."""
+        versions = {}
+        for table_id in table_ids:
+            try:
+                table = self.client.get_table(table_id)
+                versions[table_id] = table.modified.isoformat() if table.modified else None
+            except Exception as e:
+                logger.warning(f"Failed to get version of table {table_id}: {e}")
+                versions[table_id] = None
+        return versions
+
+    def validate_query(self, query: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Validate a query without executing it.
+
+        Results are shared through the validation cache and reused while the
+        tables the dry run referenced keep their last-modified versions.
+        """
+        use_cache = use_cache and settings.cache_validation_enabled
+        if use_cache:
+            cached = self.validation_cache.get(query, self.get_table_versions)
+            if cached is not None:
+                return cached
+
         try:
             job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
             query_job = self.client.query(query, job_config=job_config)
             
-            return {
+            result = {
                 "valid": True,
                 "total_bytes_processed": query_job.total_bytes_processed,
                 "estimated_cost_usd": (query_job.total_bytes_processed / 1e12) * 5.0  # $5 per TB
             }
+            referenced = [f"{ref.project}.{ref.dataset_id}.{ref.table_id}"
+                          for ref in (query_job.referenced_tables or [])]
+            cacheable = True
         except Exception as e:
-            return {
+            result = {
                 "valid": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+            referenced = []
+            # Timeouts, quota, auth and network errors say nothing about the query
+            cacheable = is_definitive_error(e)
+
+        if use_cache and cacheable:
+            try:
+                tables = self.validation_cache.table_versions(referenced, self.get_table_versions)
+                self.validation_cache.put(query, result, tables)
+            except Exception as e:
+                logger.warning(f"Failed to cache validation result: {e}")
+        return result
@@ -24,6 +24,15 @@ class DatabaseClient:
         """Execute a SQL query and return results as list of dictionaries."""
         return self.bq_client.execute_query(query)
 
+    def open_result_source(self, query: str):
+        """Run a query and return a paged result source (see src.db.result_streaming)."""
+        return self.bq_client.open_result_source(query)
+
+    @property
+    def client(self):
+        """Underlying google.cloud.bigquery.Client (used to resume paged results)."""
+        return self.bq_client.client
+
     def get_table_schema(self, table_name: str) -> Dict[str, Any]:
         """Get schema information for a specific table."""
         return self.bq_client.get_table_schema(table_name)
@@ -0,0 +1,408 @@
+"""
+Server-side result handles for streaming and paginated query results.
+
+A result source reads one query's rows page by page without materializing
+the whole result: BigQuery sources page through the finished job's
+destination table by page token. The registry keeps open sources behind
+opaque handle IDs, expires handles that have been idle too long and closes
+them.
+
+Pagination cursors encode the handle ID, job ID, location and page token, so
+a client can keep paging after its handle expired (BigQuery keeps anonymous
+query results for 24 hours). Cursors are HMAC-signed with a server secret,
+and the registry remembers which job every handle it issued belongs to
+(in Redis when a CacheManager is attached), so a cursor only resumes the job
+it was issued for.
+
+stream_ndjson / stream_json turn a handle into byte chunks that are written
+to the client as pages arrive, and report time to first row.
+"""
+
+import hmac
+import json
+import time
+import uuid
+import base64
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import structlog
+from src.config import settings
+
+logger = structlog.get_logger()
+
+RowFormatter = Callable[[List[Dict[str, Any]], List[str]], List[Dict[str, Any]]]
+
+
+PREFIX_HANDLE_JOB = "result_handle:job:"
+
+# Anonymous BigQuery query results are kept for 24 hours
+CURSOR_TTL_SECONDS = 24 * 60 * 60
+
+
+class ResultHandleExpired(Exception):
+    """The handle is unknown or expired and its cursor cannot be resumed."""
+
+
+class InvalidResultCursor(ResultHandleExpired):
+    """The cursor was not issued by this server or does not belong to the handle."""
+
+
+_cursor_secret: Optional[bytes] = None
+
+
+def _get_cursor_secret() -> bytes:
+    global _cursor_secret
+    if _cursor_secret is None:
+        if settings.result_cursor_secret:
+            _cursor_secret = settings.result_cursor_secret.encode()
+        else:
+            _cursor_secret = secrets.token_bytes(32)
+            logger.warning("RESULT_CURSOR_SECRET is not set; result cursors only resume in this process")
+    return _cursor_secret
+
+
+def _sign(payload: str) -> str:
+    return hmac.new(_get_cursor_secret(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode()
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    payload, _, signature = cursor.rpartition(".")
+    if not payload or not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidResultCursor("Invalid result cursor")
+    try:
+        return json.loads(base64.urlsafe_b64decode(payload.encode()))
+    except Exception:
+        raise InvalidResultCursor("Malformed result cursor")
+
+
+class BigQueryResultSource:
+    """Pages through a BigQuery job's results by page token."""
+
+    kind = "bigquery"
+
+    def __init__(self, client, sql: Optional[str] = None, job_id: Optional[str] = None,
+                 location: Optional[str] = None, page_token: Optional[str] = None):
+        """
+        Args:
+            client: google.cloud.bigquery.Client
+            sql: Query to run (omit when resuming an existing job)
+            job_id: Existing job to resume
+            location: Location of the existing job
+            page_token: Page token to resume from
+        """
+        self.started = time.perf_counter()
+        self.client = client
+        if sql is not None:
+            self.job = client.query(sql)
+        else:
+            self.job = client.get_job(job_id, location=location)
+        self.job.result(max_results=0)  # Wait for completion without downloading rows
+        self.destination = self.job.destination
+        self.page_token = page_token
+        self.exhausted = False
+        self.columns: List[str] = []
+        self.total_rows: Optional[int] = None
+
+    def fetch(self, page_size: int) -> List[Dict[str, Any]]:
+        if self.exhausted:
+            return []
+        rows = self.client.list_rows(self.destination, page_size=page_size, max_results=page_size,
+                                     page_token=self.page_token)
+        page = [dict(row) for row in rows]
+        self.columns = self.columns or [schema_field.name for schema_field in rows.schema]
+        self.total_rows = rows.total_rows
+        self.page_token = rows.next_page_token
+        self.exhausted = self.page_token is None
+        return page
+
+    def cursor_state(self) -> Optional[Dict[str, Any]]:
+        if self.exhausted:
+            return None
+        return {"kind": self.kind, "job_id": self.job.job_id, "location": self.job.location,
+                "page_token": self.page_token}
+
+    def close(self):
+        pass
+
+
+@dataclass
+class ResultHandle:
+    """One open result with its paging progress."""
+    handle_id: str
+    source: Any
+    opened_at: float = field(default_factory=time.perf_counter)
+    last_used: float = field(default_factory=time.time)
+    rows_served: int = 0
+    pages_served: int = 0
+    first_row_seconds: Optional[float] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.source.exhausted
+
+    @property
+    def cursor(self) -> Optional[str]:
+        """Opaque cursor for the next page (None when the result is exhausted)."""
+        if self.exhausted:
+            return None
+        state = self.source.cursor_state() or {}
+        return encode_cursor({**state, "handle_id": self.handle_id})
+
+    def next_page(self, page_size: int, formatter: Optional[RowFormatter] = None) -> List[Dict[str, Any]]:
+        with self.lock:
+            self.last_used = time.time()
+            rows = self.source.fetch(page_size)
+            if rows and self.first_row_seconds is None:
+                self.first_row_seconds = time.perf_counter() - self.opened_at
+                logger.info(f"Result {self.handle_id} first row after {self.first_row_seconds * 1000:.1f} ms")
+            self.rows_served += len(rows)
+            self.pages_served += 1
+        if rows and formatter is not None:
+            rows = formatter(rows, self.source.columns or list(rows[0].keys()))
+        return rows
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "handle_id": self.handle_id,
+            "source": self.source.kind,
+            "columns": self.source.columns,
+            "rows_served": self.rows_served,
+            "pages_served": self.pages_served,
+            "total_rows": self.source.total_rows,
+            "has_more": not self.exhausted,
+            "time_to_first_row_ms": round(self.first_row_seconds * 1000, 1)
+            if self.first_row_seconds is not None else None,
+        }
+
+    def page(self, page_size: int, formatter: Optional[RowFormatter] = None) -> Dict[str, Any]:
+        """Next page as a JSON-ready response."""
+        rows = self.next_page(page_size, formatter)
+        return {**self.summary(), "rows": rows, "row_count": len(rows), "cursor": self.cursor}
+
+
+class ResultHandleRegistry:
+    """Open result handles by ID, closing those idle longer than idle_ttl."""
+
+    def __init__(self, idle_ttl: int = 300, max_handles: int = 100, max_issued: int = 10000):
+        """
+        Args:
+            idle_ttl: Seconds an unused handle stays open
+            max_handles: Open handles kept per process
+            max_issued: Issued handle -> job records kept in-process (without Redis)
+        """
+        self.idle_ttl = idle_ttl
+        self.max_handles = max_handles
+        self.max_issued = max_issued
+        self.cache_manager = None
+        self._handles: "OrderedDict[str, ResultHandle]" = OrderedDict()
+        self._issued: "OrderedDict[str, Tuple[str, Optional[str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "expired": 0, "resumed": 0, "closed": 0, "rejected_cursors": 0}
+
+    def attach(self, cache_manager):
+        """Keep issued handle -> job records in the CacheManager's Redis so any worker can resume a cursor."""
+        self.cache_manager = cache_manager
+
+    def _redis(self):
+        if self.cache_manager is None or not getattr(self.cache_manager, "enabled", False):
+            return None
+        return self.cache_manager.redis
+
+    def _remember_job(self, handle_id: str, source):
+        """Record which BigQuery job a handle was issued for."""
+        job_id, location = source.job.job_id, source.job.location
+        with self._lock:
+            self._issued[handle_id] = (job_id, location, time.time() + CURSOR_TTL_SECONDS)
+            while len(self._issued) > self.max_issued:
+                self._issued.popitem(last=False)
+        redis_client = self._redis()
+        if redis_client is not None:
+            try:
+                redis_client.setex(PREFIX_HANDLE_JOB + handle_id, CURSOR_TTL_SECONDS,
+                                   json.dumps({"job_id": job_id, "location": location}))
+            except Exception as e:
+                logger.warning(f"Failed to record result handle job: {e}")
+
+    def _issued_job(self, handle_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(job_id, location) a handle was issued for, if this server issued it and it has not expired."""
+        with self._lock:
+            issued = self._issued.get(handle_id)
+        if issued is not None and issued[2] > time.time():
+            return issued[0], issued[1]
+        redis_client = self._redis()
+        if redis_client is None:
+            return None
+        try:
+            payload = redis_client.get(PREFIX_HANDLE_JOB + handle_id)
+        except Exception as e:
+            logger.warning(f"Failed to read result handle job: {e}")
+            return None
+        if payload is None:
+            return None
+        record = json.loads(payload.decode("utf-8") if isinstance(payload, bytes) else payload)
+        return record["job_id"], record.get("location")
+
+    def open(self, source) -> ResultHandle:
+        self.expire_idle()
+        # Time to first row counts from query submission, not from registration
+        handle = ResultHandle(handle_id=uuid.uuid4().hex, source=source,
+                              opened_at=getattr(source, "started", time.perf_counter()))
+        evicted = []
+        with self._lock:
+            self._handles[handle.handle_id] = handle
+            while len(self._handles) > self.max_handles:
+                evicted.append(self._handles.popitem(last=False)[1])
+        for old in evicted:
+            self._close_handle(old)
+        if source.kind == "bigquery":
+            self._remember_job(handle.handle_id, source)
+        self.stats["opened"] += 1
+        return handle
+
+    def get(self, handle_id: str, cursor: Optional[str] = None, bigquery_client=None) -> ResultHandle:
+        """
+        Look up a handle; a BigQuery cursor reopens an expired handle at its page token.
+
+        The cursor must carry a valid signature, name this handle and point at
+        the job the handle was issued for.
+
+        Raises:
+            InvalidResultCursor: The cursor is forged or belongs to another handle or job
+            ResultHandleExpired: The handle is gone and the cursor cannot be resumed
+        """
+        self.expire_idle()
+        with self._lock:
+            handle = self._handles.get(handle_id)
+            if handle is not None:
+                self._handles.move_to_end(handle_id)
+        if handle is not None:
+            return handle
+
+        if not cursor or bigquery_client is None:
+            raise ResultHandleExpired(f"Result handle {handle_id} expired")
+        try:
+            state = decode_cursor(cursor)
+            if state.get("handle_id") != handle_id or state.get("kind") != "bigquery":
+                raise InvalidResultCursor("Result cursor does not belong to this handle")
+            issued = self._issued_job(handle_id)
+            if issued is None:
+                raise ResultHandleExpired(f"Result handle {handle_id} expired")
+            if issued != (state.get("job_id"), state.get("location")):
+                raise InvalidResultCursor("Result cursor does not belong to this handle")
+        except InvalidResultCursor:
+            self.stats["rejected_cursors"] += 1
+            logger.warning("Rejected result cursor", handle_id=handle_id)
+            raise
+        job_id, location = issued
+        source = BigQueryResultSource(bigquery_client, job_id=job_id, location=location,
+                                      page_token=state.get("page_token"))
+        handle = ResultHandle(handle_id=handle_id, source=source)
+        with self._lock:
+            self._handles[handle_id] = handle
+        self.stats["resumed"] += 1
+        return handle
+
+    def close(self, handle_id: str) -> bool:
+        with self._lock:
+            handle = self._handles.pop(handle_id, None)
+        if handle is None:
+            return False
+        self._close_handle(handle)
+        self.stats["closed"] += 1
+        return True
+
+    def expire_idle(self) -> int:
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            expired = [handle for handle in self._handles.values() if handle.last_used < cutoff]
+            for handle in expired:
+                del self._handles[handle.handle_id]
+        for handle in expired:
+            self._close_handle(handle)
+        self.stats["expired"] += len(expired)
+        return len(expired)
+
+    def _close_handle(self, handle: ResultHandle):
+        try:
+            handle.source.close()
+        except Exception as e:
+            logger.warning(f"Failed to close result handle {handle.handle_id}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "open": len(self._handles)}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+
+def stream_ndjson(handle: ResultHandle, page_size: int,
+                  formatter: Optional[RowFormatter] = None,
+                  header: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+    """Optional {"_meta": header} line, one JSON row per line as pages arrive, then a {"_summary": {...}} line."""
+    if header:
+        yield (_dumps({"_meta": header}) + "\n").encode("utf-8")
+    while not handle.exhausted:
+        rows = handle.next_page(page_size, formatter)
+        if rows:
+            yield ("\n".join(_dumps(row) for row in rows) + "\n").encode("utf-8")
+    yield (_dumps({"_summary": handle.summary()}) + "\n").encode("utf-8")
+
+
+def stream_json(handle: ResultHandle, page_size: int,
+                formatter: Optional[RowFormatter] = None,
+                header: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+    """A {**header, "rows": [...], "summary": {...}} document written page by page."""
+    opening = _dumps(header or {})[:-1]
+    yield ((opening + "," if header else "{") + '"rows":[').encode("utf-8")
+    first = True
+    while not handle.exhausted:
+        rows = handle.next_page(page_size, formatter)
+        if rows:
+            chunk = ",".join(_dumps(row) for row in rows)
+            yield ((chunk if first else "," + chunk)).encode("utf-8")
+            first = False
+    yield ('],"summary":' + _dumps(handle.summary()) + "}").encode("utf-8")
+
+
+def streaming_body(handle: ResultHandle, fmt: str, page_size: int,
+                   formatter: Optional[RowFormatter] = None,
+                   header: Optional[Dict[str, Any]] = None) -> Tuple[Iterator[bytes], str]:
+    """Body iterator and media type for fmt "ndjson" or "json"; the handle is closed at the end."""
+    registry = get_result_handle_registry()
+
+    def body() -> Iterator[bytes]:
+        try:
+            if fmt == "ndjson":
+                yield from stream_ndjson(handle, page_size, formatter, header)
+            else:
+                yield from stream_json(handle, page_size, formatter, header)
+        finally:
+            registry.close(handle.handle_id)
+
+    return body(), "application/x-ndjson" if fmt == "ndjson" else "application/json"
+
+
+_result_handle_registry: Optional[ResultHandleRegistry] = None
+
+
+def get_result_handle_registry() -> ResultHandleRegistry:
+    """Get the process-wide result handle registry."""
+    global _result_handle_registry
+    if _result_handle_registry is None:
+        _result_handle_registry = ResultHandleRegistry(
+            idle_ttl=settings.result_handle_idle_ttl,
+            max_handles=settings.result_handle_max_open,
+        )
+    return _result_handle_registry
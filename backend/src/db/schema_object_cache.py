@@ -0,0 +1,159 @@
+"""
+Process-local cache of decoded table schemas from the TableSchemas collection.
+
+Entries are keyed by the object's UUID (derived from project.dataset.table)
+and its content hash, so a vector search only needs UUIDs, hashes and
+distances: hits whose version is cached skip property transfer and JSON
+decoding entirely. Each entry also keeps the prompt fragments rendered from
+its schema, so building a prompt for the usual top tables is concatenation.
+WeaviateClient invalidates entries whenever it writes or deletes schemas.
+"""
+
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+def render_table_prompt(schema: Dict[str, Any]) -> str:
+    """Full table block for the SQL generation prompt."""
+    table_info = f"\nTable: {schema['table_name']}"
+    if schema.get('description'):
+        table_info += f"\nDescription: {schema['description']}"
+
+    table_info += "\nColumns:"
+    for col in schema['columns']:
+        col_info = f"\n  - {col['name']} ({col['type']})"
+        if col.get('description'):
+            col_info += f": {col['description']}"
+        col_info += f" {'[REQUIRED]' if not col['is_nullable'] else '[NULLABLE]'}"
+        table_info += col_info
+    return table_info
+
+
+def render_table_summary(schema: Dict[str, Any]) -> str:
+    """Concise table block (first 10 columns) for the error correction prompt."""
+    table_info = f"Table: {schema['table_name']}"
+    columns = [f"{col['name']} ({col['type']})" for col in schema['columns'][:10]]  # Limit columns
+    table_info += "\nColumns: " + ", ".join(columns)
+    if len(schema['columns']) > 10:
+        table_info += f" ... and {len(schema['columns']) - 10} more"
+    return table_info
+
+
+@dataclass
+class CachedSchema:
+    """Decoded schema of one indexed table plus its rendered prompt fragments."""
+    uuid: str
+    version: Optional[str]
+    schema: Dict[str, Any]
+    fragments: Dict[str, str] = field(default_factory=dict)
+
+
+class SchemaObjectCache:
+    """UUID + version -> decoded schema, with lazily rendered prompt fragments."""
+
+    RENDERERS = {"prompt": render_table_prompt, "summary": render_table_summary}
+
+    def __init__(self):
+        self._entries: Dict[str, CachedSchema] = {}
+        self._by_table: Dict[str, str] = {}  # "project.dataset.table_name" -> uuid
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "fragment_hits": 0, "fragment_renders": 0, "invalidations": 0}
+
+    @staticmethod
+    def _table_key(schema: Dict[str, Any]) -> str:
+        return f"{schema.get('project')}.{schema.get('dataset')}.{schema.get('table_name')}"
+
+    def get(self, uuid: str, version: Optional[str]) -> Optional[CachedSchema]:
+        """Cached entry if it exists for exactly this version."""
+        entry = self._entries.get(uuid)
+        if entry is not None and entry.version == version:
+            self.stats["hits"] += 1
+            return entry
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, uuid: str, version: Optional[str], properties: Dict[str, Any]) -> CachedSchema:
+        """Decode the stored properties of a TableSchemas object and cache them."""
+        schema = {
+            "table_name": properties["table_name"],
+            "dataset": properties["dataset"],
+            "project": properties["project"],
+            "description": properties["description"],
+            "columns": json.loads(properties["columns"]),
+            "row_count": properties["row_count"],
+        }
+        entry = CachedSchema(uuid=uuid, version=version, schema=schema)
+        with self._lock:
+            self._entries[uuid] = entry
+            self._by_table[self._table_key(schema)] = uuid
+        return entry
+
+    def _entry_for(self, schema: Dict[str, Any]) -> Optional[CachedSchema]:
+        """Cached entry for a schema dict, if the dict still matches it."""
+        entry = self._entries.get(self._by_table.get(self._table_key(schema), ""))
+        if entry is None or entry.schema["columns"] is not schema.get("columns") \
+                or entry.schema.get("description") != schema.get("description"):
+            return None
+        return entry
+
+    def version(self, schema: Dict[str, Any]) -> Optional[str]:
+        """Content hash of a cached schema, or None if it did not come from the cache."""
+        entry = self._entry_for(schema)
+        return entry.version if entry is not None else None
+
+    def fragment(self, schema: Dict[str, Any], kind: str) -> str:
+        """
+        Prompt fragment for a schema, rendered once per cached version.
+
+        Schemas that did not come from the cache (or whose columns were
+        replaced since) are rendered directly.
+        """
+        render = self.RENDERERS[kind]
+        entry = self._entry_for(schema)
+        if entry is None:
+            return render(schema)
+
+        text = entry.fragments.get(kind)
+        if text is None:
+            text = render(entry.schema)
+            entry.fragments[kind] = text
+            self.stats["fragment_renders"] += 1
+        else:
+            self.stats["fragment_hits"] += 1
+        return text
+
+    def invalidate(self, uuids: Optional[Iterable[str]] = None):
+        """Drop the given entries, or everything when uuids is None."""
+        with self._lock:
+            if uuids is None:
+                count = len(self._entries)
+                self._entries.clear()
+                self._by_table.clear()
+            else:
+                count = 0
+                for uuid in uuids:
+                    entry = self._entries.pop(uuid, None)
+                    if entry is not None:
+                        self._by_table.pop(self._table_key(entry.schema), None)
+                        count += 1
+            self.stats["invalidations"] += count
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "entries": len(self._entries)}
+
+
+_schema_object_cache: Optional[SchemaObjectCache] = None
+
+
+def get_schema_object_cache() -> SchemaObjectCache:
+    """Get the process-wide schema object cache."""
+    global _schema_object_cache
+    if _schema_object_cache is None:
+        _schema_object_cache = SchemaObjectCache()
+    return _schema_object_cache
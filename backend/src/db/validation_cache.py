@@ -0,0 +1,177 @@
+"""
+Shared cache for BigQuery dry-run validation results.
+
+Entries are keyed by normalized SQL (whitespace collapsed outside string
+literals, trailing semicolons dropped) and remember the tables the dry run
+referenced together with their last-modified versions. A cached entry is
+only served while every referenced table still has the recorded version,
+so a schema or data change forces a fresh dry run. Table versions are
+themselves cached for a short TTL so that checking them does not cost a
+round-trip per question.
+
+Entries live in a process-local LRU and, when a CacheManager is attached,
+under its ``validation:`` prefix in Redis so that every worker shares them.
+Only definitive query errors (a 400 for bad syntax, unknown columns and the
+like) are cached, for a shorter TTL than valid results. Transient failures
+such as timeouts, quota, auth or network errors are never cached, so the
+next request dry-runs again.
+"""
+
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import structlog
+from google.api_core import exceptions as google_exceptions
+from src.config import settings
+
+logger = structlog.get_logger()
+
+# Quoted strings/identifiers are kept verbatim; whitespace runs elsewhere collapse to one space
+_SQL_TOKEN = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|\s+")
+
+TableVersionLookup = Callable[[List[str]], Dict[str, Optional[str]]]
+
+# Reasons BigQuery can attach to a 400 that still say nothing about the query itself
+_TRANSIENT_REASONS = {"backendError", "internalError", "quotaExceeded", "rateLimitExceeded"}
+
+
+def normalize_sql(sql: str) -> str:
+    """Canonical form of a query for cache keys."""
+    normalized = _SQL_TOKEN.sub(lambda match: " " if match.group().isspace() else match.group(), sql or "")
+    return normalized.strip().rstrip(";").strip()
+
+
+def is_definitive_error(error: Exception) -> bool:
+    """True when a dry-run error is about the query and would recur for the same SQL."""
+    if not isinstance(error, google_exceptions.BadRequest):
+        return False
+    reasons = {item.get("reason") for item in (getattr(error, "errors", None) or []) if isinstance(item, dict)}
+    return not reasons & _TRANSIENT_REASONS
+
+
+class ValidationCache:
+    """Normalized SQL -> dry-run result, valid while referenced table versions are unchanged."""
+
+    def __init__(self, ttl: int = 60 * 60, invalid_ttl: int = 5 * 60,
+                 table_version_ttl: int = 5 * 60, max_entries: int = 2048):
+        """
+        Args:
+            ttl: Seconds a valid result is kept
+            invalid_ttl: Seconds an invalid result is kept
+            table_version_ttl: Seconds a looked-up table version is trusted
+            max_entries: Size of the in-process LRU
+        """
+        self.ttl = ttl
+        self.invalid_ttl = invalid_ttl
+        self.table_version_ttl = table_version_ttl
+        self.max_entries = max_entries
+        self.cache_manager = None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._table_versions: Dict[str, tuple] = {}  # table id -> (version, fetched_at)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "stores": 0}
+
+    def attach(self, cache_manager):
+        """Share entries across workers through the CacheManager's validation prefix."""
+        self.cache_manager = cache_manager
+
+    def table_versions(self, table_ids: List[str], lookup: TableVersionLookup) -> Dict[str, Optional[str]]:
+        """Current versions of the tables, looking up only those older than table_version_ttl."""
+        now = time.time()
+        versions: Dict[str, Optional[str]] = {}
+        stale = []
+        for table_id in table_ids:
+            cached = self._table_versions.get(table_id)
+            if cached is not None and now - cached[1] < self.table_version_ttl:
+                versions[table_id] = cached[0]
+            else:
+                stale.append(table_id)
+        if stale:
+            fetched = lookup(stale)
+            for table_id in stale:
+                versions[table_id] = fetched.get(table_id)
+                self._table_versions[table_id] = (versions[table_id], now)
+        return versions
+
+    def forget_tables(self, table_ids: Optional[List[str]] = None):
+        """Force fresh version lookups (e.g. after loading a table)."""
+        if table_ids is None:
+            self._table_versions.clear()
+        else:
+            for table_id in table_ids:
+                self._table_versions.pop(table_id, None)
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.cache_manager is not None:
+            entry = self.cache_manager.get_validation(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is not None and entry.get("expires_at", 0) < time.time():
+            return None
+        return entry
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, sql: str, lookup: TableVersionLookup) -> Optional[Dict[str, Any]]:
+        """Cached validation result for the SQL if its referenced tables are unchanged."""
+        key = normalize_sql(sql)
+        entry = self._load(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        recorded = entry.get("tables", {})
+        if recorded and self.table_versions(list(recorded), lookup) != recorded:
+            self.stats["stale"] += 1
+            return None
+        self.stats["hits"] += 1
+        return {**entry["result"], "from_cache": True}
+
+    def put(self, sql: str, result: Dict[str, Any], tables: Dict[str, Optional[str]]):
+        """
+        Store a dry-run result with the versions of the tables it referenced.
+
+        Callers only pass invalid results for definitive errors (is_definitive_error).
+        """
+        key = normalize_sql(sql)
+        ttl = self.ttl if result.get("valid") else self.invalid_ttl
+        entry = {"result": result, "tables": tables, "expires_at": time.time() + ttl}
+        self._remember(key, entry)
+        if self.cache_manager is not None:
+            self.cache_manager.cache_validation(key, entry, ttl=ttl)
+        self.stats["stores"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self._table_versions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "entries": len(self._entries), "tracked_tables": len(self._table_versions)}
+
+
+_validation_cache: Optional[ValidationCache] = None
+
+
+def get_validation_cache() -> ValidationCache:
+    """Get the process-wide validation cache shared by every BigQueryClient."""
+    global _validation_cache
+    if _validation_cache is None:
+        _validation_cache = ValidationCache(
+            ttl=settings.cache_ttl_validation,
+            invalid_ttl=settings.cache_ttl_validation_invalid,
+            table_version_ttl=settings.bigquery_table_version_ttl,
+        )
+    return _validation_cache
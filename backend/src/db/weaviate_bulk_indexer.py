@@ -0,0 +1,196 @@
+"""
+Bulk upsert pipeline for Weaviate collections.
+
+Every object gets a deterministic UUID derived from its key and carries a
+``content_hash`` property. One lookup fetches the stored hashes for all keys;
+unchanged objects are skipped before any embedding work. Changed objects are
+embedded in chunks and written through the fixed-size batch API, which blocks
+the producer while its request queue is full. Failed embeddings and failed
+writes are collected into a manifest instead of aborting the run.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, Iterable, List, Set
+
+import structlog
+import weaviate.classes as wvc
+from weaviate.util import generate_uuid5
+
+logger = structlog.get_logger()
+
+CONTENT_HASH_PROPERTY = "content_hash"
+
+
+@dataclass
+class IndexItem:
+    """One object to upsert."""
+    key: str
+    properties: Dict[str, Any]
+    text: str  # Text that is embedded
+
+    @property
+    def uuid(self) -> str:
+        return generate_uuid5(self.key)
+
+    @property
+    def content_hash(self) -> str:
+        payload = json.dumps({"properties": self.properties, "text": self.text}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class IndexReport:
+    """Outcome of a bulk indexing run."""
+    total: int = 0
+    skipped: int = 0
+    indexed: int = 0
+    failed: int = 0
+    pruned: int = 0
+    seconds: float = 0.0
+    failures: List[Dict[str, str]] = field(default_factory=list)
+    indexed_keys: List[str] = field(default_factory=list)
+
+    @property
+    def objects_per_second(self) -> float:
+        return round(self.indexed / self.seconds, 1) if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("indexed_keys")
+        data["seconds"] = round(self.seconds, 3)
+        data["objects_per_second"] = self.objects_per_second
+        return data
+
+    def write_manifest(self, path: str):
+        """Write the failure manifest (and run totals) as JSON."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+class WeaviateBulkIndexer:
+    """Upserts IndexItems into one collection in embedding chunks and fixed-size write batches."""
+
+    def __init__(
+        self,
+        collection,
+        embed_batch: Callable[[List[str]], List[List[float]]],
+        embedding_batch_size: int = 64,
+        write_batch_size: int = 200,
+        concurrent_requests: int = 2,
+    ):
+        """
+        Args:
+            collection: Weaviate collection handle (client.collections.get(...))
+            embed_batch: Embeds a list of texts in one call
+            embedding_batch_size: Texts per embedding request
+            write_batch_size: Objects per Weaviate batch request
+            concurrent_requests: Batch requests in flight
+        """
+        self.collection = collection
+        self.embed_batch = embed_batch
+        self.embedding_batch_size = embedding_batch_size
+        self.write_batch_size = write_batch_size
+        self.concurrent_requests = concurrent_requests
+
+    def stored_hashes(self, uuids: List[str]) -> Dict[str, str]:
+        """UUID -> stored content hash for the objects that already exist."""
+        stored: Dict[str, str] = {}
+        for start in range(0, len(uuids), 1000):
+            chunk = uuids[start:start + 1000]
+            try:
+                response = self.collection.query.fetch_objects(
+                    filters=wvc.query.Filter.by_id().contains_any(chunk),
+                    return_properties=[CONTENT_HASH_PROPERTY],
+                    limit=len(chunk),
+                )
+            except Exception as e:
+                # Collections created before content hashes existed: treat everything as changed
+                logger.warning(f"Could not read stored content hashes: {e}")
+                return {}
+            for item in response.objects:
+                content_hash = item.properties.get(CONTENT_HASH_PROPERTY)
+                if content_hash:
+                    stored[str(item.uuid)] = content_hash
+        return stored
+
+    def prune(self, keep: Set[str]) -> int:
+        """Delete objects whose UUID is not in keep (tables or entries that no longer exist)."""
+        stale = [str(item.uuid) for item in self.collection.iterator(return_properties=[])
+                 if str(item.uuid) not in keep]
+        for start in range(0, len(stale), 1000):
+            self.collection.data.delete_many(where=wvc.query.Filter.by_id().contains_any(stale[start:start + 1000]))
+        return len(stale)
+
+    def index(self, items: Iterable[IndexItem], prune: bool = False, force: bool = False) -> IndexReport:
+        """
+        Upsert items, skipping unchanged ones.
+
+        Args:
+            items: Objects to index; keys must be unique
+            prune: Also delete objects not among the items (full reindex)
+            force: Re-embed and rewrite even unchanged objects
+
+        Returns:
+            IndexReport with counts, throughput and the failure manifest
+        """
+        started = time.perf_counter()
+        items = list({item.key: item for item in items}.values())
+        report = IndexReport(total=len(items))
+
+        hashes = {item.key: item.content_hash for item in items}
+        stored = {} if force else self.stored_hashes([item.uuid for item in items])
+        changed = [item for item in items if stored.get(item.uuid) != hashes[item.key]]
+        report.skipped = len(items) - len(changed)
+
+        key_by_uuid = {item.uuid: item.key for item in changed}
+        written: List[str] = []
+        with self.collection.batch.fixed_size(batch_size=self.write_batch_size,
+                                              concurrent_requests=self.concurrent_requests) as batch:
+            for start in range(0, len(changed), self.embedding_batch_size):
+                chunk = changed[start:start + self.embedding_batch_size]
+                try:
+                    vectors = self.embed_batch([item.text for item in chunk])
+                except Exception as e:
+                    logger.error(f"Embedding batch failed: {e}")
+                    report.failures.extend({"key": item.key, "stage": "embedding", "error": str(e)} for item in chunk)
+                    continue
+
+                if len(vectors) != len(chunk):
+                    # Which vector belongs to which text is unknown, so none of the chunk is written
+                    error = f"Embedder returned {len(vectors)} vectors for {len(chunk)} texts"
+                    logger.error(f"Embedding batch failed: {error}")
+                    report.failures.extend({"key": item.key, "stage": "embedding", "error": error} for item in chunk)
+                    continue
+
+                for item, vector in zip(chunk, vectors):
+                    batch.add_object(
+                        properties={**item.properties, CONTENT_HASH_PROPERTY: hashes[item.key]},
+                        vector=vector,
+                        uuid=item.uuid,
+                    )
+                    written.append(item.key)
+
+        failed_keys = set()
+        for failed in self.collection.batch.failed_objects:
+            key = key_by_uuid.get(str(failed.object_.uuid), str(failed.object_.uuid))
+            failed_keys.add(key)
+            report.failures.append({"key": key, "stage": "write", "error": failed.message})
+
+        report.indexed_keys = [key for key in written if key not in failed_keys]
+        report.indexed = len(report.indexed_keys)
+        report.failed = len(report.failures)
+        if prune:
+            report.pruned = self.prune({item.uuid for item in items})
+        report.seconds = time.perf_counter() - started
+
+        logger.info("Bulk indexing finished", **{k: v for k, v in report.to_dict().items() if k != "failures"})
+        return report
@@ -1,9 +1,13 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
+import json
 import weaviate
 import weaviate.classes as wvc
 from weaviate.classes.config import Property, DataType
+from weaviate.util import generate_uuid5
 import structlog
 from src.config import settings
+from src.db.weaviate_bulk_indexer import WeaviateBulkIndexer, IndexItem, IndexReport, CONTENT_HASH_PROPERTY
+from src.db.schema_object_cache import get_schema_object_cache
 
 logger = structlog.get_logger()
 
@@ -12,6 +16,7 @@ class WeaviateClient:
     def __init__(self):
         self.client = None
         self.collection_name = "TableSchemas"
+        self.schema_cache = get_schema_object_cache()
         try:
             self.client = self._initialize_client()
             self._ensure_collection_exists()
@@ -76,6 +81,7 @@ class WeaviateClient:
                     Property(name="columns", data_type=DataType.TEXT),  # JSON string
                     Property(name="row_count", data_type=DataType.INT),
                     Property(name="combined_text", data_type=DataType.TEXT),  # For semantic search
+                    Property(name="content_hash", data_type=DataType.TEXT),  # Skips unchanged tables on reindex
                 ],
                 vectorizer_config=wvc.config.Configure.Vectorizer.none(),
                 vector_index_config=wvc.config.Configure.VectorIndex.hnsw(
@@ -89,48 +95,115 @@ class WeaviateClient:
             logger.error(f"Failed to create collection: {e}")
             raise
     
-    def index_table_schema(self, schema: Dict[str, Any], embedding: List[float]):
-        """Index a table schema with its embedding."""
-        try:
-            # Create combined text for better semantic search
-            columns_text = []
-            for col in schema["columns"]:
-                col_desc = f"{col['name']} ({col['type']})"
-                if col.get("description"):
-                    col_desc += f": {col['description']}"
-                columns_text.append(col_desc)
-            
-            combined_text = f"""
+    @staticmethod
+    def schema_key(schema: Dict[str, Any]) -> str:
+        """Stable identifier of a table; its UUID5 is the object's UUID."""
+        return f"{schema['project']}.{schema['dataset']}.{schema['table_name']}"
+
+    @staticmethod
+    def _schema_properties(schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Collection properties for a table schema."""
+        # Create combined text for better semantic search
+        columns_text = []
+        for col in schema["columns"]:
+            col_desc = f"{col['name']} ({col['type']})"
+            if col.get("description"):
+                col_desc += f": {col['description']}"
+            columns_text.append(col_desc)
+
+        combined_text = f"""
             Table: {schema['table_name']}
             Dataset: {schema['dataset']}
             Description: {schema.get('description', 'No description')}
             Columns: {', '.join(columns_text)}
             Row Count: {schema.get('row_count', 'Unknown')}
             """
-            
-            import json
+
+        return {
+            "table_name": schema["table_name"],
+            "dataset": schema["dataset"],
+            "project": schema["project"],
+            "description": schema.get("description", ""),
+            "columns": json.dumps(schema["columns"]),
+            "row_count": schema.get("row_count", 0),
+            "combined_text": combined_text.strip()
+        }
+
+    def _schema_item(self, schema: Dict[str, Any], text: str) -> IndexItem:
+        return IndexItem(key=self.schema_key(schema), properties=self._schema_properties(schema), text=text)
+
+    def index_table_schema(self, schema: Dict[str, Any], embedding: List[float], text: Optional[str] = None):
+        """
+        Index a table schema with its embedding (upserts by the table's deterministic UUID).
+
+        Args:
+            schema: Table schema (table_name, dataset, project, columns, ...)
+            embedding: Vector for the schema
+            text: Text the embedding was made from. Pass the text_for(schema) of the bulk
+                  runs so the next one skips this table; otherwise it re-embeds it.
+        """
+        try:
             collection = self.client.collections.get(self.collection_name)
-            
-            data_object = {
-                "table_name": schema["table_name"],
-                "dataset": schema["dataset"],
-                "project": schema["project"],
-                "description": schema.get("description", ""),
-                "columns": json.dumps(schema["columns"]),
-                "row_count": schema.get("row_count", 0),
-                "combined_text": combined_text.strip()
-            }
-            
-            collection.data.insert(
-                properties=data_object,
-                vector=embedding
-            )
-            
+            item = self._schema_item(schema, text if text is not None else "")
+            # Same content hash as a bulk run, so cached copies of the old schema stop matching
+            properties = {**item.properties, CONTENT_HASH_PROPERTY: item.content_hash}
+            uuid = item.uuid
+
+            if collection.data.exists(uuid):
+                collection.data.replace(uuid=uuid, properties=properties, vector=embedding)
+            else:
+                collection.data.insert(properties=properties, vector=embedding, uuid=uuid)
+            self.schema_cache.invalidate([uuid])
+
             logger.info(f"Indexed schema for table {schema['table_name']}")
         except Exception as e:
             logger.error(f"Failed to index schema: {e}")
             raise
-    
+
+    def bulk_index_table_schemas(
+        self,
+        schemas: List[Dict[str, Any]],
+        embed_batch: Callable[[List[str]], List[List[float]]],
+        text_for: Callable[[Dict[str, Any]], str],
+        prune: bool = False,
+        force: bool = False,
+        manifest_path: Optional[str] = None,
+    ) -> IndexReport:
+        """
+        Index many table schemas through the batch API, skipping unchanged tables.
+
+        Args:
+            schemas: Table schemas (table_name, dataset, project, columns, ...)
+            embed_batch: Embeds a list of texts in one call
+            text_for: Text that is embedded for a schema
+            prune: Delete indexed tables that are not in schemas
+            force: Re-embed and rewrite unchanged tables too
+            manifest_path: Where to write the run report and failure manifest
+
+        Returns:
+            IndexReport; report.indexed_keys are the schema keys that were written
+        """
+        collection = self.client.collections.get(self.collection_name)
+        indexer = WeaviateBulkIndexer(
+            collection,
+            embed_batch,
+            embedding_batch_size=settings.weaviate_embedding_batch_size,
+            write_batch_size=settings.weaviate_write_batch_size,
+        )
+        items = [self._schema_item(schema, text_for(schema)) for schema in schemas]
+        report = indexer.index(items, prune=prune, force=force)
+        if report.pruned:
+            self.schema_cache.invalidate()
+        else:
+            self.schema_cache.invalidate(generate_uuid5(key) for key in report.indexed_keys)
+        if manifest_path:
+            report.write_manifest(manifest_path)
+        logger.info(
+            f"Bulk indexed {report.indexed}/{report.total} schemas "
+            f"({report.skipped} unchanged, {report.failed} failed, {report.objects_per_second} objects/s)"
+        )
+        return report
+
     def search_similar_tables(
         self,
         query_embedding: List[float],
@@ -150,31 +223,43 @@ class WeaviateClient:
             # Request more results if filtering, to ensure we get enough matches
             search_limit = limit * 3 if allowed_tables else limit
 
+            # Only IDs, versions and distances; decoded schemas come from the object cache
             response = collection.query.near_vector(
                 near_vector=query_embedding,
                 limit=search_limit,
+                return_properties=[CONTENT_HASH_PROPERTY],
                 return_metadata=wvc.query.MetadataQuery(distance=True)
             )
 
+            hits = [
+                (str(item.uuid), item.properties.get(CONTENT_HASH_PROPERTY),
+                 item.metadata.distance if item.metadata else None)
+                for item in response.objects
+            ]
+            entries = {uuid: self.schema_cache.get(uuid, version) for uuid, version, _ in hits}
+            missing = [uuid for uuid, entry in entries.items() if entry is None]
+            if missing:
+                fetched = collection.query.fetch_objects(
+                    filters=wvc.query.Filter.by_id().contains_any(missing),
+                    limit=len(missing)
+                )
+                for item in fetched.objects:
+                    uuid = str(item.uuid)
+                    entries[uuid] = self.schema_cache.put(uuid, item.properties.get(CONTENT_HASH_PROPERTY), item.properties)
+
             results = []
-            for item in response.objects:
-                table_name = item.properties["table_name"]
+            for uuid, _, distance in hits:
+                entry = entries.get(uuid)
+                if entry is None:
+                    continue  # Deleted between the search and the fetch
+                table_name = entry.schema["table_name"]
 
                 # Filter by allowed tables if specified
                 if allowed_tables and table_name not in allowed_tables:
                     continue
 
-                import json
-                result = {
-                    "table_name": table_name,
-                    "dataset": item.properties["dataset"],
-                    "project": item.properties["project"],
-                    "description": item.properties["description"],
-                    "columns": json.loads(item.properties["columns"]),
-                    "row_count": item.properties["row_count"],
-                    "distance": item.metadata.distance if item.metadata else None
-                }
-                results.append(result)
+                # Shallow copy: callers annotate results, the decoded columns stay shared
+                results.append({**entry.schema, "distance": distance})
 
                 # Stop once we have enough results
                 if len(results) >= limit:
@@ -190,6 +275,7 @@ class WeaviateClient:
         try:
             collection = self.client.collections.get(self.collection_name)
             collection.data.delete_many(where=wvc.query.Filter.by_property("table_name").like("*"))
+            self.schema_cache.invalidate()
             logger.info("Deleted all schemas")
         except Exception as e:
             logger.error(f"Failed to delete schemas: {e}")
@@ -6,43 +6,54 @@ Handles consolidated FedEx invoices with multiple shipments.
 Extracts invoice-level data + array of all shipments.
 """
 
-import pymupdf
+import sys
 import requests
 import json
 import csv
 from pathlib import Path
 from datetime import datetime
 
+# Make the backend package importable when run as a standalone script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.document_intelligence.pdf_extraction import get_pdf_extraction_service
+from src.core.document_intelligence.llm_chunk_runner import ChunkExtractionRunner
+
 
 class FedExInvoiceParser:
     """Parse FedEx consolidated invoices with multiple shipments."""
 
-    def __init__(self, ollama_url="http://localhost:11434", model="qwen2.5:7b", summary_mode=False):
+    def __init__(self, ollama_url="http://localhost:11434", model="qwen2.5:7b", summary_mode=False, llm_concurrency=4):
         self.ollama_url = ollama_url
         self.model = model
+        # Chunk prompts run concurrently; responses are cached by prompt hash
+        self.chunk_runner = ChunkExtractionRunner(
+            ollama_url=ollama_url,
+            model=model,
+            max_concurrency=llm_concurrency,
+            timeout=600
+        )
         self.output_dir = Path("extracted_data_v3")
         self.output_dir.mkdir(exist_ok=True)
         self.summary_mode = summary_mode  # Fast mode: just totals, no individual shipments
+        self.pdf_extractor = get_pdf_extraction_service()
+        self._extractions = {}  # pdf_path -> PdfExtractionResult, shared by all passes
+
+    def extract_pages(self, pdf_path):
+        """Extract every page once (parallel, cached by file hash) and reuse it across passes."""
+        key = str(pdf_path)
+        if key not in self._extractions:
+            result = self.pdf_extractor.extract(pdf_path)
+            source = "cache" if result.cached else "PDF"
+            print(f"  Extracted {result.page_count} pages from {source} "
+                  f"in {result.seconds:.2f}s ({result.pages_per_second:.0f} pages/sec)")
+            self._extractions[key] = result
+        return self._extractions[key]
 
     def extract_full_text(self, pdf_path):
         """Extract all text from PDF."""
         try:
-            doc = pymupdf.open(pdf_path)
-            full_text = ""
-
-            print(f"  Extracting text from {len(doc)} pages...")
-
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                page_text = page.get_text()
-                full_text += f"\n--- Page {page_num + 1} ---\n{page_text}"
-
-                # Progress indicator for large files
-                if (page_num + 1) % 10 == 0:
-                    print(f"    Progress: {page_num + 1}/{len(doc)} pages...")
-
-            doc.close()
-            return full_text
+            return self.extract_pages(pdf_path).full_text()
         except Exception as e:
             print(f"  ✗ Error extracting text: {str(e)}")
             return None
@@ -75,29 +86,22 @@ class FedExInvoiceParser:
     def extract_text_in_chunks(self, pdf_path, chunk_size=10):
         """Extract text in chunks for better processing."""
         try:
-            doc = pymupdf.open(pdf_path)
-            total_pages = len(doc)
+            pages = self.extract_pages(pdf_path)
+            total_pages = pages.page_count
 
             # First 2 pages = invoice header
-            header_text = ""
-            for page_num in range(min(2, total_pages)):
-                header_text += doc[page_num].get_text()
+            header_text = pages.page_range_text(0, min(2, total_pages), markers=False)
 
             # Rest of pages in chunks
             chunks = []
             for start_page in range(2, total_pages, chunk_size):
                 end_page = min(start_page + chunk_size, total_pages)
-                chunk_text = ""
-                for page_num in range(start_page, end_page):
-                    chunk_text += f"\n--- Page {page_num + 1} ---\n"
-                    chunk_text += doc[page_num].get_text()
                 chunks.append({
                     'start_page': start_page + 1,
                     'end_page': end_page,
-                    'text': chunk_text
+                    'text': pages.page_range_text(start_page, end_page)
                 })
 
-            doc.close()
             return header_text, chunks
         except Exception as e:
             print(f"  ✗ Error extracting text: {str(e)}")
@@ -153,21 +157,18 @@ JSON:"""
     def extract_summary_pages(self, pdf_path, first_pages=10):
         """Extract just first and last few pages."""
         try:
-            doc = pymupdf.open(pdf_path)
-            text = ""
+            pages = self.extract_pages(pdf_path)
+            total_pages = pages.page_count
 
             # First N pages
-            for i in range(min(first_pages, len(doc))):
-                text += doc[i].get_text()
+            parts = [pages.page_range_text(0, min(first_pages, total_pages), markers=False)]
 
             # Last 5 pages (if not already included)
-            if len(doc) > first_pages + 5:
-                text += "\n--- LAST PAGES ---\n"
-                for i in range(max(len(doc)-5, first_pages), len(doc)):
-                    text += doc[i].get_text()
+            if total_pages > first_pages + 5:
+                parts.append("\n--- LAST PAGES ---\n")
+                parts.append(pages.page_range_text(max(total_pages - 5, first_pages), total_pages, markers=False))
 
-            doc.close()
-            return text
+            return "".join(parts)
         except Exception as e:
             print(f"  ✗ Error: {e}")
             return None
@@ -181,20 +182,27 @@ JSON:"""
         if not header_text or not chunks:
             return None
 
-        # Step 1: Extract invoice metadata from header
-        print(f"  Step 1: Extracting invoice metadata...")
-        invoice_metadata = self.extract_invoice_metadata(header_text)
+        # Header metadata and every chunk go to the LLM concurrently
+        print(f"  Extracting invoice metadata and {len(chunks)} chunks "
+              f"({self.chunk_runner.max_concurrency} concurrent requests)...")
+        prompts = [self.build_metadata_prompt(header_text)]
+        prompts.extend(self.build_chunk_prompt(chunk['text']) for chunk in chunks)
+        responses = self.chunk_runner.run(prompts)
 
-        # Step 2: Extract shipments from each chunk
-        print(f"  Step 2: Processing {len(chunks)} chunks...")
-        all_shipments = []
+        stats = self.chunk_runner.stats
+        print(f"  LLM calls: {stats['requests']} requests, {stats['cache_hits']} cached, "
+              f"{stats['failures']} failed in {stats['seconds']:.1f}s")
 
-        for idx, chunk in enumerate(chunks, 1):
-            print(f"    Chunk {idx}/{len(chunks)} (pages {chunk['start_page']}-{chunk['end_page']})...")
-            shipments = self.extract_shipments_from_chunk(chunk['text'])
+        # Step 1: Invoice metadata from header
+        invoice_metadata = self.parse_metadata_response(responses[0])
+
+        # Step 2: Merge shipments in page order
+        all_shipments = []
+        for chunk, response in zip(chunks, responses[1:]):
+            shipments = self.parse_chunk_response(response)
             if shipments:
                 all_shipments.extend(shipments)
-                print(f"      → {len(shipments)} shipments")
+                print(f"    Pages {chunk['start_page']}-{chunk['end_page']}: {len(shipments)} shipments")
 
         # Combine results
         result = {
@@ -207,7 +215,12 @@ JSON:"""
 
     def extract_invoice_metadata(self, header_text):
         """Extract invoice-level metadata from header pages."""
-        prompt = f"""Extract invoice metadata from this FedEx invoice header.
+        response = self.query_ollama(self.build_metadata_prompt(header_text))
+        return self.parse_metadata_response(response)
+
+    def build_metadata_prompt(self, header_text):
+        """Prompt for invoice-level metadata from header pages."""
+        return f"""Extract invoice metadata from this FedEx invoice header.
 
 EXTRACT ONLY THESE FIELDS:
 - invoice_number: FedEx invoice number
@@ -224,14 +237,20 @@ HEADER TEXT:
 
 JSON OUTPUT:"""
 
-        response = self.query_ollama(prompt)
+    def parse_metadata_response(self, response):
+        """Invoice metadata from an LLM response ({} when there is none)."""
         if response:
             return self.parse_llm_response(response)
         return {}
 
     def extract_shipments_from_chunk(self, chunk_text):
         """Extract shipments from a chunk of pages."""
-        prompt = f"""Extract ALL shipments from this FedEx invoice section.
+        response = self.query_ollama(self.build_chunk_prompt(chunk_text))
+        return self.parse_chunk_response(response)
+
+    def build_chunk_prompt(self, chunk_text):
+        """Prompt for all shipments in a chunk of pages."""
+        return f"""Extract ALL shipments from this FedEx invoice section.
 
 Return ONLY valid JSON in this format:
 {{
@@ -260,7 +279,8 @@ IMPORTANT:
 
 JSON:"""
 
-        response = self.query_ollama(prompt)
+    def parse_chunk_response(self, response):
+        """Shipments from an LLM chunk response ([] when there is none)."""
         if response:
             data = self.parse_llm_response(response)
             return data.get('shipments', []) if isinstance(data, dict) else []
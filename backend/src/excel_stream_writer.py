@@ -0,0 +1,208 @@
+"""
+Excel Stream Writer Module
+Write-only openpyxl output with styles registered once as named styles
+"""
+
+from copy import copy
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+
+
+# pandas' default number format for datetime cells written through to_excel
+DATETIME_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+
+
+class StreamingExcelWriter:
+    """
+    Streaming Excel writer built on openpyxl write-only mode.
+
+    Rows are appended straight to the sheet's temporary XML stream, so memory
+    is bounded by ``chunk_size`` rather than by the number of rows. Formatting
+    is declared up front: every distinct cell format is registered once as a
+    named style and each column is mapped to a style name, so writing a cell
+    is a single style-name assignment instead of building Font/Fill/Border
+    objects per cell. Freeze panes, auto-filter, merged ranges and conditional
+    formats are sheet-level settings and never touch individual cells.
+
+    Write-only sheets are written top to bottom: column widths and freeze
+    panes must be given when the sheet is created, before the first row.
+    """
+
+    def __init__(self, output_file: str, chunk_size: int = 5000):
+        """
+        Initialize the writer
+
+        Args:
+            output_file: Path of the workbook to create
+            chunk_size: Number of DataFrame rows converted per batch
+        """
+        self.output_file = output_file
+        self.chunk_size = chunk_size
+        self.workbook = Workbook(write_only=True)
+        self.styles: Dict[str, NamedStyle] = {}
+        # Resolved style arrays, so styling a cell is a copy instead of a lookup
+        self._style_arrays: Dict[str, Any] = {}
+        self.row_counts: Dict[str, int] = {}
+
+    def register_style(
+        self,
+        name: str,
+        font=None,
+        fill=None,
+        border=None,
+        alignment=None,
+        number_format: Optional[str] = None
+    ) -> str:
+        """
+        Register a named style once; later registrations of the same name are no-ops
+
+        Returns:
+            The style name, for use in column style plans
+        """
+        if name in self.styles:
+            return name
+
+        style = NamedStyle(name=name)
+        # Keep the workbook default font rather than an unnamed, unsized Font()
+        style.font = font if font is not None else DEFAULT_FONT
+        if fill is not None:
+            style.fill = fill
+        if border is not None:
+            style.border = border
+        if alignment is not None:
+            style.alignment = alignment
+        if number_format is not None:
+            style.number_format = number_format
+
+        self.workbook.add_named_style(style)
+        self.styles[name] = style
+        self._style_arrays[name] = style.as_tuple()
+        return name
+
+    def create_sheet(
+        self,
+        title: str,
+        column_widths: Optional[Dict[str, float]] = None,
+        freeze_panes: Optional[str] = None
+    ):
+        """
+        Create a write-only sheet with its column-level layout
+
+        Args:
+            title: Sheet name
+            column_widths: Column letter → width
+            freeze_panes: Top-left unfrozen cell, e.g. 'A2'
+
+        Returns:
+            The write-only worksheet
+        """
+        ws = self.workbook.create_sheet(title=title)
+        for col_letter, width in (column_widths or {}).items():
+            ws.column_dimensions[col_letter].width = width
+        if freeze_panes:
+            ws.freeze_panes = freeze_panes
+        self.row_counts[title] = 0
+        return ws
+
+    def cell(self, ws, value: Any, style: Optional[str] = None) -> WriteOnlyCell:
+        """Build a write-only cell with an optional registered style"""
+        cell = WriteOnlyCell(ws, value=value)
+        if style is not None:
+            style_array = self._style_arrays.get(style)
+            if style_array is None:
+                cell.style = style
+            else:
+                cell._style = copy(style_array)
+        return cell
+
+    def append_row(self, ws, values: Sequence[Any], styles: Optional[Sequence[Optional[str]]] = None):
+        """
+        Append one row of values, styling each cell by position
+
+        Args:
+            ws: Write-only worksheet
+            values: Cell values
+            styles: Style name per cell (None leaves the cell unstyled)
+        """
+        if styles is None:
+            ws.append(list(values))
+        else:
+            ws.append([self.cell(ws, value, style) for value, style in zip(values, styles)])
+        self.row_counts[ws.title] += 1
+
+    def append_blank_rows(self, ws, count: int = 1):
+        """Append empty rows"""
+        for _ in range(count):
+            ws.append([])
+            self.row_counts[ws.title] += 1
+
+    def write_dataframe(
+        self,
+        ws,
+        df: pd.DataFrame,
+        column_styles: Sequence[Optional[str]],
+        header_style: Optional[str] = None,
+        row_styles: Optional[Iterable[Sequence[Optional[str]]]] = None
+    ) -> int:
+        """
+        Stream a DataFrame into the sheet chunk by chunk
+
+        Args:
+            ws: Write-only worksheet
+            df: Data to write (header + rows, no index)
+            column_styles: Style name per column, applied to every data row
+            header_style: Style name for the header row
+            row_styles: Optional per-row style sequences overriding column_styles;
+                each entry may be longer than the DataFrame to style trailing
+                empty cells
+
+        Returns:
+            Number of data rows written
+        """
+        header_styles = [header_style] * len(df.columns)
+        self.append_row(ws, list(df.columns), header_styles)
+
+        row_style_iter = iter(row_styles) if row_styles is not None else None
+        written = 0
+
+        for start in range(0, len(df), self.chunk_size):
+            chunk = df.iloc[start:start + self.chunk_size]
+            # NaN/NaT become empty cells, as pandas.to_excel leaves them
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+
+            for values in chunk.itertuples(index=False, name=None):
+                styles = next(row_style_iter) if row_style_iter is not None else column_styles
+                if len(styles) > len(values):
+                    values = values + (None,) * (len(styles) - len(values))
+                self.append_row(ws, values, styles)
+                written += 1
+
+        return written
+
+    def set_auto_filter(self, ws, ref: str):
+        """Set the auto-filter range"""
+        ws.auto_filter.ref = ref
+
+    def merge_cells(self, ws, ref: str):
+        """Merge a cell range"""
+        ws.merged_cells.add(ref)
+
+    def add_conditional_format(self, ws, ref: str, rule):
+        """Add an openpyxl conditional formatting rule over a range"""
+        ws.conditional_formatting.add(ref, rule)
+
+    def data_range(self, first_row: int, last_row: int, column_count: int) -> str:
+        """A1 range covering column_count columns between two rows"""
+        return f'A{first_row}:{get_column_letter(column_count)}{last_row}'
+
+    def save(self):
+        """Write the workbook to disk"""
+        self.workbook.save(self.output_file)
+        self.workbook.close()
+
@@ -0,0 +1,219 @@
+"""
+Facility Matcher Module
+Precomputed fuzzy matching index for facility/hospital names
+"""
+
+import re
+import time
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_facility_name(name) -> str:
+    """Normalize facility/hospital names for matching"""
+    if pd.isna(name):
+        return ""
+    name = str(name).strip()
+    name = re.sub(r'\s*-\s*', ' ', name)
+    name = re.sub(r'\s+', ' ', name)
+    name = name.replace("'s", "s")
+    return name.strip().lower()
+
+
+class FacilityMatchIndex:
+    """
+    Fuzzy facility matching index built once per reference set.
+
+    Reproduces ``difflib.get_close_matches(name, refs, n=1, cutoff)`` exactly,
+    but instead of scoring every reference name for every input row it:
+
+    - normalizes the reference names once,
+    - keeps a character-count matrix so the ``quick_ratio`` upper bound of
+      every reference can be computed in one vectorized step,
+    - scores candidates sharing the query's first token first, then the remaining candidates in descending upper-bound order,
+      stopping as soon as no remaining candidate can beat the best score.
+    """
+
+    def __init__(self, reference_facilities: Iterable):
+        """
+        Build the index
+
+        Args:
+            reference_facilities: Reference facility names
+        """
+        started = time.perf_counter()
+
+        # Later duplicates win, matching a {normalized: original} dict build
+        normalized_refs: Dict[str, str] = {}
+        for ref in reference_facilities:
+            normalized_refs[normalize_facility_name(ref)] = ref
+
+        self.normalized_refs = normalized_refs
+        self.keys: List[str] = list(normalized_refs.keys())
+        self.lengths = np.array([len(k) for k in self.keys], dtype=np.int64)
+
+        # Character-count matrix used for the vectorized quick_ratio bound
+        alphabet = sorted({ch for key in self.keys for ch in key})
+        self.char_index = {ch: i for i, ch in enumerate(alphabet)}
+        self.char_counts = np.zeros((len(self.keys), max(len(alphabet), 1)), dtype=np.int32)
+        for row, key in enumerate(self.keys):
+            for ch in key:
+                self.char_counts[row, self.char_index[ch]] += 1
+
+        # Blocking key: first token of the normalized name
+        self.blocks: Dict[str, List[int]] = {}
+        for row, key in enumerate(self.keys):
+            tokens = key.split()
+            if tokens:
+                self.blocks.setdefault(tokens[0], []).append(row)
+
+        self.build_seconds = time.perf_counter() - started
+        self.stats = {
+            'lookups': 0,
+            'exact_matches': 0,
+            'fuzzy_matches': 0,
+            'misses': 0,
+            'candidates_scored': 0,
+            'seconds': 0.0
+        }
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _block_candidates(self, normalized: str) -> List[int]:
+        """Reference rows sharing the query's first token"""
+        tokens = normalized.split()
+        return self.blocks.get(tokens[0], []) if tokens else []
+
+    def _upper_bounds(self, normalized: str) -> np.ndarray:
+        """Vectorized difflib quick_ratio of the query against every reference"""
+        query_counts = np.zeros(self.char_counts.shape[1], dtype=np.int32)
+        for ch in normalized:
+            idx = self.char_index.get(ch)
+            if idx is not None:
+                query_counts[idx] += 1
+        intersection = np.minimum(self.char_counts, query_counts).sum(axis=1)
+        total = self.lengths + len(normalized)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bounds = np.where(total > 0, 2.0 * intersection / total, 1.0)
+        return bounds
+
+    def _best_fuzzy(self, normalized: str, cutoff: float) -> Optional[str]:
+        """Highest-scoring reference key with ratio >= cutoff (difflib tie-breaking)"""
+        if not self.keys:
+            return None
+
+        bounds = self._upper_bounds(normalized)
+        eligible = np.flatnonzero(bounds >= cutoff)
+        if eligible.size == 0:
+            return None
+
+        # Score blocked candidates first so the bound prunes the rest early
+        block_rows = [row for row in self._block_candidates(normalized)
+                      if bounds[row] >= cutoff]
+        ordered = eligible[np.argsort(-bounds[eligible], kind='stable')]
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(normalized)
+
+        best: Optional[Tuple[float, str]] = None
+        scored = set()
+
+        def score(row: int):
+            nonlocal best
+            if row in scored:
+                return
+            scored.add(row)
+            key = self.keys[row]
+            matcher.set_seq1(key)
+            ratio = matcher.ratio()
+            if ratio >= cutoff and (best is None or (ratio, key) > best):
+                best = (ratio, key)
+
+        for row in block_rows:
+            score(row)
+
+        for row in ordered:
+            # quick_ratio >= ratio, so nothing below the current best can win
+            if best is not None and bounds[row] < best[0]:
+                break
+            score(int(row))
+
+        self.stats['candidates_scored'] += len(scored)
+        return best[1] if best else None
+
+    def match(self, facility_name, cutoff: float = 0.75) -> Optional[str]:
+        """
+        Find the best matching reference facility for a single name
+
+        Args:
+            facility_name: Facility name to match
+            cutoff: Minimum difflib similarity ratio
+
+        Returns:
+            Original reference facility name, or None if nothing matches
+        """
+        if pd.isna(facility_name):
+            return None
+
+        started = time.perf_counter()
+        self.stats['lookups'] += 1
+
+        normalized = normalize_facility_name(facility_name)
+        match = self.normalized_refs.get(normalized)
+        if match is not None:
+            self.stats['exact_matches'] += 1
+        else:
+            key = self._best_fuzzy(normalized, cutoff)
+            if key is not None:
+                match = self.normalized_refs[key]
+                self.stats['fuzzy_matches'] += 1
+            else:
+                self.stats['misses'] += 1
+
+        self.stats['seconds'] += time.perf_counter() - started
+        return match
+
+    def match_batch(self, facility_names: pd.Series, cutoff: float = 0.75) -> pd.Series:
+        """
+        Resolve a whole column of facility names in one call.
+
+        Each distinct name is scored once and the result is broadcast back
+        to every row.
+
+        Args:
+            facility_names: Facility names to match
+            cutoff: Minimum difflib similarity ratio
+
+        Returns:
+            Series of matched reference names aligned with facility_names
+        """
+        # NaN never equals itself; use None so missing values share one key
+        names = facility_names.astype(object).where(facility_names.notna(), None)
+
+        resolved = {name: self.match(name, cutoff) for name in names.drop_duplicates()}
+
+        return pd.Series(
+            [resolved[name] for name in names],
+            index=facility_names.index,
+            dtype=object
+        )
+
+    def throughput(self) -> float:
+        """Lookups resolved per second so far"""
+        if self.stats['seconds'] <= 0:
+            return 0.0
+        return self.stats['lookups'] / self.stats['seconds']
+
+    def summary(self) -> Dict[str, float]:
+        """Index and lookup statistics"""
+        return {
+            'references': len(self.keys),
+            'blocks': len(self.blocks),
+            'build_seconds': round(self.build_seconds, 4),
+            'matches_per_second': round(self.throughput(), 1),
+            **self.stats
+        }
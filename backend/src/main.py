@@ -89,6 +89,17 @@ async def lifespan(app: FastAPI):
         pass
     logger.info("Markets.AI Signal Scheduler stopped")
 
+    # Stop background job workers (unfinished jobs are requeued on next start)
+    from src.core.job_engine import shutdown_job_engine
+    shutdown_job_engine()
+    logger.info("Job engine stopped")
+
+    from src.core.document_intelligence.pdf_extraction import shutdown_pdf_extraction_service
+    shutdown_pdf_extraction_service()
+
+    from src.core.document_intelligence.batch_extraction import shutdown_parse_executor
+    shutdown_parse_executor()
+
 
 app = FastAPI(
     title="Mantrix Nexxt Analytics API",
@@ -0,0 +1,222 @@
+"""
+Source Loader Module
+Parallel, content-hash cached loading of CGS source workbooks
+"""
+
+import os
+import time
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+
+CACHE_FORMAT_VERSION = 1
+
+
+@dataclass
+class SourceSpec:
+    """A source file and the pandas options used to read it"""
+    name: str
+    path: str
+    reader: str = 'excel'  # 'excel' or 'csv'
+    read_kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(spec: SourceSpec, content_hash: str) -> str:
+    """Cache key from file content plus the read options that shape the frame"""
+    options = json.dumps(
+        {'reader': spec.reader, 'read_kwargs': spec.read_kwargs, 'version': CACHE_FORMAT_VERSION},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(f"{content_hash}:{options}".encode()).hexdigest()
+
+
+def _arrow_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f'{key}.arrow')
+
+
+def _pickle_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f'{key}.pkl')
+
+
+def read_cached_frame(cache_dir: str, key: str) -> Optional[pd.DataFrame]:
+    """Load a cached frame (Arrow IPC, or pickle for frames Arrow cannot hold)"""
+    arrow_path = _arrow_path(cache_dir, key)
+    if ARROW_AVAILABLE and os.path.exists(arrow_path):
+        return pd.read_feather(arrow_path)
+
+    pickle_path = _pickle_path(cache_dir, key)
+    if os.path.exists(pickle_path):
+        return pd.read_pickle(pickle_path)
+
+    return None
+
+
+def write_cached_frame(df: pd.DataFrame, cache_dir: str, key: str) -> str:
+    """
+    Write a frame to the columnar cache
+
+    Excel sheets often have mixed-type or non-string column headers that
+    Arrow rejects; those fall back to pickle so they are still cached.
+
+    Returns:
+        The cache format written ('arrow' or 'pickle')
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    if ARROW_AVAILABLE:
+        arrow_path = _arrow_path(cache_dir, key)
+        tmp_path = f'{arrow_path}.{os.getpid()}.tmp'
+        try:
+            df.to_feather(tmp_path)
+            os.replace(tmp_path, arrow_path)
+            return 'arrow'
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    pickle_path = _pickle_path(cache_dir, key)
+    tmp_path = f'{pickle_path}.{os.getpid()}.tmp'
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, pickle_path)
+    return 'pickle'
+
+
+def read_source(spec: SourceSpec) -> pd.DataFrame:
+    """Read a source file with pandas"""
+    if spec.reader == 'csv':
+        return pd.read_csv(spec.path, **spec.read_kwargs)
+    return pd.read_excel(spec.path, **spec.read_kwargs)
+
+
+def _load_into_cache(spec: SourceSpec, key: Optional[str], cache_dir: Optional[str]) -> Dict[str, Any]:
+    """
+    Worker entry point: parse one source and write it to the cache.
+
+    The frame is handed back through the cache file rather than pickled over
+    the process pipe; without a cache it is returned directly.
+    """
+    started = time.perf_counter()
+    df = read_source(spec)
+    parse_seconds = time.perf_counter() - started
+
+    result = {'name': spec.name, 'rows': len(df), 'parse_seconds': parse_seconds}
+    if cache_dir and key:
+        result['cache_format'] = write_cached_frame(df, cache_dir, key)
+    else:
+        result['frame'] = df
+    return result
+
+
+class SourceLoader:
+    """
+    Loads CGS source files in parallel worker processes.
+
+    Each source is keyed by the SHA-256 of its contents plus its read options.
+    Unchanged sources are served from a local columnar cache; only changed or
+    new files are parsed, and those are parsed concurrently.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_workers: Optional[int] = None):
+        """
+        Initialize the loader
+
+        Args:
+            cache_dir: Directory for cached frames (None disables caching)
+            max_workers: Worker processes for parsing (defaults to one per source)
+        """
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.stats: Dict[str, Any] = {}
+
+    def load(self, specs: List[SourceSpec]) -> Dict[str, pd.DataFrame]:
+        """
+        Load every source, from cache where possible
+
+        Args:
+            specs: Sources to load
+
+        Returns:
+            Source name → DataFrame
+        """
+        started = time.perf_counter()
+        frames: Dict[str, pd.DataFrame] = {}
+        sources: Dict[str, Dict[str, Any]] = {}
+        pending = []
+
+        for spec in specs:
+            hash_start = time.perf_counter()
+            key = cache_key(spec, file_sha256(spec.path)) if self.cache_dir else None
+            sources[spec.name] = {'hash_seconds': time.perf_counter() - hash_start}
+
+            if key:
+                read_start = time.perf_counter()
+                cached = read_cached_frame(self.cache_dir, key)
+                if cached is not None:
+                    frames[spec.name] = cached
+                    sources[spec.name].update({
+                        'cache_hit': True,
+                        'rows': len(cached),
+                        'read_seconds': time.perf_counter() - read_start
+                    })
+                    continue
+
+            sources[spec.name]['cache_hit'] = False
+            pending.append((spec, key))
+
+        if len(pending) == 1:
+            # Not worth a process pool for a single file
+            spec, key = pending[0]
+            self._collect(_load_into_cache(spec, key, self.cache_dir), key, frames, sources)
+        elif pending:
+            workers = self.max_workers or len(pending)
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+                futures = {
+                    executor.submit(_load_into_cache, spec, key, self.cache_dir): key
+                    for spec, key in pending
+                }
+                for future in as_completed(futures):
+                    self._collect(future.result(), futures[future], frames, sources)
+
+        self.stats = {
+            'total_seconds': time.perf_counter() - started,
+            'cache_hits': sum(1 for s in sources.values() if s['cache_hit']),
+            'cache_misses': len(pending),
+            'sources': sources
+        }
+        return frames
+
+    def _collect(self, result: Dict[str, Any], key: Optional[str], frames, sources):
+        """Record a worker result and load its frame"""
+        name = result['name']
+        read_start = time.perf_counter()
+        if 'frame' in result:
+            frames[name] = result['frame']
+        else:
+            frames[name] = read_cached_frame(self.cache_dir, key)
+        sources[name].update({
+            'rows': result['rows'],
+            'parse_seconds': result['parse_seconds'],
+            'read_seconds': time.perf_counter() - read_start,
+            'cache_format': result.get('cache_format')
+        })
@@ -5,13 +5,19 @@ Template-Aware PDF Extraction
 Uses template definitions to guide extraction and ensure all required fields are captured.
 """
 
-import pymupdf
+import sys
 import requests
 import json
 import csv
 from pathlib import Path
 from datetime import datetime
 
+# Make the backend package importable when run as a standalone script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.document_intelligence.pdf_extraction import get_pdf_extraction_service
+from src.core.document_intelligence.template_classifier import get_template_classifier
+
 
 class TemplateAwareExtractor:
     """Extract PDF data using template-specific schemas."""
@@ -28,6 +34,9 @@ class TemplateAwareExtractor:
         self.mapping = self.load_mapping()
         self.templates = self.load_templates()
 
+        # Keyword classifier compiled once per template library and shared by every extractor
+        self.classifier = get_template_classifier(self.templates, preferred=self.mapping.values())
+
     def load_mapping(self):
         """Load PDF to template type mapping."""
         mapping_file = self.templates_dir / "pdf_template_mapping.json"
@@ -50,23 +59,36 @@ class TemplateAwareExtractor:
     def extract_text_from_pdf(self, pdf_path):
         """Extract text from a PDF file."""
         try:
-            doc = pymupdf.open(pdf_path)
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text += f"\n--- Page {page_num + 1} ---\n"
-                text += page.get_text()
-            doc.close()
-            return text
+            return get_pdf_extraction_service().extract(pdf_path).full_text()
         except Exception as e:
             print(f"  ✗ Error extracting text: {str(e)}")
             return None
 
-    def auto_detect_template(self, text):
+    def auto_detect_template(self, text, doc_hash=None):
         """Automatically detect the best matching template for the document."""
         if not self.templates:
             return None
 
+        # Keyword classifier first; the LLM is only asked when it is not confident
+        detected = self.classify_template(text, doc_hash)
+        if detected:
+            return detected
+
+        response = self.query_ollama(self.create_detection_prompt(text))
+        if response:
+            return self.parse_detection_response(response)
+
+        return None
+
+    def classify_template(self, text, doc_hash=None):
+        """Detect the template from keywords alone, or None when no template matches confidently."""
+        match = self.classifier.classify(text, doc_hash)
+        if match.confident:
+            print(f"  🎯 Classified template: {match.template_type} (coverage {match.coverage:.0%})")
+        return match.template_type
+
+    def create_detection_prompt(self, text):
+        """Create the template classification prompt for a document."""
         # Extract first 2000 characters for classification
         sample_text = text[:2000]
 
@@ -96,21 +118,22 @@ INSTRUCTIONS:
 
 TEMPLATE TYPE:"""
 
-        response = self.query_ollama(prompt)
-        if response:
-            # Extract template type from response
-            detected = response.strip().lower()
-            # Remove any quotes or extra text
-            detected = detected.replace('"', '').replace("'", "").split()[0]
-
-            if detected in self.templates:
-                print(f"  🎯 Auto-detected template: {detected}")
-                return detected
-            else:
-                print(f"  ⚠ Could not auto-detect template (got: {detected})")
-                return None
-
-        return None
+        return prompt
+
+    def parse_detection_response(self, response):
+        """Map a classification response to a known template type, or None."""
+        # Extract template type from response
+        detected = response.strip().lower()
+        # Remove any quotes or extra text
+        detected = detected.replace('"', '').replace("'", "").split()
+        detected = detected[0] if detected else ""
+
+        if detected in self.templates:
+            print(f"  🎯 Auto-detected template: {detected}")
+            return detected
+        else:
+            print(f"  ⚠ Could not auto-detect template (got: {detected})")
+            return None
 
     def create_schema_prompt(self, template):
         """Create extraction schema from template definition."""
@@ -173,6 +196,17 @@ TEMPLATE TYPE:"""
             print(f"  ✗ Template not found: {template_type}")
             return None
 
+        prompt = self.create_extraction_prompt(template, text, template_type)
+
+        print(f"  Querying LLM with {template.get('name')} template...")
+        response = self.query_ollama(prompt)
+
+        if response:
+            return self.parse_llm_response(response)
+        return None
+
+    def create_extraction_prompt(self, template, text, template_type='Document'):
+        """Create the extraction prompt for a document and template definition."""
         schema = self.create_schema_prompt(template)
 
         prompt = f"""You are a precise data extraction assistant. Extract information from this document using the schema below.
@@ -195,12 +229,7 @@ DOCUMENT TEXT:
 
 JSON OUTPUT (all required fields must be present):"""
 
-        print(f"  Querying LLM with {template.get('name')} template...")
-        response = self.query_ollama(prompt)
-
-        if response:
-            return self.parse_llm_response(response)
-        return None
+        return prompt
 
     def parse_llm_response(self, response):
         """Parse LLM response and extract JSON."""
@@ -0,0 +1,93 @@
+"""Requests against the SQL routes with the generator dependency replaced."""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+try:
+    from src.api import routes
+except Exception as e:  # Importing the routes connects to Redis, PostgreSQL and Weaviate
+    pytest.skip(f"API routes unavailable: {e}", allow_module_level=True)
+
+from src.core.bigquery_sql_generator import BigQuerySQLGenerator
+
+
+class FakeCacheManager:
+    enabled = False
+
+    def get_stats(self):
+        return {"hits": 3}
+
+
+@pytest.fixture
+def generator():
+    # The route's real dependency type, without BigQuery or LLM clients
+    generator = object.__new__(BigQuerySQLGenerator)
+    generator.cache_manager = FakeCacheManager()
+    return generator
+
+
+@pytest.fixture
+def client(generator):
+    app = FastAPI()
+    app.include_router(routes.router)
+    app.dependency_overrides[routes.get_sql_generator] = lambda: generator
+    return TestClient(app)
+
+
+def test_cache_stats_reports_every_component(client):
+    response = client.get(f"{routes.router.prefix}/cache/stats")
+
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["hits"] == 3
+    for name in routes.COMPONENT_CACHES:
+        assert name in stats
+        assert "error" not in stats[name]
+
+
+def test_cache_stats_survives_a_failing_component(client, monkeypatch):
+    def broken():
+        raise RuntimeError("not configured")
+
+    monkeypatch.setitem(routes.COMPONENT_CACHES, "prompt_prefix", broken)
+    response = client.get(f"{routes.router.prefix}/cache/stats")
+
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["prompt_prefix"] == {"error": "not configured"}
+    assert "error" not in stats["validation"]
+
+
+def test_schema_reindex_reports_indexed_and_pruned_tables(client):
+    from src.db.schema_object_cache import SchemaObjectCache
+    from src.db.weaviate_client import WeaviateClient
+    from tests.fakes import FakeCollection, FakeWeaviate
+    from weaviate.util import generate_uuid5
+
+    tables = [
+        {"project": "p", "dataset": "d", "table_name": name, "description": "", "columns": [{"name": "id", "type": "INT64"}]}
+        for name in ("orders", "customers")
+    ]
+    collection = FakeCollection()
+    collection.objects[generate_uuid5("p.d.dropped")] = {"properties": {"table_name": "dropped"}, "vector": [0.0]}
+    vector_client = object.__new__(WeaviateClient)
+    vector_client.client = FakeWeaviate(collection)
+    vector_client.collection_name = "TableSchemas"
+    vector_client.schema_cache = SchemaObjectCache()
+
+    indexer = object.__new__(routes.VectorSQLGenerator)
+    indexer.cache_manager = None
+    indexer.vector_client = vector_client
+    indexer.bq_client = SimpleNamespace(get_dataset_schema=lambda: tables)
+    indexer.llm_client = SimpleNamespace(generate_embeddings=lambda texts: [[1.0] for _ in texts])
+    client.app.dependency_overrides[routes.get_schema_indexer] = lambda: indexer
+
+    first = client.post(f"{routes.router.prefix}/schemas/reindex")
+    second = client.post(f"{routes.router.prefix}/schemas/reindex")
+
+    assert first.status_code == 200
+    assert (first.json()["indexed"], first.json()["pruned"]) == (2, 1)
+    assert (second.json()["indexed"], second.json()["skipped"]) == (0, 2)
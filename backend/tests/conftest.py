@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Add project root to path
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
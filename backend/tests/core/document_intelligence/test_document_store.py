@@ -0,0 +1,43 @@
+"""Tests for blob sharing in the persistent document store."""
+
+from src.core.document_intelligence.document_store import DocumentStore
+
+
+def add_document(store, document_id, content, extension):
+    sha256, path = store.put_blob(content, extension)
+    store.add({
+        "document_id": document_id,
+        "filename": f"{document_id}.{extension}",
+        "filepath": str(path),
+        "blob_sha256": sha256,
+        "size_bytes": len(content),
+        "upload_timestamp": "2026-01-01T00:00:00",
+        "status": "processed",
+    }, [(None, content.decode())])
+    return path
+
+
+def test_same_content_with_another_extension_keeps_its_blob(tmp_path):
+    store = DocumentStore(tmp_path)
+    txt_path = add_document(store, "doc_txt", b"a,b\n1,2\n", "txt")
+    csv_path = add_document(store, "doc_csv", b"a,b\n1,2\n", "csv")
+    assert txt_path != csv_path
+
+    assert store.delete("doc_txt")
+
+    assert not txt_path.exists()
+    assert csv_path.exists()
+    assert store.read_blob("doc_csv") == b"a,b\n1,2\n"
+
+
+def test_shared_blob_is_removed_with_its_last_document(tmp_path):
+    store = DocumentStore(tmp_path)
+    first = add_document(store, "doc_1", b"same bytes", "pdf")
+    second = add_document(store, "doc_2", b"same bytes", "pdf")
+    assert first == second
+
+    store.delete("doc_1")
+    assert second.exists()
+    store.delete("doc_2")
+    assert not second.exists()
+    assert store.delete("doc_2") is False
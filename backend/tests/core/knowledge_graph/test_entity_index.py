@@ -0,0 +1,56 @@
+"""Tests for entity mention detection in the CSG entity index."""
+
+from rdflib import Graph, Literal
+from rdflib.namespace import RDF
+
+from src.core.knowledge_graph.csg_entity_resolver import CSG, CSGEntityResolver, DATA
+from src.core.knowledge_graph.entity_index import EntityEntry, EntityIndex
+
+SMITH = EntityEntry(name="John Smith", type="surgeon", uri="urn:surgeon:john_smith")
+SALES = EntityEntry(name="Sales", type="distributor", uri="urn:distributor:sales")
+NORTH = EntityEntry(name="North Medical Supply", type="distributor", uri="urn:distributor:north")
+
+
+def make_index():
+    return EntityIndex(
+        [("John Smith", SMITH), ("Sales", SALES), ("North Medical Supply", NORTH)],
+        type_priority=["surgeon", "distributor"],
+    )
+
+
+def test_default_matching_is_case_insensitive_on_whole_words():
+    mentions = make_index().find_mentions("sales by john smith; salesforce excluded")
+    assert [(m["mention"], m["uri"]) for m in mentions] == [
+        ("sales", SALES.uri),
+        ("john smith", SMITH.uri),
+    ]
+
+
+def test_title_case_gate_skips_lowercase_words_and_short_labels():
+    text = "Show sales and Sales for John Smith and north medical supply vs North Medical Supply"
+    mentions = make_index().find_mentions(text, min_words=2, title_case=True)
+    assert [(m["mention"], m["start"]) for m in mentions] == [
+        ("John Smith", text.index("John Smith")),
+        ("North Medical Supply", text.index("North Medical Supply")),
+    ]
+
+
+def test_lowercase_word_breaks_a_title_case_name():
+    mentions = make_index().find_mentions("John smith", min_words=2, title_case=True)
+    assert mentions == []
+
+
+def test_resolver_only_reports_capitalized_multi_word_names():
+    resolver = CSGEntityResolver()
+    resolver.graph = Graph()
+    for uri, rdf_class, name in [(DATA.john_smith, CSG.Surgeon, "John Smith"),
+                                 (DATA.sales, CSG.Distributor, "Sales")]:
+        resolver.graph.add((uri, RDF.type, rdf_class))
+        resolver.graph.add((uri, CSG.personName, Literal(name)))
+    resolver._initialized = True
+
+    mentions = resolver.resolve_entities("Total sales for John Smith and Sales last quarter")
+
+    assert [(m["mention"], m["type"], m["column"]) for m in mentions] == [("John Smith", "surgeon", "surgeon")]
+    assert [m["mention"] for m in resolver.resolve_entities("sales for john smith", min_words=1, title_case=False)] \
+        == ["sales", "john smith"]
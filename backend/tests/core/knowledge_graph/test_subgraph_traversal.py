@@ -0,0 +1,119 @@
+import re
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.knowledge_graph.graph_traversal import GraphTraversalEngine, TraversalOptions
+from src.core.knowledge_graph.models import NodeType, RelationType
+from src.core.knowledge_graph.subgraph_traversal import AdjacencyGraph, all_paths, bfs_paths, dfs_paths
+
+NODES = {
+    "revenue": "L1Metric",
+    "net_sales": "L2Bucket",
+    "discounts": "L2Bucket",
+    "gl_4000": "GLAccount",
+    "gl_4100": "GLAccount",
+}
+
+# Parallel edges: revenue-net_sales and net_sales-gl_4000 are each connected twice
+EDGES = [
+    ("revenue", "net_sales", "CONTAINS"),
+    ("revenue", "net_sales", "CALCULATES_FROM"),
+    ("revenue", "discounts", "CONTAINS"),
+    ("net_sales", "gl_4000", "MAPS_TO"),
+    ("net_sales", "gl_4000", "CONTAINS"),
+    ("discounts", "gl_4100", "MAPS_TO"),
+    ("gl_4100", "net_sales", "PART_OF"),
+]
+
+
+def records():
+    return [
+        {"node": {"id": node_id, "name": node_id}, "labels": [label],
+         "edges": [{"target": target, "type": rel_type, "properties": {}}
+                   for source, target, rel_type in EDGES if source == node_id]}
+        for node_id, label in NODES.items()
+    ]
+
+
+class FakeSession:
+    """Answers the two per-node queries GraphTraversalEngine's BFS/DFS issue, from NODES and EDGES."""
+
+    def run(self, query, node_id=None, **_):
+        if "neighbor" in query:
+            allowed = re.search(r"-\[:?([\w|]*)\]-\(neighbor\)", query).group(1)
+            types = set(allowed.split("|")) if allowed else None
+            ids = []
+            for source, target, rel_type in EDGES:
+                if types and rel_type not in types:
+                    continue
+                other = target if source == node_id else source if target == node_id else None
+                if other and other not in ids:
+                    ids.append(other)
+            return [{"id": other} for other in ids]
+        label = NODES.get(node_id)
+        record = {"n": {"id": node_id, "name": node_id}, "labels": [label]} if label else None
+        return SimpleNamespace(single=lambda: record)
+
+
+@contextmanager
+def session():
+    yield FakeSession()
+
+
+@pytest.fixture
+def graph():
+    return AdjacencyGraph.from_records(records())
+
+
+@pytest.fixture
+def legacy():
+    return GraphTraversalEngine(SimpleNamespace(driver=SimpleNamespace(session=session)))
+
+
+def path_ids(paths):
+    return [[node.id for node in path.nodes] for path in paths]
+
+
+def test_neighbors_lists_each_neighbour_once(graph):
+    neighbors = graph.neighbors("revenue", TraversalOptions())
+
+    assert [neighbor_id for neighbor_id, _ in neighbors] == ["net_sales", "discounts"]
+    assert neighbors[0][1].type == RelationType.CONTAINS
+
+
+def test_neighbors_keeps_the_first_allowed_parallel_edge(graph):
+    options = TraversalOptions(include_relationships={RelationType.CALCULATES_FROM})
+
+    (neighbor_id, relationship), = graph.neighbors("revenue", options)
+
+    assert neighbor_id == "net_sales"
+    assert relationship.type == RelationType.CALCULATES_FROM
+
+
+def test_dfs_and_all_paths_emit_no_duplicate_paths(graph):
+    options = TraversalOptions(max_depth=3, max_paths=10)
+
+    dfs, _ = dfs_paths(graph, "revenue", NodeType.GL_ACCOUNT, None, options)
+    every = all_paths(graph, "revenue", NodeType.GL_ACCOUNT, None, options)
+
+    for paths in (path_ids(dfs), path_ids(every)):
+        assert len(paths) == len({tuple(path) for path in paths})
+    assert sorted(path_ids(every)) == [
+        ["revenue", "discounts", "gl_4100"],
+        ["revenue", "net_sales", "gl_4000"],
+        ["revenue", "net_sales", "gl_4100"],
+    ]
+
+
+@pytest.mark.parametrize("max_paths", [1, 2, 10])
+@pytest.mark.parametrize("include", [None, {RelationType.CONTAINS, RelationType.MAPS_TO}])
+def test_dfs_and_bfs_match_the_per_node_cypher_traversal(graph, legacy, max_paths, include):
+    options = TraversalOptions(max_depth=4, max_paths=max_paths, include_relationships=include)
+
+    dfs, _ = dfs_paths(graph, "revenue", NodeType.GL_ACCOUNT, None, options)
+    bfs, _ = bfs_paths(graph, "revenue", NodeType.GL_ACCOUNT, None, options)
+
+    assert path_ids(dfs) == path_ids(legacy._dfs_traversal("revenue", NodeType.GL_ACCOUNT, None, options))
+    assert path_ids(bfs) == path_ids(legacy._bfs_traversal("revenue", NodeType.GL_ACCOUNT, None, options))
@@ -0,0 +1,51 @@
+"""Tests for lease-based requeueing in the background job engine."""
+
+import time
+from concurrent.futures import Future
+
+from src.core.job_engine import JobEngine, PENDING
+
+
+def make_engine(tmp_path, dispatched):
+    engine = JobEngine(str(tmp_path / "jobs.db"), lease_seconds=30)
+    engine._dispatch = lambda job_id, target, params: dispatched.append(job_id)
+    return engine
+
+
+def test_expired_lease_of_a_running_local_job_is_renewed_not_redispatched(tmp_path):
+    dispatched = []
+    engine = make_engine(tmp_path, dispatched)
+    # The heartbeat was late: the job still runs here, but its lease has lapsed
+    engine.store.create("job_running", "cgs", "pkg.mod:run", {}, None, owner=engine.owner, lease_until=time.time() - 1)
+    engine._futures["job_running"] = Future()
+
+    engine._requeue_expired()
+
+    assert dispatched == []
+    job = engine.store.get("job_running")
+    assert job["owner"] == engine.owner
+    assert job["lease_until"] > time.time()
+
+
+def test_expired_lease_of_another_engine_is_requeued(tmp_path):
+    dispatched = []
+    engine = make_engine(tmp_path, dispatched)
+    engine.store.create("job_orphaned", "cgs", "pkg.mod:run", {"x": 1}, None, owner="crashed", lease_until=time.time() - 1)
+
+    engine._requeue_expired()
+
+    assert dispatched == ["job_orphaned"]
+    job = engine.store.get("job_orphaned")
+    assert job["owner"] == engine.owner
+    assert job["status"] == PENDING
+
+
+def test_live_lease_of_another_engine_is_left_alone(tmp_path):
+    dispatched = []
+    engine = make_engine(tmp_path, dispatched)
+    engine.store.create("job_elsewhere", "cgs", "pkg.mod:run", {}, None, owner="other", lease_until=time.time() + 60)
+
+    engine._requeue_expired()
+
+    assert dispatched == []
+    assert engine.store.get("job_elsewhere")["owner"] == "other"
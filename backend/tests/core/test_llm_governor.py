@@ -0,0 +1,221 @@
+"""Tests for the LLM dispatch governor."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.core.llm_governor import LLMGovernor, LLMPriority, LLMQueueTimeout, PREFIX_COOLDOWN
+
+
+class RateLimitError(Exception):
+    """Looks like an SDK rate-limit error to is_rate_limited."""
+
+    def __init__(self, retry_after=None):
+        super().__init__("rate limited")
+        self.status_code = 429
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = type("Response", (), {"status_code": 429, "headers": headers})()
+
+
+class LockCheckingRedis:
+    """In-memory Redis stand-in that records calls made while the governor's lock is held."""
+
+    def __init__(self, governor):
+        self.governor = governor
+        self.values = {}
+        self.hashes = {}
+        self.calls = 0
+        self.locked_calls = 0  # The governor swallows Redis errors, so violations are counted, not raised
+
+    def _check(self):
+        self.calls += 1
+        if self.governor._cond._is_owned():
+            self.locked_calls += 1
+
+    def get(self, key):
+        self._check()
+        return self.values.get(key)
+
+    def set(self, key, value, px=None):
+        self._check()
+        self.values[key] = value
+
+    def hmget(self, key, *fields):
+        self._check()
+        bucket = self.hashes.get(key, {})
+        return [bucket.get(name) for name in fields]
+
+    def hincrby(self, key, name, amount):
+        self._check()
+        bucket = self.hashes.setdefault(key, {})
+        bucket[name] = int(bucket.get(name, 0)) + amount
+        return bucket[name]
+
+    def expire(self, key, seconds):
+        self._check()
+
+    def pipeline(self):
+        self._check()
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.redis_client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeCacheManager:
+    enabled = True
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+
+
+def make_governor(**limits):
+    return LLMGovernor(
+        limits={"anthropic": {"max_concurrency": 1, **limits}},
+        shares={LLMPriority.INTERACTIVE: 1.0, LLMPriority.BATCH: 1.0, LLMPriority.BACKGROUND: 1.0},
+        max_retries=2,
+        max_wait=5.0,
+    )
+
+
+def test_waiting_calls_are_admitted_by_priority_then_arrival():
+    governor = make_governor()
+    release_first = threading.Event()
+    started = threading.Event()
+    order = []
+
+    def blocker():
+        started.set()
+        release_first.wait(5)
+        return "first"
+
+    first = threading.Thread(target=governor.call, args=("anthropic", blocker))
+    first.start()
+    started.wait(5)
+
+    def enqueue(name, priority):
+        thread = threading.Thread(target=governor.call,
+                                  args=("anthropic", lambda: order.append(name)), kwargs={"priority": priority})
+        thread.start()
+        deadline = time.monotonic() + 5
+        while governor._queued[priority] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return thread
+
+    threads = [
+        enqueue("background", LLMPriority.BACKGROUND),
+        enqueue("batch", LLMPriority.BATCH),
+    ]
+    threads.append(enqueue("interactive", LLMPriority.INTERACTIVE))
+    release_first.set()
+    for thread in [first] + threads:
+        thread.join(5)
+
+    assert order == ["interactive", "batch", "background"]
+
+
+def test_rate_limit_retries_after_the_retry_after_cooldown():
+    governor = make_governor()
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RateLimitError(retry_after=0.3)
+        return "ok"
+
+    assert governor.call("anthropic", flaky) == "ok"
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.25
+    stats = governor.get_stats()["providers"]["anthropic"]
+    assert stats["rate_limited"] == 1 and stats["retries"] == 1
+
+
+def test_calls_on_the_event_loop_are_admitted_without_waiting_or_retrying():
+    governor = make_governor()
+    attempts = []
+
+    def limited():
+        attempts.append(1)
+        raise RateLimitError(retry_after=30)
+
+    async def run():
+        # The cap of 1 is already used up, but the loop must not wait for it
+        governor._provider("anthropic").in_flight = 1
+        assert governor.call("anthropic", lambda: "ok") == "ok"
+        with pytest.raises(RateLimitError):
+            governor.call("anthropic", limited)
+
+    started = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - started < 1.0
+    assert attempts == [1]
+    assert governor.get_stats()["providers"]["anthropic"]["event_loop_dispatches"] == 2
+
+
+def test_queue_timeout_when_no_slot_frees_up():
+    governor = make_governor()
+    governor.max_wait = 0.2
+    governor._provider("anthropic").in_flight = 1
+    with pytest.raises(LLMQueueTimeout):
+        governor.call("anthropic", lambda: "never")
+    assert governor._provider("anthropic").queue == []
+
+
+def test_redis_is_never_called_with_the_lock_held():
+    governor = make_governor(requests_per_minute=100, tokens_per_minute=100000)
+    redis_client = LockCheckingRedis(governor)
+    governor.attach(FakeCacheManager(redis_client))
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(governor.call("anthropic", lambda: "ok", 10)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    attempts = []
+
+    def limited_once():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RateLimitError(retry_after=0.1)
+        return "ok"
+
+    assert governor.call("anthropic", limited_once) == "ok"
+    stats = governor.get_stats()
+
+    assert results == ["ok"] * 4
+    assert redis_client.calls > 0
+    assert redis_client.locked_calls == 0
+    assert PREFIX_COOLDOWN + "anthropic" in redis_client.values
+    assert stats["distributed"] is True
+    assert sum(bucket["requests"] for bucket in redis_client.hashes.values()) == 6
+
+
+def test_shared_budget_holds_calls_back():
+    governor = make_governor(requests_per_minute=2)
+    governor.max_wait = 0.3
+    redis_client = LockCheckingRedis(governor)
+    governor.attach(FakeCacheManager(redis_client))
+
+    governor.call("anthropic", lambda: "ok")
+    governor.call("anthropic", lambda: "ok")
+    with pytest.raises(LLMQueueTimeout):
+        governor.call("anthropic", lambda: "over budget")
+    assert redis_client.locked_calls == 0
@@ -0,0 +1,153 @@
+"""Tests for single-flight coalescing of SQL generations."""
+
+import asyncio
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+
+from src.core import sql_generator
+from src.core.single_flight import SingleFlight, flight_key
+
+
+class FakeRedis:
+    """The handful of Redis commands SingleFlight uses, shared by several 'workers'."""
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def set(self, key, value, nx=False, px=None):
+        with self.lock:
+            if nx and key in self.values:
+                return None
+            self.values[key] = value
+            return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def pttl(self, key):
+        return 1000 if key in self.values else -2
+
+    def eval(self, script, numkeys, key, token):
+        with self.lock:
+            if self.values.get(key) == token:
+                del self.values[key]
+                return 1
+            return 0
+
+
+class FakeCacheManager:
+    enabled = True
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+
+
+def run_concurrently(flights, fns):
+    """Start the first call, let it become leader, then start the rest; return their results."""
+    results = [None] * len(fns)
+
+    def call(i):
+        results[i] = flights[i].do("key", fns[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(fns))]
+    threads[0].start()
+    time.sleep(0.05)
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def slow(result, calls):
+    def fn():
+        calls.append(1)
+        time.sleep(0.3)
+        return result
+    return fn
+
+
+def test_concurrent_callers_in_one_process_share_the_leaders_result():
+    flight = SingleFlight()
+    calls = []
+    fn = slow({"sql": "SELECT 1", "tables": ["t"]}, calls)
+
+    results = run_concurrently([flight] * 3, [fn] * 3)
+
+    assert len(calls) == 1
+    assert [coalesced for _, coalesced in results] == [False, True, True]
+    assert all(result == {"sql": "SELECT 1", "tables": ["t"]} for result, _ in results)
+    results[1][0]["tables"].append("changed")
+    assert results[2][0]["tables"] == ["t"]
+
+
+def test_json_native_results_are_shared_across_workers():
+    redis_client = FakeRedis()
+    workers = [SingleFlight(), SingleFlight()]
+    for worker in workers:
+        worker.attach(FakeCacheManager(redis_client))
+    calls = []
+
+    results = run_concurrently(workers, [slow({"sql": "SELECT 1", "rows": 2}, calls)] * 2)
+
+    assert len(calls) == 1
+    assert results[1] == ({"sql": "SELECT 1", "rows": 2}, True)
+
+
+def test_results_with_non_json_types_are_regenerated_not_stringified():
+    redis_client = FakeRedis()
+    workers = [SingleFlight(), SingleFlight()]
+    for worker in workers:
+        worker.attach(FakeCacheManager(redis_client))
+    calls = []
+    result = {"sql": "SELECT 1", "sample": [{"day": date(2026, 1, 2), "amount": Decimal("1.50")}]}
+
+    results = run_concurrently(workers, [slow(result, calls)] * 2)
+
+    assert len(calls) == 2  # The follower took over once the leader released without publishing
+    follower, coalesced = results[1]
+    assert coalesced is False
+    assert follower["sample"][0]["day"] == date(2026, 1, 2)
+    assert follower["sample"][0]["amount"] == Decimal("1.50")
+    assert workers[1].get_stats()["takeovers"] == 1
+
+
+def test_calls_on_the_event_loop_are_not_coalesced():
+    flight = SingleFlight()
+
+    async def run():
+        return flight.do("key", lambda: {"sql": "SELECT 1"})
+
+    assert asyncio.run(run()) == ({"sql": "SELECT 1"}, False)
+    assert flight.get_stats()["event_loop_calls"] == 1
+
+
+def test_flight_key_normalizes_the_question_only():
+    assert flight_key("sql:p.d", "Total  Sales ") == flight_key("sql:p.d", "total sales")
+    assert flight_key("sql:p.d", "total sales") != flight_key("sql:p.other", "total sales")
+    assert flight_key("sql:p.d", "total sales", {"max_tables": 5}) != flight_key("sql:p.d", "total sales")
+
+
+def test_sql_generator_keys_include_project_and_dataset(monkeypatch):
+    keys = []
+
+    class RecordingFlight:
+        def do(self, key, fn):
+            keys.append(key)
+            return fn(), False
+
+    monkeypatch.setattr(sql_generator, "get_single_flight", lambda: RecordingFlight())
+    for dataset in ("sales", "finance"):
+        generator = object.__new__(sql_generator.SQLGenerator)
+        generator.bq_client = type("BQ", (), {"project_id": "proj", "dataset_id": dataset})()
+        generator._generate_sql = lambda *args: {"sql": "SELECT 1"}
+        assert generator.generate_sql("total revenue") == {"sql": "SELECT 1"}
+
+    assert keys[0] != keys[1]
+    assert keys[0].startswith("sql:proj.sales:")
@@ -0,0 +1,71 @@
+"""Parity tests for the single-pass SQL rewriter against the legacy regex chain."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.core.sql_rewriter import fragment, render, rewrite_sql
+
+# The legacy chain lives in the rewrite benchmark
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+import benchmark_sql_rewriter as benchmark  # noqa: E402
+
+ENTRIES = benchmark.load_corpus(benchmark.CORPUS_PATH)
+PARITY = [entry for entry in ENTRIES if "intended_difference" not in entry]
+INTENDED = [entry for entry in ENTRIES if "intended_difference" in entry]
+SCHEMAS = [{"table_name": table} for table in benchmark.SCHEMA_TABLES]
+
+
+@pytest.fixture(scope="module")
+def context():
+    return benchmark.rewrite_context()
+
+
+@pytest.fixture(scope="module")
+def legacy():
+    return benchmark.LegacyRewriter(benchmark.PROJECT_ID, benchmark.DATASET_ID)
+
+
+def legacy_rewrite(legacy, sql):
+    return legacy.rewrite(sql, SCHEMAS, benchmark.VALID_TABLES)
+
+
+@pytest.mark.parametrize("entry", PARITY, ids=[entry["id"] for entry in PARITY])
+def test_rewrite_matches_the_legacy_chain(entry, context, legacy):
+    report = rewrite_sql(entry["sql"], context)
+    assert benchmark.sql_tokens(report.sql) == benchmark.sql_tokens(legacy_rewrite(legacy, entry["sql"]))
+    assert sorted(report.fired) == entry["expected_rules"]
+
+
+@pytest.mark.parametrize("entry", PARITY, ids=[entry["id"] for entry in PARITY])
+def test_rewriting_twice_matches_running_the_legacy_chain_twice(entry, context, legacy):
+    # SQL corrected after a failed validation goes through the rewriter again
+    twice = rewrite_sql(rewrite_sql(entry["sql"], context).sql, context).sql
+    legacy_twice = legacy_rewrite(legacy, legacy_rewrite(legacy, entry["sql"]))
+    assert benchmark.sql_tokens(twice) == benchmark.sql_tokens(legacy_twice)
+
+
+@pytest.mark.parametrize("entry", INTENDED, ids=[entry["id"] for entry in INTENDED])
+def test_intended_differences_are_still_differences(entry, context, legacy):
+    report = rewrite_sql(entry["sql"], context)
+    legacy_sql = legacy_rewrite(legacy, entry["sql"])
+    assert benchmark.sql_tokens(legacy_sql) == benchmark.sql_tokens(entry["expected_sql"])
+    assert benchmark.sql_tokens(report.sql) == benchmark.sql_tokens(entry["rewritten_sql"])
+    assert benchmark.sql_tokens(report.sql) != benchmark.sql_tokens(legacy_sql)
+    assert sorted(report.fired) == entry["expected_rules"]
+
+
+@pytest.mark.parametrize("entry", ENTRIES, ids=[entry["id"] for entry in ENTRIES])
+def test_fragment_renders_back_to_the_input(entry):
+    assert render(fragment(entry["sql"])) == entry["sql"]
+
+
+def test_valid_sql_is_left_alone(context):
+    sql = (f"SELECT Region, SUM(Revenue) AS total_revenue "
+           f"FROM `{benchmark.PROJECT_ID}.{benchmark.DATASET_ID}.dataset_25m_table` "
+           f"GROUP BY Region ORDER BY total_revenue DESC LIMIT 10")
+    report = rewrite_sql(sql, context)
+    assert report.sql == sql
+    assert not report.changed
@@ -0,0 +1,101 @@
+"""Tests for column-wise JSON, CSV and IPC serialization of Arrow results."""
+
+import datetime
+import io
+import json
+import math
+from decimal import Decimal
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from src.db.arrow_results import ColumnarResult
+
+ROWS = [
+    {"id": 1, "name": 'Say "hi"\\now', "amount": 12.5, "price": Decimal("3.10"), "active": True,
+     "day": datetime.date(2026, 1, 2), "at": datetime.datetime(2026, 1, 2, 3, 4, 5), "tags": ["a", "b"]},
+    {"id": 2, "name": "line\nbreak\ttab\r", "amount": float("nan"), "price": None, "active": False,
+     "day": None, "at": None, "tags": []},
+    {"id": None, "name": "bell\x07 und ünïcødé ✓", "amount": float("inf"), "price": Decimal("-0.5"),
+     "active": None, "day": datetime.date(1999, 12, 31), "at": datetime.datetime(2026, 6, 1), "tags": None},
+]
+
+
+def legacy_json(rows):
+    """What the row-dict path produced: jsonable_encoder values, with NaN/inf as null."""
+    def clean(value):
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        if isinstance(value, Decimal):
+            return float(value)
+        return value
+    return jsonable_encoder([{key: clean(value) for key, value in row.items()} for row in rows])
+
+
+@pytest.fixture
+def result():
+    return ColumnarResult.from_pylist(ROWS)
+
+
+def test_records_json_matches_the_row_dict_path(result):
+    assert json.loads(result.to_json()) == legacy_json(ROWS)
+
+
+def test_ndjson_has_one_row_object_per_line(result):
+    lines = result.to_ndjson().decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == legacy_json(ROWS)
+
+
+def test_columns_orient(result):
+    body = json.loads(result.to_json(orient="columns"))
+    expected = legacy_json(ROWS)
+    assert body["columns"] == list(ROWS[0])
+    assert body["data"] == {name: [row[name] for row in expected] for name in ROWS[0]}
+
+
+def test_encoding_survives_slicing_and_multiple_chunks():
+    batches = pa.Table.from_pylist(ROWS).to_batches(max_chunksize=1)
+    result = ColumnarResult.from_batches(batches)
+    assert result.table.column("name").num_chunks == 3
+    assert json.loads(result.to_json()) == legacy_json(ROWS)
+    assert json.loads(result.slice(1, 1).to_json()) == legacy_json(ROWS[1:2])
+
+
+def test_empty_results():
+    assert ColumnarResult.from_batches([]).to_json() == b"[]"
+    empty = ColumnarResult(pa.table({"id": pa.array([], pa.int64())}))
+    assert empty.to_json() == b"[]"
+    assert empty.to_ndjson() == b""
+    assert json.loads(empty.to_json(orient="columns")) == {"columns": ["id"], "data": {"id": []}}
+
+
+def test_csv_round_trip_writes_nested_columns_as_json(result):
+    frame = pd.read_csv(io.BytesIO(result.to_csv()), keep_default_na=False)
+    assert list(frame.columns) == list(ROWS[0])
+    assert frame["name"].tolist() == [row["name"] for row in ROWS]
+    assert frame["tags"].tolist() == ['["a", "b"]', "[]", ""]
+
+
+def test_ipc_round_trip(result):
+    read = pa.ipc.open_stream(result.to_ipc()).read_all()
+    assert read.schema == result.table.schema
+    assert read.drop_columns(["amount"]).equals(result.table.drop_columns(["amount"]))
+
+
+def test_map_columns_keeps_types_or_falls_back_to_strings(result):
+    mapped = result.map_columns(lambda name, values: [
+        (f"{value}!" if index == 0 else value) if name == "id" else values[index]
+        for index, value in enumerate(values)
+    ] if name in ("id", "name") else values)
+    assert mapped.table.column("id").type == pa.string()
+    assert mapped.to_pylist()[0]["id"] == "1!"
+    assert mapped.to_pylist()[1]["id"] == "2"
+    assert mapped.table.column("name").type == result.table.column("name").type
+
+
+def test_unknown_format_is_rejected(result):
+    assert result.serialize("csv")[1] == "text/csv"
+    with pytest.raises(ValueError):
+        result.serialize("xml")
@@ -0,0 +1,190 @@
+"""Tests for server-side result handles, signed cursors and streamed bodies."""
+
+import base64
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.db import result_streaming
+from src.db.result_streaming import (
+    BigQueryResultSource,
+    InvalidResultCursor,
+    ResultHandleExpired,
+    ResultHandleRegistry,
+    encode_cursor,
+    stream_json,
+    stream_ndjson,
+    streaming_body,
+)
+
+ROWS = [{"id": i, "region": f"r{i % 3}", "amount": i * 1.5} for i in range(23)]
+
+
+class FakeRows(list):
+    def __init__(self, rows, total_rows, next_page_token):
+        super().__init__(rows)
+        self.schema = [SimpleNamespace(name=name) for name in ROWS[0]]
+        self.total_rows = total_rows
+        self.next_page_token = next_page_token
+
+
+class FakeBigQuery:
+    """Jobs whose results page by integer offset tokens."""
+
+    def __init__(self):
+        self.jobs = {}
+
+    def _job(self, job_id, rows):
+        job = SimpleNamespace(job_id=job_id, location="US", destination=f"anon.{job_id}",
+                              result=lambda max_results=None: None)
+        self.jobs[job_id] = (job, rows)
+        return job
+
+    def query(self, sql):
+        return self._job(f"job_{len(self.jobs)}", list(ROWS))
+
+    def get_job(self, job_id, location=None):
+        return self.jobs[job_id][0]
+
+    def list_rows(self, destination, page_size, max_results, page_token=None):
+        rows = self.jobs[destination.split(".", 1)[1]][1]
+        start = int(page_token or 0)
+        end = start + max_results
+        return FakeRows(rows[start:end], len(rows), str(end) if end < len(rows) else None)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def get(self, key):
+        return self.values.get(key)
+
+
+@pytest.fixture(autouse=True)
+def cursor_secret(monkeypatch):
+    monkeypatch.setattr(result_streaming, "_cursor_secret", b"test-secret")
+
+
+def test_pages_add_up_to_the_whole_result():
+    bq = FakeBigQuery()
+    handle = ResultHandleRegistry().open(BigQueryResultSource(bq, sql="SELECT 1"))
+
+    rows, pages = [], []
+    while not handle.exhausted:
+        page = handle.page(10)
+        rows.extend(page["rows"])
+        pages.append((page["row_count"], page["has_more"], page["cursor"] is not None))
+
+    assert rows == ROWS
+    assert pages == [(10, True, True), (10, True, True), (3, False, False)]
+    assert handle.summary()["total_rows"] == len(ROWS)
+    assert handle.summary()["columns"] == list(ROWS[0])
+
+
+def test_cursor_resumes_an_expired_handle_on_another_worker():
+    bq = FakeBigQuery()
+    redis_client = FakeRedis()
+    workers = [ResultHandleRegistry(), ResultHandleRegistry()]
+    for worker in workers:
+        worker.attach(SimpleNamespace(enabled=True, redis=redis_client))
+
+    handle = workers[0].open(BigQueryResultSource(bq, sql="SELECT 1"))
+    first = handle.page(10)
+
+    resumed = workers[1].get(handle.handle_id, cursor=first["cursor"], bigquery_client=bq)
+
+    assert resumed.page(20)["rows"] == ROWS[10:]
+    assert workers[1].stats["resumed"] == 1
+
+
+def test_expired_handle_without_cursor_or_record_cannot_resume():
+    bq = FakeBigQuery()
+    issuer = ResultHandleRegistry()
+    handle = issuer.open(BigQueryResultSource(bq, sql="SELECT 1"))
+    cursor = handle.page(5)["cursor"]
+
+    with pytest.raises(ResultHandleExpired):
+        ResultHandleRegistry().get(handle.handle_id)
+    # A worker that never saw the handle (and shares no Redis) has no record of its job
+    with pytest.raises(ResultHandleExpired):
+        ResultHandleRegistry().get(handle.handle_id, cursor=cursor, bigquery_client=bq)
+
+
+def test_forged_and_foreign_cursors_are_rejected():
+    bq = FakeBigQuery()
+    registry = ResultHandleRegistry()
+    mine = registry.open(BigQueryResultSource(bq, sql="SELECT 1"))
+    other = registry.open(BigQueryResultSource(bq, sql="SELECT 2"))
+    cursor = mine.page(5)["cursor"]
+    other_cursor = other.page(5)["cursor"]
+    registry.close(mine.handle_id)
+
+    payload, _, signature = cursor.rpartition(".")
+    state = json.loads(base64.urlsafe_b64decode(payload))
+    tampered = base64.urlsafe_b64encode(json.dumps({**state, "job_id": "job_1"}).encode()).decode()
+
+    for bad in (f"{tampered}.{signature}",                          # Edited payload
+                other_cursor,                                          # Another handle's cursor
+                encode_cursor({**state, "job_id": "job_1"})):         # Validly signed, wrong job
+        with pytest.raises(InvalidResultCursor):
+            registry.get(mine.handle_id, cursor=bad, bigquery_client=bq)
+    assert registry.stats["rejected_cursors"] == 3
+
+
+def test_idle_handles_expire_and_the_oldest_is_evicted():
+    bq = FakeBigQuery()
+    registry = ResultHandleRegistry(idle_ttl=60, max_handles=2)
+    handles = [registry.open(BigQueryResultSource(bq, sql="SELECT 1")) for _ in range(3)]
+
+    with pytest.raises(ResultHandleExpired):
+        registry.get(handles[0].handle_id)
+    handles[1].last_used -= 120
+    assert registry.expire_idle() == 1
+    assert registry.get(handles[2].handle_id) is handles[2]
+
+
+def test_streamed_bodies_hold_every_row_and_a_summary():
+    bq = FakeBigQuery()
+    registry = ResultHandleRegistry()
+
+    ndjson = b"".join(stream_ndjson(registry.open(BigQueryResultSource(bq, sql="SELECT 1")), 7,
+                                    header={"sql": "SELECT 1"}))
+    lines = [json.loads(line) for line in ndjson.decode().splitlines()]
+    assert lines[0] == {"_meta": {"sql": "SELECT 1"}}
+    assert lines[1:-1] == ROWS
+    assert lines[-1]["_summary"]["rows_served"] == len(ROWS)
+
+    document = json.loads(b"".join(stream_json(registry.open(BigQueryResultSource(bq, sql="SELECT 1")), 7,
+                                               header={"sql": "SELECT 1"})))
+    assert document["sql"] == "SELECT 1"
+    assert document["rows"] == ROWS
+    assert document["summary"]["pages_served"] == 4
+
+
+def test_formatter_sees_each_page_with_its_columns():
+    bq = FakeBigQuery()
+    handle = ResultHandleRegistry().open(BigQueryResultSource(bq, sql="SELECT 1"))
+    seen = []
+
+    def formatter(rows, columns):
+        seen.append(columns)
+        return [{**row, "amount": f"{row['amount']:.2f}"} for row in rows]
+
+    assert handle.next_page(3, formatter)[1]["amount"] == "1.50"
+    assert seen == [list(ROWS[0])]
+
+
+def test_streaming_body_closes_its_handle(monkeypatch):
+    registry = ResultHandleRegistry()
+    monkeypatch.setattr(result_streaming, "get_result_handle_registry", lambda: registry)
+    handle = registry.open(BigQueryResultSource(FakeBigQuery(), sql="SELECT 1"))
+
+    body, media_type = streaming_body(handle, "ndjson", 10)
+    assert media_type == "application/x-ndjson"
+    assert len(b"".join(body).splitlines()) == len(ROWS) + 1
+    assert registry.get_stats()["open"] == 0
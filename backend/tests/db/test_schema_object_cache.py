@@ -0,0 +1,140 @@
+"""Tests for the decoded schema cache and its prompt fragments."""
+
+import json
+
+import pytest
+
+from src.db.schema_object_cache import SchemaObjectCache
+from src.db.weaviate_client import WeaviateClient
+from tests.fakes import FakeCollection, FakeWeaviate
+
+
+def legacy_prompt_block(schema):
+    """Table block LLMClient._build_user_prompt rendered inline before the cache."""
+    table_info = f"\nTable: {schema['table_name']}"
+    if schema.get('description'):
+        table_info += f"\nDescription: {schema['description']}"
+    table_info += "\nColumns:"
+    for col in schema['columns']:
+        col_info = f"\n  - {col['name']} ({col['type']})"
+        if col.get('description'):
+            col_info += f": {col['description']}"
+        col_info += f" {'[REQUIRED]' if not col['is_nullable'] else '[NULLABLE]'}"
+        table_info += col_info
+    return table_info
+
+
+def legacy_summary_block(schema):
+    """Table block LLMClient._format_schemas_for_prompt rendered inline before the cache."""
+    table_info = f"Table: {schema['table_name']}"
+    columns = [f"{col['name']} ({col['type']})" for col in schema['columns'][:10]]
+    table_info += "\nColumns: " + ", ".join(columns)
+    if len(schema['columns']) > 10:
+        table_info += f" ... and {len(schema['columns']) - 10} more"
+    return table_info
+
+
+def legacy_search_result(properties, distance):
+    """Result dict search_similar_tables decoded from full properties before the cache."""
+    return {
+        "table_name": properties["table_name"],
+        "dataset": properties["dataset"],
+        "project": properties["project"],
+        "description": properties["description"],
+        "columns": json.loads(properties["columns"]),
+        "row_count": properties["row_count"],
+        "distance": distance,
+    }
+
+
+def table(name, column_count, description="Sales facts"):
+    return {
+        "project": "p", "dataset": "d", "table_name": name, "description": description, "row_count": 10,
+        "columns": [{"name": f"c{i}", "type": "STRING", "is_nullable": i % 2 == 0,
+                     **({"description": f"column {i}"} if i % 3 == 0 else {})}
+                    for i in range(column_count)],
+    }
+
+
+def properties(schema):
+    return {**WeaviateClient._schema_properties(schema), "content_hash": "v1"}
+
+
+@pytest.mark.parametrize("schema", [table("sales", 3), table("wide", 14), table("bare", 2, description="")])
+def test_fragments_match_the_legacy_rendering(schema):
+    cache = SchemaObjectCache()
+    cached = cache.put("uuid-1", "v1", properties(schema)).schema
+
+    for _ in range(2):
+        assert cache.fragment(cached, "prompt") == legacy_prompt_block(schema)
+        assert cache.fragment(cached, "summary") == legacy_summary_block(schema)
+    # Schemas that never came from the cache are rendered directly, the same way
+    assert cache.fragment(schema, "prompt") == legacy_prompt_block(schema)
+    assert cache.stats["fragment_renders"] == 2
+    assert cache.stats["fragment_hits"] == 2
+
+
+def test_schema_with_replaced_columns_is_rendered_from_its_own_columns():
+    cache = SchemaObjectCache()
+    cached = cache.put("uuid-1", "v1", properties(table("sales", 3))).schema
+    cache.fragment(cached, "prompt")
+
+    trimmed = {**cached, "columns": cached["columns"][:1]}
+
+    assert cache.fragment(trimmed, "prompt") == legacy_prompt_block(trimmed)
+    assert cache.version(trimmed) is None
+    assert cache.version(cached) == "v1"
+
+
+def test_entries_are_served_only_for_their_version_and_until_invalidated():
+    cache = SchemaObjectCache()
+    cache.put("uuid-1", "v1", properties(table("sales", 3)))
+
+    assert cache.get("uuid-1", "v2") is None
+    assert cache.get("uuid-1", "v1") is not None
+    cache.invalidate(["uuid-1"])
+    assert cache.get("uuid-1", "v1") is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def make_client(collection):
+    client = object.__new__(WeaviateClient)  # Skips connecting and creating the collection
+    client.client = FakeWeaviate(collection)
+    client.collection_name = "TableSchemas"
+    client.schema_cache = SchemaObjectCache()
+    return client
+
+
+def test_search_returns_what_the_legacy_decoding_did_and_reuses_decoded_schemas():
+    collection = FakeCollection()
+    client = make_client(collection)
+    for name, vector in [("sales", [0.0, 1.0]), ("returns", [1.0, 0.0]), ("stock", [0.5, 0.5])]:
+        client.index_table_schema(table(name, 4), vector)
+
+    query = [0.1, 0.9]
+    expected = [legacy_search_result(hit.properties, hit.metadata.distance)
+                for hit in collection.query.near_vector(query, limit=2).objects]
+
+    first = client.search_similar_tables(query, limit=2)
+    fetches = collection.fetches
+    second = client.search_similar_tables(query, limit=2)
+
+    assert first == expected
+    assert second == expected
+    assert collection.fetches == fetches  # Every hit came from the cache
+    second[0]["distance"] = None
+    assert client.search_similar_tables(query, limit=2) == expected
+
+
+def test_search_picks_up_a_reindexed_schema():
+    collection = FakeCollection()
+    client = make_client(collection)
+    client.index_table_schema(table("sales", 2), [0.0, 1.0])
+    client.search_similar_tables([0.0, 1.0], limit=1)
+
+    # Another worker rewrites the table; this worker's cache only sees the new content hash
+    other = make_client(collection)
+    other.index_table_schema(table("sales", 5), [0.0, 1.0])
+
+    (result,) = client.search_similar_tables([0.0, 1.0], limit=1)
+    assert len(result["columns"]) == 5
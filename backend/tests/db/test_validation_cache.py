@@ -0,0 +1,92 @@
+"""Tests for the shared BigQuery dry-run validation cache."""
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from src.db.bigquery import BigQueryClient
+from src.db.validation_cache import ValidationCache, is_definitive_error, normalize_sql
+
+
+class FakeTableRef:
+    project, dataset_id, table_id = "p", "d", "orders"
+
+
+class FakeDryRun:
+    total_bytes_processed = 2 * 10 ** 12
+    referenced_tables = [FakeTableRef()]
+
+
+class FakeBigQuery:
+    """Dry runs raise the queued errors in turn, then succeed."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.dry_runs = 0
+
+    def query(self, sql, job_config=None):
+        self.dry_runs += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return FakeDryRun()
+
+
+def make_client(bq):
+    client = object.__new__(BigQueryClient)
+    client.client = bq
+    client.validation_cache = ValidationCache()
+    client.get_table_versions = lambda table_ids: {table_id: "v1" for table_id in table_ids}
+    return client
+
+
+def test_normalize_sql_keeps_literals_and_drops_trailing_semicolon():
+    assert normalize_sql("SELECT  'a  b'\n FROM `t  x` ;") == "SELECT 'a  b' FROM `t  x`"
+
+
+@pytest.mark.parametrize("error, definitive", [
+    (google_exceptions.BadRequest("Unrecognized name: foo", errors=[{"reason": "invalidQuery"}]), True),
+    (google_exceptions.BadRequest("Syntax error"), True),
+    (google_exceptions.BadRequest("Quota", errors=[{"reason": "quotaExceeded"}]), False),
+    (google_exceptions.Forbidden("Access denied"), False),
+    (google_exceptions.TooManyRequests("Slow down"), False),
+    (google_exceptions.DeadlineExceeded("Timed out"), False),
+    (ConnectionError("reset by peer"), False),
+])
+def test_only_query_errors_are_definitive(error, definitive):
+    assert is_definitive_error(error) is definitive
+
+
+def test_transient_dry_run_errors_are_not_cached():
+    bq = FakeBigQuery(google_exceptions.ServiceUnavailable("backend down"))
+    client = make_client(bq)
+
+    assert client.validate_query("SELECT 1")["valid"] is False
+    result = client.validate_query("SELECT 1")
+
+    assert result["valid"] is True
+    assert "from_cache" not in result
+    assert bq.dry_runs == 2
+
+
+def test_query_errors_are_cached():
+    bq = FakeBigQuery(google_exceptions.BadRequest("Unrecognized name: foo"))
+    client = make_client(bq)
+
+    first = client.validate_query("SELECT foo FROM t")
+    second = client.validate_query("SELECT  foo FROM t;")
+
+    assert first["valid"] is False
+    assert second == {**first, "from_cache": True}
+    assert bq.dry_runs == 1
+
+
+def test_valid_result_is_dropped_when_a_referenced_table_changes():
+    bq = FakeBigQuery()
+    client = make_client(bq)
+    client.validate_query("SELECT * FROM p.d.orders")
+    assert client.validate_query("SELECT * FROM p.d.orders")["from_cache"] is True
+
+    client.validation_cache.forget_tables()
+    client.get_table_versions = lambda table_ids: {table_id: "v2" for table_id in table_ids}
+
+    assert "from_cache" not in client.validate_query("SELECT * FROM p.d.orders")
+    assert bq.dry_runs == 2
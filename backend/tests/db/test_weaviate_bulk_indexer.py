@@ -0,0 +1,72 @@
+from src.db.weaviate_bulk_indexer import CONTENT_HASH_PROPERTY, IndexItem, WeaviateBulkIndexer
+from tests.fakes import FakeCollection
+
+
+def items(*keys, text="text"):
+    return [IndexItem(key=key, properties={"name": key}, text=f"{text} {key}") for key in keys]
+
+
+def embed(texts):
+    return [[float(len(text))] for text in texts]
+
+
+def test_index_writes_items_with_their_content_hash():
+    collection = FakeCollection()
+    report = WeaviateBulkIndexer(collection, embed).index(items("a", "b"))
+
+    assert (report.total, report.indexed, report.skipped, report.failed) == (2, 2, 0, 0)
+    for item in items("a", "b"):
+        assert collection.objects[item.uuid]["properties"][CONTENT_HASH_PROPERTY] == item.content_hash
+
+
+def test_unchanged_items_are_skipped_and_changed_ones_rewritten():
+    collection = FakeCollection()
+    indexer = WeaviateBulkIndexer(collection, embed)
+    indexer.index(items("a", "b"))
+
+    report = indexer.index(items("a") + items("b", text="changed"))
+
+    assert (report.skipped, report.indexed) == (1, 1)
+    assert report.indexed_keys == ["b"]
+
+
+def test_force_rewrites_unchanged_items():
+    collection = FakeCollection()
+    indexer = WeaviateBulkIndexer(collection, embed)
+    indexer.index(items("a"))
+
+    assert indexer.index(items("a"), force=True).indexed == 1
+
+
+def test_short_embedding_batch_fails_the_chunk_instead_of_dropping_items():
+    collection = FakeCollection()
+    indexer = WeaviateBulkIndexer(collection, lambda texts: embed(texts)[:-1], embedding_batch_size=3)
+
+    report = indexer.index(items("a", "b", "c", "d"))
+
+    # Chunk a-c got two vectors for three texts; chunk d got none
+    assert report.indexed == 0
+    assert report.failed == 4
+    assert {failure["stage"] for failure in report.failures} == {"embedding"}
+    assert collection.objects == {}
+
+
+def test_failed_writes_are_reported_and_not_counted_as_indexed():
+    rejected = items("b")[0].uuid
+    collection = FakeCollection(fail_uuids=[rejected])
+
+    report = WeaviateBulkIndexer(collection, embed).index(items("a", "b"))
+
+    assert report.indexed_keys == ["a"]
+    assert report.failures == [{"key": "b", "stage": "write", "error": "write rejected"}]
+
+
+def test_prune_removes_objects_that_are_no_longer_indexed():
+    collection = FakeCollection()
+    indexer = WeaviateBulkIndexer(collection, embed)
+    indexer.index(items("a", "b"))
+
+    report = indexer.index(items("a"), prune=True)
+
+    assert report.pruned == 1
+    assert list(collection.objects) == [items("a")[0].uuid]
@@ -0,0 +1,54 @@
+from src.db.schema_object_cache import SchemaObjectCache
+from src.db.weaviate_bulk_indexer import CONTENT_HASH_PROPERTY
+from src.db.weaviate_client import WeaviateClient
+from tests.fakes import FakeCollection, FakeWeaviate
+
+
+def schema(columns):
+    return {"project": "p", "dataset": "d", "table_name": "sales", "description": "Sales",
+            "columns": [{"name": name, "type": "STRING"} for name in columns]}
+
+
+def text_for(table):
+    return table["table_name"] + " " + " ".join(column["name"] for column in table["columns"])
+
+
+def make_client(collection):
+    client = object.__new__(WeaviateClient)  # Skips connecting and creating the collection
+    client.client = FakeWeaviate(collection)
+    client.collection_name = "TableSchemas"
+    client.schema_cache = SchemaObjectCache()
+    return client
+
+
+def test_single_table_index_stores_the_bulk_content_hash():
+    collection = FakeCollection()
+    client = make_client(collection)
+    table = schema(["region"])
+
+    client.index_table_schema(table, [0.1], text=text_for(table))
+    (stored,) = collection.objects.values()
+    assert stored["properties"][CONTENT_HASH_PROPERTY] == client._schema_item(table, text_for(table)).content_hash
+
+    # The next bulk run sees the table as unchanged
+    report = client.bulk_index_table_schemas([table], embed_batch=lambda texts: [[0.1]] * len(texts),
+                                             text_for=text_for)
+    assert report.skipped == 1
+
+
+def test_single_table_reindex_moves_the_cached_version():
+    collection = FakeCollection()
+    client = make_client(collection)
+    other_worker = SchemaObjectCache()
+    old, new = schema(["region"]), schema(["region", "channel"])
+
+    client.index_table_schema(old, [0.1], text=text_for(old))
+    (uuid, stored), = collection.objects.items()
+    old_version = stored["properties"][CONTENT_HASH_PROPERTY]
+    other_worker.put(uuid, old_version, stored["properties"])
+
+    client.index_table_schema(new, [0.2], text=text_for(new))
+    new_version = collection.objects[uuid]["properties"][CONTENT_HASH_PROPERTY]
+
+    assert new_version != old_version
+    assert other_worker.get(uuid, new_version) is None
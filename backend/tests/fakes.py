@@ -0,0 +1,78 @@
+"""In-memory stand-ins for external services, shared by the tests."""
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+
+class FakeCollection:
+    """The slice of a Weaviate v4 collection the indexer and WeaviateClient use."""
+
+    def __init__(self, fail_uuids=()):
+        self.objects = {}  # uuid -> {"properties": ..., "vector": ...}
+        self.fail_uuids = set(fail_uuids)
+        self.query = SimpleNamespace(fetch_objects=self._fetch_objects, near_vector=self._near_vector)
+        self.fetches = 0
+        self.data = SimpleNamespace(exists=self._exists, insert=self._insert, replace=self._replace,
+                                    delete_many=self._delete_many)
+        self.batch = SimpleNamespace(fixed_size=self._fixed_size, failed_objects=[])
+
+    def _hits(self, filters):
+        wanted = set(filters.value) if filters is not None else set(self.objects)
+        return [SimpleNamespace(uuid=uuid, properties=dict(obj["properties"]), metadata=None)
+                for uuid, obj in self.objects.items() if uuid in wanted]
+
+    def _fetch_objects(self, filters=None, return_properties=None, limit=None):
+        self.fetches += 1
+        return SimpleNamespace(objects=self._hits(filters))
+
+    def _near_vector(self, near_vector, limit, return_properties=None, return_metadata=None):
+        """Objects by ascending squared distance, carrying only return_properties (all when None)."""
+        ranked = sorted(
+            (sum((a - b) ** 2 for a, b in zip(near_vector, obj["vector"])), uuid, obj)
+            for uuid, obj in self.objects.items()
+        )[:limit]
+        return SimpleNamespace(objects=[
+            SimpleNamespace(
+                uuid=uuid,
+                properties={key: value for key, value in obj["properties"].items()
+                            if return_properties is None or key in return_properties},
+                metadata=SimpleNamespace(distance=distance),
+            )
+            for distance, uuid, obj in ranked
+        ])
+
+    def _exists(self, uuid):
+        return uuid in self.objects
+
+    def _insert(self, properties, vector, uuid):
+        self.objects[uuid] = {"properties": properties, "vector": vector}
+
+    def _replace(self, uuid, properties, vector):
+        self.objects[uuid] = {"properties": properties, "vector": vector}
+
+    def _delete_many(self, where):
+        for uuid in where.value:
+            self.objects.pop(uuid, None)
+
+    def iterator(self, return_properties=None):
+        return self._hits(None)
+
+    @contextmanager
+    def _fixed_size(self, batch_size, concurrent_requests):
+        self.batch.failed_objects = []
+        queued = []
+        yield SimpleNamespace(add_object=lambda properties, vector, uuid: queued.append((uuid, properties, vector)))
+        for uuid, properties, vector in queued:
+            if uuid in self.fail_uuids:
+                self.batch.failed_objects.append(
+                    SimpleNamespace(object_=SimpleNamespace(uuid=uuid), message="write rejected"))
+            else:
+                self.objects[uuid] = {"properties": properties, "vector": vector}
+
+
+class FakeWeaviate:
+    """A weaviate client with one collection."""
+
+    def __init__(self, collection: FakeCollection):
+        self.collection = collection
+        self.collections = SimpleNamespace(get=lambda name: collection)
@@ -0,0 +1,84 @@
+"""Parity tests for the precomputed facility match index against difflib."""
+
+import random
+from difflib import get_close_matches
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.facility_matcher import FacilityMatchIndex, normalize_facility_name
+
+WORDS = ["st", "mary's", "general", "memorial", "regional", "medical", "center", "hospital",
+         "community", "university", "health", "baptist", "mercy", "valley", "north", "children's"]
+
+
+def legacy_match(name, reference_facilities, cutoff=0.75):
+    """The per-row matcher FacilityMatchIndex replaced."""
+    if pd.isna(name):
+        return None
+    normalized = normalize_facility_name(name)
+    normalized_refs = {normalize_facility_name(f): f for f in reference_facilities}
+    if normalized in normalized_refs:
+        return normalized_refs[normalized]
+    matches = get_close_matches(normalized, normalized_refs.keys(), n=1, cutoff=cutoff)
+    return normalized_refs[matches[0]] if matches else None
+
+
+def typo(name, rng):
+    chars = list(name)
+    for _ in range(rng.randint(1, 3)):
+        position = rng.randrange(len(chars))
+        action = rng.choice(["drop", "swap", "replace"])
+        if action == "drop" and len(chars) > 3:
+            del chars[position]
+        elif action == "swap" and position + 1 < len(chars):
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+        else:
+            chars[position] = rng.choice("abcdefghijklmnopqrstuvwxyz ")
+    return "".join(chars)
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = random.Random(7)
+    references = [" ".join(rng.sample(WORDS, rng.randint(2, 5))).title() for _ in range(250)]
+    references += ["St. Mary's - Regional", "St Marys Regional", "Mercy  Hospital"]
+    queries = [typo(rng.choice(references), rng) for _ in range(200)]
+    queries += [rng.choice(references).upper() for _ in range(30)]
+    queries += ["Completely Unrelated Clinic", "", None, np.nan, "St Mary's-Regional"]
+    return references, queries
+
+
+@pytest.mark.parametrize("cutoff", [0.6, 0.75, 0.9])
+def test_matches_agree_with_difflib(corpus, cutoff):
+    references, queries = corpus
+    index = FacilityMatchIndex(references)
+    for query in queries:
+        assert index.match(query, cutoff=cutoff) == legacy_match(query, references, cutoff), query
+
+
+def test_batch_matches_agree_with_single_lookups(corpus):
+    references, queries = corpus
+    index = FacilityMatchIndex(references)
+    names = pd.Series(queries * 2, index=range(100, 100 + 2 * len(queries)))
+
+    matched = index.match_batch(names)
+
+    assert list(matched.index) == list(names.index)
+    assert list(matched) == [legacy_match(name, references) for name in names]
+    # Each distinct name is looked up once; missing values are never looked up
+    assert index.stats["lookups"] == len({name for name in queries if not pd.isna(name)})
+
+
+def test_later_duplicate_reference_wins_like_the_dict_build():
+    index = FacilityMatchIndex(["Mercy Hospital", "MERCY  hospital"])
+    assert len(index) == 1
+    assert index.match("mercy hospital") == "MERCY  hospital"
+    assert index.summary()["exact_matches"] == 1
+
+
+def test_empty_reference_set_matches_nothing():
+    index = FacilityMatchIndex([])
+    assert index.match("Mercy Hospital") is None
+    assert index.stats["misses"] == 1